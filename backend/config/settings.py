@@ -316,3 +316,84 @@ Q_CLUSTER = {
 # The Odds API
 THE_ODDS_API_KEY = os.getenv('THE_ODDS_API_KEY')
 THE_ODDS_API_BASE_URL = os.getenv('THE_ODDS_API_BASE_URL')
+
+# Line movement detection
+LINE_MOVEMENT_ALERT_THRESHOLD = float(os.getenv('LINE_MOVEMENT_ALERT_THRESHOLD', 0.05))  # Relative price change
+LINE_MOVEMENT_LEAD_WINDOW = int(os.getenv('LINE_MOVEMENT_LEAD_WINDOW', 30))  # Minutes a move is followed
+LINE_MOVEMENT_STREAM = os.getenv('LINE_MOVEMENT_STREAM', 'oddsley:line_movements')  # Empty to disable
+LINE_MOVEMENT_STREAM_MAXLEN = int(os.getenv('LINE_MOVEMENT_STREAM_MAXLEN', 100000))
+
+# Generated data (exports, tick store, task outputs) lives outside the source tree, which
+# docker-compose bind-mounts into the containers
+DATA_DIR = os.getenv('DATA_DIR', os.path.join(os.path.expanduser('~'), '.oddsley'))
+
+# Parquet export
+EXPORT_DIR = os.getenv('EXPORT_DIR', os.path.join(DATA_DIR, 'exports'))
+
+# Memory-mapped tick store read by OddsFrame
+TICK_STORE_DIR = os.getenv('TICK_STORE_DIR', os.path.join(DATA_DIR, 'ticks'))
+
+# Large task outputs are written here as NDJSON, only a reference is stored as the task result.
+# Outputs older than TASK_OUTPUT_MAX_AGE_DAYS are deleted when a new one is written (0 keeps them)
+TASK_OUTPUT_DIR = os.getenv('TASK_OUTPUT_DIR', os.path.join(DATA_DIR, 'task_output'))
+TASK_OUTPUT_CHUNK_ROWS = int(os.getenv('TASK_OUTPUT_CHUNK_ROWS', 100000))
+TASK_OUTPUT_MAX_AGE_DAYS = float(os.getenv('TASK_OUTPUT_MAX_AGE_DAYS', 7))
+
+# Odds rollups (OHLC per outcome): bucket sizes in seconds, and the most buckets a chart request
+# should return when the resolution is picked automatically
+ODDS_ROLLUP_BUCKETS = [int(seconds) for seconds in os.getenv('ODDS_ROLLUP_BUCKETS', '3600,86400').split(',')]
+ODDS_ROLLUP_MAX_POINTS = int(os.getenv('ODDS_ROLLUP_MAX_POINTS', 500))
+
+# Most points per bookmaker/outcome series the downsampled odds history endpoint returns
+ODDS_HISTORY_MAX_POINTS = int(os.getenv('ODDS_HISTORY_MAX_POINTS', 1000))
+
+# Backtest parameter sweeps: worker processes (0 uses every CPU) and the directory the shared
+# price history is memory-mapped from (defaults to the system temporary directory, /dev/shm keeps
+# it in RAM)
+SWEEP_PROCESSES = int(os.getenv('SWEEP_PROCESSES', 0))
+SWEEP_TMP_DIR = os.getenv('SWEEP_TMP_DIR') or None
+
+# Team ratings (Elo): starting rating, K-factor and home advantage in rating points. Rebuild the
+# ratings (rebuild_ratings) after changing them
+RATING_INITIAL = float(os.getenv('RATING_INITIAL', 1500))
+RATING_K = float(os.getenv('RATING_K', 20))
+RATING_HOME_ADVANTAGE = float(os.getenv('RATING_HOME_ADVANTAGE', 60))
+
+# Poisson score model: half-life in days of the weight of past results (0 weighs them equally),
+# the highest number of goals per side in the score matrices and the sports it is fitted for
+POISSON_HALF_LIFE_DAYS = float(os.getenv('POISSON_HALF_LIFE_DAYS', 365))
+POISSON_MAX_GOALS = int(os.getenv('POISSON_MAX_GOALS', 10))
+POISSON_SPORT_PREFIX = os.getenv('POISSON_SPORT_PREFIX', 'soccer_')
+
+# Season simulations: seasons per sport, seasons per batch (bounds the memory of a batch), worker
+# processes (0 uses every CPU), the positions that qualify for the finals, and the start date of the
+# current season (YYYY-MM-DD, empty starts it after the last break of more than SEASON_BREAK_DAYS)
+SEASON_SIMULATIONS = int(os.getenv('SEASON_SIMULATIONS', 100000))
+SEASON_BATCH_SIZE = int(os.getenv('SEASON_BATCH_SIZE', 10000))
+SEASON_PROCESSES = int(os.getenv('SEASON_PROCESSES', 0))
+SEASON_FINALS_PLACES = int(os.getenv('SEASON_FINALS_PLACES', 6))
+SEASON_START = os.getenv('SEASON_START', '')
+SEASON_BREAK_DAYS = int(os.getenv('SEASON_BREAK_DAYS', 45))
+
+# Value bets: lowest expected profit per unit staked against the model probability, and the
+# multiplier of the Kelly stake (0.25 stakes a quarter Kelly)
+VALUE_BET_MIN_EDGE = float(os.getenv('VALUE_BET_MIN_EDGE', 0.03))
+VALUE_BET_KELLY_MULTIPLIER = float(os.getenv('VALUE_BET_KELLY_MULTIPLIER', 0.25))
+
+# Bookmaker lead-lag analysis: bin size in seconds of the resampled price series, largest lag in
+# bins, days of odds history analysed and worker processes (0 uses every CPU)
+LEAD_LAG_RESOLUTION = int(os.getenv('LEAD_LAG_RESOLUTION', 300))
+LEAD_LAG_MAX_LAG = int(os.getenv('LEAD_LAG_MAX_LAG', 12))
+LEAD_LAG_WINDOW_DAYS = int(os.getenv('LEAD_LAG_WINDOW_DAYS', 90))
+LEAD_LAG_PROCESSES = int(os.getenv('LEAD_LAG_PROCESSES', 0))
+
+# Keyset pagination of the odds endpoints (/odd/, /outcomes/, /line-movements/, /latest-outcomes/,
+# /consensus/, /value-bets/, /rollups/, /event-odds/): rows per page by default and the most a
+# `page_size` query parameter can ask for
+ODDS_PAGE_SIZE = int(os.getenv('ODDS_PAGE_SIZE', 500))
+ODDS_MAX_PAGE_SIZE = int(os.getenv('ODDS_MAX_PAGE_SIZE', 5000))
+
+# Incremental aggregates (odds rollups, bookmaker stats) re-read the snapshots ingested this many
+# minutes before their watermark, so snapshots committed late by a concurrent ingest are not
+# skipped. The Parquet export only writes snapshots ingested at least this long ago.
+WATERMARK_OVERLAP_MINUTES = int(os.getenv('WATERMARK_OVERLAP_MINUTES', 10))
@@ -1,7 +1,14 @@
 from django.contrib import admin
 
-from .models import (Bookmaker, Event, EventResult, Market,
-                     Odd, Outcome, Region, Sport, Team)
+from .models import (ArbitrageOpportunity, Bookmaker, BookmakerStat,
+                     BookmakerStatWatermark, ClosingLine, Event,
+                     EventResult, ExportWatermark, LatestOutcome, LeadLag,
+                     LineMovement,
+                     Market, MarketConsensus, ModelProbability, Odd,
+                     OddsRollup, OpeningLine, Outcome, PoissonFit,
+                     RatingWatermark, Region, RollupWatermark, ScoreMatrix,
+                     SeasonProjection, SeasonSimulation, Sport, SweepResult,
+                     Team, TeamRating, TeamStrength, ValueBet)
 
 admin.site.register(Region)
 admin.site.register(Sport)
@@ -11,4 +18,26 @@ admin.site.register(Market)
 admin.site.register(Event)
 admin.site.register(Odd)
 admin.site.register(Outcome)
-admin.site.register(EventResult)
\ No newline at end of file
+admin.site.register(EventResult)
+admin.site.register(LatestOutcome)
+admin.site.register(MarketConsensus)
+admin.site.register(ArbitrageOpportunity)
+admin.site.register(LineMovement)
+admin.site.register(OpeningLine)
+admin.site.register(ClosingLine)
+admin.site.register(ExportWatermark)
+admin.site.register(OddsRollup)
+admin.site.register(RollupWatermark)
+admin.site.register(SweepResult)
+admin.site.register(TeamRating)
+admin.site.register(RatingWatermark)
+admin.site.register(PoissonFit)
+admin.site.register(TeamStrength)
+admin.site.register(ScoreMatrix)
+admin.site.register(ModelProbability)
+admin.site.register(SeasonSimulation)
+admin.site.register(SeasonProjection)
+admin.site.register(ValueBet)
+admin.site.register(LeadLag)
+admin.site.register(BookmakerStat)
+admin.site.register(BookmakerStatWatermark)
@@ -0,0 +1,9 @@
+from core.services.arbitrage_service import ArbitrageService
+from . import register, synthetic_prices
+
+
+@register('arbitrage')
+def arbitrage_benchmark(size: int):
+    """ Scan a board of `size` events quoted by ten bookmakers for arbitrage """
+    columns = synthetic_prices(size)
+    return lambda: ArbitrageService.find_arbitrage(columns), len(columns['id'])
@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.services import backtest
+from . import register
+
+
+def synthetic_history(n_events: int, n_bookmakers: int = 8, n_snapshots: int = 40, seed: int = 0) -> dict:
+    """ Price history of three-way markets drifting towards their fair price until kick-off
+
+    Args:
+        n_events (int): Number of settled events, one per hour
+        n_bookmakers (int): Number of bookmakers quoting every snapshot
+        n_snapshots (int): Number of hourly snapshots before commence time
+        seed (int): Seed of the random generator
+
+    Returns:
+        dict: Columns in the layout of `BacktestService.load_history`
+    """
+    rng = np.random.default_rng(seed)
+    fair = rng.dirichlet([4, 2, 3], size=n_events)
+    drift = rng.normal(1.0, 0.04, size=(n_events, n_snapshots, n_bookmakers, 3))
+    drift = 1 + (drift - 1) * np.linspace(1, 0.2, n_snapshots)[None, :, None, None]
+    quoted = fair[:, None, None, :] * 1.05 * drift
+    shape = quoted.shape
+    prices = np.round(1 / quoted, 2)
+    fair_probability = (1 / prices) / (1 / prices).sum(axis=-1, keepdims=True)
+
+    commence_times = np.datetime64('2030-01-01T00:00') + np.arange(n_events) * np.timedelta64(1, 'h')
+    timestamps = commence_times[:, None] - (n_snapshots - np.arange(n_snapshots)) * np.timedelta64(1, 'h')
+    scores = rng.poisson(1.3, size=(n_events, 2)).astype(float)
+    outcome = np.broadcast_to(np.arange(3)[None, None, None, :], shape).ravel()
+    event = np.broadcast_to(np.arange(n_events)[:, None, None, None], shape).ravel()
+    return {
+        'event': event,
+        'event_keys': np.array([f"event{i}" for i in range(n_events)], dtype=object),
+        'bookmaker': np.broadcast_to(np.arange(n_bookmakers)[None, None, :, None], shape).ravel(),
+        'bookmaker_keys': np.array([f"bookmaker{i}" for i in range(n_bookmakers)], dtype=object),
+        'market': np.zeros(quoted.size, dtype=np.int64),
+        'market_keys': np.array(['h2h'], dtype=object),
+        'name': outcome,
+        'name_keys': np.array(['Home', 'Draw', 'Away'], dtype=object),
+        'timestamp': np.broadcast_to(timestamps[:, :, None, None], shape).ravel().astype('datetime64[us]'),
+        'commence_time': commence_times[event].astype('datetime64[us]'),
+        'price': prices.ravel(),
+        'point': np.full(quoted.size, np.nan),
+        'fair_probability': fair_probability.ravel(),
+        'is_home': outcome == 0,
+        'is_away': outcome == 2,
+        'home_score': scores[event, 0],
+        'away_score': scores[event, 1],
+    }
+
+
+@register('backtest')
+def backtest_benchmark(size: int):
+    """ Backtest a best-price value strategy over `size` events with 40 snapshots from eight bookmakers """
+    history = synthetic_history(size)
+    strategy = backtest.Strategy(best_price=True, entry_hours=12, min_edge=0.02, staking='kelly', stake=0.25)
+    return lambda: backtest.summarise(backtest.evaluate(strategy, history)), len(history['price'])
@@ -0,0 +1,25 @@
+import pandas as pd
+
+from core.models import Outcome
+from core.services import frame_loader
+from . import register
+
+
+def outcome_sample(size: int):
+    """ The first `size` stored outcomes, the loader benchmarks read the configured database """
+    ids = list(Outcome.objects.order_by('id').values_list('id', flat=True)[:size])
+    return Outcome.objects.filter(id__lte=ids[-1] if ids else 0), len(ids)
+
+
+@register('loader')
+def loader_benchmark(size: int):
+    """ Load `size` outcomes into a DataFrame with the chunked, categorical frame loader """
+    queryset, rows = outcome_sample(size)
+    return lambda: frame_loader.load_frame(queryset), rows
+
+
+@register('loader_values')
+def loader_values_benchmark(size: int):
+    """ Load `size` outcomes into a DataFrame through `values()` dicts, the path the loader replaces """
+    queryset, rows = outcome_sample(size)
+    return lambda: pd.DataFrame(list(queryset.values())), rows
@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.services import parlay
+from . import register
+
+
+def synthetic_board(n_events: int, n_bookmakers: int = 10, seed: int = 0) -> dict:
+    """ Latest prices of h2h, spreads and totals markets with a ~5% bookmaker margin
+
+    Args:
+        n_events (int): Number of events on the board
+        n_bookmakers (int): Number of bookmakers quoting every market
+        seed (int): Seed of the random generator
+
+    Returns:
+        dict: Columns in the layout of `LatestOutcomeService.get_latest_columns`, seven outcomes per
+            event and bookmaker
+    """
+    rng = np.random.default_rng(seed)
+    h2h = rng.dirichlet([4, 2, 3], size=n_events)
+    spreads = rng.uniform(0.4, 0.6, size=(n_events, 1))
+    totals = rng.uniform(0.4, 0.6, size=(n_events, 1))
+    fair = np.hstack((h2h, spreads, 1 - spreads, totals, 1 - totals))
+    quoted = fair[:, None, :] * rng.normal(1.05, 0.03, size=(n_events, n_bookmakers, 7))
+    prices = np.round(1 / quoted, 2)
+    markets = np.array([0, 0, 0, 1, 1, 2, 2])
+    # Normalise each bookmaker's book of a market to its fair probabilities
+    implied = 1 / prices
+    books = np.stack([implied[..., markets == market].sum(axis=-1) for market in range(3)], axis=-1)
+    shape = quoted.shape
+    return {
+        'id': np.arange(quoted.size),
+        'event': np.broadcast_to(np.arange(n_events)[:, None, None], shape).ravel(),
+        'bookmaker': np.broadcast_to(np.arange(n_bookmakers)[None, :, None], shape).ravel(),
+        'market': np.broadcast_to(markets[None, None, :], shape).ravel(),
+        'name': np.broadcast_to(np.arange(7)[None, None, :], shape).ravel(),
+        'price': prices.ravel(),
+        'point': np.broadcast_to(np.array([np.nan, np.nan, np.nan, -1.5, 1.5, 2.5, 2.5])[None, None, :],
+                                 shape).ravel(),
+        'fair_probability': (implied / books[..., markets]).ravel(),
+    }
+
+
+@register('parlay')
+def parlay_benchmark(size: int):
+    """ Find the top 25 parlays of four, six and ten legs by expected value over a board of `size`
+    events with seven outcomes quoted by ten bookmakers
+    """
+    columns = synthetic_board(size)
+
+    def run():
+        legs = parlay.best_legs(columns)
+        pushes = np.zeros(len(legs['price']))
+        scores = parlay.leg_scores(legs['price'], legs['probability'], pushes, 'ev')
+        for n_legs in (4, 6, 10):
+            combinations, _ = parlay.top_parlays(legs['event'], scores, n_legs, 25)
+            parlay.combine(combinations, legs['price'], legs['probability'], pushes)
+
+    return run, len(columns['id'])
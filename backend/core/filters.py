@@ -0,0 +1,27 @@
+class QueryParamFilterMixin:
+    """ Filters the queryset of a view by its query parameters
+
+    Views declare `filter_params`, a mapping of query parameter to ORM lookup, e.g.
+    {'sport': 'event__sport_id'}. Parameters that are missing or empty are ignored.
+    """
+
+    filter_params = {}
+
+    def query_filters(self, params: dict = None) -> dict:
+        """ ORM lookups of the filter parameters given in the request
+
+        Args:
+            params (dict): Query parameter to lookup mapping, `filter_params` by default
+
+        Returns:
+            dict: Lookup -> value of the parameters given
+        """
+        filters = {}
+        for param, lookup in (self.filter_params if params is None else params).items():
+            value = self.request.query_params.get(param)
+            if value:
+                filters[lookup] = value
+        return filters
+
+    def filter_queryset(self, queryset):
+        return super().filter_queryset(queryset).filter(**self.query_filters())
@@ -0,0 +1,21 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services.lead_lag_service import LeadLagService
+
+
+class Command(BaseCommand):
+    help = 'Measure which bookmakers move their prices first per sport and market, on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only analyse this sport key')
+        parser.add_argument('--days', type=int, help='Days of odds history to analyse, defaults to LEAD_LAG_WINDOW_DAYS')
+        parser.add_argument('--processes', type=int, help='Worker processes, defaults to LEAD_LAG_PROCESSES')
+
+    def handle(self, *args, **options):
+        filters = {'key': options['sport']} if options.get('sport') else {}
+        since = timezone.now() - timedelta(days=options['days']) if options.get('days') else None
+        stored = LeadLagService().analyse(since=since, processes=options.get('processes'), **filters)
+        self.stdout.write(self.style.SUCCESS(f'Stored {stored} bookmaker lead-lag pairs'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.services.closing_line_service import ClosingLineService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the opening and closing line tables from the stored odds history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only backfill events of this sport key')
+        parser.add_argument('--batch_size', type=int, default=5000, help='Rows streamed and written per batch')
+
+    def handle(self, *args, **options):
+        filters = {'sport_id': options['sport']} if options.get('sport') else {}
+        opened, closed = ClosingLineService().backfill(batch_size=options['batch_size'], **filters)
+        self.stdout.write(self.style.SUCCESS(f'Backfilled {opened} opening and {closed} closing lines'))
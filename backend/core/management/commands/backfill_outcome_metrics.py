@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.services.outcome_metrics_service import OutcomeMetricsService
+
+
+class Command(BaseCommand):
+    help = 'Compute implied probability, overround and fair probability of stored outcomes and copy their snapshot timestamp'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only backfill snapshots of this sport key')
+        parser.add_argument('--batch_size', type=int, default=500, help='Snapshots processed per batch')
+        parser.add_argument('--missing', action='store_true',
+                            help='Only backfill snapshots with outcomes that have no timestamp yet')
+
+    def handle(self, *args, **options):
+        filters = {'event__sport_id': options['sport']} if options.get('sport') else {}
+        if options.get('missing'):
+            filters['outcome__timestamp__isnull'] = True
+        count = OutcomeMetricsService().backfill(batch_size=options['batch_size'], **filters)
+        self.stdout.write(self.style.SUCCESS(f'Stored metrics of {count} outcomes'))
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services.backtest import SIDES, STAKING_RULES, Strategy
+from core.services.backtest_service import BacktestService
+
+
+class Command(BaseCommand):
+    help = 'Backtest a betting strategy against the stored odds history and event results'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only include events of this sport key')
+        parser.add_argument('--start', type=str, help='Earliest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Latest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--markets', type=str, nargs='+', default=['h2h'], help='Market keys to bet')
+        parser.add_argument('--sides', type=str, nargs='+', choices=SIDES, help='Outcomes to bet')
+        parser.add_argument('--bookmakers', type=str, nargs='+', help='Bookmaker keys to bet with')
+        parser.add_argument('--best_price', action='store_true', help='Only take the best price across bookmakers')
+        parser.add_argument('--entry_hours', type=float, default=0.0,
+                            help='Take the latest price quoted at least this many hours before commence time')
+        parser.add_argument('--min_price', type=float, help='Lowest decimal price to bet')
+        parser.add_argument('--max_price', type=float, help='Highest decimal price to bet')
+        parser.add_argument('--min_edge', type=float, help='Lowest expected return against the consensus price')
+        parser.add_argument('--staking', type=str, choices=STAKING_RULES, default='flat', help='Staking rule')
+        parser.add_argument('--stake', type=float, default=1.0, help='Stake size of the staking rule')
+        parser.add_argument('--bankroll', type=float, default=100.0, help='Bankroll of the kelly staking rule')
+        parser.add_argument('--csv', type=str, help='Optional path to write every bet to')
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options.get('sport'):
+            filters['sport_id'] = options['sport']
+        if options.get('start'):
+            filters['commence_time__gte'] = timezone.make_aware(datetime.strptime(options['start'], '%Y-%m-%d'))
+        if options.get('end'):
+            filters['commence_time__lt'] = timezone.make_aware(datetime.strptime(options['end'], '%Y-%m-%d'))
+
+        try:
+            strategy = Strategy(markets=tuple(options['markets']),
+                                sides=tuple(options['sides']) if options.get('sides') else None,
+                                bookmakers=tuple(options['bookmakers']) if options.get('bookmakers') else None,
+                                best_price=options['best_price'],
+                                entry_hours=options['entry_hours'],
+                                min_price=options.get('min_price'),
+                                max_price=options.get('max_price'),
+                                min_edge=options.get('min_edge'),
+                                staking=options['staking'],
+                                stake=options['stake'],
+                                bankroll=options['bankroll'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        bets, summary = BacktestService().run(strategy, **filters)
+        if options.get('csv'):
+            bets.to_csv(options['csv'], index=False)
+
+        if bets.empty:
+            self.stdout.write(self.style.WARNING('The strategy placed no bets.'))
+            return
+        with pd.option_context('display.width', None):
+            self.stdout.write(str(pd.Series(summary)))
@@ -0,0 +1,66 @@
+import json
+import time
+from datetime import datetime
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.services.sweep_service import SweepService
+
+
+class Command(BaseCommand):
+    help = 'Backtest every combination of a strategy parameter grid on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('grid', type=str,
+                            help='JSON object of candidate values per strategy parameter, or @<path> of a JSON file')
+        parser.add_argument('--base', type=str, default='{}', help='JSON object of fixed strategy parameters')
+        parser.add_argument('--name', type=str, help='Name to store the results under')
+        parser.add_argument('--sport', type=str, help='Only include events of this sport key')
+        parser.add_argument('--start', type=str, help='Earliest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Latest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--processes', type=int, help='Number of worker processes')
+        parser.add_argument('--chunk_size', type=int, help='Parameter combinations per pool task')
+        parser.add_argument('--top', type=int, default=10, help='Number of best results to print')
+
+    @staticmethod
+    def parse_json(value: str) -> dict:
+        try:
+            if value.startswith('@'):
+                with open(value[1:]) as file:
+                    return json.load(file)
+            return json.loads(value)
+        except (OSError, json.JSONDecodeError) as e:
+            raise CommandError(f"Invalid JSON {value}: {str(e)}")
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options.get('sport'):
+            filters['sport_id'] = options['sport']
+        if options.get('start'):
+            filters['commence_time__gte'] = timezone.make_aware(datetime.strptime(options['start'], '%Y-%m-%d'))
+        if options.get('end'):
+            filters['commence_time__lt'] = timezone.make_aware(datetime.strptime(options['end'], '%Y-%m-%d'))
+
+        service = SweepService()
+        start = time.perf_counter()
+        try:
+            sweep, evaluated = service.run(self.parse_json(options['grid']),
+                                           base=self.parse_json(options['base']),
+                                           sweep=options.get('name'),
+                                           processes=options.get('processes'),
+                                           chunk_size=options.get('chunk_size'),
+                                           **filters)
+        except (ValueError, TypeError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Sweep {sweep}: evaluated {evaluated} combinations in {elapsed:.2f} s "
+            f"({evaluated / elapsed:,.1f} per second)"))
+        results = pd.DataFrame(service.get_results(sweep)[:options['top']])
+        if not results.empty:
+            with pd.option_context('display.width', None, 'display.max_columns', None,
+                                   'display.max_colwidth', None):
+                self.stdout.write(str(results.drop(columns=['id', 'sweep', 'created_at'])))
@@ -0,0 +1,36 @@
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import BENCHMARKS
+
+
+class Command(BaseCommand):
+    help = 'Time one of the registered benchmarks of the vectorised engines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', type=str, choices=sorted(BENCHMARKS), help='Name of the benchmark to run')
+        parser.add_argument('--size', type=int, default=10000, help='Problem size passed to the benchmark')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of timed runs, the best one is reported')
+
+    def handle(self, *args, **options):
+        func, rows = BENCHMARKS[options['name']](options['size'])
+
+        timings = []
+        for _ in range(options['repeat']):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        best = min(timings)
+        self.stdout.write(f"Benchmark: {options['name']} (size={options['size']})")
+        self.stdout.write(f"Rows: {rows}")
+        self.stdout.write(f"Best of {options['repeat']}: {best * 1000:.2f} ms")
+        self.stdout.write(f"Throughput: {rows / best:,.0f} rows/s")
+        self.stdout.write(f"Peak memory: {peak / 1024 / 1024:.1f} MiB")
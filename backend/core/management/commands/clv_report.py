@@ -0,0 +1,37 @@
+from datetime import datetime
+
+import pandas as pd
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services.closing_line_service import ClosingLineService
+
+
+class Command(BaseCommand):
+    help = 'Report closing line value and opening-price ROI per bookmaker and market'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only include events of this sport key')
+        parser.add_argument('--start', type=str, help='Earliest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--end', type=str, help='Latest commence time (format: YYYY-MM-DD)')
+        parser.add_argument('--csv', type=str, help='Optional path to write every line with its CLV to')
+
+    def handle(self, *args, **options):
+        filters = {}
+        if options.get('sport'):
+            filters['sport_id'] = options['sport']
+        if options.get('start'):
+            filters['commence_time__gte'] = timezone.make_aware(datetime.strptime(options['start'], '%Y-%m-%d'))
+        if options.get('end'):
+            filters['commence_time__lt'] = timezone.make_aware(datetime.strptime(options['end'], '%Y-%m-%d'))
+
+        service = ClosingLineService()
+        lines = service.compute_clv(**filters)
+        if options.get('csv'):
+            lines.to_csv(options['csv'], index=False)
+
+        if lines.empty:
+            self.stdout.write(self.style.WARNING('No lines with both an opening and a closing price.'))
+            return
+        with pd.option_context('display.max_rows', None, 'display.width', None, 'display.max_columns', None):
+            self.stdout.write(str(service.summarise_clv(lines)))
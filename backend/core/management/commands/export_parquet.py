@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.services.export_service import ExportService
+
+
+class Command(BaseCommand):
+    help = 'Export events, odds, outcomes and results to Parquet files partitioned by sport and month'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset',
+                            action='append',
+                            choices=list(ExportService.datasets),
+                            help='Dataset to export, repeat for several (default: all)')
+        parser.add_argument('--export_dir', type=str, help='Output directory (default: EXPORT_DIR setting)')
+        parser.add_argument('--batch_size', type=int, default=50000, help='Rows streamed and written per batch')
+
+    def handle(self, *args, **options):
+        counts = ExportService(export_dir=options.get('export_dir')).export(datasets=options.get('dataset'),
+                                                                            batch_size=options['batch_size'])
+        for dataset, rows in counts.items():
+            self.stdout.write(self.style.SUCCESS(f'Exported {rows} {dataset} rows'))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from core.services.tick_store_service import TickStoreService
+
+
+class Command(BaseCommand):
+    help = 'Write the odds history to a memory-mapped tick store readable with OddsFrame'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only export events of this sport key')
+        parser.add_argument('--path', type=str, help='Tick store directory (default: TICK_STORE_DIR setting)')
+        parser.add_argument('--batch_size', type=int, default=100000, help='Rows streamed per batch')
+
+    def handle(self, *args, **options):
+        filters = {'sport_id': options['sport']} if options.get('sport') else {}
+        written = TickStoreService().write(path=options.get('path'), batch_size=options['batch_size'], **filters)
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written} ticks'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.services.bookmaker_stats_service import BookmakerStatsService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the bookmaker stats from the whole odds history, e.g. after backfilling closing lines'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only rebuild the stats of this sport key')
+
+    def handle(self, *args, **options):
+        filters = {'key': options['sport']} if options.get('sport') else {}
+        written = BookmakerStatsService().rebuild(**filters)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} bookmaker stat buckets'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.services.latest_outcome_service import LatestOutcomeService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the latest outcome table from the stored odds history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only rebuild events of this sport key')
+        parser.add_argument('--batch_size', type=int, default=5000, help='Rows streamed and written per batch')
+
+    def handle(self, *args, **options):
+        filters = {'sport_id': options['sport']} if options.get('sport') else {}
+        count = LatestOutcomeService().rebuild(batch_size=options['batch_size'], **filters)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {count} latest outcomes'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from core.services.rating_service import RatingService
+
+
+class Command(BaseCommand):
+    help = 'Recompute the team ratings from every stored event result, e.g. after changing the RATING_* settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sport', type=str, help='Only rebuild the ratings of this sport key')
+
+    def handle(self, *args, **options):
+        filters = {'key': options['sport']} if options.get('sport') else {}
+        applied = RatingService().rebuild(**filters)
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt the team ratings from {applied} results'))
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services.season_service import SeasonService
+
+
+class Command(BaseCommand):
+    help = 'Simulate the rest of a season on a process pool and store the projected standings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sport', type=str, help='Sport key')
+        parser.add_argument('--since', type=str, help='Start date of the season (YYYY-MM-DD), defaults to the current season')
+        parser.add_argument('--simulations', type=int, help='Number of seasons, defaults to SEASON_SIMULATIONS')
+        parser.add_argument('--processes', type=int, help='Worker processes, defaults to SEASON_PROCESSES')
+        parser.add_argument('--batch_size', type=int, help='Seasons per batch, defaults to SEASON_BATCH_SIZE')
+        parser.add_argument('--seed', type=int, help='Seed of the random streams, for a reproducible projection')
+        parser.add_argument('--force', action='store_true', help='Simulate even when nothing changed')
+
+    def handle(self, *args, **options):
+        service = SeasonService()
+        since = timezone.make_aware(datetime.strptime(options['since'], '%Y-%m-%d')) if options.get('since') \
+            else service.season_start(options['sport'])
+        simulation = service.simulate_sport(options['sport'],
+                                            simulations=options.get('simulations'),
+                                            since=since,
+                                            seed=options.get('seed'),
+                                            processes=options.get('processes'),
+                                            batch_size=options.get('batch_size'),
+                                            force=options['force'])
+        if simulation is None:
+            self.stdout.write(self.style.WARNING(f"No fitted results or events for {options['sport']}"))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Simulated {simulation.simulations} seasons of {options['sport']} with {simulation.remaining} "
+            f"fixtures left (seed {simulation.seed})"))
@@ -1,5 +1,6 @@
 from django.core.management.base import BaseCommand
 from core.task_registry import TaskRegistry
+from core.services.task_output_service import TaskOutputService
 from loguru import logger
 import ast
 import pandas as pd
@@ -110,7 +111,13 @@ class Command(BaseCommand):
         try:
             result = TaskRegistry.run_task(task_name, **kwargs)
             logger.success(f'Task {task_name} executed successfully.')
-            if result:
+            if TaskOutputService.is_reference(result):
+                logger.info(f"Task output: {result['rows']} rows in {result['path']}")
+                result = pd.DataFrame(TaskOutputService.read(result))
+            if isinstance(result, pd.DataFrame):
+                with pd.option_context('display.max_rows', None, 'display.width', None, 'display.max_columns', None, 'display.max_colwidth', None):
+                    print(result)
+            elif result:
                 if isinstance(result, list) and isinstance(result[0], dict):
                     df = pd.DataFrame(result)
                     with pd.option_context('display.max_rows', None, 'display.width', None, 'display.max_columns', None, 'display.max_colwidth', None):
@@ -102,6 +102,12 @@ class EventResult(models.Model):
                                blank=True)
     details = models.JSONField(
         null=True, blank=True)  # For storing additional result details
+    # When the result was last saved (a new result or a corrected score), the watermark of the
+    # incremental ratings, Poisson fits and bookmaker stats
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['updated_at', 'id'])]
 
     def __str__(self):
         return f"{self.event}: {self.home_score} - {self.away_score}"
@@ -112,10 +118,13 @@ class Odd(models.Model):
     timestamp = models.DateTimeField(default=timezone.now)
     previous_timestamp = models.DateTimeField(null=True, blank=True)
     next_timestamp = models.DateTimeField(null=True, blank=True)
+    # When the snapshot was last (re-)ingested, the watermark of the incremental aggregates
+    ingested_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('event', 'timestamp')
         verbose_name_plural = 'Odds'
+        indexes = [models.Index(fields=['timestamp', 'id']), models.Index(fields=['ingested_at', 'id'])]
 
     def __str__(self):
         return f"{self.event} - {self.timestamp}"
@@ -196,6 +205,7 @@ class Odd(models.Model):
                                 defaults={
                                     'price': outcome_data['price'],
                                     'point': outcome_data.get('point'),
+                                    'timestamp': odd.timestamp,
                                 }
                             )
                             
@@ -233,10 +243,439 @@ class Outcome(models.Model):
     name = models.ForeignKey(Team, on_delete=models.CASCADE)
     price = models.DecimalField(max_digits=10, decimal_places=4)
     point = models.FloatField(null=True, blank=True)
+    implied_probability = models.FloatField(null=True, blank=True)
+    overround = models.FloatField(null=True, blank=True)
+    fair_probability = models.FloatField(null=True, blank=True)
+    # Copy of odd.timestamp so the history can be paged by (timestamp, id) without a join
+    timestamp = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('odd', 'bookmaker', 'market', 'name')
+        indexes = [models.Index(fields=['timestamp', 'id'])]
 
     def __str__(self):
         return f"{self.name} - {self.price}"
     
+
+
+class LatestOutcome(models.Model):
+    """ Most recent price per event/bookmaker/market/outcome, maintained at ingest time
+
+    Rows are upserted by the odds ingestion pipeline whenever a snapshot newer than the
+    stored one arrives, so readers of current prices never have to search `Odd.timestamp`.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='latest_outcomes')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    odd = models.ForeignKey(Odd, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=4)
+    point = models.FloatField(null=True, blank=True)
+    implied_probability = models.FloatField(null=True, blank=True)
+    overround = models.FloatField(null=True, blank=True)
+    fair_probability = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('event', 'bookmaker', 'market', 'name')
+
+    def __str__(self):
+        return f"{self.event} - {self.name} - {self.price}"
+
+
+class MarketConsensus(models.Model):
+    """ Best available price and bookmaker consensus per event/market/line/outcome
+
+    Rebuilt for an event from its latest outcomes every time a snapshot of the event is ingested.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='consensus')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    point = models.FloatField(null=True, blank=True)
+    line = models.FloatField(default=0)
+    best_price = models.DecimalField(max_digits=10, decimal_places=4)
+    best_bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE)
+    median_price = models.DecimalField(max_digits=10, decimal_places=4)
+    fair_probability = models.FloatField(null=True, blank=True)
+    fair_price = models.DecimalField(max_digits=10, decimal_places=4, null=True, blank=True)
+    bookmaker_count = models.IntegerField(default=0)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('event', 'market', 'line', 'name', 'point')
+        verbose_name_plural = 'Market consensus'
+
+    def __str__(self):
+        return f"{self.event} - {self.name} - {self.best_price}"
+
+
+class ArbitrageOpportunity(models.Model):
+    """ A cross-bookmaker arbitrage found by the arbitrage scanner
+
+    `legs` holds one entry per outcome with the bookmaker, price and the fraction of the total
+    stake to place on it so that every outcome returns the same amount.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='arbitrage_opportunities')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    line = models.FloatField(default=0)
+    implied_probability = models.FloatField()
+    profit_margin = models.FloatField()
+    legs = models.JSONField()
+    detected_at = models.DateTimeField(default=timezone.now)
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name_plural = 'Arbitrage opportunities'
+
+    def __str__(self):
+        return f"{self.event} - {self.market.key} - {self.profit_margin:.2%}"
+
+
+class LineMovement(models.Model):
+    """ A change in a bookmaker's price between two consecutive snapshots of an event
+
+    `first_mover` is set when no other bookmaker moved the same outcome in the same direction
+    shortly before, otherwise `led_by` names the bookmaker that moved first.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='line_movements')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='line_movements')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    point = models.FloatField(null=True, blank=True)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=4)
+    price = models.DecimalField(max_digits=10, decimal_places=4)
+    delta = models.FloatField()
+    delta_percent = models.FloatField()
+    velocity = models.FloatField(help_text='Price change per hour')
+    previous_timestamp = models.DateTimeField()
+    timestamp = models.DateTimeField()
+    first_mover = models.BooleanField(default=True)
+    led_by = models.ForeignKey(Bookmaker, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    is_alert = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [models.Index(fields=['event', 'timestamp']), models.Index(fields=['timestamp', 'id'])]
+
+    def __str__(self):
+        return f"{self.event} - {self.name} - {self.previous_price} -> {self.price}"
+
+
+class EventLine(models.Model):
+    """ A single stored price per event/bookmaker/market/outcome, see OpeningLine and ClosingLine
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    odd = models.ForeignKey(Odd, on_delete=models.CASCADE)
+    timestamp = models.DateTimeField()
+    price = models.DecimalField(max_digits=10, decimal_places=4)
+    point = models.FloatField(null=True, blank=True)
+    fair_probability = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        abstract = True
+        unique_together = ('event', 'bookmaker', 'market', 'name')
+
+    def __str__(self):
+        return f"{self.event} - {self.name} - {self.price}"
+
+
+class OpeningLine(EventLine):
+    """ The first price seen for an event/bookmaker/market/outcome """
+
+
+class ClosingLine(EventLine):
+    """ The last price seen before the event's commence time """
+
+
+class ExportWatermark(models.Model):
+    """ Ingest time up to which the snapshots were written by the Parquet export, per dataset """
+    dataset = models.CharField(primary_key=True, max_length=50)
+    last_ingested_at = models.DateTimeField(null=True, blank=True)
+    rows = models.BigIntegerField(default=0)
+    exported_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.dataset} - {self.last_ingested_at}"
+
+
+class OddsRollup(models.Model):
+    """ Open/high/low/close price per event/bookmaker/market/outcome/line and time bucket
+
+    Buckets are `bucket_seconds` long (see ODDS_ROLLUP_BUCKETS) and start at multiples of that
+    length since the Unix epoch. Every spread or total line of an outcome gets its own buckets.
+    Maintained incrementally from new snapshots by RollupService.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rollups')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    # Point of the outcome, 0 for markets without one (part of the key, unlike the nullable point)
+    line = models.FloatField(default=0)
+    bucket_seconds = models.IntegerField()
+    bucket_start = models.DateTimeField()
+    open = models.FloatField()
+    high = models.FloatField()
+    low = models.FloatField()
+    close = models.FloatField()
+    point = models.FloatField(null=True, blank=True)
+    open_timestamp = models.DateTimeField()
+    close_timestamp = models.DateTimeField()
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('event', 'bookmaker', 'market', 'name', 'line', 'bucket_seconds', 'bucket_start')
+        indexes = [models.Index(fields=['event', 'bucket_seconds', 'bucket_start'])]
+
+    def __str__(self):
+        return f"{self.event} - {self.name} - {self.bucket_start} ({self.bucket_seconds}s)"
+
+
+class RollupWatermark(models.Model):
+    """ Latest ingest time of the snapshots of a sport already aggregated into the odds rollups """
+    sport = models.OneToOneField(Sport, on_delete=models.CASCADE, primary_key=True)
+    last_ingested_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.last_ingested_at}"
+
+
+class SweepResult(models.Model):
+    """ Backtest summary of one parameter combination of a strategy sweep, see SweepService """
+    sweep = models.CharField(max_length=100, db_index=True)
+    parameters = models.JSONField()
+    bets = models.IntegerField(default=0)
+    settled = models.IntegerField(default=0)
+    staked = models.FloatField(default=0)
+    profit = models.FloatField(default=0)
+    roi = models.FloatField(null=True, blank=True)
+    hit_rate = models.FloatField(null=True, blank=True)
+    max_drawdown = models.FloatField(default=0)
+    clv = models.FloatField(null=True, blank=True)
+    beat_close = models.FloatField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sweep} - {self.parameters}"
+
+
+class TeamRating(models.Model):
+    """ Current Elo rating of a team, maintained from EventResult scores by RatingService """
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, primary_key=True, related_name='rating')
+    rating = models.FloatField()
+    games = models.IntegerField(default=0)
+    last_event = models.ForeignKey(Event, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.team} - {self.rating:.0f}"
+
+
+class RatingWatermark(models.Model):
+    """ Latest EventResult update and commence time of a sport already applied to the ratings
+
+    `recent_results` maps the id of every applied result saved within the overlap window before
+    `last_updated_at` to its `updated_at` (ISO 8601), so re-reading the window skips them.
+    """
+    sport = models.OneToOneField(Sport, on_delete=models.CASCADE, primary_key=True)
+    last_updated_at = models.DateTimeField(null=True, blank=True)
+    recent_results = models.JSONField(default=dict)
+    last_commence_time = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.last_updated_at}"
+
+
+class PoissonFit(models.Model):
+    """ Fitted Poisson score model of a sport and the results it was fitted on, see PoissonService """
+    sport = models.OneToOneField(Sport, on_delete=models.CASCADE, primary_key=True)
+    home_advantage = models.FloatField()
+    last_result_updated_at = models.DateTimeField(null=True, blank=True)
+    results = models.IntegerField(default=0)
+    iterations = models.IntegerField(default=0)
+    log_likelihood = models.FloatField(null=True, blank=True)
+    fitted_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.results} results"
+
+
+class TeamStrength(models.Model):
+    """ Attack and defence strength of a team in its sport's Poisson score model (1 is average) """
+    team = models.OneToOneField(Team, on_delete=models.CASCADE, primary_key=True, related_name='strength')
+    attack = models.FloatField()
+    defence = models.FloatField()
+    games = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.team} - {self.attack:.2f}/{self.defence:.2f}"
+
+
+class ScoreMatrix(models.Model):
+    """ Expected goals and score probabilities of an upcoming event under the Poisson score model
+
+    `matrix[i][j]` is the probability of the home side scoring i and the away side j goals.
+    """
+    event = models.OneToOneField(Event, on_delete=models.CASCADE, primary_key=True, related_name='score_matrix')
+    home_goals = models.FloatField()
+    away_goals = models.FloatField()
+    matrix = models.JSONField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.event} - {self.home_goals:.2f}:{self.away_goals:.2f}"
+
+
+class ModelProbability(models.Model):
+    """ Model probability of an outcome of an upcoming event, comparable with its quoted prices
+
+    `probability` is the chance the outcome wins and `push_probability` the chance its stake is
+    returned (whole-number lines), so the fair decimal price is (1 - push) / probability.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='model_probabilities')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    point = models.FloatField(null=True, blank=True)
+    probability = models.FloatField()
+    push_probability = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.event} - {self.name} {self.point} - {self.probability:.3f}"
+
+
+class SeasonSimulation(models.Model):
+    """ Monte Carlo simulation of the rest of a sport's season, see SeasonService
+
+    `fingerprint` identifies the results, fixtures and model fit it was run on, the simulation is
+    reused until it changes.
+    """
+    sport = models.OneToOneField(Sport, on_delete=models.CASCADE, primary_key=True)
+    fingerprint = models.CharField(max_length=64)
+    since = models.DateTimeField(null=True, blank=True)
+    simulations = models.IntegerField()
+    seed = models.BigIntegerField()
+    completed = models.IntegerField(default=0)
+    remaining = models.IntegerField(default=0)
+    simulated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.simulations} simulations"
+
+
+class SeasonProjection(models.Model):
+    """ Current standing and simulated final standing of a team
+
+    `positions[i]` is the probability of the team finishing in position i + 1.
+    """
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, related_name='season_projections')
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='season_projections')
+    played = models.IntegerField(default=0)
+    points = models.IntegerField(default=0)
+    goal_difference = models.IntegerField(default=0)
+    remaining = models.IntegerField(default=0)
+    mean_points = models.FloatField()
+    mean_position = models.FloatField()
+    title_probability = models.FloatField()
+    finals_probability = models.FloatField()
+    positions = models.JSONField()
+
+    class Meta:
+        unique_together = ('sport', 'team')
+
+    def __str__(self):
+        return f"{self.team} - {self.mean_position:.1f}"
+
+
+class ValueBet(models.Model):
+    """ A bookmaker price above the fair price of the model probability, found by ValueBetService
+
+    `edge` is the expected profit per unit staked and `kelly_fraction` the share of the bankroll
+    to stake (Kelly scaled by the VALUE_BET_KELLY_MULTIPLIER setting).
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='value_bets')
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    name = models.ForeignKey(Team, on_delete=models.CASCADE)
+    point = models.FloatField(null=True, blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=4)
+    probability = models.FloatField()
+    push_probability = models.FloatField(default=0)
+    edge = models.FloatField()
+    kelly_fraction = models.FloatField()
+    detected_at = models.DateTimeField(default=timezone.now)
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['active', 'event'])]
+
+    def __str__(self):
+        return f"{self.event} - {self.bookmaker} - {self.name} @ {self.price} ({self.edge:.2%})"
+
+
+class LeadLag(models.Model):
+    """ How long a bookmaker's price moves lead another's in a sport's market, see LeadLagService
+
+    `correlation` is the mean cross-correlation of the two bookmakers' price returns at
+    `lag_seconds` (its peak), `series` the number of outcome price series it is averaged over. A
+    lag of 0 means neither bookmaker leads.
+    """
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, related_name='lead_lags')
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    leader = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='leads')
+    follower = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='follows')
+    lag_seconds = models.IntegerField()
+    correlation = models.FloatField()
+    zero_lag_correlation = models.FloatField()
+    series = models.IntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('sport', 'market', 'leader', 'follower')
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.leader} leads {self.follower} by {self.lag_seconds}s"
+
+
+class BookmakerStat(models.Model):
+    """ Margin and efficiency aggregates of a bookmaker's prices in a sport's market for one day
+
+    Every field is a sum, so buckets are merged by adding them and any range is answered by
+    summing its days, see BookmakerStatsService. Quotes are bucketed by snapshot day, closing line
+    accuracy by the day the event commenced.
+    """
+    bookmaker = models.ForeignKey(Bookmaker, on_delete=models.CASCADE, related_name='stats')
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE)
+    market = models.ForeignKey(Market, on_delete=models.CASCADE)
+    day = models.DateField()
+    books = models.IntegerField(default=0, help_text='Quoted markets (snapshot and line)')
+    overround_books = models.IntegerField(default=0, help_text='Quoted markets with a complete book')
+    overround_sum = models.FloatField(default=0)
+    outcomes = models.IntegerField(default=0)
+    best_prices = models.IntegerField(default=0, help_text='Outcomes quoted at the best price of their snapshot')
+    closing_outcomes = models.IntegerField(default=0, help_text='Settled closing lines with a fair probability')
+    brier_sum = models.FloatField(default=0)
+    log_loss_sum = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = ('bookmaker', 'sport', 'market', 'day')
+        indexes = [models.Index(fields=['sport', 'market', 'day'])]
+
+    def __str__(self):
+        return f"{self.bookmaker} - {self.sport_id} - {self.market} - {self.day}"
+
+
+class BookmakerStatWatermark(models.Model):
+    """ Latest snapshot ingest time and result update of a sport already aggregated into the
+    bookmaker stats
+    """
+    sport = models.OneToOneField(Sport, on_delete=models.CASCADE, primary_key=True)
+    last_ingested_at = models.DateTimeField(null=True, blank=True)
+    last_result_updated_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.sport_id} - {self.last_ingested_at}/{self.last_result_updated_at}"
@@ -0,0 +1,154 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """ Keyset pagination of odds tables on (timestamp, id)
+
+    A page is read as the `page_size` rows after (or, paging back, before) the opaque cursor of
+    the previous page, so it is one range scan of the (timestamp, id) index however deep the page
+    is and no COUNT(*) is run. The cursor is the base64 encoded position of the last (or first)
+    row of the page. Rows without a timestamp are not paged.
+
+    Responses hold the 'next' and 'previous' page links (None at either end) and the 'results'.
+    Subclasses set `ordering` to page newest first, e.g. ('-timestamp', '-id'), or by another key
+    and a unique tie-breaker, e.g. ('-edge', '-id'). The key may be a datetime, a number or a string.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('timestamp', 'id')
+
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.ODDS_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.ODDS_PAGE_SIZE
+        return max(1, min(page_size, settings.ODDS_MAX_PAGE_SIZE))
+
+    def fields(self) -> tuple[str, str, bool]:
+        """ Key and id field of the ordering and whether it is descending """
+        key_field, id_field = (field.lstrip('-') for field in self.ordering)
+        return key_field, id_field, self.ordering[0].startswith('-')
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        """ Link to the page after (or before, when reverse) a row """
+        key_field, id_field, _ = self.fields()
+        key = getattr(row, key_field)
+        # Datetimes are stored as ISO 8601 under 't', other keys as JSON values under 'k'
+        if isinstance(key, datetime):
+            position = {'t': key.isoformat()}
+        else:
+            position = {'k': float(key) if isinstance(key, Decimal) else key}
+        position.update(i=getattr(row, id_field), r=int(reverse))
+        cursor = base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        """ Position (key, id, reverse) of the cursor of a request, None without a cursor
+
+        Raises:
+            NotFound: If the cursor is invalid
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            position = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if 't' in position:
+                key = parse_datetime(position['t'])
+                if key is None:
+                    raise ValueError(position['t'])
+            else:
+                key = position['k']
+            if not isinstance(key, (datetime, int, float, str)) or not isinstance(position['i'], (int, str)):
+                raise TypeError(position)
+            return key, position['i'], bool(position['r'])
+        except (ValueError, TypeError, KeyError):
+            raise NotFound('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = remove_query_param(request.build_absolute_uri(), self.cursor_query_param)
+        page_size = self.get_page_size(request)
+        key_field, id_field, descending = self.fields()
+        position = self.decode_cursor(request)
+        reverse = bool(position and position[2])
+
+        queryset = queryset.filter(**{f"{key_field}__isnull": False})
+        if position:
+            key, row_id = position[0], position[1]
+            direction = 'lt' if reverse != descending else 'gt'
+            # The plain range condition on the key lets the database range scan the index
+            queryset = queryset.filter(Q(**{f"{key_field}__{direction}": key}) |
+                                       Q(**{key_field: key, f"{id_field}__{direction}": row_id}),
+                                       **{f"{key_field}__{direction}e": key})
+        order = [field[1:] if field.startswith('-') else f"-{field}" for field in self.ordering] if reverse \
+            else list(self.ordering)
+        rows = list(queryset.order_by(*order)[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        self.next_link = self.previous_link = None
+        if rows:
+            # Paging forward there is a previous page behind any cursor, paging back a next one
+            if has_more or reverse:
+                self.next_link = self.encode_cursor(rows[-1], reverse=False)
+            if (has_more and reverse) or (position and not reverse):
+                self.previous_link = self.encode_cursor(rows[0], reverse=True)
+        return rows
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.next_link,
+            'previous': self.previous_link,
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class NewestFirstKeysetPagination(KeysetPagination):
+    """ Keyset pagination on (timestamp, id), newest first """
+
+    ordering = ('-timestamp', '-id')
+
+
+class CommenceTimeKeysetPagination(KeysetPagination):
+    """ Keyset pagination of events (or rows annotated with their event's commence_time) on
+    (commence_time, id), soonest first
+    """
+
+    ordering = ('commence_time', 'id')
+
+
+class BucketKeysetPagination(KeysetPagination):
+    """ Keyset pagination of rollups on (bucket_start, id) """
+
+    ordering = ('bucket_start', 'id')
+
+
+class LargestEdgeFirstKeysetPagination(KeysetPagination):
+    """ Keyset pagination of value bets on (edge, id), largest edge first """
+
+    ordering = ('-edge', '-id')
@@ -3,7 +3,43 @@ from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 
 
-from .models import Event, Odd, Outcome, Sport, Team
+from .models import (ArbitrageOpportunity, Event, LatestOutcome, LeadLag,
+                     LineMovement, MarketConsensus, ModelProbability, Odd,
+                     OddsRollup, Outcome, SeasonProjection, Sport,
+                     SweepResult, Team, TeamRating, ValueBet)
+from .services import odds_format
+
+
+def request_odds_format(context: dict) -> str:
+    """ Odds format asked for with the `odds_format` query parameter, decimal by default """
+    request = context.get('request')
+    value = request.query_params.get('odds_format') if request is not None else None
+    if value and value not in odds_format.FORMATS:
+        raise serializers.ValidationError({'odds_format': f"Expected one of {', '.join(odds_format.FORMATS)}"})
+    return value or 'decimal'
+
+
+class OddsFormatListSerializer(serializers.ListSerializer):
+    """ Converts the price fields of a whole result set at once, see OddsFormatSerializer """
+
+    def to_representation(self, data):
+        rows = super().to_representation(data)
+        return odds_format.convert_rows(rows, self.child.Meta.price_fields, request_odds_format(self.context))
+
+
+class OddsFormatSerializer(serializers.ModelSerializer):
+    """ Model serializer whose decimal price fields (Meta.price_fields) are returned in the odds
+    format of the `odds_format` query parameter: decimal (default), american or fractional
+
+    Subclasses set `list_serializer_class = OddsFormatListSerializer` in their Meta so lists are
+    converted in one vectorised pass instead of row by row.
+    """
+
+    def to_representation(self, instance):
+        row = super().to_representation(instance)
+        if isinstance(self.parent, serializers.ListSerializer):
+            return row
+        return odds_format.convert_rows([row], self.Meta.price_fields, request_odds_format(self.context))[0]
 
 class RegisterSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=True)
@@ -63,8 +99,191 @@ class OddSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class OutcomeSerializer(serializers.ModelSerializer):
+class OutcomeSerializer(OddsFormatSerializer):
 
     class Meta:
         model = Outcome
         fields = '__all__'
+        price_fields = ['price']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class LatestOutcomeSerializer(OddsFormatSerializer):
+
+    class Meta:
+        model = LatestOutcome
+        fields = '__all__'
+        price_fields = ['price']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class MarketConsensusSerializer(OddsFormatSerializer):
+
+    class Meta:
+        model = MarketConsensus
+        fields = '__all__'
+        price_fields = ['best_price', 'median_price', 'fair_price']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class ArbitrageOpportunityListSerializer(serializers.ListSerializer):
+    """ Converts the leg prices of every opportunity of a result set at once, see ArbitrageOpportunitySerializer """
+
+    def to_representation(self, data):
+        rows = super().to_representation(data)
+        return ArbitrageOpportunitySerializer.convert_prices(rows, self.context)
+
+
+class ArbitrageOpportunitySerializer(serializers.ModelSerializer):
+    """ Arbitrage opportunity whose leg prices follow the `odds_format` query parameter """
+
+    class Meta:
+        model = ArbitrageOpportunity
+        fields = '__all__'
+        list_serializer_class = ArbitrageOpportunityListSerializer
+
+    @staticmethod
+    def convert_prices(rows: list[dict], context: dict) -> list[dict]:
+        """ Convert the leg prices of serialised opportunities in one vectorised pass """
+        legs = [leg for row in rows for leg in row['legs']]
+        odds_format.convert_rows(legs, ['price'], request_odds_format(context))
+        return rows
+
+    def to_representation(self, instance):
+        row = super().to_representation(instance)
+        if isinstance(self.parent, serializers.ListSerializer):
+            return row
+        return self.convert_prices([row], self.context)[0]
+
+
+class LineMovementSerializer(OddsFormatSerializer):
+
+    class Meta:
+        model = LineMovement
+        fields = '__all__'
+        price_fields = ['previous_price', 'price']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class OddsRollupSerializer(OddsFormatSerializer):
+
+    class Meta:
+        model = OddsRollup
+        fields = '__all__'
+        price_fields = ['open', 'high', 'low', 'close']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class SweepResultSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SweepResult
+        fields = '__all__'
+
+
+class TeamRatingSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = TeamRating
+        fields = '__all__'
+
+
+class ModelProbabilitySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = ModelProbability
+        fields = '__all__'
+
+
+class SeasonProjectionSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = SeasonProjection
+        fields = '__all__'
+
+
+class ValueBetSerializer(OddsFormatSerializer):
+
+    class Meta:
+        model = ValueBet
+        fields = '__all__'
+        price_fields = ['price']
+        list_serializer_class = OddsFormatListSerializer
+
+
+class LeadLagSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = LeadLag
+        fields = '__all__'
+
+
+class TeamSummarySerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = Team
+        fields = ['id', 'name']
+
+
+class EventOddsListSerializer(serializers.ListSerializer):
+    """ Converts the prices of every event of a result set at once, see EventOddsSerializer """
+
+    def to_representation(self, data):
+        rows = super().to_representation(data)
+        return EventOddsSerializer.convert_prices(rows, self.context)
+
+
+class EventOddsSerializer(serializers.ModelSerializer):
+    """ Event with its teams and current prices nested per bookmaker and market
+
+    Reads `latest_outcomes` from the prefetch cache, so the queryset must prefetch them with their
+    bookmaker, market and name (see EventOddsViewSet). Prices follow the `odds_format` query parameter.
+    """
+    home_team = TeamSummarySerializer(read_only=True)
+    away_team = TeamSummarySerializer(read_only=True)
+    timestamp = serializers.SerializerMethodField()
+    bookmakers = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Event
+        fields = ['id', 'sport', 'commence_time', 'home_team', 'away_team', 'timestamp', 'bookmakers']
+        list_serializer_class = EventOddsListSerializer
+
+    @staticmethod
+    def convert_prices(rows: list[dict], context: dict) -> list[dict]:
+        """ Convert the outcome prices of serialised events in one vectorised pass """
+        outcomes = [outcome for row in rows for bookmaker in row['bookmakers'] for market in bookmaker['markets']
+                    for outcome in market['outcomes']]
+        odds_format.convert_rows(outcomes, ['price'], request_odds_format(context))
+        return rows
+
+    def to_representation(self, instance):
+        row = super().to_representation(instance)
+        if isinstance(self.parent, serializers.ListSerializer):
+            return row
+        return self.convert_prices([row], self.context)[0]
+
+    def get_timestamp(self, event):
+        """ Time of the most recent snapshot with a current price """
+        return max((outcome.timestamp for outcome in event.latest_outcomes.all()), default=None)
+
+    def get_bookmakers(self, event):
+        bookmakers = {}
+        for outcome in event.latest_outcomes.all():
+            bookmaker = bookmakers.setdefault(outcome.bookmaker_id, {
+                'key': outcome.bookmaker.key,
+                'title': outcome.bookmaker.title,
+                'last_update': outcome.timestamp,
+                'markets': {},
+            })
+            bookmaker['last_update'] = max(bookmaker['last_update'], outcome.timestamp)
+            bookmaker['markets'].setdefault(outcome.market.key, []).append({
+                'name': outcome.name.name,
+                'price': float(outcome.price),
+                'point': outcome.point,
+            })
+        return [{
+            **bookmaker,
+            'markets': [{'key': key, 'outcomes': outcomes} for key, outcomes in bookmaker['markets'].items()],
+        } for bookmaker in bookmakers.values()]
+
@@ -1,4 +1,23 @@
 from .oddsapi_service import OddsAPIService
 from .sport_service import SportService
 from .event_service import EventService
-from .odd_service import OddService
\ No newline at end of file
+from .odd_service import OddService
+from .latest_outcome_service import LatestOutcomeService
+from .consensus_service import ConsensusService
+from .outcome_metrics_service import OutcomeMetricsService
+from .line_movement_service import LineMovementService
+from .closing_line_service import ClosingLineService
+from .as_of_service import AsOfService
+from .export_service import ExportService
+from .tick_store_service import TickStoreService
+from .task_output_service import TaskOutputService
+from .rollup_service import RollupService
+from .odds_history_service import OddsHistoryService
+from .sweep_service import SweepService
+from .rating_service import RatingService
+from .poisson_service import PoissonService
+from .season_service import SeasonService
+from .value_bet_service import ValueBetService
+from .lead_lag_service import LeadLagService
+from .bookmaker_stats_service import BookmakerStatsService
+from .parlay_service import ParlayService
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import ArbitrageOpportunity, Bookmaker, Team
+from core.services import frame_loader, odds_math
+from core.services.latest_outcome_service import LatestOutcomeService
+
+
+class ArbitrageService:
+    """ Service class to scan the latest prices for cross-bookmaker arbitrage
+    """
+
+    def __init__(self):
+        self.latest_outcome_service = LatestOutcomeService()
+        logger.debug("ArbitrageService initialized")
+
+    @staticmethod
+    def find_arbitrage(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Find arbitrage over every event/market/line of a set of latest prices in one vectorised pass
+
+        The best price of every outcome is taken across bookmakers, and a market is an arbitrage when
+        all of its outcomes are covered and the implied probabilities of those best prices add up to
+        less than one. Stakes are split in proportion to the implied probabilities so each outcome
+        pays out the same.
+
+        Args:
+            columns (dict[str, np.ndarray]): Aligned columns 'event', 'bookmaker', 'market', 'name',
+                'price' and 'point', keys encoded as integers
+
+        Returns:
+            dict[str, np.ndarray]: Per arbitrage leg the input 'row', the 'market_label' grouping legs
+                of one opportunity, the 'stake' fraction and per leg the 'implied_probability' sum of
+                its opportunity
+        """
+        prices = columns['price'].astype(float)
+        groups = odds_math.market_groups(columns)
+        markets, n_markets = groups['markets'], groups['n_markets']
+        cells, n_cells = groups['cells'], groups['n_cells']
+
+        best_rows = odds_math.group_argmax(prices, cells, n_cells)
+        best_implied = odds_math.implied_probabilities(prices[best_rows])
+        cell_markets = markets[best_rows]
+
+        implied_sum = np.bincount(cell_markets, weights=best_implied, minlength=n_markets)
+        cells_per_market = np.bincount(cell_markets, minlength=n_markets)
+        widest_book = np.zeros(n_markets, dtype=np.int64)
+        books_first = odds_math.group_first(groups['books'], groups['n_books'])
+        np.maximum.at(widest_book, markets[books_first], np.bincount(groups['books'], minlength=groups['n_books']))
+
+        is_arbitrage = (implied_sum < 1) & (cells_per_market >= 2) & (cells_per_market == widest_book)
+        legs = is_arbitrage[cell_markets]
+        return {
+            'row': best_rows[legs],
+            'market_label': cell_markets[legs],
+            'stake': best_implied[legs] / implied_sum[cell_markets[legs]],
+            'implied_probability': implied_sum[cell_markets[legs]],
+        }
+
+    @transaction.atomic
+    def scan(self, **kwargs) -> int:
+        """ Scan the latest prices of events that have not started and store the arbitrage found
+
+        Every opportunity stored by earlier scans in the scope of the scan is marked inactive,
+        including those of events that have started or are no longer quoted.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering the latest outcomes and the stored
+                opportunities, lookups on the event or market, e.g. event__sport_id
+
+        Returns:
+            int: Number of arbitrage opportunities found
+        """
+        logger.debug(f"Scanning for arbitrage with filters: {kwargs}")
+        columns = self.latest_outcome_service.get_latest_columns(event__commence_time__gt=timezone.now(), **kwargs)
+        ArbitrageOpportunity.objects.filter(active=True, **kwargs).update(active=False)
+        if not len(columns['id']):
+            return 0
+
+        found = self.find_arbitrage(columns)
+        bookmakers = dict(Bookmaker.objects.filter(id__in=np.unique(columns['bookmaker'][found['row']]).tolist()).values_list('id', 'key'))
+        names = dict(Team.objects.filter(id__in=np.unique(columns['name'][found['row']]).tolist()).values_list('id', 'name'))
+
+        opportunities = []
+        for label in np.unique(found['market_label']):
+            legs = found['market_label'] == label
+            rows = found['row'][legs]
+            first = rows[0]
+            implied_probability = float(found['implied_probability'][legs][0])
+            opportunities.append(ArbitrageOpportunity(
+                event_id=columns['event_keys'][columns['event'][first]],
+                market_id=int(columns['market'][first]),
+                line=float(odds_math.line_of(columns['point'][first:first + 1])[0]),
+                implied_probability=implied_probability,
+                profit_margin=1 / implied_probability - 1,
+                legs=[{
+                    'bookmaker': bookmakers[int(columns['bookmaker'][row])],
+                    'name': names[int(columns['name'][row])],
+                    'price': float(columns['price'][row]),
+                    'point': None if np.isnan(columns['point'][row]) else float(columns['point'][row]),
+                    'stake': float(stake),
+                } for row, stake in zip(rows, found['stake'][legs])]))
+        ArbitrageOpportunity.objects.bulk_create(opportunities)
+        logger.debug(f"Found {len(opportunities)} arbitrage opportunities")
+        return len(opportunities)
+
+    def get_opportunities(self, **kwargs) -> list[dict]:
+        """ Get the active arbitrage opportunities from the database
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of arbitrage opportunity data
+        """
+        logger.debug(f"Getting arbitrage opportunities with filters: {kwargs}")
+        return list(ArbitrageOpportunity.objects.filter(active=True, **kwargs).values())
+
+    def get_opportunities_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the active arbitrage opportunities as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting arbitrage opportunities frame with filters: {kwargs}")
+        return frame_loader.load_frame(ArbitrageOpportunity.objects.filter(active=True, **kwargs))
+
+    def __del__(self):
+        logger.debug("ArbitrageService terminated")
@@ -0,0 +1,175 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from core.models import Odd, Outcome
+
+
+class AsOfService:
+    """ Service class to resolve batches of point-in-time odds lookups
+
+    Every (event, time) pair is matched to the latest snapshot of the event at or before that time
+    with one sorted search over the snapshots of all requested events, then the outcomes of the
+    matched snapshots are fetched in one query.
+    """
+
+    chunk_size = 10000
+
+    def __init__(self):
+        logger.debug("AsOfService initialized")
+
+    @staticmethod
+    def validate_lookups(lookups: list[dict]) -> pd.DataFrame:
+        """ Validate the lookups and parse them into columns
+
+        Args:
+            lookups (list[dict]): List of {'event': <event id>, 'time': <ISO 8601 datetime>}
+
+        Raises:
+            ValueError: If lookups is not a non-empty list
+            ValueError: If a lookup is not a dictionary with 'event' and 'time'
+            ValueError: If a time can not be parsed
+
+        Returns:
+            pd.DataFrame: Columns 'event' and 'time' (UTC)
+        """
+        logger.debug("Validating as-of lookups")
+        if not isinstance(lookups, list) or not lookups:
+            raise ValueError("lookups must be a non-empty list")
+        if not all(isinstance(lookup, dict) and {'event', 'time'} <= set(lookup) for lookup in lookups):
+            raise ValueError("Each lookup must be a dictionary with 'event' and 'time' keys")
+
+        frame = pd.DataFrame.from_records(lookups, columns=['event', 'time'])
+        frame['event'] = frame['event'].astype(str)
+        try:
+            frame['time'] = pd.to_datetime(frame['time'], utc=True, format='ISO8601')
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"Each lookup time must be an ISO 8601 datetime: {str(e)}")
+        return frame
+
+    @staticmethod
+    def validate_options(markets: list[str] = None, bookmakers: list[str] = None, max_age: int = None) -> None:
+        """ Validate the optional filters of a batch of lookups
+
+        Args:
+            markets (list[str]): Optional market keys to return
+            bookmakers (list[str]): Optional bookmaker keys to return
+            max_age (int): Optional maximum age in seconds of a matched snapshot
+
+        Raises:
+            ValueError: If markets or bookmakers is not a list of strings
+            ValueError: If max_age is not a non-negative integer
+        """
+        for name, keys in (('markets', markets), ('bookmakers', bookmakers)):
+            if keys is not None and not (isinstance(keys, list) and all(isinstance(key, str) for key in keys)):
+                raise ValueError(f"{name} must be a list of strings")
+        if max_age is not None and (isinstance(max_age, bool) or not isinstance(max_age, int) or max_age < 0):
+            raise ValueError("max_age must be a non-negative integer (seconds)")
+
+    @staticmethod
+    def match_snapshots(odd_events: np.ndarray, odd_times: np.ndarray, lookup_events: np.ndarray,
+                        lookup_times: np.ndarray, max_age: np.timedelta64 = None) -> np.ndarray:
+        """ Find the latest snapshot at or before each lookup time in one vectorised search
+
+        Args:
+            odd_events (np.ndarray): Integer event code of each snapshot
+            odd_times (np.ndarray): Timestamp (datetime64) of each snapshot
+            lookup_events (np.ndarray): Integer event code of each lookup
+            lookup_times (np.ndarray): Timestamp (datetime64) of each lookup
+            max_age (np.timedelta64): Optional maximum age of the matched snapshot
+
+        Returns:
+            np.ndarray: Index into the snapshot arrays per lookup, -1 where there is no match
+        """
+        matched = np.full(len(lookup_events), -1, dtype=np.int64)
+        if len(odd_events) == 0:
+            return matched
+
+        times = odd_times.astype('datetime64[us]')
+        queries = lookup_times.astype('datetime64[us]')
+        # Rank all timestamps together so (event, rank) packs into one sortable integer key
+        _, ranks = np.unique(np.concatenate((times, queries)), return_inverse=True)
+        ranks = ranks.reshape(-1)
+        n_ranks = int(ranks.max()) + 1
+        keys = odd_events.astype(np.int64) * n_ranks + ranks[:len(times)]
+        lookup_keys = lookup_events.astype(np.int64) * n_ranks + ranks[len(times):]
+
+        order = np.argsort(keys, kind='stable')
+        positions = np.searchsorted(keys[order], lookup_keys, side='right') - 1
+        candidates = order[np.clip(positions, 0, None)]
+
+        valid = (positions >= 0) & (odd_events[candidates] == lookup_events)
+        if max_age is not None:
+            valid &= queries - times[candidates] <= max_age
+        matched[valid] = candidates[valid]
+        return matched
+
+    def lookup(self, lookups: list[dict], markets: list[str] = None, bookmakers: list[str] = None,
+               max_age: int = None) -> dict:
+        """ Resolve a batch of (event, time) lookups to the prices of the nearest prior snapshot
+
+        Args:
+            lookups (list[dict]): List of {'event': <event id>, 'time': <ISO 8601 datetime>}
+            markets (list[str]): Optional market keys to return
+            bookmakers (list[str]): Optional bookmaker keys to return
+            max_age (int): Optional maximum age in seconds of a matched snapshot
+
+        Raises:
+            ValueError: If the lookups or the filters are invalid, see `validate_lookups` and
+                `validate_options`
+
+        Returns:
+            dict: 'lookups' with one {'event', 'time', 'odd', 'timestamp'} per requested pair (odd and
+                timestamp are None when nothing matched) and 'outcomes' as columns 'odd', 'bookmaker',
+                'market', 'name', 'price' and 'point'
+        """
+        frame = self.validate_lookups(lookups)
+        self.validate_options(markets, bookmakers, max_age)
+        logger.debug(f"Resolving {len(frame)} as-of lookups")
+
+        event_keys, lookup_events = np.unique(frame['event'].to_numpy(dtype=str), return_inverse=True)
+        snapshots = []
+        for start in range(0, len(event_keys), self.chunk_size):
+            snapshots += Odd.objects.filter(event_id__in=event_keys[start:start + self.chunk_size].tolist()).values_list(
+                'id', 'event_id', 'timestamp')
+        odd_ids = np.array([odd_id for odd_id, _, _ in snapshots], dtype=np.int64)
+        odd_events = np.searchsorted(event_keys, np.array([event_id for _, event_id, _ in snapshots], dtype=str)).astype(
+            np.int64)
+        odd_times = np.array([timestamp.replace(tzinfo=None) for _, _, timestamp in snapshots], dtype='datetime64[us]')
+        lookup_times = frame['time'].dt.tz_localize(None).to_numpy(dtype='datetime64[us]')
+
+        matched = self.match_snapshots(odd_events, odd_times, lookup_events.reshape(-1), lookup_times,
+                                       None if max_age is None else np.timedelta64(max_age, 's'))
+
+        has_match = matched >= 0
+        matched_ids = [None] * len(frame)
+        matched_times = [None] * len(frame)
+        for index in np.flatnonzero(has_match):
+            matched_ids[index] = int(odd_ids[matched[index]])
+            matched_times[index] = f"{np.datetime_as_string(odd_times[matched[index]], unit='s')}Z"
+
+        outcomes = {field: [] for field in ('odd', 'bookmaker', 'market', 'name', 'price', 'point')}
+        unique_ids = np.unique(odd_ids[matched[has_match]]).tolist()
+        for start in range(0, len(unique_ids), self.chunk_size):
+            queryset = Outcome.objects.filter(odd_id__in=unique_ids[start:start + self.chunk_size])
+            if markets:
+                queryset = queryset.filter(market__key__in=markets)
+            if bookmakers:
+                queryset = queryset.filter(bookmaker__key__in=bookmakers)
+            for row in queryset.order_by('odd_id', 'bookmaker_id', 'market_id', 'name_id').values_list(
+                    'odd_id', 'bookmaker__key', 'market__key', 'name__name', 'price', 'point'):
+                for field, value in zip(outcomes, row):
+                    outcomes[field].append(value)
+
+        return {
+            'lookups': [{
+                'event': event,
+                'time': time.isoformat(),
+                'odd': odd_id,
+                'timestamp': timestamp,
+            } for event, time, odd_id, timestamp in zip(frame['event'], frame['time'], matched_ids, matched_times)],
+            'outcomes': outcomes,
+        }
+
+    def __del__(self):
+        logger.debug("AsOfService terminated")
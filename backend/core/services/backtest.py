@@ -0,0 +1,225 @@
+""" Vectorised backtesting of declarative betting strategies
+
+A backtest runs over a price history: aligned NumPy columns with one element per quoted outcome
+of every stored snapshot (see `BacktestService.load_history` for the layout). A `Strategy`
+declares which outcomes to bet, when before the commence time to take the price and how much to
+stake. `evaluate` turns it into bets with a handful of sorts and masks over the whole history and
+`summarise` reports ROI, drawdown and closing line value (CLV), so a season is tested without
+looping over events and one loaded history can be reused across many strategies.
+"""
+from dataclasses import dataclass
+
+import numpy as np
+
+from core.services import odds_math
+
+SIDES = ('home', 'away', 'draw', 'over', 'under')
+STAKING_RULES = ('flat', 'to_win', 'kelly')
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """ Declarative betting strategy
+
+    Attributes:
+        markets (tuple[str]): Market keys to bet
+        sides (tuple[str]): Outcomes to bet out of SIDES, None for all
+        bookmakers (tuple[str]): Bookmaker keys to bet with, None for all
+        best_price (bool): Only take the best price across bookmakers per outcome and line
+        entry_hours (float): Take the latest price quoted at least this long before commence time
+        min_price (float): Optional lowest decimal price to bet
+        max_price (float): Optional highest decimal price to bet
+        min_edge (float): Optional lowest expected return against the consensus fair probability
+        staking (str): 'flat' stakes `stake` units, 'to_win' stakes to win `stake` units and
+            'kelly' stakes `stake` times the Kelly fraction of `bankroll`
+        stake (float): Stake size of the staking rule
+        bankroll (float): Bankroll of the 'kelly' staking rule (not compounded)
+    """
+    markets: tuple = ('h2h', )
+    sides: tuple = None
+    bookmakers: tuple = None
+    best_price: bool = False
+    entry_hours: float = 0.0
+    min_price: float = None
+    max_price: float = None
+    min_edge: float = None
+    staking: str = 'flat'
+    stake: float = 1.0
+    bankroll: float = 100.0
+
+    def __post_init__(self):
+        if self.staking not in STAKING_RULES:
+            raise ValueError(f"staking must be one of {', '.join(STAKING_RULES)}")
+        if self.sides is not None and not set(self.sides) <= set(SIDES):
+            raise ValueError(f"sides must be out of {', '.join(SIDES)}")
+        if self.entry_hours < 0:
+            raise ValueError("entry_hours must not be negative")
+        if self.stake <= 0:
+            raise ValueError("stake must be positive")
+
+
+def key_mask(codes: np.ndarray, keys: np.ndarray, selected) -> np.ndarray:
+    """ Mask of the rows whose dictionary encoded key is in `selected` (all rows for None) """
+    if selected is None:
+        return np.ones(len(codes), dtype=bool)
+    return np.isin(keys.astype(object), list(selected))[codes]
+
+
+def latest_per_group(labels: np.ndarray, timestamps: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """ Row of the latest timestamp per group among the masked rows
+
+    Args:
+        labels (np.ndarray): Group label of each row
+        timestamps (np.ndarray): Timestamp of each row
+        mask (np.ndarray): Rows to consider
+
+    Returns:
+        np.ndarray: Selected rows, one per group with a masked row, in label order
+    """
+    rows = np.flatnonzero(mask)
+    rows = rows[np.lexsort((timestamps[rows], labels[rows]))]
+    last = np.append(labels[rows][1:] != labels[rows][:-1], True) if len(rows) else np.zeros(0, dtype=bool)
+    return rows[last]
+
+
+def sides_of(history: dict, rows: np.ndarray) -> np.ndarray:
+    """ Side ('home', 'away', 'draw', 'over', 'under' or '') of the given rows """
+    names = history['name_keys'][history['name'][rows]].astype(object)
+    return np.select([history['is_home'][rows], history['is_away'][rows], names == 'Draw', names == 'Over',
+                      names == 'Under'], list(SIDES), default='')
+
+
+def evaluate(strategy: Strategy, history: dict) -> dict[str, np.ndarray]:
+    """ Bets a strategy places over a price history, settled against the final scores
+
+    Args:
+        strategy (Strategy): Strategy to evaluate
+        history (dict): Price history columns
+
+    Returns:
+        dict[str, np.ndarray]: One element per bet in commence time order: 'event', 'bookmaker',
+            'market', 'name', 'point', 'timestamp', 'commence_time', 'price', 'closing_price',
+            'closing_point', 'clv' (NaN where the point moved between entry and close), 'edge', 'stake',
+            'result' (1 win, 0 loss, NaN void or unsettled), 'settled' and 'profit'
+    """
+    labels, n_groups = odds_math.group_labels(history['event'], history['bookmaker'], history['market'],
+                                              history['name'])
+    eligible = (key_mask(history['market'], history['market_keys'], strategy.markets)
+                & key_mask(history['bookmaker'], history['bookmaker_keys'], strategy.bookmakers))
+    timestamps, commence_times = history['timestamp'], history['commence_time']
+    entry_cutoff = commence_times - np.timedelta64(int(round(strategy.entry_hours * 3600)), 's')
+
+    closing_price, closing_point = np.full(n_groups, np.nan), np.full(n_groups, np.nan)
+    closing = latest_per_group(labels, timestamps, eligible & (timestamps < commence_times))
+    closing_price[labels[closing]] = history['price'][closing]
+    closing_point[labels[closing]] = history['point'][closing]
+    rows = latest_per_group(labels, timestamps, eligible & (timestamps < entry_cutoff))
+
+    # Consensus fair probability of each outcome and line across the bookmakers at entry
+    lines = odds_math.line_of(history['point'][rows])
+    cells, n_cells = odds_math.group_labels(history['event'][rows], history['market'][rows], history['name'][rows],
+                                            lines)
+    fair = np.nan_to_num(history['fair_probability'][rows].astype(float), nan=0.0)
+    quoted = np.bincount(cells, weights=(fair > 0).astype(float), minlength=n_cells)
+    consensus = np.bincount(cells, weights=fair, minlength=n_cells) / np.where(quoted > 0, quoted, np.nan)
+    prices = history['price'][rows].astype(float)
+    edge = prices * consensus[cells] - 1
+
+    selected = np.ones(len(rows), dtype=bool)
+    if strategy.sides is not None:
+        selected &= np.isin(sides_of(history, rows), list(strategy.sides))
+    if strategy.min_price is not None:
+        selected &= prices >= strategy.min_price
+    if strategy.max_price is not None:
+        selected &= prices <= strategy.max_price
+    if strategy.min_edge is not None:
+        selected &= edge >= strategy.min_edge
+    if strategy.best_price and selected.any():
+        candidates = np.flatnonzero(selected)
+        candidate_cells, n_candidate_cells = odds_math.group_labels(cells[candidates])
+        best = odds_math.group_argmax(prices[candidates], candidate_cells, n_candidate_cells)
+        selected[:] = False
+        selected[candidates[best]] = True
+
+    rows, prices, edge = rows[selected], prices[selected], edge[selected]
+    if strategy.staking == 'flat':
+        stakes = np.full(len(rows), float(strategy.stake))
+    elif strategy.staking == 'to_win':
+        stakes = strategy.stake / (prices - 1)
+    else:
+        stakes = strategy.stake * strategy.bankroll * np.clip(np.nan_to_num(edge / (prices - 1)), 0, 1)
+    placed = stakes > 0
+    rows, prices, edge, stakes = rows[placed], prices[placed], edge[placed], stakes[placed]
+    order = np.lexsort((history['event'][rows], commence_times[rows]))
+    rows, prices, edge, stakes = rows[order], prices[order], edge[order], stakes[order]
+
+    names = history['name_keys'][history['name'][rows]].astype(object)
+    markets = history['market_keys'][history['market'][rows]].astype(object)
+    home_scores = history['home_score'][rows].astype(float)
+    away_scores = history['away_score'][rows].astype(float)
+    results = odds_math.settle_outcomes(markets, names, history['point'][rows].astype(float),
+                                        history['is_home'][rows], history['is_away'][rows], home_scores, away_scores)
+    closing_prices, closing_points = closing_price[labels[rows]], closing_point[labels[rows]]
+    points = history['point'][rows].astype(float)
+    # A closing price of another line (e.g. -4.5 after entering at -3.5) is not comparable
+    moved = ~((points == closing_points) | (np.isnan(points) & np.isnan(closing_points)))
+    return {
+        'event': history['event_keys'][history['event'][rows]],
+        'bookmaker': history['bookmaker_keys'][history['bookmaker'][rows]],
+        'market': markets,
+        'name': names,
+        'point': history['point'][rows],
+        'timestamp': timestamps[rows],
+        'commence_time': commence_times[rows],
+        'price': prices,
+        'closing_price': closing_prices,
+        'closing_point': closing_points,
+        'clv': np.where(moved, np.nan, prices / closing_prices - 1),
+        'edge': edge,
+        'stake': stakes,
+        'result': results,
+        'settled': ~np.isnan(home_scores) & ~np.isnan(away_scores),
+        'profit': odds_math.settled_profit(prices, results) * stakes,
+    }
+
+
+def max_drawdown(profits: np.ndarray) -> float:
+    """ Largest fall of the cumulative profit from its running peak (starting at 0)
+
+    Args:
+        profits (np.ndarray): Profit of each bet in settlement order
+
+    Returns:
+        float: Maximum drawdown in stake units
+    """
+    equity = np.concatenate(([0.0], np.cumsum(profits)))
+    return float(np.max(np.maximum.accumulate(equity) - equity))
+
+
+def summarise(bets: dict[str, np.ndarray]) -> dict:
+    """ Performance of the bets from `evaluate`, over the settled bets
+
+    Args:
+        bets (dict[str, np.ndarray]): Output of `evaluate`
+
+    Returns:
+        dict: 'bets', 'settled', 'staked', 'profit', 'roi', 'hit_rate' (wins over decided bets),
+            'max_drawdown', 'clv' (mean over bets with a closing price) and 'beat_close' (share of
+            those bets priced above the close)
+    """
+    settled = bets['settled']
+    staked = float(bets['stake'][settled].sum())
+    profit = float(bets['profit'][settled].sum())
+    decided = settled & ~np.isnan(bets['result'])
+    clv = bets['clv'][~np.isnan(bets['clv'])]
+    return {
+        'bets': int(len(settled)),
+        'settled': int(settled.sum()),
+        'staked': staked,
+        'profit': profit,
+        'roi': profit / staked if staked else None,
+        'hit_rate': float(bets['result'][decided].mean()) if decided.any() else None,
+        'max_drawdown': max_drawdown(bets['profit'][settled]),
+        'clv': float(clv.mean()) if len(clv) else None,
+        'beat_close': float((clv > 0).mean()) if len(clv) else None,
+    }
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from core.models import Outcome
+from core.services import backtest, frame_loader
+
+
+class BacktestService:
+    """ Service class to load price histories and backtest strategies on them, see `backtest`
+    """
+
+    history_fields = {
+        'odd__event_id': 'event',
+        'bookmaker__key': 'bookmaker',
+        'market__key': 'market',
+        'name__name': 'name',
+        'odd__timestamp': 'timestamp',
+        'odd__event__commence_time': 'commence_time',
+        'price': 'price',
+        'point': 'point',
+        'fair_probability': 'fair_probability',
+        'name_id': 'name_id',
+        'odd__event__home_team_id': 'home_team_id',
+        'odd__event__away_team_id': 'away_team_id',
+        'odd__event__odds_snapshots__home_score': 'home_score',
+        'odd__event__odds_snapshots__away_score': 'away_score',
+    }
+
+    def __init__(self):
+        logger.debug("BacktestService initialized")
+
+    def load_history(self, **kwargs) -> dict[str, np.ndarray]:
+        """ Load the price history of the matching events into backtest columns
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering events, e.g. sport_id or
+                commence_time__range
+
+        Returns:
+            dict[str, np.ndarray]: One element per stored outcome: 'event', 'bookmaker', 'market' and
+                'name' codes (with their '<column>_keys'), 'timestamp' and 'commence_time' (naive UTC
+                datetime64), 'price', 'point', 'fair_probability', 'is_home', 'is_away', 'home_score'
+                and 'away_score' (NaN without a result)
+        """
+        logger.debug(f"Loading backtest history with filters: {kwargs}")
+        filters = {f"odd__event__{lookup}": value for lookup, value in kwargs.items()}
+        columns = frame_loader.load_columns(Outcome.objects.filter(**filters), list(self.history_fields),
+                                            categorical=['odd__event_id', 'bookmaker__key', 'market__key',
+                                                         'name__name'])
+        history = {column: columns[field] for field, column in self.history_fields.items()}
+        for field in ('odd__event_id', 'bookmaker__key', 'market__key', 'name__name'):
+            history[f"{self.history_fields[field]}_keys"] = columns[f"{field}_keys"]
+        name_ids = history.pop('name_id')
+        history['is_home'] = name_ids == history.pop('home_team_id')
+        history['is_away'] = name_ids == history.pop('away_team_id')
+        logger.debug(f"Loaded {len(history['price'])} outcomes for backtesting")
+        return history
+
+    def run(self, strategy: backtest.Strategy, history: dict = None, **kwargs) -> tuple[pd.DataFrame, dict]:
+        """ Backtest a strategy
+
+        Args:
+            strategy (backtest.Strategy): Strategy to evaluate
+            history (dict): Price history from `load_history`, loaded with `kwargs` when not given
+            **kwargs: Arbitrary keyword arguments for filtering events
+
+        Returns:
+            tuple[pd.DataFrame, dict]: The bets and their summary from `backtest.summarise`
+        """
+        history = self.load_history(**kwargs) if history is None else history
+        bets = backtest.evaluate(strategy, history)
+        summary = backtest.summarise(bets)
+        logger.debug(f"Backtested {strategy}: {summary}")
+        return pd.DataFrame(bets), summary
+
+    def __del__(self):
+        logger.debug("BacktestService terminated")
@@ -0,0 +1,316 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from itertools import batched
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+from loguru import logger
+
+from core.models import BookmakerStat, BookmakerStatWatermark, ClosingLine, EventResult, Odd, Outcome, Sport
+from core.services import frame_loader, odds_math
+
+
+class BookmakerStatsService:
+    """ Service class to maintain per bookmaker, sport, market and day margin and efficiency stats
+
+    The snapshots of a sport (re-)ingested past its BookmakerStatWatermark give the number of
+    quoted markets and their overround and how often each bookmaker had the best price of its
+    snapshot. The quote stats of every day those snapshots fall on are recomputed from all of the
+    day's snapshots, so processing a snapshot again never counts it twice and a refresh re-reads
+    the WATERMARK_OVERLAP_MINUTES before the watermark to pick up snapshots a concurrent ingest
+    committed late. The accuracy (Brier score and log loss) of the bookmakers' closing fair
+    probabilities is recomputed the same way for every commence day of the results saved (new or
+    corrected) past the watermark. Stats are sums per day, so a refresh only reads the days that
+    changed and a range is answered from the day buckets alone.
+    """
+
+    sum_fields = ['books', 'overround_books', 'overround_sum', 'outcomes', 'best_prices', 'closing_outcomes',
+                  'brier_sum', 'log_loss_sum']
+    quote_sum_fields = ['books', 'overround_books', 'overround_sum', 'outcomes', 'best_prices']
+    closing_sum_fields = ['closing_outcomes', 'brier_sum', 'log_loss_sum']
+    quote_fields = ['odd_id', 'bookmaker_id', 'market_id', 'name_id', 'point', 'price', 'overround',
+                    'odd__timestamp']
+    closing_fields = ['bookmaker_id', 'market_id', 'market__key', 'name__name', 'name_id', 'point',
+                      'fair_probability', 'event__home_team_id', 'event__away_team_id', 'event__commence_time',
+                      'event__odds_snapshots__home_score', 'event__odds_snapshots__away_score']
+
+    def __init__(self):
+        logger.debug("BookmakerStatsService initialized")
+
+    @staticmethod
+    def sum_by_key(bookmakers: np.ndarray, markets: np.ndarray, days: np.ndarray,
+                   values: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Sum values per bookmaker, market and day
+
+        Returns:
+            dict[str, np.ndarray]: 'bookmaker', 'market' and 'day' per key and the sum of every value
+        """
+        labels, n_keys = odds_math.group_labels(bookmakers, markets, days.astype(np.int64))
+        first = odds_math.group_first(labels, n_keys)
+        return {
+            'bookmaker': bookmakers[first],
+            'market': markets[first],
+            'day': days[first],
+            **{field: np.bincount(labels, column.astype(float), n_keys) for field, column in values.items()},
+        }
+
+    @classmethod
+    def quote_stats(cls, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Overround and best price counts of a batch of quotes, see `sum_by_key`
+
+        Args:
+            columns (dict[str, np.ndarray]): Columns of `quote_fields`
+
+        Returns:
+            dict[str, np.ndarray]: Sums of 'books', 'overround_books', 'overround_sum', 'outcomes'
+                and 'best_prices' per bookmaker, market and snapshot day
+        """
+        prices = columns['price'].astype(float)
+        points = np.nan_to_num(columns['point'].astype(float), nan=0.0)
+        books, n_books = odds_math.group_labels(columns['odd_id'], columns['bookmaker_id'], columns['market_id'],
+                                                odds_math.line_of(columns['point']))
+        # Every outcome of a book carries the overround of the book, count it once
+        is_first = np.zeros(len(prices), dtype=bool)
+        is_first[odds_math.group_first(books, n_books)] = True
+        overround = columns['overround'].astype(float)
+        has_overround = is_first & ~np.isnan(overround)
+
+        cells, n_cells = odds_math.group_labels(columns['odd_id'], columns['market_id'], columns['name_id'], points)
+        best = np.full(n_cells, -np.inf)
+        np.maximum.at(best, cells, prices)
+        return cls.sum_by_key(columns['bookmaker_id'], columns['market_id'],
+                              columns['odd__timestamp'].astype('datetime64[D]'), {
+                                  'books': is_first,
+                                  'overround_books': has_overround,
+                                  'overround_sum': np.where(has_overround, overround, 0.0),
+                                  'outcomes': np.ones(len(prices)),
+                                  'best_prices': prices >= best[cells] - 1e-9,
+                              })
+
+    @classmethod
+    def closing_stats(cls, columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Accuracy of the closing fair probabilities of settled events, see `sum_by_key`
+
+        Args:
+            columns (dict[str, np.ndarray]): Columns of `closing_fields`
+
+        Returns:
+            dict[str, np.ndarray]: Sums of 'closing_outcomes', 'brier_sum' and 'log_loss_sum' per
+                bookmaker, market and commence day
+        """
+        name_ids = columns['name_id']
+        results = odds_math.settle_outcomes(columns['market__key'].astype(object),
+                                            columns['name__name'].astype(object), columns['point'].astype(float),
+                                            name_ids == columns['event__home_team_id'],
+                                            name_ids == columns['event__away_team_id'],
+                                            columns['event__odds_snapshots__home_score'].astype(float),
+                                            columns['event__odds_snapshots__away_score'].astype(float))
+        probabilities = columns['fair_probability'].astype(float)
+        settled = ~np.isnan(results) & ~np.isnan(probabilities)
+        results, clipped = results[settled], np.clip(probabilities[settled], 1e-12, 1 - 1e-12)
+        return cls.sum_by_key(columns['bookmaker_id'][settled], columns['market_id'][settled],
+                              columns['event__commence_time'][settled].astype('datetime64[D]'), {
+                                  'closing_outcomes': np.ones(len(results)),
+                                  'brier_sum': (clipped - results) ** 2,
+                                  'log_loss_sum': -(results * np.log(clipped) + (1 - results) * np.log(1 - clipped)),
+                              })
+
+    def merge(self, sport_id: str, stats: dict[str, np.ndarray]) -> int:
+        """ Add aggregated sums to the stored day buckets of a sport
+
+        Args:
+            sport_id (str): Sport key
+            stats (dict[str, np.ndarray]): Output of `quote_stats` or `closing_stats`
+
+        Returns:
+            int: Number of buckets written
+        """
+        if len(stats['day']) == 0:
+            return 0
+        keys = list(zip(stats['bookmaker'].tolist(), stats['market'].tolist(),
+                        stats['day'].astype('datetime64[D]').tolist()))
+        existing = {
+            (bookmaker_id, market_id, day): values
+            for bookmaker_id, market_id, day, *values in BookmakerStat.objects.filter(
+                sport_id=sport_id,
+                bookmaker_id__in={bookmaker_id for bookmaker_id, _, _ in keys},
+                day__range=(min(day for _, _, day in keys), max(day for _, _, day in keys))).values_list(
+                    'bookmaker_id', 'market_id', 'day', *self.sum_fields)
+        }
+        objs = []
+        for i, (bookmaker_id, market_id, day) in enumerate(keys):
+            stored = existing.get((bookmaker_id, market_id, day), [0] * len(self.sum_fields))
+            values = {
+                field: stored_value + (float(stats[field][i]) if field in stats else 0)
+                for field, stored_value in zip(self.sum_fields, stored)
+            }
+            objs.append(BookmakerStat(bookmaker_id=bookmaker_id, sport_id=sport_id, market_id=market_id, day=day,
+                                      **values))
+        BookmakerStat.objects.bulk_create(objs,
+                                          update_conflicts=True,
+                                          unique_fields=['bookmaker', 'sport', 'market', 'day'],
+                                          update_fields=self.sum_fields)
+        return len(objs)
+
+    def restate_days(self, sport_id: str, days: list[date]) -> int:
+        """ Recompute the quote stats of the given days of a sport from all of their snapshots
+
+        Args:
+            sport_id (str): Sport key
+            days (list[date]): UTC days of the snapshots
+
+        Returns:
+            int: Number of buckets written
+        """
+        ranges = Q()
+        for day in days:
+            start = datetime.combine(day, time.min, dt_timezone.utc)
+            ranges |= Q(odd__timestamp__gte=start, odd__timestamp__lt=start + timedelta(days=1))
+        BookmakerStat.objects.filter(sport_id=sport_id, day__in=days).update(
+            **{field: 0 for field in self.quote_sum_fields})
+        columns = frame_loader.load_columns(Outcome.objects.filter(ranges, odd__event__sport_id=sport_id),
+                                            self.quote_fields)
+        return self.merge(sport_id, self.quote_stats(columns))
+
+    def restate_closing_days(self, sport_id: str, days: list[date]) -> int:
+        """ Recompute the closing line accuracy of the given days of a sport from all of their results
+
+        Args:
+            sport_id (str): Sport key
+            days (list[date]): UTC commence days of the events
+
+        Returns:
+            int: Number of buckets written
+        """
+        ranges = Q()
+        for day in days:
+            start = datetime.combine(day, time.min, dt_timezone.utc)
+            ranges |= Q(event__commence_time__gte=start, event__commence_time__lt=start + timedelta(days=1))
+        BookmakerStat.objects.filter(sport_id=sport_id, day__in=days).update(
+            **{field: 0 for field in self.closing_sum_fields})
+        columns = frame_loader.load_columns(
+            ClosingLine.objects.filter(ranges, event__sport_id=sport_id, event__odds_snapshots__isnull=False),
+            self.closing_fields,
+            categorical=['market__key', 'name__name'])
+        for field in ('market__key', 'name__name'):
+            columns[field] = columns[f"{field}_keys"][columns[field]]
+        return self.merge(sport_id, self.closing_stats(columns))
+
+    def refresh_sport(self, sport_id: str, batch_size: int = 500) -> int:
+        """ Aggregate the snapshots (re-)ingested and the results saved since the watermark of a sport
+
+        Every batch is merged and the watermark moved in the same transaction, so an interrupted
+        refresh resumes where it stopped.
+
+        Args:
+            sport_id (str): Sport key
+            batch_size (int): Number of snapshots or results aggregated per transaction
+
+        Returns:
+            int: Number of buckets written
+        """
+        watermark, _ = BookmakerStatWatermark.objects.get_or_create(sport_id=sport_id)
+        odds = Odd.objects.filter(event__sport_id=sport_id)
+        if watermark.last_ingested_at is not None:
+            odds = odds.filter(ingested_at__gt=watermark.last_ingested_at
+                               - timedelta(minutes=settings.WATERMARK_OVERLAP_MINUTES))
+        snapshots = list(odds.order_by('ingested_at', 'id').values_list('timestamp', 'ingested_at'))
+        results = EventResult.objects.filter(event__sport_id=sport_id, event__commence_time__isnull=False)
+        if watermark.last_result_updated_at is not None:
+            results = results.filter(updated_at__gt=watermark.last_result_updated_at
+                                     - timedelta(minutes=settings.WATERMARK_OVERLAP_MINUTES))
+        results = list(results.order_by('updated_at', 'id').values_list('event__commence_time', 'updated_at'))
+        written = 0
+        for batch in batched(snapshots, batch_size):
+            with transaction.atomic():
+                written += self.restate_days(sport_id, sorted({timestamp.astimezone(dt_timezone.utc).date()
+                                                                for timestamp, _ in batch}))
+                watermark.last_ingested_at = max(filter(None, (watermark.last_ingested_at, batch[-1][1])))
+                watermark.updated_at = timezone.now()
+                watermark.save()
+        for batch in batched(results, batch_size):
+            with transaction.atomic():
+                written += self.restate_closing_days(sport_id, sorted({
+                    commence_time.astimezone(dt_timezone.utc).date() for commence_time, _ in batch}))
+                watermark.last_result_updated_at = max(filter(None, (watermark.last_result_updated_at,
+                                                                     batch[-1][1])))
+                watermark.updated_at = timezone.now()
+                watermark.save()
+        logger.debug(f"Aggregated {len(snapshots)} snapshots and {len(results)} results of {sport_id} into "
+                     f"{written} bookmaker stat buckets")
+        return written
+
+    def refresh(self, batch_size: int = 500, **kwargs) -> int:
+        """ Aggregate the new snapshots and results of every matching sport
+
+        Args:
+            batch_size (int): Number of snapshots or results aggregated per transaction
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of buckets written
+        """
+        logger.debug(f"Refreshing bookmaker stats with filters: {kwargs}")
+        return sum(
+            self.refresh_sport(sport_id, batch_size)
+            for sport_id in Sport.objects.filter(**kwargs).values_list('key', flat=True))
+
+    def rebuild(self, batch_size: int = 500, **kwargs) -> int:
+        """ Recompute the stats of every matching sport from its whole history, e.g. after closing
+        lines of already settled events were backfilled
+
+        Args:
+            batch_size (int): Number of snapshots or results aggregated per transaction
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of buckets written
+        """
+        sport_ids = list(Sport.objects.filter(**kwargs).values_list('key', flat=True))
+        with transaction.atomic():
+            BookmakerStat.objects.filter(sport_id__in=sport_ids).delete()
+            BookmakerStatWatermark.objects.filter(sport_id__in=sport_ids).delete()
+        return self.refresh(batch_size, key__in=sport_ids)
+
+    def get_stats(self, start: date = None, end: date = None, **kwargs) -> list[dict]:
+        """ Margin and efficiency of each bookmaker and market over a range of days
+
+        Args:
+            start (date): Optional first day
+            end (date): Optional last day (inclusive)
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. sport_id, market__key or
+                bookmaker__key
+
+        Returns:
+            list[dict]: Per bookmaker and market the summed counts, 'overround' (mean sum of
+                implied probabilities of a complete book), 'best_price_rate', 'brier_score' and
+                'log_loss' (None without data)
+        """
+        logger.debug(f"Getting bookmaker stats from {start} to {end} with filters: {kwargs}")
+        queryset = BookmakerStat.objects.filter(**kwargs)
+        if start is not None:
+            queryset = queryset.filter(day__gte=start)
+        if end is not None:
+            queryset = queryset.filter(day__lte=end)
+        rows = queryset.values('bookmaker__key', 'market__key').annotate(
+            **{field: Sum(field) for field in self.sum_fields}).order_by('bookmaker__key', 'market__key')
+
+        def ratio(numerator, denominator):
+            return numerator / denominator if denominator else None
+
+        return [{
+            'bookmaker': row['bookmaker__key'],
+            'market': row['market__key'],
+            'books': row['books'],
+            'outcomes': row['outcomes'],
+            'closing_outcomes': row['closing_outcomes'],
+            'overround': ratio(row['overround_sum'], row['overround_books']),
+            'best_price_rate': ratio(row['best_prices'], row['outcomes']),
+            'brier_score': ratio(row['brier_sum'], row['closing_outcomes']),
+            'log_loss': ratio(row['log_loss_sum'], row['closing_outcomes']),
+        } for row in rows]
+
+    def __del__(self):
+        logger.debug("BookmakerStatsService terminated")
@@ -0,0 +1,208 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.db.models.lookups import LessThan
+from loguru import logger
+
+from core.models import ClosingLine, Event, Odd, OpeningLine, Outcome
+from core.services import odds_math
+
+
+class ClosingLineService:
+    """ Service class to maintain the opening and closing line tables and to compute
+    closing line value (CLV)
+    """
+
+    unique_fields = ['event', 'bookmaker', 'market', 'name']
+    update_fields = ['odd', 'timestamp', 'price', 'point', 'fair_probability']
+    line_fields = ['bookmaker_id', 'market_id', 'name_id', 'price', 'point', 'fair_probability']
+
+    def __init__(self):
+        logger.debug("ClosingLineService initialized")
+
+    @staticmethod
+    def upsert_lines(model, odd: Odd, outcomes: list[tuple], replace) -> int:
+        """ Upsert the lines of a snapshot where `replace(stored_timestamp, odd.timestamp)` holds
+
+        Args:
+            model (type[EventLine]): OpeningLine or ClosingLine
+            odd (Odd): The snapshot the outcomes belong to
+            outcomes (list[tuple]): Rows of `line_fields` of the snapshot
+            replace (callable): Whether a stored line of the given timestamp is replaced
+
+        Returns:
+            int: Number of lines written
+        """
+        existing = {
+            (bookmaker_id, market_id, name_id): timestamp
+            for bookmaker_id, market_id, name_id, timestamp in model.objects.filter(event_id=odd.event_id).values_list(
+                'bookmaker_id', 'market_id', 'name_id', 'timestamp')
+        }
+        rows = [
+            model(event_id=odd.event_id,
+                  bookmaker_id=bookmaker_id,
+                  market_id=market_id,
+                  name_id=name_id,
+                  odd=odd,
+                  timestamp=odd.timestamp,
+                  price=price,
+                  point=point,
+                  fair_probability=fair_probability)
+            for bookmaker_id, market_id, name_id, price, point, fair_probability in outcomes
+            if (bookmaker_id, market_id, name_id) not in existing
+            or replace(existing[(bookmaker_id, market_id, name_id)], odd.timestamp)
+        ]
+        if rows:
+            model.objects.bulk_create(rows,
+                                      update_conflicts=True,
+                                      unique_fields=ClosingLineService.unique_fields,
+                                      update_fields=ClosingLineService.update_fields)
+        return len(rows)
+
+    def refresh_from_odd(self, odd: Odd) -> tuple[int, int]:
+        """ Update the opening and closing lines of an event from a freshly ingested snapshot
+
+        A snapshot opens a line when it is older than the stored opening line, and closes it when
+        it is newer than the stored closing line but still before the event commences.
+
+        Args:
+            odd (Odd): The snapshot that was just ingested
+
+        Returns:
+            tuple[int, int]: Number of opening and closing lines written
+        """
+        outcomes = list(Outcome.objects.filter(odd=odd).values_list(*self.line_fields))
+        opened = self.upsert_lines(OpeningLine, odd, outcomes, lambda stored, new: new <= stored)
+        closed = 0
+        commence_time = odd.event.commence_time
+        if commence_time is None or odd.timestamp < commence_time:
+            closed = self.upsert_lines(ClosingLine, odd, outcomes, lambda stored, new: new >= stored)
+        logger.debug(f"Refreshed {opened} opening and {closed} closing lines for event {odd.event_id}")
+        return opened, closed
+
+    @transaction.atomic
+    def backfill(self, batch_size: int = 5000, **kwargs) -> tuple[int, int]:
+        """ Rebuild the opening and closing line tables from the full odds history
+
+        Outcomes are streamed once in snapshot order: the first row seen per key opens the line
+        and the last row before the commence time closes it.
+
+        Args:
+            batch_size (int): Number of rows streamed and written per batch
+            **kwargs: Arbitrary keyword arguments for filtering events, e.g. sport_id
+
+        Returns:
+            tuple[int, int]: Number of opening and closing lines written
+        """
+        logger.debug(f"Backfilling opening and closing lines with filters: {kwargs}")
+        events = Event.objects.filter(**kwargs).values('id')
+        OpeningLine.objects.filter(event_id__in=events).delete()
+        ClosingLine.objects.filter(event_id__in=events).delete()
+
+        opening, closing = {}, {}
+        outcomes = Outcome.objects.filter(odd__event_id__in=events).order_by('odd__timestamp').annotate(
+            before_commence=LessThan(F('odd__timestamp'), F('odd__event__commence_time'))).values_list(
+                'odd_id', 'odd__event_id', 'odd__timestamp', 'before_commence', *self.line_fields)
+        for odd_id, event_id, timestamp, before_commence, bookmaker_id, market_id, name_id, *values in outcomes.iterator(
+                chunk_size=batch_size):
+            key = (event_id, bookmaker_id, market_id, name_id)
+            opening.setdefault(key, (odd_id, timestamp, *values))
+            if before_commence is not False:
+                closing[key] = (odd_id, timestamp, *values)
+
+        for model, lines in ((OpeningLine, opening), (ClosingLine, closing)):
+            model.objects.bulk_create([
+                model(event_id=event_id,
+                      bookmaker_id=bookmaker_id,
+                      market_id=market_id,
+                      name_id=name_id,
+                      odd_id=odd_id,
+                      timestamp=timestamp,
+                      price=price,
+                      point=point,
+                      fair_probability=fair_probability)
+                for (event_id, bookmaker_id, market_id, name_id), (odd_id, timestamp, price, point,
+                                                                   fair_probability) in lines.items()
+            ],
+                                      batch_size=batch_size)
+        logger.debug(f"Backfilled {len(opening)} opening and {len(closing)} closing lines")
+        return len(opening), len(closing)
+
+    def compute_clv(self, **kwargs) -> pd.DataFrame:
+        """ Compute closing line value and settlement of every opening line in one set-based pass
+
+        `clv` compares the opening price with the closing price of the same bookmaker, `clv_fair`
+        is the expected return of the opening price under the bookmaker's margin-free closing
+        probability. A line whose point moved between open and close (e.g. a spread from -3.5 to
+        -4.5) has no comparable closing price, so it is flagged `point_moved` and has no CLV. Lines
+        are settled on their opening point against EventResult scores where available.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering events, e.g. sport_id or
+                commence_time__range
+
+        Returns:
+            pd.DataFrame: One row per line with the opening price and 'point', the closing price and
+                'closing_point', 'point_moved', 'clv' and 'clv_fair' (NaN where the point moved),
+                'result' (1 win, 0 loss, NaN void) and 'profit' per unit staked at the opening price
+        """
+        logger.debug(f"Computing closing line value with filters: {kwargs}")
+        key_fields = ['event_id', 'bookmaker_id', 'market_id', 'name_id']
+        events = Event.objects.filter(**kwargs).values('id')
+
+        opening = pd.DataFrame.from_records(
+            OpeningLine.objects.filter(event_id__in=events).values_list(*key_fields, 'price', 'point'),
+            columns=key_fields + ['opening_price', 'point'])
+        closing = pd.DataFrame.from_records(
+            ClosingLine.objects.filter(event_id__in=events).values_list(
+                *key_fields, 'price', 'point', 'fair_probability', 'bookmaker__key', 'market__key', 'name__name',
+                'event__home_team_id', 'event__away_team_id', 'event__odds_snapshots__home_score',
+                'event__odds_snapshots__away_score'),
+            columns=key_fields + ['closing_price', 'closing_point', 'closing_fair_probability', 'bookmaker', 'market', 'name',
+                                  'home_team_id', 'away_team_id', 'home_score', 'away_score'])
+        lines = opening.merge(closing, on=key_fields, how='inner')
+
+        opening_price = lines['opening_price'].to_numpy(dtype=float)
+        closing_price = lines['closing_price'].to_numpy(dtype=float)
+        closing_fair = lines['closing_fair_probability'].to_numpy(dtype=float, na_value=np.nan)
+        opening_point = lines['point'].to_numpy(dtype=float, na_value=np.nan)
+        closing_point = lines['closing_point'].to_numpy(dtype=float, na_value=np.nan)
+        moved = ~((opening_point == closing_point) | (np.isnan(opening_point) & np.isnan(closing_point)))
+        lines['point_moved'] = moved
+        lines['clv'] = np.where(moved, np.nan, opening_price / closing_price - 1)
+        lines['clv_fair'] = np.where(moved, np.nan, opening_price * closing_fair - 1)
+        lines['result'] = odds_math.settle_outcomes(
+            lines['market'].to_numpy(dtype=object), lines['name'].to_numpy(dtype=object),
+            opening_point,
+            (lines['name_id'] == lines['home_team_id']).to_numpy(),
+            (lines['name_id'] == lines['away_team_id']).to_numpy(),
+            lines['home_score'].to_numpy(dtype=float, na_value=np.nan),
+            lines['away_score'].to_numpy(dtype=float, na_value=np.nan))
+        lines['profit'] = odds_math.settled_profit(opening_price, lines['result'].to_numpy())
+        logger.debug(f"Computed closing line value of {len(lines)} lines")
+        return lines
+
+    @staticmethod
+    def summarise_clv(lines: pd.DataFrame) -> pd.DataFrame:
+        """ Summarise closing line value per bookmaker and market
+
+        Args:
+            lines (pd.DataFrame): Output of `compute_clv`
+
+        Returns:
+            pd.DataFrame: Count, count of lines whose point moved, mean CLV and mean no-vig CLV of the
+                other lines, settled count and ROI per bookmaker/market
+        """
+        settled = lines.assign(settled=lines['result'].notna())
+        summary = settled.groupby(['bookmaker', 'market']).agg(lines=('clv', 'size'),
+                                                               point_moved=('point_moved', 'sum'),
+                                                               clv=('clv', 'mean'),
+                                                               clv_fair=('clv_fair', 'mean'),
+                                                               settled=('settled', 'sum'),
+                                                               profit=('profit', 'sum'))
+        summary['roi'] = summary['profit'] / summary['settled'].where(summary['settled'] > 0)
+        return summary.reset_index()
+
+    def __del__(self):
+        logger.debug("ClosingLineService terminated")
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import MarketConsensus
+from core.services import frame_loader, odds_math
+from core.services.latest_outcome_service import LatestOutcomeService
+
+
+class ConsensusService:
+    """ Service class to maintain and read the MarketConsensus table
+    """
+
+    def __init__(self):
+        logger.debug("ConsensusService initialized")
+
+    @staticmethod
+    def compute_consensus(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Compute best price and consensus per event/market/line/outcome in one vectorised pass
+
+        The fair probability of an outcome is the median over bookmakers of its margin-free
+        probability, using only bookmakers that quote the full market, renormalised so the
+        outcomes of a market/line add up to one.
+
+        Args:
+            columns (dict[str, np.ndarray]): Aligned columns 'event', 'bookmaker', 'market', 'name',
+                'price' and 'point' of the latest outcomes, keys encoded as integers. A
+                'fair_probability' column stored at ingest is used as is when present
+
+        Returns:
+            dict[str, np.ndarray]: One element per event/market/line/outcome cell with keys 'row'
+                (a representative input row), 'line', 'best_price', 'best_bookmaker', 'median_price',
+                'fair_probability' and 'bookmaker_count'
+        """
+        prices = columns['price'].astype(float)
+        groups = odds_math.market_groups(columns)
+        lines, markets, n_markets = groups['line'], groups['markets'], groups['n_markets']
+        books, n_books = groups['books'], groups['n_books']
+        cells, n_cells = groups['cells'], groups['n_cells']
+
+        if 'fair_probability' in columns:
+            fair = columns['fair_probability']
+        else:
+            _, fair = odds_math.no_vig_probabilities(prices, books, n_books)
+            complete = odds_math.complete_books(books, n_books, markets, n_markets, cells)
+            fair = np.where(complete, fair, np.nan)
+
+        best_rows = odds_math.group_argmax(prices, cells, n_cells)
+        consensus = odds_math.group_median(fair, cells, n_cells)
+        cell_markets = markets[best_rows]
+        totals = np.bincount(cell_markets, weights=np.nan_to_num(consensus), minlength=n_markets)[cell_markets]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            consensus = np.where(totals > 0, consensus / totals, np.nan)
+
+        return {
+            'row': best_rows,
+            'line': lines[best_rows],
+            'best_price': prices[best_rows],
+            'best_bookmaker': columns['bookmaker'][best_rows],
+            'median_price': odds_math.group_median(prices, cells, n_cells),
+            'fair_probability': consensus,
+            'bookmaker_count': np.bincount(cells, minlength=n_cells),
+        }
+
+    @transaction.atomic
+    def refresh_event(self, event_id: str) -> int:
+        """ Recompute the consensus rows of one event from its latest outcomes
+
+        Args:
+            event_id (str): The event whose prices changed
+
+        Returns:
+            int: Number of consensus rows written
+        """
+        columns = LatestOutcomeService().get_latest_columns(event_id=event_id)
+        MarketConsensus.objects.filter(event_id=event_id).delete()
+        if not len(columns['id']):
+            return 0
+
+        consensus = self.compute_consensus(columns)
+        timestamp = columns['timestamp'].max().astype(datetime).replace(tzinfo=dt_timezone.utc)
+
+        objs = []
+        for i, row in enumerate(consensus['row']):
+            fair_probability = consensus['fair_probability'][i]
+            has_fair = bool(np.isfinite(fair_probability) and fair_probability > 0)
+            point = columns['point'][row]
+            objs.append(MarketConsensus(
+                event_id=event_id,
+                market_id=int(columns['market'][row]),
+                name_id=int(columns['name'][row]),
+                point=None if np.isnan(point) else float(point),
+                line=float(consensus['line'][i]),
+                best_price=round(Decimal(float(consensus['best_price'][i])), 4),
+                best_bookmaker_id=int(consensus['best_bookmaker'][i]),
+                median_price=round(Decimal(float(consensus['median_price'][i])), 4),
+                fair_probability=float(fair_probability) if has_fair else None,
+                fair_price=round(Decimal(1 / float(fair_probability)), 4) if has_fair else None,
+                bookmaker_count=int(consensus['bookmaker_count'][i]),
+                timestamp=timestamp))
+        MarketConsensus.objects.bulk_create(objs)
+        logger.debug(f"Refreshed {len(objs)} consensus rows for event {event_id}")
+        return len(objs)
+
+    def get_board(self, **kwargs) -> list[dict]:
+        """ Get the consensus rows of events that have not started yet
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of consensus data ordered by commence time
+        """
+        logger.debug(f"Getting consensus board with filters: {kwargs}")
+        board = MarketConsensus.objects.filter(event__commence_time__gte=timezone.now(), **kwargs).order_by(
+            'event__commence_time', 'event_id', 'market_id', 'line', 'name_id').values()
+        return list(board)
+
+    def get_board_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the consensus rows of events that have not started yet as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting consensus board frame with filters: {kwargs}")
+        return frame_loader.load_frame(MarketConsensus.objects.filter(event__commence_time__gte=timezone.now(), **kwargs).order_by(
+            'event__commence_time', 'event_id', 'market_id', 'line', 'name_id'))
+
+    def __del__(self):
+        logger.debug("ConsensusService terminated")
@@ -1,5 +1,9 @@
+from collections.abc import Iterator
+
+import pandas as pd
 from django.db import transaction
 from core.models import Event
+from core.services import frame_loader
 from loguru import logger
 
 
@@ -91,5 +95,33 @@ class EventService:
         logger.debug(f"Got {len(events)} sports")
         return list(events)
         
+    def iter_events(self, chunk_size: int = 2000, **kwargs) -> Iterator[dict]:
+        """ Stream events data from the database one row at a time
+
+        Rows are fetched `chunk_size` at a time (through a server-side cursor on PostgreSQL) and
+        outside of a transaction, so memory stays flat however many rows match.
+
+        Args:
+            chunk_size (int): Number of rows fetched per round trip
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Yields:
+            dict: One row of events data
+        """
+        logger.debug(f"Streaming events with filters: {kwargs}")
+        yield from Event.objects.filter(**kwargs).order_by('pk').values().iterator(chunk_size=chunk_size)
+
+    def get_events_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the events as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting events frame with filters: {kwargs}")
+        return frame_loader.load_frame(Event.objects.filter(**kwargs))
+
     def __del__(self):
         logger.debug("EventService terminated")
\ No newline at end of file
@@ -0,0 +1,208 @@
+import os
+from datetime import timedelta
+from itertools import batched
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Event, EventResult, ExportWatermark, Odd, Outcome
+
+
+def load_pyarrow():
+    """ Import pyarrow on first use so the rest of the backend does not depend on it
+
+    Raises:
+        ImportError: If pyarrow is not installed
+
+    Returns:
+        tuple: The pyarrow and pyarrow.parquet modules
+    """
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("The Parquet export requires pyarrow, install it with `pip install pyarrow`") from e
+    return pyarrow, pyarrow.parquet
+
+
+class ExportService:
+    """ Service class to export the odds history and results to partitioned Parquet files
+
+    Every dataset is streamed from a server-side cursor and written to
+    `<export_dir>/<dataset>/sport=<sport>/month=<YYYY-MM>/`. Odds and outcomes are exported
+    incrementally by the ingest time of their snapshot: each run writes the snapshots ingested
+    between the ExportWatermark of the previous run and WATERMARK_OVERLAP_MINUTES ago (so the
+    ingests still committing are left to the next run) as one `part-<ingest time>.parquet` file per
+    partition. A snapshot ingested again is exported again, readers keep the row of every id with
+    the latest `ingested_at`. Events and results change in place, so they are rewritten as one
+    `data.parquet` per partition on every run. As usual for hive partitioning the sport is only
+    stored in the directory name.
+    """
+
+    # dataset: (model, ingest time lookup of incremental datasets, partition columns (sport, time),
+    #           [(lookup, column, kind)])
+    datasets = {
+        'events': (Event, None, ('sport', 'commence_time'), [
+            ('id', 'event', 'string'),
+            ('sport_id', 'sport', 'dictionary'),
+            ('commence_time', 'commence_time', 'timestamp'),
+            ('home_team__name', 'home_team', 'dictionary'),
+            ('away_team__name', 'away_team', 'dictionary'),
+        ]),
+        'results': (EventResult, None, ('sport', 'commence_time'), [
+            ('event_id', 'event', 'string'),
+            ('event__sport_id', 'sport', 'dictionary'),
+            ('event__commence_time', 'commence_time', 'timestamp'),
+            ('home_score', 'home_score', 'integer'),
+            ('away_score', 'away_score', 'integer'),
+            ('winner__name', 'winner', 'dictionary'),
+        ]),
+        'odds': (Odd, 'ingested_at', ('sport', 'timestamp'), [
+            ('id', 'id', 'integer'),
+            ('event_id', 'event', 'dictionary'),
+            ('event__sport_id', 'sport', 'dictionary'),
+            ('timestamp', 'timestamp', 'timestamp'),
+            ('previous_timestamp', 'previous_timestamp', 'timestamp'),
+            ('next_timestamp', 'next_timestamp', 'timestamp'),
+            ('ingested_at', 'ingested_at', 'timestamp'),
+        ]),
+        'outcomes': (Outcome, 'odd__ingested_at', ('sport', 'timestamp'), [
+            ('id', 'id', 'integer'),
+            ('odd_id', 'odd', 'integer'),
+            ('odd__event_id', 'event', 'dictionary'),
+            ('odd__event__sport_id', 'sport', 'dictionary'),
+            ('odd__timestamp', 'timestamp', 'timestamp'),
+            ('odd__ingested_at', 'ingested_at', 'timestamp'),
+            ('bookmaker__key', 'bookmaker', 'dictionary'),
+            ('market__key', 'market', 'dictionary'),
+            ('name__name', 'name', 'dictionary'),
+            ('price', 'price', 'float'),
+            ('point', 'point', 'float'),
+            ('implied_probability', 'implied_probability', 'float'),
+            ('overround', 'overround', 'float'),
+            ('fair_probability', 'fair_probability', 'float'),
+        ]),
+    }
+
+    def __init__(self, export_dir: str = None):
+        self.export_dir = export_dir or settings.EXPORT_DIR
+        logger.debug("ExportService initialized")
+
+    def export(self, datasets: list[str] = None, batch_size: int = 50000) -> dict[str, int]:
+        """ Export the given datasets, all of them by default
+
+        Args:
+            datasets (list[str]): Names of the datasets to export
+            batch_size (int): Number of rows fetched from the cursor and written per batch
+
+        Raises:
+            ValueError: If a dataset is unknown
+
+        Returns:
+            dict[str, int]: Number of rows written per dataset
+        """
+        datasets = datasets or list(self.datasets)
+        unknown = set(datasets) - set(self.datasets)
+        if unknown:
+            raise ValueError(f"Unknown datasets: {', '.join(sorted(unknown))}")
+        return {dataset: self.export_dataset(dataset, batch_size) for dataset in datasets}
+
+    def export_dataset(self, dataset: str, batch_size: int = 50000) -> int:
+        """ Stream one dataset into its Parquet partitions
+
+        Files are written under a temporary name and only renamed, and the watermark only moved,
+        once the whole dataset is written, so a failed run leaves the previous export intact.
+
+        Args:
+            dataset (str): Name of the dataset, see `datasets`
+            batch_size (int): Number of rows fetched from the cursor and written per batch
+
+        Returns:
+            int: Number of rows written
+        """
+        pa, pq = load_pyarrow()
+        model, ingested_at, (sport_column, time_column), fields = self.datasets[dataset]
+        types = {
+            'string': pa.string(),
+            'dictionary': pa.string(),
+            'integer': pa.int64(),
+            'float': pa.float64(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        columns = [column for _, column, _ in fields]
+        file_columns = [column for column in columns if column != sport_column]
+        schema = pa.schema([(column, types[kind]) for _, column, kind in fields if column != sport_column])
+        dictionary_columns = [column for _, column, kind in fields if kind == 'dictionary' and column != sport_column]
+        float_columns = [column for _, column, kind in fields if kind == 'float']
+
+        watermark, _ = ExportWatermark.objects.get_or_create(dataset=dataset)
+        queryset = model.objects.order_by('pk')
+        cutoff = timezone.now() - timedelta(minutes=settings.WATERMARK_OVERLAP_MINUTES)
+        if ingested_at:
+            queryset = queryset.filter(**{f"{ingested_at}__lte": cutoff})
+            if watermark.last_ingested_at is not None:
+                queryset = queryset.filter(**{f"{ingested_at}__gt": watermark.last_ingested_at})
+        logger.debug(f"Exporting {dataset} to {self.export_dir} ingested after "
+                     f"{watermark.last_ingested_at if ingested_at else None}")
+
+        writers = {}  # partition directory -> [writer, temporary path]
+        rows = 0
+        try:
+            for chunk in batched(queryset.values_list('pk', *[lookup for lookup, _, _ in fields]).iterator(
+                    chunk_size=batch_size), batch_size):
+                frame = pd.DataFrame.from_records(chunk, columns=['pk'] + columns)
+                for column in float_columns:
+                    frame[column] = pd.to_numeric(frame[column])
+                months = pd.to_datetime(frame[time_column], utc=True).dt.strftime('%Y-%m').fillna('unknown')
+                for (sport, month), part in frame.groupby([frame[sport_column], months], sort=False):
+                    directory = os.path.join(self.export_dir, dataset, f"sport={sport}", f"month={month}")
+                    if directory not in writers:
+                        os.makedirs(directory, exist_ok=True)
+                        path = os.path.join(directory, f".{dataset}-{os.getpid()}.parquet.tmp")
+                        writers[directory] = [
+                            pq.ParquetWriter(path, schema, use_dictionary=dictionary_columns, compression='zstd'),
+                            path
+                        ]
+                    writers[directory][0].write_table(
+                        pa.Table.from_pandas(part[file_columns], schema=schema, preserve_index=False))
+                rows += len(frame)
+        except Exception:
+            for writer, path in writers.values():
+                writer.close()
+                os.remove(path)
+            raise
+
+        written = set()
+        for directory, (writer, path) in writers.items():
+            writer.close()
+            name = f"part-{cutoff:%Y%m%dT%H%M%S%f}.parquet" if ingested_at else 'data.parquet'
+            os.replace(path, os.path.join(directory, name))
+            written.add(directory)
+        if not ingested_at:
+            self.remove_stale_partitions(os.path.join(self.export_dir, dataset), written)
+
+        watermark.last_ingested_at = cutoff if ingested_at else None
+        watermark.rows = watermark.rows + rows if ingested_at else rows
+        watermark.exported_at = timezone.now()
+        watermark.save()
+        logger.debug(f"Exported {rows} {dataset} rows to {len(writers)} partitions")
+        return rows
+
+    @staticmethod
+    def remove_stale_partitions(root: str, written: set[str]) -> None:
+        """ Remove the snapshot files of partitions that no longer have rows
+
+        Args:
+            root (str): Directory of the dataset
+            written (set[str]): Partition directories written by this run
+        """
+        if not os.path.isdir(root):
+            return
+        for directory, _, files in os.walk(root):
+            if 'data.parquet' in files and directory not in written:
+                os.remove(os.path.join(directory, 'data.parquet'))
+
+    def __del__(self):
+        logger.debug("ExportService terminated")
@@ -0,0 +1,162 @@
+""" Load querysets straight into NumPy columns or pandas DataFrames
+
+`queryset.values()` builds one dict per row before anything columnar exists. The loaders here
+stream `values_list` tuples through a chunked (server-side where the database supports it)
+cursor and copy each chunk into preallocated, typed NumPy columns, so peak memory is the final
+columns plus one chunk of tuples. Key columns can be dictionary encoded on the fly and returned
+as pandas categoricals.
+"""
+from itertools import batched
+
+import numpy as np
+import pandas as pd
+from django.db import models
+
+DEFAULT_CHUNK_SIZE = 20000
+
+
+def resolve_field(model, lookup: str) -> tuple[models.Field, bool]:
+    """ Model field a `values_list` lookup points at, following relations
+
+    Args:
+        model (type[models.Model]): Model the lookup starts from
+        lookup (str): Field lookup, e.g. 'price', 'sport_id' or 'odd__event__commence_time'
+
+    Returns:
+        tuple[models.Field, bool]: The final field and whether the value can be None (the field or
+            any relation on the way is nullable)
+    """
+    *relations, name = lookup.split('__')
+    nullable = False
+    for relation in relations:
+        field = model._meta.get_field(relation)
+        nullable |= field.null or not field.concrete
+        model = field.related_model
+    field = next((field for field in model._meta.concrete_fields if name == field.attname), None)
+    field = field or model._meta.get_field(name)
+    return field, nullable or field.null
+
+
+def column_kind(field: models.Field, nullable: bool) -> str:
+    """ Storage kind of a field's column: 'integer', 'float', 'datetime', 'boolean' or 'object'
+
+    Args:
+        field (models.Field): Model field
+        nullable (bool): Whether the value can be None
+
+    Returns:
+        str: The kind
+    """
+    if field.is_relation:
+        field = field.target_field
+    if isinstance(field, models.BooleanField):
+        return 'object' if nullable else 'boolean'
+    if isinstance(field, (models.IntegerField, models.AutoField)):
+        return 'float' if nullable else 'integer'
+    if isinstance(field, (models.FloatField, models.DecimalField)):
+        return 'float'
+    if isinstance(field, models.DateTimeField):
+        return 'datetime'
+    return 'object'
+
+
+DTYPES = {
+    'integer': np.int64,
+    'float': np.float64,
+    'datetime': 'datetime64[us]',
+    'boolean': np.bool_,
+    'object': object,
+}
+
+
+def convert(values: tuple, kind: str) -> np.ndarray:
+    """ Convert one chunk of a column to its NumPy dtype, None becoming NaN/NaT
+
+    Args:
+        values (tuple): Values of the chunk
+        kind (str): Kind from `column_kind`
+
+    Returns:
+        np.ndarray: The converted chunk
+    """
+    if kind == 'float':
+        return np.fromiter((np.nan if value is None else value for value in values), dtype=np.float64,
+                           count=len(values))
+    if kind == 'datetime':
+        return np.array([None if value is None else value.replace(tzinfo=None) for value in values],
+                        dtype='datetime64[us]')
+    return np.fromiter(values, dtype=DTYPES[kind], count=len(values))
+
+
+def load_columns(queryset, fields: list[str] = None, categorical: list[str] = (),
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> dict[str, np.ndarray]:
+    """ Stream a queryset into preallocated NumPy columns
+
+    Timestamps are returned as naive UTC datetime64[us], missing numbers as NaN. Categorical
+    columns are returned as integer codes (-1 for None) with their keys under '<field>_keys'.
+
+    Args:
+        queryset (QuerySet): Queryset to load
+        fields (list[str]): Field lookups to load, defaults to every concrete field (as `values()`)
+        categorical (list[str]): Fields to dictionary encode
+        chunk_size (int): Number of rows fetched per round trip
+
+    Returns:
+        dict[str, np.ndarray]: One column per field, plus the keys of the categorical fields
+    """
+    fields = list(fields or [field.attname for field in queryset.model._meta.concrete_fields])
+    kinds = {field: 'integer' if field in categorical else column_kind(*resolve_field(queryset.model, field))
+             for field in fields}
+    count = queryset.count()
+    columns = {field: np.empty(count, dtype=DTYPES[kinds[field]]) for field in fields}
+    indexes = {field: {} for field in categorical}
+
+    loaded = 0
+    for chunk in batched(queryset.values_list(*fields).iterator(chunk_size=chunk_size), chunk_size):
+        loaded = _store_chunk(columns, kinds, indexes, chunk, loaded)
+
+    columns = {field: column[:loaded] for field, column in columns.items()}
+    for field, index in indexes.items():
+        columns[f"{field}_keys"] = np.fromiter(index, dtype=object, count=len(index))
+    return columns
+
+
+def _store_chunk(columns: dict, kinds: dict, indexes: dict, chunk: tuple, loaded: int) -> int:
+    """ Copy one chunk of rows into the columns, growing them if rows were added since the count """
+    end = loaded + len(chunk)
+    for field, values in zip(kinds, zip(*chunk)):
+        if end > len(columns[field]):
+            columns[field] = np.resize(columns[field], max(end, 2 * len(columns[field])))
+        if field in indexes:
+            index = indexes[field]
+            columns[field][loaded:end] = np.fromiter(
+                (-1 if value is None else index.setdefault(value, len(index)) for value in values),
+                dtype=np.int64,
+                count=len(values))
+        else:
+            columns[field][loaded:end] = convert(values, kinds[field])
+    return end
+
+
+def load_frame(queryset, fields: list[str] = None, categorical: list[str] = None,
+               chunk_size: int = DEFAULT_CHUNK_SIZE) -> pd.DataFrame:
+    """ Stream a queryset into a DataFrame
+
+    Args:
+        queryset (QuerySet): Queryset to load
+        fields (list[str]): Field lookups to load, defaults to every concrete field (as `values()`)
+        categorical (list[str]): Fields loaded as pandas categoricals, defaults to the foreign keys
+        chunk_size (int): Number of rows fetched per round trip
+
+    Returns:
+        pd.DataFrame: One column per field
+    """
+    fields = list(fields or [field.attname for field in queryset.model._meta.concrete_fields])
+    if categorical is None:
+        categorical = [field for field in fields if resolve_field(queryset.model, field)[0].is_relation]
+    columns = load_columns(queryset, fields, categorical, chunk_size)
+    return pd.DataFrame({
+        field: pd.Categorical.from_codes(columns[field], categories=pd.Index(columns[f"{field}_keys"]))
+        if field in categorical else columns[field]
+        for field in fields
+    })
@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from django.db import transaction
+from core.models import Event, LatestOutcome, Odd, Outcome
+from core.services import frame_loader
+from loguru import logger
+
+
+class LatestOutcomeService:
+    """ Service class to maintain and read the LatestOutcome table
+    """
+
+    unique_fields = ['event', 'bookmaker', 'market', 'name']
+    update_fields = ['odd', 'timestamp', 'price', 'point', 'implied_probability', 'overround', 'fair_probability']
+
+    def __init__(self):
+        logger.debug("LatestOutcomeService initialized")
+
+    def refresh_from_odd(self, odd: Odd) -> int:
+        """ Upsert the latest outcome rows of an event from a freshly ingested snapshot
+
+        The table holds the newest quote of every bookmaker and market of an event. Polls may be split
+        by market, region or bookmaker, so a snapshot only speaks for the (bookmaker, market) pairs it
+        quotes. A pair whose stored rows are newer than the snapshot is left alone, so historical
+        backfills arriving out of order never overwrite current prices. Otherwise the pair's rows are
+        replaced: outcomes the snapshot no longer quotes in it (withdrawn prices or lines) are deleted,
+        so readers of current prices never see them.
+
+        Args:
+            odd (Odd): The snapshot that was just ingested
+
+        Returns:
+            int: Number of latest outcome rows written
+        """
+        existing, newest = {}, {}
+        for row_id, bookmaker_id, market_id, name_id, timestamp in LatestOutcome.objects.filter(
+                event_id=odd.event_id).values_list('id', 'bookmaker_id', 'market_id', 'name_id', 'timestamp'):
+            existing[(bookmaker_id, market_id, name_id)] = (row_id, timestamp)
+            newest[(bookmaker_id, market_id)] = max(timestamp, newest.get((bookmaker_id, market_id), timestamp))
+
+        rows, quoted, ignored = [], set(), set()
+        for bookmaker_id, market_id, name_id, price, point, implied_probability, overround, fair_probability in (
+                Outcome.objects.filter(odd=odd).values_list('bookmaker_id', 'market_id', 'name_id', 'price', 'point',
+                                                            'implied_probability', 'overround', 'fair_probability')):
+            if newest.get((bookmaker_id, market_id), odd.timestamp) > odd.timestamp:
+                ignored.add((bookmaker_id, market_id))
+                continue
+            quoted.add((bookmaker_id, market_id))
+            existing.pop((bookmaker_id, market_id, name_id), None)
+            rows.append(LatestOutcome(event_id=odd.event_id,
+                                      bookmaker_id=bookmaker_id,
+                                      market_id=market_id,
+                                      name_id=name_id,
+                                      odd=odd,
+                                      timestamp=odd.timestamp,
+                                      price=price,
+                                      point=point,
+                                      implied_probability=implied_probability,
+                                      overround=overround,
+                                      fair_probability=fair_probability))
+        if ignored:
+            logger.debug(f"Ignored {len(ignored)} bookmaker markets of event {odd.event_id} at {odd.timestamp}, "
+                         f"older than the stored prices")
+
+        if rows:
+            LatestOutcome.objects.bulk_create(rows,
+                                              update_conflicts=True,
+                                              unique_fields=self.unique_fields,
+                                              update_fields=self.update_fields)
+        withdrawn = [row_id for (bookmaker_id, market_id, _), (row_id, timestamp) in existing.items()
+                     if (bookmaker_id, market_id) in quoted and timestamp < odd.timestamp]
+        if withdrawn:
+            LatestOutcome.objects.filter(id__in=withdrawn).delete()
+        logger.debug(f"Refreshed {len(rows)} and removed {len(withdrawn)} latest outcomes for event {odd.event_id} "
+                     f"at {odd.timestamp}")
+        return len(rows)
+
+    @transaction.atomic
+    def rebuild(self, batch_size: int = 5000, **kwargs) -> int:
+        """ Rebuild the latest outcome table from the full odds history
+
+        Outcomes are streamed in snapshot order so the last row seen per key is the latest one. Only
+        the rows of the newest snapshot quoting each event's bookmaker and market are kept, as
+        `refresh_from_odd` does.
+
+        Args:
+            batch_size (int): Number of rows to stream and write per batch
+            **kwargs: Arbitrary keyword arguments for filtering events, e.g. sport_id
+
+        Returns:
+            int: Number of latest outcome rows written
+        """
+        logger.debug(f"Rebuilding latest outcomes with filters: {kwargs}")
+        events = Event.objects.filter(**kwargs).values('id')
+        LatestOutcome.objects.filter(event_id__in=events).delete()
+
+        latest, newest = {}, {}
+        outcomes = Outcome.objects.filter(odd__event_id__in=events).order_by('odd__timestamp').values_list(
+            'odd_id', 'odd__event_id', 'odd__timestamp', 'bookmaker_id', 'market_id', 'name_id', 'price', 'point',
+            'implied_probability', 'overround', 'fair_probability')
+        for odd_id, event_id, timestamp, bookmaker_id, market_id, name_id, *values in outcomes.iterator(
+                chunk_size=batch_size):
+            latest[(event_id, bookmaker_id, market_id, name_id)] = (odd_id, timestamp, *values)
+            newest[(event_id, bookmaker_id, market_id)] = timestamp
+
+        rows = [
+            LatestOutcome(event_id=event_id,
+                          bookmaker_id=bookmaker_id,
+                          market_id=market_id,
+                          name_id=name_id,
+                          odd_id=odd_id,
+                          timestamp=timestamp,
+                          price=price,
+                          point=point,
+                          implied_probability=implied_probability,
+                          overround=overround,
+                          fair_probability=fair_probability)
+            for (event_id, bookmaker_id, market_id, name_id), (odd_id, timestamp, price, point, implied_probability,
+                                                               overround, fair_probability) in latest.items()
+            if timestamp == newest[(event_id, bookmaker_id, market_id)]
+        ]
+        LatestOutcome.objects.bulk_create(rows, batch_size=batch_size)
+        logger.debug(f"Rebuilt {len(rows)} latest outcomes")
+        return len(rows)
+
+    def get_latest_outcomes(self, **kwargs) -> list[dict]:
+        """ Get the current prices from the database
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of latest outcome data
+        """
+        logger.debug(f"Getting latest outcomes with filters: {kwargs}")
+        outcomes = LatestOutcome.objects.filter(**kwargs).values() if kwargs else LatestOutcome.objects.all().values()
+        return list(outcomes)
+
+    def get_latest_columns(self, **kwargs) -> dict[str, np.ndarray]:
+        """ Get the current prices as aligned NumPy columns for vectorised analytics
+
+        Event ids are encoded as integer codes into the 'event_keys' column, missing points as NaN.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            dict[str, np.ndarray]: Columns 'id', 'event', 'event_keys', 'bookmaker', 'market', 'name',
+                'price', 'point', 'fair_probability' and 'timestamp'
+        """
+        fields = ['id', 'event_id', 'bookmaker_id', 'market_id', 'name_id', 'price', 'point', 'fair_probability', 'timestamp']
+        columns = frame_loader.load_columns(LatestOutcome.objects.filter(**kwargs), fields, categorical=['event_id'])
+        return {
+            'id': columns['id'],
+            'event': columns['event_id'],
+            'event_keys': columns['event_id_keys'].astype(str),
+            'bookmaker': columns['bookmaker_id'],
+            'market': columns['market_id'],
+            'name': columns['name_id'],
+            'price': columns['price'],
+            'point': columns['point'],
+            'fair_probability': columns['fair_probability'],
+            'timestamp': columns['timestamp'],
+        }
+
+    def get_latest_outcomes_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the current prices as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting latest outcomes frame with filters: {kwargs}")
+        return frame_loader.load_frame(LatestOutcome.objects.filter(**kwargs))
+
+    def __del__(self):
+        logger.debug("LatestOutcomeService terminated")
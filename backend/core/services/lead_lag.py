@@ -0,0 +1,114 @@
+""" Vectorised lead–lag statistics between the price series of bookmakers
+
+The prices every bookmaker quoted for one outcome (an event, market, name and point) are resampled
+onto a common grid of `resolution` second bins, forward filled and turned into log returns. The
+cross-correlation of the returns of every pair of bookmakers is taken at once with one real FFT
+of the whole matrix, so the cost per outcome is O(B·T log T) for B bookmakers and T bins instead of
+O(B²·T·lags) for direct correlation at each lag.
+
+`correlate` returns, per pair of bookmakers (lowest id first), the correlation at lags -max_lag to
+max_lag bins: a peak at a positive lag means the second bookmaker's moves are repeated by the first
+that many bins later, i.e. the second bookmaker leads.
+"""
+import numpy as np
+
+
+def price_matrix(rows: np.ndarray, bins: np.ndarray, timestamps: np.ndarray, prices: np.ndarray, n_rows: int,
+                 n_bins: int) -> np.ndarray:
+    """ Last price per row and bin, forward filled, NaN before a row's first quote
+
+    Args:
+        rows (np.ndarray): Row (bookmaker) index of each quote
+        bins (np.ndarray): Bin index of each quote
+        timestamps (np.ndarray): Timestamp of each quote, the latest quote of a bin is kept
+        prices (np.ndarray): Price of each quote
+        n_rows (int): Number of rows
+        n_bins (int): Number of bins
+
+    Returns:
+        np.ndarray: (n_rows, n_bins) prices
+    """
+    cells = rows * n_bins + bins
+    order = np.lexsort((timestamps, cells))
+    last = np.append(cells[order][1:] != cells[order][:-1], True)
+    matrix = np.full(n_rows * n_bins, np.nan)
+    matrix[cells[order][last]] = prices[order][last]
+    matrix = matrix.reshape(n_rows, n_bins)
+    filled = np.maximum.accumulate(np.where(np.isnan(matrix), 0, np.arange(n_bins)), axis=1)
+    return np.take_along_axis(matrix, filled, axis=1)
+
+
+def correlate(matrix: np.ndarray, max_lag: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """ Cross-correlation of the log returns of every pair of rows of a price matrix
+
+    Rows without a price move are left out.
+
+    Args:
+        matrix (np.ndarray): (rows, bins) prices from `price_matrix`
+        max_lag (int): Largest lag in bins
+
+    Returns:
+        tuple[np.ndarray, np.ndarray, np.ndarray]: First and second row of each pair (first < second)
+            and the (pairs, 2 * max_lag + 1) correlations at lags -max_lag..max_lag
+    """
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = np.nan_to_num(np.diff(np.log(matrix), axis=1))
+    moving = np.flatnonzero(np.any(returns != 0, axis=1))
+    first, second = np.triu_indices(len(moving), 1)
+    first, second = moving[first], moving[second]
+    if len(first) == 0:
+        return first, second, np.zeros((0, 2 * max_lag + 1))
+
+    returns = returns - returns.mean(axis=1, keepdims=True)
+    norms = np.sqrt((returns ** 2).sum(axis=1))
+    # Zero padding to at least T + max_lag keeps the circular correlation free of wrap-around
+    size = 1 << int(np.ceil(np.log2(returns.shape[1] + max_lag + 1)))
+    spectra = np.fft.rfft(returns, size, axis=1)
+    # irfft(A * conj(B))[k] is sum_t a[t + k] * b[t], negative lags wrap to the end
+    circular = np.fft.irfft(spectra[first] * np.conj(spectra[second]), size, axis=1)
+    lags = np.concatenate((circular[:, size - max_lag:], circular[:, :max_lag + 1]), axis=1)
+    return first, second, lags / (norms[first] * norms[second])[:, None]
+
+
+def accumulate(columns: dict[str, np.ndarray], resolution: int, max_lag: int) -> dict[str, np.ndarray]:
+    """ Sum the cross-correlations of every outcome per market and pair of bookmakers
+
+    Args:
+        columns (dict[str, np.ndarray]): Aligned quotes sorted by 'cell' (the outcome label) with
+            'market' and 'bookmaker' ids, 'timestamp' in seconds and 'price'
+        resolution (int): Bin size in seconds
+        max_lag (int): Largest lag in bins
+
+    Returns:
+        dict[str, np.ndarray]: 'keys' (pairs, 3) market, first and second bookmaker id (first <
+            second), 'sums' (pairs, 2 * max_lag + 1) correlation sums and 'counts' outcomes per pair
+    """
+    keys, sums = [], []
+    cells = columns['cell']
+    bounds = np.flatnonzero(np.diff(cells)) + 1
+    for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(cells)]))):
+        bookmakers, rows = np.unique(columns['bookmaker'][start:end], return_inverse=True)
+        if len(bookmakers) < 2:
+            continue
+        timestamps = columns['timestamp'][start:end]
+        bins = (timestamps - timestamps.min()) // resolution
+        matrix = price_matrix(rows, bins, timestamps, columns['price'][start:end].astype(float), len(bookmakers),
+                              int(bins.max()) + 1)
+        first, second, correlations = correlate(matrix, max_lag)
+        if len(first):
+            keys.append(np.column_stack((np.full(len(first), columns['market'][start]), bookmakers[first],
+                                         bookmakers[second])))
+            sums.append(correlations)
+    if not keys:
+        return {'keys': np.zeros((0, 3), dtype=np.int64), 'sums': np.zeros((0, 2 * max_lag + 1)),
+                'counts': np.zeros(0, dtype=np.int64)}
+    return merge(np.concatenate(keys), np.concatenate(sums), np.ones(sum(len(key) for key in keys), dtype=np.int64))
+
+
+def merge(keys: np.ndarray, sums: np.ndarray, counts: np.ndarray) -> dict[str, np.ndarray]:
+    """ Add up the sums and counts of equal keys, see `accumulate` """
+    unique, labels = np.unique(keys, axis=0, return_inverse=True)
+    labels = labels.reshape(-1)
+    merged = np.zeros((len(unique), sums.shape[1]))
+    np.add.at(merged, labels, sums)
+    return {'keys': unique, 'sums': merged, 'counts': np.bincount(labels, counts, len(unique)).astype(np.int64)}
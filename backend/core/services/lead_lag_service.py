@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from loguru import logger
+
+from core.models import LeadLag, Outcome, Sport
+from core.services import frame_loader, lead_lag, odds_math
+
+
+def accumulate_chunk(task: tuple) -> dict[str, np.ndarray]:
+    """ Pool task: `lead_lag.accumulate` over a chunk of outcomes """
+    columns, resolution, max_lag = task
+    return lead_lag.accumulate(columns, resolution, max_lag)
+
+
+class LeadLagService:
+    """ Service class to measure which bookmakers move their prices first, per sport and market
+
+    The pre-match odds history of a sport is loaded once as aligned columns, split into chunks of
+    whole outcome price series and cross-correlated on a process pool (see `lead_lag`). The
+    correlation sums of the chunks are added up per market and pair of bookmakers, and the peak
+    of their mean is stored in LeadLag, replacing the previous analysis of the sport.
+    """
+
+    history_fields = ['odd__event_id', 'market_id', 'name_id', 'point', 'bookmaker_id', 'odd__timestamp', 'price']
+
+    def __init__(self):
+        logger.debug("LeadLagService initialized")
+
+    def load_history(self, sport_id: str, since=None) -> dict[str, np.ndarray]:
+        """ Pre-match quotes of a sport sorted by outcome, see `lead_lag.accumulate`
+
+        Args:
+            sport_id (str): Sport key
+            since (datetime): Earliest snapshot, defaults to LEAD_LAG_WINDOW_DAYS ago
+
+        Returns:
+            dict[str, np.ndarray]: Columns 'cell', 'market', 'bookmaker', 'timestamp' (seconds) and 'price'
+        """
+        since = since or timezone.now() - timedelta(days=settings.LEAD_LAG_WINDOW_DAYS)
+        queryset = Outcome.objects.filter(odd__event__sport_id=sport_id,
+                                          odd__timestamp__gte=since,
+                                          odd__timestamp__lt=F('odd__event__commence_time'))
+        columns = frame_loader.load_columns(queryset, self.history_fields, categorical=['odd__event_id'])
+        cells, _ = odds_math.group_labels(columns['odd__event_id'], columns['market_id'], columns['name_id'],
+                                          np.nan_to_num(columns['point'], nan=0.0))
+        order = np.argsort(cells, kind='stable')
+        return {
+            'cell': cells[order],
+            'market': columns['market_id'][order],
+            'bookmaker': columns['bookmaker_id'][order],
+            'timestamp': columns['odd__timestamp'][order].astype('datetime64[s]').astype(np.int64),
+            'price': columns['price'][order],
+        }
+
+    @staticmethod
+    def chunks(history: dict[str, np.ndarray], n_chunks: int) -> list[dict[str, np.ndarray]]:
+        """ Split a history into about `n_chunks` parts without splitting an outcome's series """
+        cells = history['cell']
+        if len(cells) == 0:
+            return []
+        _, cells = np.unique(cells, return_inverse=True)
+        parts = cells.reshape(-1) * n_chunks // (cells.max() + 1)
+        bounds = np.flatnonzero(np.diff(parts)) + 1
+        return [{column: values[start:end] for column, values in history.items()}
+                for start, end in zip(np.concatenate(([0], bounds)), np.concatenate((bounds, [len(cells)])))]
+
+    def summarise(self, totals: dict[str, np.ndarray], resolution: int, max_lag: int) -> list[dict]:
+        """ Peak of the mean correlation of every market and pair of bookmakers
+
+        Args:
+            totals (dict[str, np.ndarray]): Merged output of `lead_lag.accumulate`
+            resolution (int): Bin size in seconds
+            max_lag (int): Largest lag in bins
+
+        Returns:
+            list[dict]: 'market_id', 'leader_id', 'follower_id', 'lag_seconds', 'correlation',
+                'zero_lag_correlation' and 'series' per pair
+        """
+        means = totals['sums'] / totals['counts'][:, None]
+        peaks = np.argmax(means, axis=1)
+        lags = peaks - max_lag
+        market, first, second = totals['keys'].T
+        # A peak at a positive lag means the second bookmaker leads the first
+        leaders = np.where(lags > 0, second, first)
+        followers = np.where(lags > 0, first, second)
+        return [{
+            'market_id': market_id,
+            'leader_id': leader,
+            'follower_id': follower,
+            'lag_seconds': abs(lag) * resolution,
+            'correlation': correlation,
+            'zero_lag_correlation': zero_lag,
+            'series': series,
+        } for market_id, leader, follower, lag, correlation, zero_lag, series in zip(
+            market.tolist(), leaders.tolist(), followers.tolist(), lags.tolist(),
+            means[np.arange(len(means)), peaks].tolist(), means[:, max_lag].tolist(), totals['counts'].tolist())]
+
+    @transaction.atomic
+    def store(self, sport_id: str, pairs: list[dict]) -> None:
+        """ Replace the stored lead-lag pairs of a sport """
+        now = timezone.now()
+        LeadLag.objects.filter(sport_id=sport_id).delete()
+        LeadLag.objects.bulk_create([LeadLag(sport_id=sport_id, computed_at=now, **pair) for pair in pairs])
+
+    def analyse(self, since=None, processes: int = None, **kwargs) -> int:
+        """ Analyse the lead-lag of the bookmakers of every matching sport
+
+        Args:
+            since (datetime): Earliest snapshot, defaults to LEAD_LAG_WINDOW_DAYS ago
+            processes (int): Number of worker processes, defaults to the LEAD_LAG_PROCESSES setting
+                or the number of CPUs
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of bookmaker pairs stored
+        """
+        resolution, max_lag = settings.LEAD_LAG_RESOLUTION, settings.LEAD_LAG_MAX_LAG
+        processes = processes or settings.LEAD_LAG_PROCESSES or os.cpu_count()
+        if processes > 1 and multiprocessing.current_process().daemon:
+            # Daemonic processes (such as django-q workers) cannot start a pool
+            logger.info("Running the lead-lag analysis in the current daemonic process")
+            processes = 1
+        logger.debug(f"Analysing bookmaker lead-lag with filters: {kwargs} on {processes} processes")
+        pool = multiprocessing.Pool(processes) if processes > 1 else None
+        stored = 0
+        try:
+            for sport_id in Sport.objects.filter(**kwargs).values_list('key', flat=True):
+                history = self.load_history(sport_id, since)
+                tasks = [(chunk, resolution, max_lag) for chunk in self.chunks(history, processes * 4)]
+                results = list(pool.imap_unordered(accumulate_chunk, tasks) if pool else map(accumulate_chunk, tasks))
+                results = [result for result in results if len(result['keys'])]
+                pairs = []
+                if results:
+                    totals = lead_lag.merge(*(np.concatenate([result[key] for result in results])
+                                              for key in ('keys', 'sums', 'counts')))
+                    pairs = self.summarise(totals, resolution, max_lag)
+                self.store(sport_id, pairs)
+                logger.debug(f"Stored {len(pairs)} bookmaker lead-lag pairs of {sport_id}")
+                stored += len(pairs)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return stored
+
+    def get_lead_lags(self, **kwargs) -> list[dict]:
+        """ Get lead-lag pairs from the database, strongest correlation first
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. sport_id or market__key
+
+        Returns:
+            list[dict]: List of lead-lag data
+        """
+        logger.debug(f"Getting lead-lag pairs with filters: {kwargs}")
+        return list(LeadLag.objects.filter(**kwargs).order_by('-correlation').values())
+
+    def __del__(self):
+        logger.debug("LeadLagService terminated")
@@ -0,0 +1,181 @@
+from datetime import timedelta
+
+import pandas as pd
+import redis
+from django.conf import settings
+from django.db import transaction
+from loguru import logger
+
+from core.models import LatestOutcome, LineMovement, Odd, Outcome
+from core.services import frame_loader
+
+
+class LineMovementService:
+    """ Service class to detect price movements between consecutive snapshots
+
+    A new snapshot is compared with the latest outcome table, which holds the previous price of
+    every event/bookmaker/market/outcome, so each snapshot is compared in O(size of the snapshot)
+    and only the changes are written. No state is kept in the process, so snapshots of one event
+    can be ingested by any worker. Whether a bookmaker followed another is read from the first
+    movers recorded within the lead window. Movements are published to the Redis stream once the
+    ingest transaction commits, over one connection per service instance.
+    """
+
+    def __init__(self):
+        self.redis_connection = None
+        logger.debug("LineMovementService initialized")
+
+    @staticmethod
+    def previous_prices(odd: Odd) -> dict[tuple, tuple]:
+        """ Stored latest price of every outcome of a snapshot's event
+
+        Returns:
+            dict[tuple, tuple]: (bookmaker, market, name) -> (price, point, timestamp)
+        """
+        return {
+            (bookmaker_id, market_id, name_id): (price, point, timestamp)
+            for bookmaker_id, market_id, name_id, price, point, timestamp in LatestOutcome.objects.filter(
+                event_id=odd.event_id).values_list('bookmaker_id', 'market_id', 'name_id', 'price', 'point',
+                                                   'timestamp')
+        }
+
+    @staticmethod
+    def leaders(odd: Odd, lead_window: timedelta) -> dict[tuple, tuple]:
+        """ Most recent first mover per market, outcome and point within the lead window before a snapshot
+
+        Returns:
+            dict[tuple, tuple]: (market, name, point) -> (timestamp, bookmaker, direction)
+        """
+        leaders = {}
+        for market_id, name_id, point, timestamp, bookmaker_id, delta in LineMovement.objects.filter(
+                event_id=odd.event_id, first_mover=True, timestamp__gte=odd.timestamp - lead_window,
+                timestamp__lt=odd.timestamp).order_by('timestamp', 'id').values_list(
+                    'market_id', 'name_id', 'point', 'timestamp', 'bookmaker_id', 'delta'):
+            leaders[(market_id, name_id, point)] = (timestamp, bookmaker_id, (delta > 0) - (delta < 0))
+        return leaders
+
+    def detect(self, odd: Odd) -> list[LineMovement]:
+        """ Compare a snapshot against the previous prices of its event and record the movements
+
+        Must run before the latest outcome table is refreshed with the same snapshot.
+
+        Args:
+            odd (Odd): The snapshot that was just ingested
+
+        Returns:
+            list[LineMovement]: The movements found, already saved
+        """
+        state = self.previous_prices(odd)
+        lead_window = timedelta(minutes=settings.LINE_MOVEMENT_LEAD_WINDOW)
+        leaders = self.leaders(odd, lead_window)
+
+        movements = []
+        for bookmaker_id, market_id, name_id, price, point in Outcome.objects.filter(odd=odd).values_list(
+                'bookmaker_id', 'market_id', 'name_id', 'price', 'point'):
+            previous = state.get((bookmaker_id, market_id, name_id))
+            if previous is None or previous[2] >= odd.timestamp:
+                continue
+
+            previous_price, previous_point, previous_timestamp = previous
+            if previous_price == price and previous_point == point:
+                continue
+
+            delta = float(price - previous_price)
+            hours = (odd.timestamp - previous_timestamp).total_seconds() / 3600
+            direction = (delta > 0) - (delta < 0)
+
+            leader = leaders.get((market_id, name_id, point))
+            led_by_id = None
+            if leader is not None and leader[2] == direction and leader[1] != bookmaker_id:
+                led_by_id = leader[1]
+
+            delta_percent = delta / float(previous_price)
+            movements.append(LineMovement(event_id=odd.event_id,
+                                          bookmaker_id=bookmaker_id,
+                                          market_id=market_id,
+                                          name_id=name_id,
+                                          point=point,
+                                          previous_price=previous_price,
+                                          price=price,
+                                          delta=delta,
+                                          delta_percent=delta_percent,
+                                          velocity=delta / hours,
+                                          previous_timestamp=previous_timestamp,
+                                          timestamp=odd.timestamp,
+                                          first_mover=led_by_id is None,
+                                          led_by_id=led_by_id,
+                                          is_alert=abs(delta_percent) >= settings.LINE_MOVEMENT_ALERT_THRESHOLD))
+
+        if movements:
+            LineMovement.objects.bulk_create(movements)
+            # A rolled back ingest must not reach the subscribers
+            transaction.on_commit(lambda: self.publish(movements))
+        logger.debug(f"Detected {len(movements)} line movements for event {odd.event_id} at {odd.timestamp}")
+        return movements
+
+    def connection(self) -> redis.Redis:
+        """ Redis connection of the service, opened on first use """
+        if self.redis_connection is None:
+            self.redis_connection = redis.Redis(socket_connect_timeout=1, **settings.Q_CLUSTER['redis'])
+        return self.redis_connection
+
+    def publish(self, movements: list[LineMovement]) -> None:
+        """ Append movements to the line movement Redis stream
+
+        Publishing is best effort, the table stays the source of truth when Redis is unavailable.
+
+        Args:
+            movements (list[LineMovement]): Movements to publish
+        """
+        if not settings.LINE_MOVEMENT_STREAM:
+            return
+        try:
+            pipeline = self.connection().pipeline(transaction=False)
+            for movement in movements:
+                pipeline.xadd(settings.LINE_MOVEMENT_STREAM, {
+                    'event': movement.event_id,
+                    'bookmaker': movement.bookmaker_id,
+                    'market': movement.market_id,
+                    'name': movement.name_id,
+                    'point': '' if movement.point is None else movement.point,
+                    'previous_price': str(movement.previous_price),
+                    'price': str(movement.price),
+                    'delta': movement.delta,
+                    'velocity': movement.velocity,
+                    'timestamp': movement.timestamp.isoformat(),
+                    'first_mover': int(movement.first_mover),
+                    'led_by': movement.led_by_id or '',
+                    'is_alert': int(movement.is_alert),
+                },
+                              maxlen=settings.LINE_MOVEMENT_STREAM_MAXLEN,
+                              approximate=True)
+            pipeline.execute()
+        except redis.exceptions.RedisError as e:
+            logger.warning(f"Could not publish {len(movements)} line movements: {str(e)}")
+
+    def get_movements(self, **kwargs) -> list[dict]:
+        """ Get line movements from the database
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of line movement data
+        """
+        logger.debug(f"Getting line movements with filters: {kwargs}")
+        return list(LineMovement.objects.filter(**kwargs).order_by('-timestamp').values())
+
+    def get_movements_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the line movements as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting line movements frame with filters: {kwargs}")
+        return frame_loader.load_frame(LineMovement.objects.filter(**kwargs).order_by('-timestamp'))
+
+    def __del__(self):
+        logger.debug("LineMovementService terminated")
@@ -1,5 +1,14 @@
+from collections.abc import Iterator
+
+import pandas as pd
 from django.db import transaction
 from core.models import Odd
+from core.services import frame_loader
+from core.services.closing_line_service import ClosingLineService
+from core.services.consensus_service import ConsensusService
+from core.services.latest_outcome_service import LatestOutcomeService
+from core.services.line_movement_service import LineMovementService
+from core.services.outcome_metrics_service import OutcomeMetricsService
 from loguru import logger
 from datetime import datetime
 
@@ -10,6 +19,11 @@ class OddService:
     """
     
     def __init__(self):
+        self.outcome_metrics_service = OutcomeMetricsService()
+        self.line_movement_service = LineMovementService()
+        self.latest_outcome_service = LatestOutcomeService()
+        self.consensus_service = ConsensusService()
+        self.closing_line_service = ClosingLineService()
         logger.debug("oddservice initialized")
     
     @staticmethod
@@ -80,6 +94,9 @@ class OddService:
                 obj, created = Odd.upsert_from_api(odd, **kwargs)
             except Exception as e:
                 logger.error(f"Error upserting odd: {str(e)}, data: {odd}")
+                continue
+            if obj is not None:
+                self.process_snapshot(obj)
             if not created:
                 updated_count += 1
             else:
@@ -87,7 +104,18 @@ class OddService:
         total_count = updated_count + created_count
         logger.debug(f"Upserted {total_count} odds, {created_count} were created and {updated_count} were updated.")
         return total_count
-        
+
+    def process_snapshot(self, odd: Odd) -> None:
+        """ Run the ingest-time stages that keep derived tables in step with a new snapshot
+
+        Args:
+            odd (Odd): The snapshot that was just upserted
+        """
+        self.outcome_metrics_service.refresh_odds([odd.id])
+        self.line_movement_service.detect(odd)
+        self.latest_outcome_service.refresh_from_odd(odd)
+        self.consensus_service.refresh_event(odd.event_id)
+        self.closing_line_service.refresh_from_odd(odd)
     
     @transaction.atomic
     def get_odds(self, **kwargs) -> list[dict]:
@@ -104,5 +132,33 @@ class OddService:
         logger.debug(f"Got {len(odds)} sports")
         return list(odds)
         
+    def iter_odds(self, chunk_size: int = 2000, **kwargs) -> Iterator[dict]:
+        """ Stream odds data from the database one row at a time
+
+        Rows are fetched `chunk_size` at a time (through a server-side cursor on PostgreSQL) and
+        outside of a transaction, so memory stays flat however many rows match.
+
+        Args:
+            chunk_size (int): Number of rows fetched per round trip
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Yields:
+            dict: One row of odds data
+        """
+        logger.debug(f"Streaming odds with filters: {kwargs}")
+        yield from Odd.objects.filter(**kwargs).order_by('pk').values().iterator(chunk_size=chunk_size)
+
+    def get_odds_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the odds as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting odds frame with filters: {kwargs}")
+        return frame_loader.load_frame(Odd.objects.filter(**kwargs))
+
     def __del__(self):
         logger.debug("OddService terminated")
\ No newline at end of file
@@ -0,0 +1,129 @@
+""" Vectorised conversion of stored decimal prices to the other common odds formats
+
+Prices are stored as decimal odds (the stake included in the return). The read API converts whole
+result sets at serialisation time:
+
+- 'american': +150 / -200 style moneyline odds, rounded to whole numbers
+- 'fractional': 3/2 style odds, the profit per stake as the closest fraction with a denominator of
+  at most MAX_DENOMINATOR
+
+Finding the closest fraction is the expensive step, so it runs once per distinct price of a result
+set and is cached across requests; boards quote the same few hundred prices over and over.
+"""
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+FORMATS = ('decimal', 'american', 'fractional')
+MAX_DENOMINATOR = 100
+
+
+def to_american(prices: np.ndarray) -> np.ndarray:
+    """ American odds of decimal prices
+
+    Args:
+        prices (np.ndarray): Decimal prices, NaN where missing
+
+    Returns:
+        np.ndarray: Whole-number American odds as floats, NaN where missing or the price is 1 or less
+    """
+    odds = prices.astype(float) - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        american = np.where(odds >= 1, odds * 100, -100 / odds)
+    return np.where(odds > 0, np.round(american), np.nan)
+
+
+@lru_cache(maxsize=4096)
+def fraction(price: float) -> str:
+    """ Fractional odds of one decimal price, e.g. '11/10' for 2.1 """
+    odds = (Fraction(repr(price)) - 1).limit_denominator(MAX_DENOMINATOR)
+    return f"{odds.numerator}/{odds.denominator}"
+
+
+def to_fractional(prices: np.ndarray) -> np.ndarray:
+    """ Fractional odds of decimal prices
+
+    Args:
+        prices (np.ndarray): Decimal prices, NaN where missing
+
+    Returns:
+        np.ndarray: Object array of fractions, None where missing or the price is 1 or less
+    """
+    prices = prices.astype(float)
+    unique, inverse = np.unique(prices, return_inverse=True)
+    labels = np.array([fraction(price) if price > 1 else None for price in unique.tolist()], dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def convert(prices: np.ndarray, odds_format: str) -> np.ndarray:
+    """ Convert decimal prices to an odds format
+
+    Args:
+        prices (np.ndarray): Decimal prices, NaN where missing
+        odds_format (str): One of FORMATS
+
+    Raises:
+        ValueError: If the format is unknown
+
+    Returns:
+        np.ndarray: Object array of Python values (float, int or str), None where missing
+    """
+    prices = prices.astype(float)
+    if odds_format == 'decimal':
+        converted = prices.astype(object)
+        converted[np.isnan(prices)] = None
+    elif odds_format == 'american':
+        american = to_american(prices)
+        converted = np.nan_to_num(american).astype(np.int64).astype(object)
+        converted[np.isnan(american)] = None
+    elif odds_format == 'fractional':
+        converted = to_fractional(prices)
+    else:
+        raise ValueError(f"odds_format must be one of {', '.join(FORMATS)}")
+    return converted
+
+
+def convert_rows(rows: list[dict], fields: list[str], odds_format: str) -> list[dict]:
+    """ Convert the price fields of serialised rows in place with one vectorised pass
+
+    Args:
+        rows (list[dict]): Serialised rows, prices as numbers or numeric strings
+        fields (list[str]): Price fields of the rows
+        odds_format (str): One of FORMATS, decimal rows are returned unchanged
+
+    Raises:
+        ValueError: If the format is unknown
+
+    Returns:
+        list[dict]: The rows
+    """
+    if odds_format not in FORMATS:
+        raise ValueError(f"odds_format must be one of {', '.join(FORMATS)}")
+    if odds_format == 'decimal' or not rows:
+        return rows
+    prices = np.array([[row[field] for field in fields] for row in rows], dtype=float)
+    converted = convert(prices.ravel(), odds_format).reshape(prices.shape).tolist()
+    for row, values in zip(rows, converted):
+        row.update(zip(fields, values))
+    return rows
+
+
+def convert_values(prices: list, odds_format: str) -> list:
+    """ Convert a column of decimal prices, e.g. the prices of a price series
+
+    Args:
+        prices (list): Decimal prices, None where missing
+        odds_format (str): One of FORMATS, decimal prices are returned unchanged
+
+    Raises:
+        ValueError: If the format is unknown
+
+    Returns:
+        list: The converted prices
+    """
+    if odds_format not in FORMATS:
+        raise ValueError(f"odds_format must be one of {', '.join(FORMATS)}")
+    if odds_format == 'decimal' or not prices:
+        return prices
+    return convert(np.array(prices, dtype=float), odds_format).tolist()
@@ -0,0 +1,150 @@
+""" Memory-mapped odds tick store
+
+A tick store is a directory written by `TickStoreService.write` holding
+
+- `ticks.npy`: one fixed-width `TICK_DTYPE` record per quoted outcome, sorted by event and
+  timestamp,
+- `offsets.npy`: the first record of every event (plus the total), so event `i` is
+  `ticks[offsets[i]:offsets[i + 1]]`,
+- `keys.json`: the side dictionaries mapping the integer codes back to event ids, sports,
+  bookmaker and market keys and outcome names.
+
+`OddsFrame` opens the arrays with `mmap_mode='r'`, so opening a store costs a few milliseconds
+whatever its size, columns are zero-copy views of the file and the pages are shared by every
+process reading the same store.
+"""
+import json
+import os
+
+import numpy as np
+from django.conf import settings
+
+TICK_STORE_VERSION = 1
+
+TICK_DTYPE = np.dtype([
+    ('event', np.uint32),
+    ('bookmaker', np.uint16),
+    ('market', np.uint16),
+    ('name', np.uint32),
+    ('timestamp', 'datetime64[us]'),
+    ('price', np.float64),
+    ('point', np.float32),
+])
+
+# Column of each side dictionary in keys.json
+KEY_COLUMNS = {'events': 'event', 'bookmakers': 'bookmaker', 'markets': 'market', 'names': 'name'}
+
+
+class OddsFrame:
+    """ Read-only, memory-mapped view of a tick store
+
+    Args:
+        path (str): Directory of the tick store, defaults to the TICK_STORE_DIR setting
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.TICK_STORE_DIR
+        with open(os.path.join(self.path, 'keys.json')) as file:
+            self.keys = json.load(file)
+        if self.keys.get('version') != TICK_STORE_VERSION:
+            raise ValueError(f"Unsupported tick store version {self.keys.get('version')} in {self.path}")
+        self.ticks = np.load(os.path.join(self.path, 'ticks.npy'), mmap_mode='r')
+        self.offsets = np.load(os.path.join(self.path, 'offsets.npy'), mmap_mode='r')
+        self.codes = {kind: {key: code for code, key in enumerate(keys)}
+                      for kind, keys in self.keys.items() if kind in KEY_COLUMNS}
+
+    def __len__(self) -> int:
+        return len(self.ticks)
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        """ Zero-copy view of one column, e.g. frame['price'] """
+        return self.ticks[column]
+
+    def code(self, kind: str, key: str) -> int:
+        """ Integer code of a key
+
+        Args:
+            kind (str): 'events', 'bookmakers', 'markets' or 'names'
+            key (str): The key to encode, e.g. a bookmaker key
+
+        Raises:
+            KeyError: If the key is not in the store
+
+        Returns:
+            int: Code used in the ticks
+        """
+        return self.codes[kind][key]
+
+    def decode(self, kind: str, codes: np.ndarray) -> np.ndarray:
+        """ Keys of an array of codes
+
+        Args:
+            kind (str): 'events', 'bookmakers', 'markets' or 'names'
+            codes (np.ndarray): Codes from the matching tick column
+
+        Returns:
+            np.ndarray: The keys (object array)
+        """
+        return np.asarray(self.keys[kind], dtype=object)[codes]
+
+    def event(self, event_id: str) -> np.ndarray:
+        """ All ticks of one event, a zero-copy slice
+
+        Args:
+            event_id (str): Event id
+
+        Returns:
+            np.ndarray: Ticks of the event in timestamp order
+        """
+        code = self.code('events', event_id)
+        return self.ticks[self.offsets[code]:self.offsets[code + 1]]
+
+    def select(self, events: list[str] = None, sports: list[str] = None, bookmakers: list[str] = None,
+               markets: list[str] = None, start: np.datetime64 = None, end: np.datetime64 = None) -> np.ndarray:
+        """ Ticks matching the given filters
+
+        Only the selected records are copied out of the map.
+
+        Args:
+            events (list[str]): Optional event ids
+            sports (list[str]): Optional sport keys
+            bookmakers (list[str]): Optional bookmaker keys
+            markets (list[str]): Optional market keys
+            start (np.datetime64): Optional inclusive lower bound on the timestamp (UTC)
+            end (np.datetime64): Optional exclusive upper bound on the timestamp (UTC)
+
+        Returns:
+            np.ndarray: Selected ticks
+        """
+        mask = np.ones(len(self.ticks), dtype=bool)
+        if sports is not None:
+            event_codes = np.flatnonzero(np.isin(np.asarray(self.keys['sports'], dtype=object), sports))
+            events = [self.keys['events'][code] for code in event_codes] + list(events or [])
+        for kind, keys in (('events', events), ('bookmakers', bookmakers), ('markets', markets)):
+            if keys is not None:
+                codes = [self.codes[kind][key] for key in keys if key in self.codes[kind]]
+                mask &= np.isin(self.ticks[KEY_COLUMNS[kind]], codes)
+        if start is not None:
+            mask &= self.ticks['timestamp'] >= np.datetime64(start, 'us')
+        if end is not None:
+            mask &= self.ticks['timestamp'] < np.datetime64(end, 'us')
+        return self.ticks[mask]
+
+    def to_pandas(self, ticks: np.ndarray = None):
+        """ DataFrame of ticks with categorical key columns
+
+        Args:
+            ticks (np.ndarray): Ticks to convert, the whole store by default
+
+        Returns:
+            pd.DataFrame: One row per tick
+        """
+        import pandas as pd
+
+        ticks = self.ticks if ticks is None else ticks
+        frame = {
+            column: pd.Categorical.from_codes(ticks[column].astype(np.int64), categories=self.keys[kind])
+            for kind, column in KEY_COLUMNS.items()
+        }
+        frame.update({column: ticks[column] for column in ('timestamp', 'price', 'point')})
+        return pd.DataFrame(frame)
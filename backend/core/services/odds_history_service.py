@@ -0,0 +1,147 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from loguru import logger
+
+from core.models import Outcome
+from core.services import frame_loader, odds_math
+
+
+class OddsHistoryService:
+    """ Service class to serve downsampled price histories for charts
+
+    The ticks of every requested event are loaded in one columnar query, split into one series per
+    bookmaker, outcome and point (a spread or total moving to a new line starts a new series) and
+    reduced to the point budget with Largest-Triangle-Three-Buckets, which
+    keeps the peaks and turns of a line instead of averaging them away.
+    """
+
+    max_events = 1000
+
+    def __init__(self):
+        logger.debug("OddsHistoryService initialized")
+
+    @staticmethod
+    def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+        """ Select the points of a series to keep with Largest-Triangle-Three-Buckets
+
+        The first and last points are always kept. The points in between are split into
+        `threshold - 2` buckets and from each bucket the point forming the largest triangle with
+        the previously kept point and the average of the next bucket is kept.
+
+        Args:
+            x (np.ndarray): Ascending x values, e.g. epoch seconds
+            y (np.ndarray): Aligned y values
+            threshold (int): Number of points to keep, at least 3
+
+        Returns:
+            np.ndarray: Ascending indexes of the kept points
+        """
+        n = len(x)
+        if threshold >= n:
+            return np.arange(n)
+        x, y = x.astype(float), y.astype(float)
+        # Bucket i covers [edges[i], edges[i + 1]), the last one ends before the last point
+        edges = np.append(np.linspace(1, n - 1, threshold - 1).astype(np.int64), n)
+        selected = np.empty(threshold, dtype=np.int64)
+        selected[0], selected[-1] = 0, n - 1
+        a = 0
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            next_x, next_y = x[end:edges[i + 2]].mean(), y[end:edges[i + 2]].mean()
+            areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+            a = start + int(np.argmax(areas))
+            selected[i + 1] = a
+        return selected
+
+    @staticmethod
+    def parse_time(value, name: str):
+        """ Parse an optional ISO 8601 bound into a UTC timestamp
+
+        Raises:
+            ValueError: If the value can not be parsed
+        """
+        if value in (None, ''):
+            return None
+        try:
+            timestamp = pd.Timestamp(value)
+        except (ValueError, TypeError) as e:
+            raise ValueError(f"{name} must be an ISO 8601 datetime: {str(e)}")
+        return timestamp.tz_localize('UTC') if timestamp.tzinfo is None else timestamp.tz_convert('UTC')
+
+    def history(self, events: list[str], market: str = 'h2h', bookmakers: list[str] = None, points: int = None,
+                start: str = None, end: str = None) -> dict:
+        """ Downsampled price history of a batch of events
+
+        Args:
+            events (list[str]): Event ids
+            market (str): Market key
+            bookmakers (list[str]): Optional bookmaker keys to return
+            points (int): Most points per series, defaults to and is capped by the
+                ODDS_HISTORY_MAX_POINTS setting
+            start (str): Optional inclusive ISO 8601 lower bound on the snapshot timestamp
+            end (str): Optional exclusive ISO 8601 upper bound on the snapshot timestamp
+
+        Raises:
+            ValueError: If events is not a non-empty list of at most `max_events` ids
+            ValueError: If points is not an integer of at least 3
+            ValueError: If start or end can not be parsed
+
+        Returns:
+            dict: 'market', 'points' and one {'event', 'series'} per requested event in request order,
+                each series holding the 'bookmaker', 'name', 'point', number of raw 'ticks' and the kept
+                'timestamps' (epoch seconds), 'prices' and 'points' as arrays
+        """
+        if not isinstance(events, list) or not events:
+            raise ValueError("events must be a non-empty list")
+        if len(events) > self.max_events:
+            raise ValueError(f"At most {self.max_events} events can be requested at once")
+        try:
+            points = min(int(points or settings.ODDS_HISTORY_MAX_POINTS), settings.ODDS_HISTORY_MAX_POINTS)
+        except (ValueError, TypeError):
+            raise ValueError("points must be an integer")
+        if points < 3:
+            raise ValueError("points must be at least 3")
+        events = [str(event) for event in events]
+        start, end = self.parse_time(start, 'start'), self.parse_time(end, 'end')
+        logger.debug(f"Getting {market} history of {len(events)} events downsampled to {points} points")
+
+        queryset = Outcome.objects.filter(odd__event_id__in=set(events), market__key=market)
+        if bookmakers:
+            queryset = queryset.filter(bookmaker__key__in=bookmakers)
+        if start is not None:
+            queryset = queryset.filter(odd__timestamp__gte=start.to_pydatetime())
+        if end is not None:
+            queryset = queryset.filter(odd__timestamp__lt=end.to_pydatetime())
+        columns = frame_loader.load_columns(
+            queryset, ['odd__event_id', 'bookmaker__key', 'name__name', 'odd__timestamp', 'price', 'point'],
+            categorical=['odd__event_id', 'bookmaker__key', 'name__name'])
+
+        series = {event: [] for event in events}
+        labels, n_groups = odds_math.group_labels(columns['odd__event_id'], columns['bookmaker__key'],
+                                                  columns['name__name'], columns['point'])
+        seconds = columns['odd__timestamp'].astype('datetime64[s]').astype(np.int64)
+        order = np.lexsort((columns['odd__timestamp'], labels))
+        bounds = np.searchsorted(labels[order], np.arange(n_groups + 1))
+        for group in range(n_groups):
+            rows = order[bounds[group]:bounds[group + 1]]
+            kept = rows[self.lttb(seconds[rows], columns['price'][rows], points)]
+            first = rows[0]
+            series[columns['odd__event_id_keys'][columns['odd__event_id'][first]]].append({
+                'bookmaker': columns['bookmaker__key_keys'][columns['bookmaker__key'][first]],
+                'name': columns['name__name_keys'][columns['name__name'][first]],
+                'point': None if np.isnan(columns['point'][first]) else float(columns['point'][first]),
+                'ticks': len(rows),
+                'timestamps': seconds[kept].tolist(),
+                'prices': columns['price'][kept].tolist(),
+                'points': [None if np.isnan(point) else point for point in columns['point'][kept].tolist()],
+            })
+
+        return {
+            'market': market,
+            'points': points,
+            'events': [{'event': event, 'series': series[event]} for event in events],
+        }
+
+    def __del__(self):
+        logger.debug("OddsHistoryService terminated")
@@ -0,0 +1,233 @@
+""" Vectorised odds maths shared by the pricing and analytics services
+
+Every function works on flat, aligned NumPy arrays (one element per quoted outcome) and on
+integer group labels, so a whole snapshot, or a whole board of snapshots, is handled in one
+pass instead of one outcome at a time.
+"""
+import numpy as np
+
+
+def line_of(points: np.ndarray) -> np.ndarray:
+    """ Group the outcomes of a handicap/total market that belong to the same line
+
+    A spread of -3.5/+3.5 and a total of Over/Under 45.5 share the absolute value of their point,
+    markets without a point (h2h) all fall on line 0.
+
+    Args:
+        points (np.ndarray): Outcome points, NaN where the outcome has no point
+
+    Returns:
+        np.ndarray: Line of each outcome
+    """
+    return np.nan_to_num(np.abs(points.astype(float)), nan=0.0)
+
+
+def group_labels(*keys: np.ndarray) -> tuple[np.ndarray, int]:
+    """ Label rows by the unique combination of the given key columns
+
+    Args:
+        *keys (np.ndarray): Aligned key columns (numeric)
+
+    Returns:
+        tuple[np.ndarray, int]: Group label of each row and the number of groups
+    """
+    if len(keys[0]) == 0:
+        return np.zeros(0, dtype=np.int64), 0
+    # Factorise one key at a time so the combined code stays a compact 1-d integer
+    labels, n_groups = np.zeros(len(keys[0]), dtype=np.int64), 1
+    for key in keys:
+        values, codes = np.unique(np.asarray(key), return_inverse=True)
+        _, labels = np.unique(labels * len(values) + codes.reshape(-1), return_inverse=True)
+        labels = labels.reshape(-1)
+        n_groups = int(labels.max()) + 1
+    return labels, n_groups
+
+
+def market_groups(columns: dict[str, np.ndarray]) -> dict:
+    """ Label the markets, bookmaker books and outcome cells of a set of quoted outcomes
+
+    A market is an event/market/line, a book is one bookmaker's quotes on a market and a cell is
+    one outcome (name and signed point) of a market across bookmakers.
+
+    Args:
+        columns (dict[str, np.ndarray]): Aligned columns 'event', 'bookmaker', 'market', 'name'
+            and 'point', keys encoded as integers and missing points as NaN
+
+    Returns:
+        dict: Labels and group counts under 'markets'/'n_markets', 'books'/'n_books' and
+            'cells'/'n_cells', plus the 'line' of each row
+    """
+    lines = line_of(columns['point'])
+    points = np.nan_to_num(columns['point'].astype(float), nan=0.0)
+    markets, n_markets = group_labels(columns['event'], columns['market'], lines)
+    books, n_books = group_labels(markets, columns['bookmaker'])
+    cells, n_cells = group_labels(markets, columns['name'], points)
+    return {
+        'line': lines,
+        'markets': markets,
+        'n_markets': n_markets,
+        'books': books,
+        'n_books': n_books,
+        'cells': cells,
+        'n_cells': n_cells,
+    }
+
+
+def group_first(labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """ Index of the first row of each group
+
+    Args:
+        labels (np.ndarray): Group label of each row
+        n_groups (int): Number of groups
+
+    Returns:
+        np.ndarray: Row index of the first member of each group
+    """
+    first = np.full(n_groups, len(labels), dtype=np.int64)
+    np.minimum.at(first, labels, np.arange(len(labels)))
+    return first
+
+
+def group_argmax(values: np.ndarray, labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """ Row index of the largest value in each group
+
+    Args:
+        values (np.ndarray): Values to compare
+        labels (np.ndarray): Group label of each row
+        n_groups (int): Number of groups
+
+    Returns:
+        np.ndarray: Row index of the maximum of each group
+    """
+    order = np.lexsort((-values, labels))
+    starts = np.searchsorted(labels[order], np.arange(n_groups))
+    return order[starts]
+
+
+def group_median(values: np.ndarray, labels: np.ndarray, n_groups: int) -> np.ndarray:
+    """ Median of each group, ignoring NaN values
+
+    Args:
+        values (np.ndarray): Values to summarise
+        labels (np.ndarray): Group label of each row
+        n_groups (int): Number of groups
+
+    Returns:
+        np.ndarray: Median per group, NaN for groups without any finite value
+    """
+    valid = ~np.isnan(values)
+    values, labels = values[valid], labels[valid]
+    order = np.lexsort((values, labels))
+    values, labels = values[order], labels[order]
+    counts = np.bincount(labels, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    medians = np.full(n_groups, np.nan)
+    has_values = counts > 0
+    low = starts[has_values] + (counts[has_values] - 1) // 2
+    high = starts[has_values] + counts[has_values] // 2
+    medians[has_values] = (values[low] + values[high]) / 2
+    return medians
+
+
+def implied_probabilities(prices: np.ndarray) -> np.ndarray:
+    """ Implied probability of decimal prices
+
+    Args:
+        prices (np.ndarray): Decimal prices
+
+    Returns:
+        np.ndarray: 1 / price
+    """
+    return 1.0 / prices.astype(float)
+
+
+def complete_books(book_labels: np.ndarray, n_books: int, market_labels: np.ndarray,
+                   n_markets: int, outcome_labels: np.ndarray) -> np.ndarray:
+    """ Flag rows whose bookmaker quotes every outcome seen in the market
+
+    Args:
+        book_labels (np.ndarray): Label of each row's bookmaker/market/line group
+        n_books (int): Number of bookmaker/market/line groups
+        market_labels (np.ndarray): Label of each row's market/line group (across bookmakers)
+        n_markets (int): Number of market/line groups
+        outcome_labels (np.ndarray): Label of each row's market/line/outcome cell
+
+    Returns:
+        np.ndarray: Boolean mask of rows belonging to a complete book
+    """
+    outcomes_per_market = np.zeros(n_markets, dtype=np.int64)
+    _, first_of_cell = np.unique(outcome_labels, return_index=True)
+    np.add.at(outcomes_per_market, market_labels[first_of_cell], 1)
+    quotes_per_book = np.bincount(book_labels, minlength=n_books)
+    return quotes_per_book[book_labels] == outcomes_per_market[market_labels]
+
+
+def no_vig_probabilities(prices: np.ndarray, book_labels: np.ndarray, n_books: int) -> tuple[np.ndarray, np.ndarray]:
+    """ Overround of each book and the normalised (margin-free) probability of each outcome
+
+    Args:
+        prices (np.ndarray): Decimal prices
+        book_labels (np.ndarray): Label of each row's bookmaker/market/line group
+        n_books (int): Number of bookmaker/market/line groups
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Overround per row (sum of implied probabilities of its book)
+            and fair probability per row
+    """
+    implied = implied_probabilities(prices)
+    overround = np.bincount(book_labels, weights=implied, minlength=n_books)[book_labels]
+    return overround, implied / overround
+
+
+def settle_outcomes(market_keys: np.ndarray, names: np.ndarray, points: np.ndarray, is_home: np.ndarray,
+                    is_away: np.ndarray, home_scores: np.ndarray, away_scores: np.ndarray) -> np.ndarray:
+    """ Settle h2h, spreads and totals outcomes against final scores
+
+    Args:
+        market_keys (np.ndarray): Market key of each outcome, e.g. 'h2h'
+        names (np.ndarray): Outcome name, e.g. a team name, 'Draw', 'Over' or 'Under'
+        points (np.ndarray): Outcome point, NaN when the market has none
+        is_home (np.ndarray): Whether the outcome is the home team
+        is_away (np.ndarray): Whether the outcome is the away team
+        home_scores (np.ndarray): Final home score, NaN when there is no result
+        away_scores (np.ndarray): Final away score, NaN when there is no result
+
+    Returns:
+        np.ndarray: 1 for a winning outcome, 0 for a losing one and NaN for voids (pushes, unknown
+            markets or missing results)
+    """
+    result = np.full(len(market_keys), np.nan)
+    margin = np.where(is_home, home_scores - away_scores, away_scores - home_scores)
+    total = home_scores + away_scores
+
+    h2h = market_keys == 'h2h'
+    draw = names == 'Draw'
+    h2h_team = h2h & (is_home | is_away)
+    result[h2h_team] = (margin[h2h_team] > 0)
+    result[h2h & draw] = (home_scores[h2h & draw] == away_scores[h2h & draw])
+
+    spreads = (market_keys == 'spreads') & (is_home | is_away)
+    handicap = margin + points
+    result[spreads] = np.where(handicap[spreads] == 0, np.nan, handicap[spreads] > 0)
+
+    totals = market_keys == 'totals'
+    over = totals & (names == 'Over')
+    under = totals & (names == 'Under')
+    result[over] = np.where(total[over] == points[over], np.nan, total[over] > points[over])
+    result[under] = np.where(total[under] == points[under], np.nan, total[under] < points[under])
+
+    result[np.isnan(home_scores) | np.isnan(away_scores)] = np.nan
+    return result
+
+
+def settled_profit(prices: np.ndarray, results: np.ndarray) -> np.ndarray:
+    """ Profit of a one unit stake at decimal prices, voids return the stake
+
+    Args:
+        prices (np.ndarray): Decimal prices taken
+        results (np.ndarray): Settlement from `settle_outcomes`
+
+    Returns:
+        np.ndarray: Profit per unit staked
+    """
+    return np.where(results == 1, prices - 1, np.where(results == 0, -1.0, 0.0))
@@ -0,0 +1,98 @@
+import numpy as np
+from loguru import logger
+
+from core.models import Odd, Outcome
+from core.services import odds_math
+
+
+class OutcomeMetricsService:
+    """ Service class to derive and store the implied probability, overround and fair
+    probability of every outcome of a snapshot, along with the snapshot timestamp the outcome
+    history is paged by
+    """
+
+    metric_fields = ['implied_probability', 'overround', 'fair_probability']
+
+    def __init__(self):
+        logger.debug("OutcomeMetricsService initialized")
+
+    @staticmethod
+    def compute_metrics(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Compute the metrics of a batch of outcomes in one vectorised pass
+
+        The overround is the sum of the implied probabilities of a bookmaker's quotes on a
+        market/line. The fair probability normalises those quotes to add up to one and is only
+        defined when the bookmaker quotes every outcome of the market.
+
+        Args:
+            columns (dict[str, np.ndarray]): Aligned columns 'event', 'bookmaker', 'market', 'name',
+                'price' and 'point'; 'event' may be any snapshot label
+
+        Returns:
+            dict[str, np.ndarray]: 'implied_probability', 'overround' and 'fair_probability' per row,
+                NaN where undefined
+        """
+        groups = odds_math.market_groups(columns)
+        overround, fair = odds_math.no_vig_probabilities(columns['price'], groups['books'], groups['n_books'])
+        complete = odds_math.complete_books(groups['books'], groups['n_books'], groups['markets'],
+                                            groups['n_markets'], groups['cells'])
+        return {
+            'implied_probability': odds_math.implied_probabilities(columns['price']),
+            'overround': np.where(complete, overround, np.nan),
+            'fair_probability': np.where(complete, fair, np.nan),
+        }
+
+    def refresh_odds(self, odd_ids: list[int]) -> int:
+        """ Compute and store the metrics of every outcome of the given snapshots
+
+        Args:
+            odd_ids (list[int]): Snapshots to process, handled together in one batch
+
+        Returns:
+            int: Number of outcomes updated
+        """
+        rows = list(Outcome.objects.filter(odd_id__in=odd_ids).values_list(
+            'id', 'odd_id', 'bookmaker_id', 'market_id', 'name_id', 'price', 'point', 'odd__timestamp'))
+        if not rows:
+            return 0
+
+        ids, odds, bookmakers, markets, names, prices, points, timestamps = zip(*rows)
+        metrics = self.compute_metrics({
+            'event': np.array(odds, dtype=np.int64),
+            'bookmaker': np.array(bookmakers, dtype=np.int64),
+            'market': np.array(markets, dtype=np.int64),
+            'name': np.array(names, dtype=np.int64),
+            'price': np.array(prices, dtype=float),
+            'point': np.array([np.nan if point is None else point for point in points], dtype=float),
+        })
+
+        outcomes = [
+            Outcome(id=outcome_id, timestamp=timestamps[i], **{
+                field: None if np.isnan(metrics[field][i]) else float(metrics[field][i])
+                for field in self.metric_fields
+            }) for i, outcome_id in enumerate(ids)
+        ]
+        Outcome.objects.bulk_update(outcomes, [*self.metric_fields, 'timestamp'], batch_size=1000)
+        logger.debug(f"Stored metrics of {len(outcomes)} outcomes for {len(odd_ids)} snapshots")
+        return len(outcomes)
+
+    def backfill(self, batch_size: int = 500, **kwargs) -> int:
+        """ Compute the metrics of stored snapshots in batches
+
+        Args:
+            batch_size (int): Number of snapshots processed per batch
+            **kwargs: Arbitrary keyword arguments for filtering snapshots
+
+        Returns:
+            int: Number of outcomes updated
+        """
+        logger.debug(f"Backfilling outcome metrics with filters: {kwargs}")
+        odd_ids = list(Odd.objects.filter(**kwargs).order_by('id').values_list('id', flat=True).distinct())
+        updated_count = 0
+        for start in range(0, len(odd_ids), batch_size):
+            updated_count += self.refresh_odds(odd_ids[start:start + batch_size])
+        logger.debug(f"Backfilled metrics of {updated_count} outcomes")
+        return updated_count
+
+    def __del__(self):
+        logger.debug("OutcomeMetricsService terminated")
@@ -0,0 +1,168 @@
+""" Vectorised parlay (accumulator) pricing with a branch and bound search for the best combinations
+
+A parlay of N legs pays the product of its legs' prices and wins only if every leg wins. Legs are
+taken from distinct events, so they are treated as independent: the parlay's probability is the
+product of the legs' probabilities and its expected return the product of the legs' expected
+returns. Both objectives are therefore sums of per-leg log scores:
+
+- 'price' ranks parlays by log(price)
+- 'ev' ranks parlays by log(probability · price + push probability), the expected return of a
+  unit stake (a pushed leg is dropped from the parlay, i.e. returns its stake)
+
+`top_parlays` finds the K best sums without enumerating the C(events, N) combinations. Each
+event only keeps its K best legs (a combination using a worse one is beaten by the K combinations
+swapping in a better leg of the same event), events are ordered by their best leg and the search
+abandons a branch as soon as its score plus the best legs of the next events can no longer beat
+the K-th best parlay found so far. The last leg of every branch is chosen in one vectorised pass.
+"""
+import heapq
+from itertools import count
+
+import numpy as np
+
+from core.services import odds_math
+
+OBJECTIVES = ('ev', 'price')
+
+
+def best_legs(columns: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """ Best price of every outcome across bookmakers with the consensus probability of the outcome
+
+    Args:
+        columns (dict[str, np.ndarray]): Latest price columns 'event', 'bookmaker', 'market',
+            'name', 'point', 'price' and 'fair_probability', see `LatestOutcomeService.get_latest_columns`
+
+    Returns:
+        dict[str, np.ndarray]: Per outcome the price 'row' of its best price, 'event', 'market',
+            'name', 'point', 'bookmaker', 'price' and 'probability' (mean fair probability of the
+            bookmakers, NaN when no bookmaker had a complete book)
+    """
+    cells, n_cells = odds_math.group_labels(columns['event'], columns['market'], columns['name'],
+                                            np.nan_to_num(columns['point'].astype(float), nan=0.0))
+    prices = columns['price'].astype(float)
+    rows = odds_math.group_argmax(prices, cells, n_cells)
+    fair = columns['fair_probability'].astype(float)
+    valid = ~np.isnan(fair)
+    quoted = np.bincount(cells[valid], minlength=n_cells)
+    with np.errstate(invalid='ignore'):
+        probabilities = np.bincount(cells[valid], fair[valid], n_cells) / quoted
+    return {
+        'row': rows,
+        'event': columns['event'][rows],
+        'market': columns['market'][rows],
+        'name': columns['name'][rows],
+        'point': columns['point'][rows].astype(float),
+        'bookmaker': columns['bookmaker'][rows],
+        'price': prices[rows],
+        'probability': probabilities,
+    }
+
+
+def leg_scores(prices: np.ndarray, probabilities: np.ndarray, pushes: np.ndarray, objective: str) -> np.ndarray:
+    """ Log score of every leg for an objective, see the module docstring
+
+    Args:
+        prices (np.ndarray): Decimal prices
+        probabilities (np.ndarray): Probability of each leg winning, NaN if unknown
+        pushes (np.ndarray): Probability of each leg being a push
+        objective (str): 'ev' or 'price'
+
+    Returns:
+        np.ndarray: Score per leg, -inf for legs that can not be ranked (no probability for 'ev')
+    """
+    if objective == 'price':
+        return np.log(prices)
+    returns = probabilities * prices + pushes
+    with np.errstate(divide='ignore'):
+        return np.where(returns > 0, np.log(np.where(returns > 0, returns, 1)), -np.inf)
+
+
+def top_parlays(events: np.ndarray, scores: np.ndarray, n_legs: int, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """ The K combinations of `n_legs` legs from distinct events with the largest sum of scores
+
+    Args:
+        events (np.ndarray): Event of each leg
+        scores (np.ndarray): Score of each leg, legs scored -inf are left out
+        n_legs (int): Legs per combination
+        k (int): Number of combinations to return
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: (combinations, n_legs) leg indexes, legs in the order of
+            their events' best leg, and the score of each combination, best first
+    """
+    legs = np.flatnonzero(np.isfinite(scores))
+    _, leg_events = np.unique(events[legs], return_inverse=True)
+    n_events = int(leg_events.max()) + 1 if len(legs) else 0
+    if n_events < n_legs or k < 1:
+        return np.zeros((0, n_legs), dtype=np.int64), np.zeros(0)
+
+    best = np.full(n_events, -np.inf)
+    np.maximum.at(best, leg_events, scores[legs])
+    ranks = np.empty(n_events, dtype=np.int64)
+    ranks[np.argsort(-best, kind='stable')] = np.arange(n_events)
+    order = np.lexsort((-scores[legs], ranks[leg_events]))
+    legs, leg_ranks = legs[order], ranks[leg_events][order]
+    # Only the K best legs of an event can appear in the top K
+    starts = np.searchsorted(leg_ranks, np.arange(n_events + 1))
+    kept = np.arange(len(legs)) - starts[leg_ranks] < k
+    legs, leg_ranks = legs[kept], leg_ranks[kept]
+    starts = np.searchsorted(leg_ranks, np.arange(n_events + 1))
+    values = scores[legs]
+    best = -np.sort(-best)
+    cumulative = np.concatenate(([0.0], np.cumsum(best)))
+
+    heap, tiebreak = [], count()
+
+    def threshold():
+        return heap[0][0] if len(heap) == k else -np.inf
+
+    def extend(first_event, total, chosen):
+        remaining = n_legs - len(chosen)
+        if remaining == 1:
+            start = starts[first_event]
+            candidates = total + values[start:]
+            hits = np.flatnonzero(candidates > threshold())
+            if len(hits) > k:
+                hits = hits[np.argpartition(-candidates[hits], k - 1)[:k]]
+            for hit in hits.tolist():
+                entry = (float(candidates[hit]), next(tiebreak), chosen + (start + hit,))
+                if len(heap) < k:
+                    heapq.heappush(heap, entry)
+                else:
+                    heapq.heappushpop(heap, entry)
+            return
+        for event in range(first_event, n_events - remaining + 1):
+            # The best legs of the next events bound every branch through this event
+            rest = cumulative[event + remaining] - cumulative[event + 1]
+            if total + best[event] + rest <= threshold():
+                break
+            for leg in range(starts[event], starts[event + 1]):
+                if total + values[leg] + rest <= threshold():
+                    break
+                extend(event + 1, total + values[leg], chosen + (leg,))
+
+    extend(0, 0.0, ())
+    ranked = sorted(heap, key=lambda entry: (-entry[0], entry[1]))
+    combinations = np.array([entry[2] for entry in ranked], dtype=np.int64).reshape(-1, n_legs)
+    return legs[combinations], np.array([entry[0] for entry in ranked])
+
+
+def combine(combinations: np.ndarray, prices: np.ndarray, probabilities: np.ndarray,
+            pushes: np.ndarray) -> dict[str, np.ndarray]:
+    """ Price, probability and expected value of parlays
+
+    Args:
+        combinations (np.ndarray): (parlays, legs) leg indexes
+        prices (np.ndarray): Decimal price of each leg
+        probabilities (np.ndarray): Probability of each leg winning, NaN if unknown
+        pushes (np.ndarray): Probability of each leg being a push
+
+    Returns:
+        dict[str, np.ndarray]: 'price', 'probability' (of every leg winning) and 'expected_value'
+            (expected profit per unit staked) per parlay, NaN where a leg has no probability
+    """
+    return {
+        'price': prices[combinations].prod(axis=1),
+        'probability': probabilities[combinations].prod(axis=1),
+        'expected_value': (probabilities[combinations] * prices[combinations] + pushes[combinations]).prod(axis=1) - 1,
+    }
@@ -0,0 +1,148 @@
+import numpy as np
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Bookmaker, Market, Team
+from core.services import parlay
+from core.services.latest_outcome_service import LatestOutcomeService
+from core.services.value_bet_service import ValueBetService
+
+
+class ParlayService:
+    """ Service class to find the best priced parlays across the upcoming events and bookmakers
+
+    The latest prices of the events that have not started are loaded as aligned columns and
+    reduced to the best price of every outcome across bookmakers, with the probability of the
+    outcome from the bookmakers' consensus or the model. The K best combinations of N legs from
+    distinct events are then found by branch and bound, see `parlay`.
+    """
+
+    max_legs = 12
+    max_top = 100
+    sources = ('consensus', 'model')
+
+    def __init__(self):
+        self.latest_outcome_service = LatestOutcomeService()
+        logger.debug("ParlayService initialized")
+
+    def load_legs(self, source: str = 'consensus', markets: list[str] = None, bookmakers: list[str] = None,
+                  **kwargs) -> dict[str, np.ndarray]:
+        """ Best price and probability of every outcome of the events that have not started
+
+        Args:
+            source (str): 'consensus' for the mean fair probability of the bookmakers, 'model' for
+                the stored ModelProbability (outcomes the model does not price have none)
+            markets (list[str]): Optional market keys
+            bookmakers (list[str]): Optional bookmaker keys to take the prices from
+            **kwargs: Arbitrary keyword arguments for filtering the latest outcomes, e.g. event__sport_id
+
+        Returns:
+            dict[str, np.ndarray]: Output of `parlay.best_legs` with the 'push_probability' of
+                each leg and the 'event_keys' of the event codes
+        """
+        filters = {'event__commence_time__gt': timezone.now(), **kwargs}
+        if markets:
+            filters['market__key__in'] = markets
+        if bookmakers:
+            filters['bookmaker__key__in'] = bookmakers
+        prices = self.latest_outcome_service.get_latest_columns(**filters)
+        legs = parlay.best_legs(prices)
+        legs['push_probability'] = np.zeros(len(legs['row']))
+        legs['event_keys'] = prices['event_keys']
+        if source == 'model':
+            value_bet_service = ValueBetService()
+            model = value_bet_service.load_model(prices)
+            matched = value_bet_service.match_rows(legs, model)
+            priced = matched >= 0
+            legs['probability'] = np.full(len(matched), np.nan)
+            legs['probability'][priced] = model['probability'][matched[priced]].astype(float)
+            legs['push_probability'][priced] = np.nan_to_num(model['push_probability'][matched[priced]].astype(float))
+        return legs
+
+    def price(self, legs: int = 2, top: int = 10, objective: str = 'ev', source: str = 'consensus',
+              markets: list[str] = None, bookmakers: list[str] = None, min_price: float = None,
+              max_price: float = None, **kwargs) -> dict:
+        """ The best parlays of `legs` legs from distinct upcoming events
+
+        Args:
+            legs (int): Legs per parlay, at most `max_legs`
+            top (int): Number of parlays to return, at most `max_top`
+            objective (str): 'ev' ranks by expected value, 'price' by combined price
+            source (str): Probability of the legs, see `load_legs`
+            markets (list[str]): Optional market keys
+            bookmakers (list[str]): Optional bookmaker keys to take the prices from
+            min_price (float): Optional lowest price of a leg
+            max_price (float): Optional highest price of a leg
+            **kwargs: Arbitrary keyword arguments for filtering the latest outcomes, e.g. event__sport_id
+
+        Raises:
+            ValueError: If legs, top, objective or source is invalid
+
+        Returns:
+            dict: 'legs', 'objective', 'source', number of 'candidates' (outcomes considered) and the
+                'parlays' best first, each with its combined 'price', 'probability' of winning,
+                'expected_value' per unit staked (None without a probability) and its 'legs'
+        """
+        try:
+            legs, top = int(legs), int(top)
+        except (ValueError, TypeError):
+            raise ValueError("legs and top must be integers")
+        if not 1 <= legs <= self.max_legs:
+            raise ValueError(f"legs must be between 1 and {self.max_legs}")
+        if not 1 <= top <= self.max_top:
+            raise ValueError(f"top must be between 1 and {self.max_top}")
+        if objective not in parlay.OBJECTIVES:
+            raise ValueError(f"objective must be one of {', '.join(parlay.OBJECTIVES)}")
+        if source not in self.sources:
+            raise ValueError(f"source must be one of {', '.join(self.sources)}")
+        logger.debug(f"Pricing the top {top} parlays of {legs} legs by {objective} with filters: {kwargs}")
+
+        candidates = self.load_legs(source, markets, bookmakers, **kwargs)
+        prices, probabilities = candidates['price'], candidates['probability']
+        pushes = candidates['push_probability']
+        scores = parlay.leg_scores(prices, probabilities, pushes, objective)
+        if min_price is not None:
+            scores[prices < float(min_price)] = -np.inf
+        if max_price is not None:
+            scores[prices > float(max_price)] = -np.inf
+        combinations, _ = parlay.top_parlays(candidates['event'], scores, legs, top)
+        combined = parlay.combine(combinations, prices, probabilities, pushes)
+        return {
+            'legs': legs,
+            'objective': objective,
+            'source': source,
+            'candidates': int(np.isfinite(scores).sum()),
+            'parlays': self.describe(candidates, combinations, combined),
+        }
+
+    @staticmethod
+    def describe(candidates: dict[str, np.ndarray], combinations: np.ndarray, combined: dict) -> list[dict]:
+        """ Parlays with the keys and names of their legs, see `price` """
+        used = np.unique(combinations)
+        markets = dict(Market.objects.filter(id__in=candidates['market'][used].tolist()).values_list('id', 'key'))
+        names = dict(Team.objects.filter(id__in=candidates['name'][used].tolist()).values_list('id', 'name'))
+        bookmakers = dict(Bookmaker.objects.filter(id__in=candidates['bookmaker'][used].tolist()).values_list(
+            'id', 'key'))
+
+        def optional(value):
+            return None if np.isnan(value) else float(value)
+
+        return [{
+            'price': price,
+            'probability': optional(probability),
+            'expected_value': optional(expected_value),
+            'legs': [{
+                'event': str(candidates['event_keys'][candidates['event'][leg]]),
+                'market': markets[candidates['market'][leg]],
+                'name': names[candidates['name'][leg]],
+                'point': optional(candidates['point'][leg]),
+                'bookmaker': bookmakers[candidates['bookmaker'][leg]],
+                'price': float(candidates['price'][leg]),
+                'probability': optional(candidates['probability'][leg]),
+            } for leg in combination],
+        } for combination, price, probability, expected_value in zip(
+            combinations.tolist(), combined['price'].tolist(), combined['probability'].tolist(),
+            combined['expected_value'].tolist())]
+
+    def __del__(self):
+        logger.debug("ParlayService terminated")
@@ -0,0 +1,383 @@
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import (Event, EventResult, LatestOutcome, ModelProbability, PoissonFit, ScoreMatrix, Sport,
+                         TeamStrength)
+from core.services import frame_loader
+
+
+class PoissonService:
+    """ Service class to fit the Poisson score model and price upcoming events with it
+
+    Home goals are Poisson with mean `home_advantage * attack[home] * defence[away]` and away goals
+    with mean `attack[away] * defence[home]`, strengths of 1 being average. The strengths are the
+    (time-weighted) maximum likelihood estimate, found with the fixed-point iteration of the
+    likelihood equations where every step is a handful of `np.bincount` calls over all results.
+
+    A sport is only refitted when its results changed (a result was saved, including a corrected
+    score, or deleted) since the stored PoissonFit, the score matrices and outcome probabilities of
+    its upcoming events are refreshed from the stored strengths on every run.
+    """
+
+    # Pseudo-goals pulling the strength of teams with few results towards average
+    smoothing = 0.5
+    tolerance = 1e-8
+    max_iterations = 1000
+    result_fields = ['id', 'event__commence_time', 'event__home_team_id', 'event__away_team_id', 'home_score',
+                     'away_score', 'updated_at']
+
+    def __init__(self):
+        logger.debug("PoissonService initialized")
+
+    @classmethod
+    def fit(cls, home: np.ndarray, away: np.ndarray, home_goals: np.ndarray, away_goals: np.ndarray, n_teams: int,
+            weights: np.ndarray = None) -> dict:
+        """ Maximum likelihood attack/defence strengths and home advantage
+
+        Args:
+            home (np.ndarray): Home team index of each result
+            away (np.ndarray): Away team index of each result
+            home_goals (np.ndarray): Home goals of each result
+            away_goals (np.ndarray): Away goals of each result
+            n_teams (int): Number of team indexes
+            weights (np.ndarray): Optional weight of each result
+
+        Returns:
+            dict: 'attack' and 'defence' per team index, 'home_advantage', 'iterations' and
+                'log_likelihood' (without the constant factorial terms)
+        """
+        weights = np.ones(len(home)) if weights is None else weights
+        home_goals, away_goals = home_goals.astype(float), away_goals.astype(float)
+        scored = (np.bincount(home, weights * home_goals, n_teams) + np.bincount(away, weights * away_goals, n_teams)
+                  + cls.smoothing)
+        conceded = (np.bincount(away, weights * home_goals, n_teams) + np.bincount(home, weights * away_goals, n_teams)
+                    + cls.smoothing)
+        played = np.bincount(home, minlength=n_teams) + np.bincount(away, minlength=n_teams) > 0
+        attack, defence = np.ones(n_teams), np.ones(n_teams)
+        home_advantage = max((weights * home_goals).sum(), cls.smoothing) / max((weights * away_goals).sum(),
+                                                                                  cls.smoothing)
+
+        iterations = 0
+        while iterations < cls.max_iterations:
+            iterations += 1
+            previous = np.concatenate((attack, defence, [home_advantage]))
+            attack = scored / (np.bincount(home, weights * home_advantage * defence[away], n_teams) +
+                               np.bincount(away, weights * defence[home], n_teams) + cls.smoothing)
+            defence = conceded / (np.bincount(away, weights * home_advantage * attack[home], n_teams) +
+                                  np.bincount(home, weights * attack[away], n_teams) + cls.smoothing)
+            home_advantage = (weights * home_goals).sum() / max((weights * attack[home] * defence[away]).sum(), 1e-12)
+            # Strengths are only defined up to a common factor, keep the average attack at 1
+            scale = attack[played].mean() if played.any() else 1.0
+            attack, defence = attack / scale, defence * scale
+            if np.max(np.abs(np.concatenate((attack, defence, [home_advantage])) - previous)) < cls.tolerance:
+                break
+
+        home_mean = home_advantage * attack[home] * defence[away]
+        away_mean = attack[away] * defence[home]
+        log_likelihood = float((weights * (home_goals * np.log(home_mean) - home_mean + away_goals * np.log(away_mean)
+                                           - away_mean)).sum())
+        return {
+            'attack': attack,
+            'defence': defence,
+            'home_advantage': float(home_advantage),
+            'iterations': iterations,
+            'log_likelihood': log_likelihood,
+        }
+
+    @staticmethod
+    def score_matrices(home_means: np.ndarray, away_means: np.ndarray, max_goals: int = None) -> np.ndarray:
+        """ Score probability matrices of independent Poisson goal counts
+
+        Args:
+            home_means (np.ndarray): Expected home goals per event
+            away_means (np.ndarray): Expected away goals per event
+            max_goals (int): Highest number of goals per side, defaults to the POISSON_MAX_GOALS setting
+
+        Returns:
+            np.ndarray: (events, max_goals + 1, max_goals + 1) probabilities of home i - away j goals,
+                renormalised for the truncated tail
+        """
+        max_goals = max_goals or settings.POISSON_MAX_GOALS
+        goals = np.arange(max_goals + 1)
+        log_factorials = np.concatenate(([0.0], np.cumsum(np.log(np.arange(1, max_goals + 1)))))
+
+        def pmf(means):
+            return np.exp(goals * np.log(means[:, None]) - means[:, None] - log_factorials)
+
+        matrices = pmf(home_means)[:, :, None] * pmf(away_means)[:, None, :]
+        return matrices / matrices.sum(axis=(1, 2), keepdims=True)
+
+    @staticmethod
+    def value_distributions(matrices: np.ndarray) -> dict[str, np.ndarray]:
+        """ Distributions of the total goals and the home margin of every matrix
+
+        Args:
+            matrices (np.ndarray): Output of `score_matrices`
+
+        Returns:
+            dict[str, np.ndarray]: 'total' (values 0..2G) and 'margin' (values -G..G) probabilities per event
+        """
+        size = matrices.shape[1]
+        home_goals, away_goals = np.indices((size, size))
+        flat = matrices.reshape(len(matrices), -1)
+        total = np.zeros((len(matrices), 2 * size - 1))
+        margin = np.zeros((len(matrices), 2 * size - 1))
+        np.add.at(total.T, (home_goals + away_goals).ravel(), flat.T)
+        np.add.at(margin.T, (home_goals - away_goals + size - 1).ravel(), flat.T)
+        return {'total': total, 'margin': margin}
+
+    @staticmethod
+    def line_probabilities(pmf: np.ndarray, minimum: int, rows: np.ndarray, lines: np.ndarray,
+                           above: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Probability of an integer value landing above (or below) a line, and on it
+
+        A quarter line (e.g. 2.25 or -0.75) is settled as half the stake on each of the two adjacent
+        lines (2 and 2.5), so its probabilities are the means of theirs, which keeps the expected
+        return `probability * price + push` exact.
+
+        Args:
+            pmf (np.ndarray): Probability of each value per event, values starting at `minimum`
+            minimum (int): Value of the first column
+            rows (np.ndarray): Event row of each line
+            lines (np.ndarray): The lines
+            above (np.ndarray): Whether the outcome wins above the line (else below)
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Probability of winning and of landing on the line
+        """
+        cdf = np.concatenate((np.zeros((len(pmf), 1)), np.cumsum(pmf, axis=1)), axis=1)
+        width = pmf.shape[1]
+
+        def single(lines):
+            # P(value <= x) is cdf[x - minimum + 1], clipped to the bounds of the values
+            below_floor = cdf[rows, np.clip(np.floor(lines).astype(np.int64) - minimum + 1, 0, width)]
+            below_ceil = cdf[rows, np.clip(np.ceil(lines).astype(np.int64) - minimum, 0, width)]
+            on_line = np.where(lines == np.round(lines), below_floor - below_ceil, 0.0)
+            return np.where(above, 1 - below_floor, below_ceil), on_line
+
+        quarter = np.mod(lines * 4, 2) == 1
+        if not quarter.any():
+            return single(lines)
+        win, on_line = single(np.where(quarter, lines - 0.25, lines))
+        upper_win, upper_on_line = single(np.where(quarter, lines + 0.25, lines))
+        return (win + upper_win) / 2, (on_line + upper_on_line) / 2
+
+    def load_results(self, sport_id: str) -> dict[str, np.ndarray]:
+        """ Scored results of a sport in commence time order, see `result_fields` """
+        queryset = EventResult.objects.filter(event__sport_id=sport_id,
+                                              home_score__isnull=False,
+                                              away_score__isnull=False,
+                                              event__commence_time__isnull=False).order_by('event__commence_time', 'id')
+        return frame_loader.load_columns(queryset, self.result_fields)
+
+    @transaction.atomic
+    def fit_sport(self, sport_id: str, force: bool = False) -> PoissonFit:
+        """ Fit the model of a sport unless its results are unchanged since the stored fit
+
+        Args:
+            sport_id (str): Sport key
+            force (bool): Refit even when the results are unchanged
+
+        Returns:
+            PoissonFit: The stored fit, None when the sport has no results
+        """
+        results = self.load_results(sport_id)
+        stored = PoissonFit.objects.filter(sport_id=sport_id).first()
+        if len(results['id']) == 0:
+            return stored
+        last_result_updated_at = results['updated_at'].max().astype(datetime).replace(tzinfo=dt_timezone.utc)
+        if stored and not force and (stored.last_result_updated_at, stored.results) == (last_result_updated_at,
+                                                                                         len(results['id'])):
+            logger.debug(f"Results of {sport_id} unchanged, keeping the stored Poisson fit")
+            return stored
+
+        team_ids, teams = np.unique(np.concatenate((results['event__home_team_id'], results['event__away_team_id'])),
+                                    return_inverse=True)
+        home, away = np.split(teams.reshape(-1), 2)
+        weights = None
+        if settings.POISSON_HALF_LIFE_DAYS > 0:
+            times = results['event__commence_time']
+            age_days = (times.max() - times) / np.timedelta64(1, 'D')
+            weights = 0.5 ** (age_days / settings.POISSON_HALF_LIFE_DAYS)
+        fitted = self.fit(home, away, results['home_score'], results['away_score'], len(team_ids), weights)
+
+        games = np.bincount(home, minlength=len(team_ids)) + np.bincount(away, minlength=len(team_ids))
+        TeamStrength.objects.filter(team__sport_id=sport_id).delete()
+        TeamStrength.objects.bulk_create([
+            TeamStrength(team_id=team_id, attack=attack, defence=defence, games=played)
+            for team_id, attack, defence, played in zip(team_ids.tolist(), fitted['attack'].tolist(),
+                                                        fitted['defence'].tolist(), games.tolist())
+        ])
+        fit, _ = PoissonFit.objects.update_or_create(sport_id=sport_id,
+                                                     defaults={
+                                                         'home_advantage': fitted['home_advantage'],
+                                                         'last_result_updated_at': last_result_updated_at,
+                                                         'results': len(results['id']),
+                                                         'iterations': fitted['iterations'],
+                                                         'log_likelihood': fitted['log_likelihood'],
+                                                         'fitted_at': timezone.now(),
+                                                     })
+        logger.debug(f"Fitted {sport_id} on {len(results['id'])} results in {fitted['iterations']} iterations")
+        return fit
+
+    def expected_goals(self, fit: PoissonFit, home_ids: list[int],
+                       away_ids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """ Expected home and away goals of fixtures under a sport's fit
+
+        Args:
+            fit (PoissonFit): Fit of the sport
+            home_ids (list[int]): Home team id of each fixture
+            away_ids (list[int]): Away team id of each fixture
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Expected home and away goals, teams without a fitted
+                strength being treated as average
+        """
+        strengths = dict((team_id, (attack, defence)) for team_id, attack, defence in TeamStrength.objects.filter(
+            team__sport_id=fit.sport_id).values_list('team_id', 'attack', 'defence'))
+        home_attack, home_defence = np.array([strengths.get(home, (1.0, 1.0)) for home in home_ids]).reshape(-1, 2).T
+        away_attack, away_defence = np.array([strengths.get(away, (1.0, 1.0)) for away in away_ids]).reshape(-1, 2).T
+        return fit.home_advantage * home_attack * away_defence, away_attack * home_defence
+
+    @transaction.atomic
+    def price_sport(self, fit: PoissonFit) -> int:
+        """ Store the score matrices and outcome probabilities of a sport's upcoming events
+
+        Every h2h, totals and spreads line currently quoted (in LatestOutcome) is priced.
+
+        Args:
+            fit (PoissonFit): Fit of the sport
+
+        Returns:
+            int: Number of events priced
+        """
+        events = list(Event.objects.filter(sport_id=fit.sport_id, commence_time__gt=timezone.now()).values_list(
+            'id', 'home_team_id', 'away_team_id'))
+        if not events:
+            return 0
+        event_ids = [event_id for event_id, _, _ in events]
+        home_means, away_means = self.expected_goals(fit, [home for _, home, _ in events],
+                                                     [away for _, _, away in events])
+        matrices = self.score_matrices(home_means, away_means)
+
+        ScoreMatrix.objects.bulk_create([
+            ScoreMatrix(event_id=event_id, home_goals=home_mean, away_goals=away_mean, matrix=matrix)
+            for event_id, home_mean, away_mean, matrix in zip(event_ids, home_means.tolist(), away_means.tolist(),
+                                                              np.round(matrices, 8).tolist())
+        ],
+                                        update_conflicts=True,
+                                        unique_fields=['event'],
+                                        update_fields=['home_goals', 'away_goals', 'matrix', 'updated_at'])
+
+        lines = pd.DataFrame.from_records(
+            LatestOutcome.objects.filter(event_id__in=event_ids, market__key__in=['h2h', 'totals', 'spreads']).values_list(
+                'event_id', 'market_id', 'market__key', 'name_id', 'name__name', 'point').distinct(),
+            columns=['event_id', 'market_id', 'market', 'name_id', 'name', 'point'])
+        ModelProbability.objects.filter(event_id__in=event_ids).delete()
+        if not lines.empty:
+            probabilities, pushes = self.outcome_probabilities(matrices, event_ids, events, lines)
+            priced = ~np.isnan(probabilities)
+            ModelProbability.objects.bulk_create([
+                ModelProbability(event_id=event_id,
+                                 market_id=market_id,
+                                 name_id=name_id,
+                                 point=None if pd.isna(point) else point,
+                                 probability=probability,
+                                 push_probability=push)
+                for event_id, market_id, name_id, point, probability, push in zip(
+                    lines['event_id'][priced], lines['market_id'][priced], lines['name_id'][priced],
+                    lines['point'][priced], probabilities[priced], pushes[priced])
+            ])
+        logger.debug(f"Priced {len(events)} upcoming events of {fit.sport_id}")
+        return len(events)
+
+    def outcome_probabilities(self, matrices: np.ndarray, event_ids: list[str], events: list[tuple],
+                              lines: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+        """ Win and push probability of quoted outcomes from the score matrices of their events
+
+        Args:
+            matrices (np.ndarray): Score matrices, one per event
+            event_ids (list[str]): Event id of each matrix
+            events (list[tuple]): (event id, home team id, away team id) of each matrix
+            lines (pd.DataFrame): Outcomes with 'event_id', 'market', 'name_id', 'name' and 'point'
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Probability of winning and of a push per outcome, NaN for
+                outcomes the model does not price
+        """
+        rows = pd.Index(event_ids).get_indexer(lines['event_id'])
+        home_ids = np.array([home for _, home, _ in events])[rows]
+        away_ids = np.array([away for _, _, away in events])[rows]
+        market = lines['market'].to_numpy(dtype=object)
+        name = lines['name'].to_numpy(dtype=object)
+        name_ids = lines['name_id'].to_numpy()
+        point = lines['point'].to_numpy(dtype=float, na_value=np.nan)
+        is_home, is_away = name_ids == home_ids, name_ids == away_ids
+        size = matrices.shape[1]
+        distributions = self.value_distributions(matrices)
+
+        # h2h: the home side wins on a margin above 0, the away side below it
+        h2h = market == 'h2h'
+        margin_win, margin_on = self.line_probabilities(distributions['margin'], 1 - size, rows, np.zeros(len(lines)),
+                                                        is_home)
+        probability = np.full(len(lines), np.nan)
+        push = np.zeros(len(lines))
+        probability[h2h & (is_home | is_away)] = margin_win[h2h & (is_home | is_away)]
+        draw = h2h & (name == 'Draw')
+        probability[draw] = margin_on[draw]
+
+        # spreads: the home side wins when margin + point > 0, the away side when margin < point
+        spreads = (market == 'spreads') & (is_home | is_away) & ~np.isnan(point)
+        spread_lines = np.where(is_home, -point, point)
+        spread_win, spread_on = self.line_probabilities(distributions['margin'], 1 - size, rows,
+                                                        np.nan_to_num(spread_lines), is_home)
+        probability[spreads], push[spreads] = spread_win[spreads], spread_on[spreads]
+
+        # totals: Over wins above the line, Under below it
+        totals = (market == 'totals') & np.isin(name, ['Over', 'Under']) & ~np.isnan(point)
+        total_win, total_on = self.line_probabilities(distributions['total'], 0, rows, np.nan_to_num(point),
+                                                      name == 'Over')
+        probability[totals], push[totals] = total_win[totals], total_on[totals]
+        return probability, np.where(np.isnan(probability), np.nan, push)
+
+    def refresh(self, force: bool = False, **kwargs) -> tuple[int, int]:
+        """ Refit the sports with new results and price their upcoming events
+
+        Args:
+            force (bool): Refit even when the results are unchanged
+            **kwargs: Arbitrary keyword arguments for filtering sports, defaults to the sports
+                whose key starts with the POISSON_SPORT_PREFIX setting
+
+        Returns:
+            tuple[int, int]: Number of sports with a fit and number of events priced
+        """
+        kwargs = kwargs or {'key__startswith': settings.POISSON_SPORT_PREFIX}
+        logger.debug(f"Refreshing Poisson models with filters: {kwargs}")
+        fitted, priced = 0, 0
+        for sport_id in Sport.objects.filter(**kwargs).values_list('key', flat=True):
+            fit = self.fit_sport(sport_id, force)
+            if fit is not None:
+                fitted += 1
+                priced += self.price_sport(fit)
+        return fitted, priced
+
+    def get_probabilities(self, **kwargs) -> list[dict]:
+        """ Get model probabilities from the database
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. event_id
+
+        Returns:
+            list[dict]: List of model probability data
+        """
+        logger.debug(f"Getting model probabilities with filters: {kwargs}")
+        return list(ModelProbability.objects.filter(**kwargs).values())
+
+    def __del__(self):
+        logger.debug("PoissonService terminated")
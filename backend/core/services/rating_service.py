@@ -0,0 +1,298 @@
+import itertools
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Event, EventResult, RatingWatermark, Sport, TeamRating
+from core.services import frame_loader
+
+
+class RatingService:
+    """ Service class to maintain Elo power ratings of the teams from the event results
+
+    Results of a sport saved since its RatingWatermark are applied incrementally in commence time
+    order to the stored ratings of the teams involved. An update re-reads the
+    WATERMARK_OVERLAP_MINUTES before the watermark to pick up results a concurrent ingest committed
+    late, skipping the ones already applied. A result older than the ones already applied, or a
+    corrected score of an applied result, triggers a rebuild of the sport, as does changing the
+    RATING_* settings (`rebuild`).
+
+    Both paths run the same vectorised update: the results are split into layers in which no team
+    plays twice, and each layer is applied to all of its matches at once.
+    """
+
+    result_fields = ['id', 'event_id', 'event__sport_id', 'event__commence_time', 'event__home_team_id',
+                     'event__away_team_id', 'home_score', 'away_score', 'updated_at']
+
+    def __init__(self):
+        logger.debug("RatingService initialized")
+
+    @staticmethod
+    def expected_score(difference: np.ndarray) -> np.ndarray:
+        """ Expected score of the side rated `difference` points above its opponent """
+        return 1 / (1 + 10 ** (-difference / 400))
+
+    @staticmethod
+    def schedule_layers(home: np.ndarray, away: np.ndarray) -> np.ndarray:
+        """ Layer of each match so that no team plays twice in a layer and every team's matches
+        keep their order
+
+        Args:
+            home (np.ndarray): Home team index of each match, in chronological order
+            away (np.ndarray): Away team index of each match
+
+        Returns:
+            np.ndarray: Layer of each match, starting at 0
+        """
+        last = {}
+        layers = np.empty(len(home), dtype=np.int64)
+        for i, (home_team, away_team) in enumerate(zip(home.tolist(), away.tolist())):
+            layer = max(last.get(home_team, -1), last.get(away_team, -1)) + 1
+            layers[i] = last[home_team] = last[away_team] = layer
+        return layers
+
+    @classmethod
+    def apply_results(cls, ratings: np.ndarray, games: np.ndarray, home: np.ndarray, away: np.ndarray,
+                      home_scores: np.ndarray, away_scores: np.ndarray, k: float = None,
+                      home_advantage: float = None) -> None:
+        """ Apply results in chronological order to the ratings, in place
+
+        Args:
+            ratings (np.ndarray): Rating per team index
+            games (np.ndarray): Games played per team index
+            home (np.ndarray): Home team index of each match, in chronological order
+            away (np.ndarray): Away team index of each match
+            home_scores (np.ndarray): Home score of each match
+            away_scores (np.ndarray): Away score of each match
+            k (float): K-factor, defaults to the RATING_K setting
+            home_advantage (float): Home advantage in rating points, defaults to the
+                RATING_HOME_ADVANTAGE setting
+        """
+        k = settings.RATING_K if k is None else k
+        home_advantage = settings.RATING_HOME_ADVANTAGE if home_advantage is None else home_advantage
+        scores = np.where(home_scores > away_scores, 1.0, np.where(home_scores == away_scores, 0.5, 0.0))
+        layers = cls.schedule_layers(home, away)
+        order = np.argsort(layers, kind='stable')
+        bounds = np.searchsorted(layers[order], np.arange(layers.max() + 2 if len(layers) else 1))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            matches = order[start:end]
+            home_teams, away_teams = home[matches], away[matches]
+            change = k * (scores[matches] -
+                          cls.expected_score(ratings[home_teams] + home_advantage - ratings[away_teams]))
+            ratings[home_teams] += change
+            ratings[away_teams] -= change
+            games[home_teams] += 1
+            games[away_teams] += 1
+
+    def load_results(self, **kwargs) -> dict[str, np.ndarray]:
+        """ Scored results of the matching events in commence time order
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering results, e.g. event__sport_id
+
+        Returns:
+            dict[str, np.ndarray]: Columns of `result_fields`
+        """
+        queryset = EventResult.objects.filter(home_score__isnull=False,
+                                              away_score__isnull=False,
+                                              event__commence_time__isnull=False,
+                                              **kwargs).order_by('event__commence_time', 'id')
+        return frame_loader.load_columns(queryset, self.result_fields)
+
+    @staticmethod
+    def to_datetime(value: np.datetime64) -> datetime:
+        """ Aware UTC datetime of a naive UTC datetime64 """
+        return value.astype('datetime64[us]').astype(datetime).replace(tzinfo=dt_timezone.utc)
+
+    def store(self, team_ids: np.ndarray, ratings: np.ndarray, games: np.ndarray, results: dict,
+              home: np.ndarray, away: np.ndarray) -> None:
+        """ Upsert the ratings of the given teams with the last result each of them played
+
+        Args:
+            team_ids (np.ndarray): Team id per team index
+            ratings (np.ndarray): Rating per team index
+            games (np.ndarray): Games played per team index
+            results (dict): Applied results from `load_results`
+            home (np.ndarray): Home team index of each applied result
+            away (np.ndarray): Away team index of each applied result
+        """
+        last_match = np.full(len(team_ids), -1, dtype=np.int64)
+        positions = np.arange(len(home))
+        np.maximum.at(last_match, home, positions)
+        np.maximum.at(last_match, away, positions)
+        now = timezone.now()
+        TeamRating.objects.bulk_create([
+            TeamRating(team_id=team_id,
+                       rating=rating,
+                       games=played,
+                       last_event_id=results['event_id'][match] if match >= 0 else None,
+                       updated_at=now)
+            for team_id, rating, played, match in zip(team_ids.tolist(), ratings.tolist(), games.tolist(),
+                                                      last_match.tolist())
+        ],
+                                       update_conflicts=True,
+                                       unique_fields=['team'],
+                                       update_fields=['rating', 'games', 'last_event', 'updated_at'])
+
+    def move_watermark(self, sport_id: str, results: dict, watermark: RatingWatermark = None) -> None:
+        """ Record the latest result update and commence time applied for a sport
+
+        The applied results saved within the overlap window before the new watermark, or played at
+        its latest commence time, are kept in `recent_results` to tell them apart from new ones.
+
+        Args:
+            sport_id (str): Sport key
+            results (dict): Applied results from `load_results`
+            watermark (RatingWatermark): Current watermark of the sport, if any
+        """
+        if len(results['id']) == 0:
+            return
+        recent = {
+            int(result_id): (np.datetime64(updated_at), np.datetime64(commence_time))
+            for result_id, (updated_at, commence_time) in (watermark.recent_results if watermark else {}).items()
+        }
+        recent.update(zip(results['id'].tolist(), zip(results['updated_at'], results['event__commence_time'])))
+        last_updated_at = max(updated_at for updated_at, _ in recent.values())
+        last_commence_time = max(commence_time for _, commence_time in recent.values())
+        if watermark and watermark.last_commence_time:
+            last_commence_time = max(last_commence_time,
+                                     np.datetime64(watermark.last_commence_time.replace(tzinfo=None), 'us'))
+        window_start = last_updated_at - np.timedelta64(settings.WATERMARK_OVERLAP_MINUTES, 'm')
+        RatingWatermark.objects.update_or_create(sport_id=sport_id,
+                                                 defaults={
+                                                     'last_updated_at': self.to_datetime(last_updated_at),
+                                                     'recent_results': {
+                                                         str(result_id): [str(updated_at), str(commence_time)]
+                                                         for result_id, (updated_at, commence_time) in recent.items()
+                                                         if updated_at > window_start
+                                                         or commence_time == last_commence_time
+                                                     },
+                                                     'last_commence_time': self.to_datetime(last_commence_time),
+                                                     'updated_at': timezone.now(),
+                                                 })
+
+    @transaction.atomic
+    def rebuild(self, **kwargs) -> int:
+        """ Recompute the ratings of every team of the matching sports from all of their results
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of results applied
+        """
+        sport_ids = list(Sport.objects.filter(**kwargs).values_list('key', flat=True))
+        logger.debug(f"Rebuilding team ratings of {len(sport_ids)} sports")
+        results = self.load_results(event__sport_id__in=sport_ids)
+        # Outcome names such as 'Draw' are stored as teams too, only rate the teams that play
+        events = Event.objects.filter(sport_id__in=sport_ids)
+        team_ids = np.unique(np.fromiter(
+            itertools.chain(events.values_list('home_team_id', flat=True), events.values_list('away_team_id',
+                                                                                              flat=True)),
+            dtype=np.int64))
+        home = np.searchsorted(team_ids, results['event__home_team_id'])
+        away = np.searchsorted(team_ids, results['event__away_team_id'])
+        ratings = np.full(len(team_ids), float(settings.RATING_INITIAL))
+        games = np.zeros(len(team_ids), dtype=np.int64)
+        self.apply_results(ratings, games, home, away, results['home_score'], results['away_score'])
+
+        TeamRating.objects.filter(team__sport_id__in=sport_ids).delete()
+        RatingWatermark.objects.filter(sport_id__in=sport_ids).delete()
+        self.store(team_ids, ratings, games, results, home, away)
+        for sport_id in sport_ids:
+            self.move_watermark(sport_id, {column: values[results['event__sport_id'] == sport_id]
+                                           for column, values in results.items()})
+        logger.debug(f"Rebuilt the ratings of {len(team_ids)} teams from {len(results['id'])} results")
+        return len(results['id'])
+
+    @transaction.atomic
+    def update_sport(self, sport_id: str) -> int:
+        """ Apply the results of a sport saved since its watermark
+
+        Args:
+            sport_id (str): Sport key
+
+        Returns:
+            int: Number of results applied
+        """
+        watermark = RatingWatermark.objects.filter(sport_id=sport_id).first()
+        filters = {}
+        if watermark and watermark.last_updated_at:
+            filters['updated_at__gt'] = watermark.last_updated_at - timedelta(
+                minutes=settings.WATERMARK_OVERLAP_MINUTES)
+        results = self.load_results(event__sport_id=sport_id, **filters)
+        recent_results = watermark.recent_results if watermark else {}
+        # Skip the results of the overlap window already applied as they are
+        unseen = np.array([
+            recent_results.get(str(result_id), [None])[0] != str(updated_at)
+            for result_id, updated_at in zip(results['id'].tolist(), results['updated_at'])
+        ], dtype=bool)
+        results = {column: values[unseen] for column, values in results.items()}
+        if len(results['id']) == 0:
+            return 0
+        if watermark and (any(str(result_id) in recent_results for result_id in results['id'].tolist()) or (
+                watermark.last_commence_time
+                and self.to_datetime(results['event__commence_time'].min()) < watermark.last_commence_time)):
+            logger.info(f"Results of {sport_id} arrived out of order or were corrected, rebuilding its ratings")
+            return self.rebuild(key=sport_id)
+
+        team_ids = np.unique(np.concatenate((results['event__home_team_id'], results['event__away_team_id'])))
+        ratings = np.full(len(team_ids), float(settings.RATING_INITIAL))
+        games = np.zeros(len(team_ids), dtype=np.int64)
+        for team_id, rating, played in TeamRating.objects.filter(team_id__in=team_ids.tolist()).values_list(
+                'team_id', 'rating', 'games'):
+            index = np.searchsorted(team_ids, team_id)
+            ratings[index], games[index] = rating, played
+        home = np.searchsorted(team_ids, results['event__home_team_id'])
+        away = np.searchsorted(team_ids, results['event__away_team_id'])
+        self.apply_results(ratings, games, home, away, results['home_score'], results['away_score'])
+
+        self.store(team_ids, ratings, games, results, home, away)
+        self.move_watermark(sport_id, results, watermark)
+        logger.debug(f"Applied {len(results['id'])} results of {sport_id} to the ratings of {len(team_ids)} teams")
+        return len(results['id'])
+
+    def update(self, **kwargs) -> int:
+        """ Apply the new results of every matching sport
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of results applied
+        """
+        logger.debug(f"Updating team ratings with filters: {kwargs}")
+        return sum(self.update_sport(sport_id) for sport_id in Sport.objects.filter(**kwargs).values_list('key',
+                                                                                                       flat=True))
+
+    def get_ratings(self, **kwargs) -> list[dict]:
+        """ Get team ratings from the database, highest first
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. team__sport_id
+
+        Returns:
+            list[dict]: List of rating data
+        """
+        logger.debug(f"Getting team ratings with filters: {kwargs}")
+        return list(TeamRating.objects.filter(**kwargs).order_by('-rating').values())
+
+    def get_ratings_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the team ratings as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per team
+        """
+        logger.debug(f"Getting team ratings frame with filters: {kwargs}")
+        return frame_loader.load_frame(TeamRating.objects.filter(**kwargs))
+
+    def __del__(self):
+        logger.debug("RatingService terminated")
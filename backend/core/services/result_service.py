@@ -1,3 +1,4 @@
+from collections.abc import Iterator
 from django.db import transaction
 from core.models import EventResult as Result
 from loguru import logger
@@ -6,6 +7,7 @@ from django.utils import timezone
 from django.db.models import Q
 from datetime import timedelta
 from core.models import Event, Team
+from core.services import frame_loader
 import pytz
 from django.conf import settings
 
@@ -163,5 +165,33 @@ class ResultService:
         
         return results_df
         
+    def iter_results(self, chunk_size: int = 2000, **kwargs) -> Iterator[dict]:
+        """ Stream results data from the database one row at a time
+
+        Rows are fetched `chunk_size` at a time (through a server-side cursor on PostgreSQL) and
+        outside of a transaction, so memory stays flat however many rows match.
+
+        Args:
+            chunk_size (int): Number of rows fetched per round trip
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Yields:
+            dict: One row of results data
+        """
+        logger.debug(f"Streaming results with filters: {kwargs}")
+        yield from Result.objects.filter(**kwargs).order_by('pk').values().iterator(chunk_size=chunk_size)
+
+    def get_results_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the results as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting results frame with filters: {kwargs}")
+        return frame_loader.load_frame(Result.objects.filter(**kwargs))
+
     def __del__(self):
         logger.debug("ResultService terminated")
\ No newline at end of file
@@ -0,0 +1,296 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from itertools import batched
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Odd, OddsRollup, Outcome, RollupWatermark, Sport
+from core.services import frame_loader, odds_math
+
+
+class RollupService:
+    """ Service class to maintain the OHLC odds rollups
+
+    The snapshots of every sport (re-)ingested past the sport's RollupWatermark are aggregated,
+    and every bucket they fall in is recomputed from all of its stored ticks, so each refresh only
+    reads the buckets that changed and processing a snapshot again never counts it twice. That
+    lets a refresh re-read the WATERMARK_OVERLAP_MINUTES before the watermark, which picks up the
+    snapshots a concurrent ingest committed after the previous refresh read past them.
+
+    Buckets are keyed by the point of the outcome too, so a spread or total moving to a new line
+    starts new buckets instead of mixing the prices of both lines.
+    """
+
+    unique_fields = ['event', 'bookmaker', 'market', 'name', 'line', 'bucket_seconds', 'bucket_start']
+    update_fields = ['open', 'high', 'low', 'close', 'point', 'open_timestamp', 'close_timestamp', 'count']
+
+    def __init__(self):
+        logger.debug("RollupService initialized")
+
+    @staticmethod
+    def compute_rollups(columns: dict[str, np.ndarray], bucket_seconds: int) -> dict[str, np.ndarray]:
+        """ Aggregate ticks into OHLC buckets in one vectorised pass
+
+        Args:
+            columns (dict[str, np.ndarray]): Aligned columns 'event', 'bookmaker', 'market', 'name'
+                (integer codes), 'price', 'point' and 'timestamp' (datetime64)
+            bucket_seconds (int): Bucket length in seconds
+
+        Returns:
+            dict[str, np.ndarray]: Per bucket the 'row' of its first tick (for the keys), 'line'
+                (the point, 0 without one), 'bucket_start' (datetime64[s]), 'open', 'high', 'low',
+                'close', 'point', 'open_timestamp', 'close_timestamp' and 'count'
+        """
+        timestamps = columns['timestamp'].astype('datetime64[us]')
+        buckets = timestamps.astype('datetime64[s]').astype(np.int64) // bucket_seconds
+        lines = np.nan_to_num(columns['point'].astype(float), nan=0.0)
+        labels, n_groups = odds_math.group_labels(columns['event'], columns['bookmaker'], columns['market'],
+                                                  columns['name'], lines, buckets)
+        if n_groups == 0:
+            empty = np.zeros(0)
+            return {key: empty for key in ('row', 'line', 'bucket_start', 'open', 'high', 'low', 'close', 'point',
+                                           'open_timestamp', 'close_timestamp', 'count')}
+
+        order = np.lexsort((timestamps, labels))
+        starts = np.searchsorted(labels[order], np.arange(n_groups))
+        ends = np.append(starts[1:], len(order))
+        first, last = order[starts], order[ends - 1]
+        prices = columns['price'].astype(float)
+        return {
+            'row': first,
+            'line': lines[first],
+            'bucket_start': (buckets[first] * bucket_seconds).astype('datetime64[s]'),
+            'open': prices[first],
+            'high': np.maximum.reduceat(prices[order], starts),
+            'low': np.minimum.reduceat(prices[order], starts),
+            'close': prices[last],
+            'point': columns['point'][last],
+            'open_timestamp': timestamps[first],
+            'close_timestamp': timestamps[last],
+            'count': ends - starts,
+        }
+
+    @staticmethod
+    def to_datetime(value: np.datetime64) -> datetime:
+        """ Aware UTC datetime of a naive UTC datetime64 """
+        return value.astype('datetime64[us]').astype(datetime).replace(tzinfo=dt_timezone.utc)
+
+    @staticmethod
+    def bucket_of(timestamp: datetime, bucket_seconds: int) -> datetime:
+        """ Start of the bucket a timestamp falls in """
+        return datetime.fromtimestamp(int(timestamp.timestamp()) // bucket_seconds * bucket_seconds, dt_timezone.utc)
+
+    def store(self, columns: dict[str, np.ndarray], bucket_seconds: int, buckets: set[tuple]) -> int:
+        """ Replace stored buckets with the rollups of every tick in them
+
+        Args:
+            columns (dict[str, np.ndarray]): Columns from `frame_loader.load_columns` of the outcomes,
+                holding every tick of the given buckets
+            bucket_seconds (int): Bucket length in seconds
+            buckets (set[tuple]): (event id, bucket start) of the buckets to write
+
+        Returns:
+            int: Number of buckets written
+        """
+        rollups = self.compute_rollups({
+            'event': columns['odd__event_id'],
+            'bookmaker': columns['bookmaker_id'],
+            'market': columns['market_id'],
+            'name': columns['name_id'],
+            'price': columns['price'],
+            'point': columns['point'],
+            'timestamp': columns['odd__timestamp'],
+        }, bucket_seconds)
+        rows = rollups['row']
+        event_ids = columns['odd__event_id_keys'][columns['odd__event_id'][rows]] if len(rows) else []
+        objs = []
+        for i, (event_id, bookmaker_id, market_id, name_id, bucket_start) in enumerate(zip(
+                event_ids, columns['bookmaker_id'][rows].tolist(), columns['market_id'][rows].tolist(),
+                columns['name_id'][rows].tolist(), map(self.to_datetime, rollups['bucket_start']))):
+            if (event_id, bucket_start) not in buckets:
+                continue
+            objs.append(
+                OddsRollup(event_id=event_id,
+                           bookmaker_id=bookmaker_id,
+                           market_id=market_id,
+                           name_id=name_id,
+                           line=float(rollups['line'][i]),
+                           bucket_seconds=bucket_seconds,
+                           bucket_start=bucket_start,
+                           open=float(rollups['open'][i]),
+                           high=float(rollups['high'][i]),
+                           low=float(rollups['low'][i]),
+                           close=float(rollups['close'][i]),
+                           point=None if np.isnan(rollups['point'][i]) else float(rollups['point'][i]),
+                           open_timestamp=self.to_datetime(rollups['open_timestamp'][i]),
+                           close_timestamp=self.to_datetime(rollups['close_timestamp'][i]),
+                           count=int(rollups['count'][i])))
+        OddsRollup.objects.bulk_create(objs,
+                                       update_conflicts=True,
+                                       unique_fields=self.unique_fields,
+                                       update_fields=self.update_fields)
+        # A snapshot ingested again can move an outcome to another line, drop the buckets left empty
+        kept = {(obj.event_id, obj.bookmaker_id, obj.market_id, obj.name_id, obj.line, obj.bucket_start)
+                for obj in objs}
+        in_buckets = Q()
+        for event_id, bucket_start in buckets:
+            in_buckets |= Q(event_id=event_id, bucket_start=bucket_start)
+        stale = [
+            rollup_id for rollup_id, *key in OddsRollup.objects.filter(
+                in_buckets, bucket_seconds=bucket_seconds).values_list('id', 'event_id', 'bookmaker_id', 'market_id',
+                                                                       'name_id', 'line', 'bucket_start')
+            if tuple(key) not in kept
+        ]
+        OddsRollup.objects.filter(id__in=stale).delete()
+        return len(objs)
+
+    def rollup_snapshots(self, snapshots: list[tuple]) -> int:
+        """ Recompute every bucket of every size a batch of snapshots falls in
+
+        Args:
+            snapshots (list[tuple]): (event id, timestamp) of the snapshots
+
+        Returns:
+            int: Number of buckets written
+        """
+        timestamps = [timestamp for _, timestamp in snapshots]
+        sizes = settings.ODDS_ROLLUP_BUCKETS
+        start = min(self.bucket_of(min(timestamps), bucket_seconds) for bucket_seconds in sizes)
+        end = max(self.bucket_of(max(timestamps), bucket_seconds) + timedelta(seconds=bucket_seconds)
+                  for bucket_seconds in sizes)
+        # Every tick of the events in the range covering all of the buckets
+        columns = frame_loader.load_columns(
+            Outcome.objects.filter(odd__event_id__in={event_id for event_id, _ in snapshots},
+                                   odd__timestamp__gte=start,
+                                   odd__timestamp__lt=end),
+            ['odd__event_id', 'bookmaker_id', 'market_id', 'name_id', 'price', 'point', 'odd__timestamp'],
+            categorical=['odd__event_id'])
+        return sum(
+            self.store(columns, bucket_seconds, {(event_id, self.bucket_of(timestamp, bucket_seconds))
+                                                 for event_id, timestamp in snapshots})
+            for bucket_seconds in sizes)
+
+    def refresh_sport(self, sport_id: str, batch_size: int = 500) -> int:
+        """ Aggregate the snapshots of a sport (re-)ingested since its watermark
+
+        Every batch of snapshots is rolled up for all bucket sizes and the watermark moved in the
+        same transaction, so an interrupted refresh resumes where it stopped.
+
+        Args:
+            sport_id (str): Sport key
+            batch_size (int): Number of snapshots aggregated per transaction
+
+        Returns:
+            int: Number of buckets written
+        """
+        watermark, _ = RollupWatermark.objects.get_or_create(sport_id=sport_id)
+        odds = Odd.objects.filter(event__sport_id=sport_id)
+        if watermark.last_ingested_at is not None:
+            odds = odds.filter(ingested_at__gt=watermark.last_ingested_at
+                               - timedelta(minutes=settings.WATERMARK_OVERLAP_MINUTES))
+        snapshots = list(odds.order_by('ingested_at', 'id').values_list('event_id', 'timestamp', 'ingested_at'))
+        written = 0
+        for batch in batched(snapshots, batch_size):
+            with transaction.atomic():
+                written += self.rollup_snapshots([(event_id, timestamp) for event_id, timestamp, _ in batch])
+                watermark.last_ingested_at = max(filter(None, (watermark.last_ingested_at, batch[-1][2])))
+                watermark.updated_at = timezone.now()
+                watermark.save()
+        logger.debug(f"Rolled up {len(snapshots)} snapshots of {sport_id} into {written} buckets")
+        return written
+
+    def refresh(self, batch_size: int = 500, **kwargs) -> int:
+        """ Aggregate the new snapshots of every matching sport
+
+        Args:
+            batch_size (int): Number of snapshots aggregated per transaction
+            **kwargs: Arbitrary keyword arguments for filtering sports, e.g. key
+
+        Returns:
+            int: Number of buckets written
+        """
+        logger.debug(f"Refreshing odds rollups with filters: {kwargs}")
+        return sum(
+            self.refresh_sport(sport_id, batch_size)
+            for sport_id in Sport.objects.filter(**kwargs).values_list('key', flat=True))
+
+    @staticmethod
+    def choose_resolution(start: datetime, end: datetime, max_points: int = None) -> int:
+        """ Finest configured bucket size that covers a range in at most `max_points` buckets
+
+        Args:
+            start (datetime): Start of the requested range
+            end (datetime): End of the requested range
+            max_points (int): Bucket budget, defaults to the ODDS_ROLLUP_MAX_POINTS setting
+
+        Returns:
+            int: Bucket size in seconds, the coarsest one when none fits
+        """
+        max_points = max_points or settings.ODDS_ROLLUP_MAX_POINTS
+        buckets = sorted(settings.ODDS_ROLLUP_BUCKETS)
+        span = max((end - start).total_seconds(), 0)
+        return next((seconds for seconds in buckets if span / seconds <= max_points), buckets[-1])
+
+    def rollup_queryset(self, start: datetime = None, end: datetime = None, bucket_seconds: int = None, **kwargs):
+        """ Rollups of a range, picking the resolution from the range when not given
+
+        Args:
+            start (datetime): Optional start of the range, the bucket containing it is included
+            end (datetime): Optional exclusive end of the range
+            bucket_seconds (int): Optional bucket size, see `choose_resolution`
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. event_id
+
+        Returns:
+            QuerySet: OddsRollup rows ordered by outcome, line and bucket
+        """
+        queryset = OddsRollup.objects.filter(**kwargs)
+        bucket_seconds = bucket_seconds or self.resolution_for(queryset, start, end)
+        queryset = queryset.filter(bucket_seconds=bucket_seconds)
+        if start is not None:
+            queryset = queryset.filter(bucket_start__gt=start - timedelta(seconds=bucket_seconds))
+        if end is not None:
+            queryset = queryset.filter(bucket_start__lt=end)
+        return queryset.order_by('event_id', 'bookmaker_id', 'market_id', 'name_id', 'line', 'bucket_start')
+
+    def get_rollups(self, start: datetime = None, end: datetime = None, bucket_seconds: int = None,
+                    **kwargs) -> list[dict]:
+        """ Get rollups of a range from the database, see `rollup_queryset`
+
+        Args:
+            start (datetime): Optional start of the range
+            end (datetime): Optional exclusive end of the range
+            bucket_seconds (int): Optional bucket size
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of rollup data
+        """
+        logger.debug(f"Getting rollups from {start} to {end} with filters: {kwargs}")
+        return list(self.rollup_queryset(start, end, bucket_seconds, **kwargs).values())
+
+    def resolution_for(self, queryset, start: datetime = None, end: datetime = None) -> int:
+        """ Automatic resolution of a rollup query, the open ends of the range taken from the data
+
+        Args:
+            queryset (QuerySet): Filtered OddsRollup queryset
+            start (datetime): Optional start of the range
+            end (datetime): Optional end of the range
+
+        Returns:
+            int: Bucket size in seconds
+        """
+        if start is None or end is None:
+            finest = queryset.filter(bucket_seconds=min(settings.ODDS_ROLLUP_BUCKETS))
+            first = finest.order_by('bucket_start').values_list('bucket_start', flat=True).first()
+            last = finest.order_by('-bucket_start').values_list('bucket_start', flat=True).first()
+            if first is None:
+                return min(settings.ODDS_ROLLUP_BUCKETS)
+            start, end = start or first, end or last
+        return self.choose_resolution(start, end)
+
+    def __del__(self):
+        logger.debug("RollupService terminated")
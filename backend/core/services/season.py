@@ -0,0 +1,97 @@
+""" Vectorised Monte Carlo simulation of the rest of a league season
+
+The remaining fixtures are played out for a whole batch of seasons at once: goals are drawn from
+the Poisson score model as (seasons, fixtures) arrays, tallied into (seasons, teams) tables with
+`np.bincount` over offset team indexes and ranked with one `np.lexsort` along the team axis. Only
+the per-team position counts and point sums of a batch are returned, so batches run on separate
+processes with their own seeded streams are combined by adding them up.
+"""
+import numpy as np
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+
+
+def match_points(home_goals: np.ndarray, away_goals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """ League points of the home and away side of each match """
+    home_points = np.where(home_goals > away_goals, WIN_POINTS, np.where(home_goals == away_goals, DRAW_POINTS, 0))
+    away_points = np.where(away_goals > home_goals, WIN_POINTS, np.where(home_goals == away_goals, DRAW_POINTS, 0))
+    return home_points, away_points
+
+
+def tally(n_teams: int, home: np.ndarray, away: np.ndarray, home_values: np.ndarray,
+          away_values: np.ndarray) -> np.ndarray:
+    """ Sum per team of a value of each match, for every season of a batch
+
+    Args:
+        n_teams (int): Number of team indexes
+        home (np.ndarray): Home team index of each match
+        away (np.ndarray): Away team index of each match
+        home_values (np.ndarray): (seasons, matches) value credited to the home side
+        away_values (np.ndarray): (seasons, matches) value credited to the away side
+
+    Returns:
+        np.ndarray: (seasons, teams) totals
+    """
+    n_seasons = len(home_values)
+    offsets = (np.arange(n_seasons) * n_teams)[:, None]
+    size = n_seasons * n_teams
+    totals = (np.bincount((offsets + home).ravel(), home_values.ravel(), size) +
+              np.bincount((offsets + away).ravel(), away_values.ravel(), size))
+    return totals.reshape(n_seasons, n_teams)
+
+
+def table(n_teams: int, home: np.ndarray, away: np.ndarray, home_goals: np.ndarray,
+          away_goals: np.ndarray) -> dict[str, np.ndarray]:
+    """ League table of played matches
+
+    Returns:
+        dict[str, np.ndarray]: 'played', 'points', 'goals_for' and 'goals_against' per team index
+    """
+    home_points, away_points = match_points(home_goals, away_goals)
+    played = np.ones((1, len(home)))
+    return {
+        'played': tally(n_teams, home, away, played, played)[0].astype(np.int64),
+        'points': tally(n_teams, home, away, home_points[None], away_points[None])[0].astype(np.int64),
+        'goals_for': tally(n_teams, home, away, home_goals[None], away_goals[None])[0].astype(np.int64),
+        'goals_against': tally(n_teams, home, away, away_goals[None], home_goals[None])[0].astype(np.int64),
+    }
+
+
+def simulate(standings: dict[str, np.ndarray], home: np.ndarray, away: np.ndarray, home_means: np.ndarray,
+             away_means: np.ndarray, n_seasons: int, rng: np.random.Generator) -> dict[str, np.ndarray]:
+    """ Play out the remaining fixtures `n_seasons` times
+
+    Teams are ranked on points, then goal difference, then goals scored, remaining ties broken at
+    random.
+
+    Args:
+        standings (dict[str, np.ndarray]): Current table from `table`
+        home (np.ndarray): Home team index of each remaining fixture
+        away (np.ndarray): Away team index of each remaining fixture
+        home_means (np.ndarray): Expected home goals of each fixture
+        away_means (np.ndarray): Expected away goals of each fixture
+        n_seasons (int): Number of seasons to simulate
+        rng (np.random.Generator): Random stream of the batch
+
+    Returns:
+        dict[str, np.ndarray]: 'positions' (teams, teams) count of each final position (0 first)
+            per team index and 'points' (teams) sum of the final points over the seasons
+    """
+    n_teams = len(standings['points'])
+    home_goals = rng.poisson(home_means, size=(n_seasons, len(home)))
+    away_goals = rng.poisson(away_means, size=(n_seasons, len(home)))
+    home_points, away_points = match_points(home_goals, away_goals)
+    points = standings['points'] + tally(n_teams, home, away, home_points, away_points)
+    goals_for = standings['goals_for'] + tally(n_teams, home, away, home_goals, away_goals)
+    goal_difference = goals_for - standings['goals_against'] - tally(n_teams, home, away, away_goals, home_goals)
+
+    # lexsort sorts on the last key first, negated keys rank the highest first
+    order = np.lexsort((rng.random((n_seasons, n_teams)), -goals_for, -goal_difference, -points), axis=-1)
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.broadcast_to(np.arange(n_teams), order.shape), axis=-1)
+    return {
+        'positions': np.bincount((np.arange(n_teams) * n_teams + positions).ravel(),
+                                 minlength=n_teams * n_teams).reshape(n_teams, n_teams),
+        'points': points.sum(axis=0).astype(np.int64),
+    }
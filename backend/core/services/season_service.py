@@ -0,0 +1,268 @@
+import hashlib
+import multiprocessing
+import os
+import random
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from loguru import logger
+
+from core.models import Event, SeasonProjection, SeasonSimulation, Sport
+from core.services import season
+from core.services.poisson_service import PoissonService
+
+
+def simulate_batch(task: tuple) -> dict[str, np.ndarray]:
+    """ Pool task: simulate one batch of seasons with its own random stream
+
+    Args:
+        task (tuple): Current table, remaining fixtures (home, away, home means, away means),
+            number of seasons and the np.random.SeedSequence of the batch
+
+    Returns:
+        dict[str, np.ndarray]: Output of `season.simulate`
+    """
+    standings, home, away, home_means, away_means, n_seasons, seed_sequence = task
+    return season.simulate(standings, home, away, home_means, away_means, n_seasons,
+                           np.random.default_rng(seed_sequence))
+
+
+class SeasonService:
+    """ Service class to simulate the rest of league seasons and store the projected standings
+
+    The remaining fixtures of a sport (its events without a result) are played out with the
+    expected goals of the Poisson score model, see `season`. The simulations are split into
+    batches seeded from one np.random.SeedSequence, so a seed gives the same projection whether the
+    batches run on a process pool or one after the other. A simulation is only rerun when the
+    results, fixtures or model fit of the sport changed.
+    """
+
+    def __init__(self):
+        logger.debug("SeasonService initialized")
+
+    @staticmethod
+    def season_start(sport_id: str) -> datetime:
+        """ Start of a sport's current season
+
+        The SEASON_START setting when set, otherwise the first event after the last break of more
+        than SEASON_BREAK_DAYS days between the sport's events, up to its next fixture. Between
+        seasons that is the first fixture of the next season once it is stored.
+
+        Args:
+            sport_id (str): Sport key
+
+        Returns:
+            datetime: Start of the season, None when every stored event is in one season
+        """
+        if settings.SEASON_START:
+            return timezone.make_aware(datetime.strptime(settings.SEASON_START, '%Y-%m-%d'))
+        times = list(Event.objects.filter(sport_id=sport_id, commence_time__isnull=False).order_by(
+            'commence_time').values_list('commence_time', flat=True))
+        now, season_break = timezone.now(), timedelta(days=settings.SEASON_BREAK_DAYS)
+        upcoming = next((i for i, commence_time in enumerate(times) if commence_time >= now), len(times) - 1)
+        start = None
+        for previous, commence_time in zip(times[:upcoming], times[1:upcoming + 1]):
+            if commence_time - previous > season_break:
+                start = commence_time
+        return start
+
+    def load_season(self, sport_id: str, since: datetime = None) -> list[tuple]:
+        """ Events of a sport's season with their scores
+
+        Events that have started without a stored score (in play, or their result is missing)
+        are left out: they are neither in the table nor played out as fixtures.
+
+        Args:
+            sport_id (str): Sport key
+            since (datetime): Start of the season, defaults to every stored event
+
+        Returns:
+            list[tuple]: (event id, home team id, away team id, home score, away score) per event,
+                scores None for fixtures still to play
+        """
+        events = Event.objects.filter(sport_id=sport_id, home_team__isnull=False, away_team__isnull=False)
+        if since is not None:
+            events = events.filter(commence_time__gte=since)
+        unscored = Q(commence_time__lt=timezone.now()) & (Q(odds_snapshots__home_score__isnull=True)
+                                                         | Q(odds_snapshots__away_score__isnull=True))
+        missing = events.filter(unscored).count()
+        if missing:
+            logger.warning(f"Leaving {missing} events of {sport_id} that started without a result out of the season")
+            events = events.exclude(unscored)
+        return list(events.order_by('commence_time', 'id').values_list('id', 'home_team_id', 'away_team_id',
+                                                                        'odds_snapshots__home_score',
+                                                                        'odds_snapshots__away_score'))
+
+    @staticmethod
+    def fingerprint(events: list[tuple], *parameters) -> str:
+        """ Digest of a season's events and the simulation parameters """
+        digest = hashlib.sha256()
+        for value in (*parameters, *events):
+            digest.update(repr(value).encode())
+        return digest.hexdigest()
+
+    def run_batches(self, task: tuple, simulations: int, seed: int, processes: int,
+                    batch_size: int) -> dict[str, np.ndarray]:
+        """ Simulate in batches with independent random streams and add up their counts
+
+        Args:
+            task (tuple): Arguments of `simulate_batch` before the number of seasons
+            simulations (int): Total number of seasons
+            seed (int): Seed of the np.random.SeedSequence the batch streams are spawned from
+            processes (int): Number of worker processes, batches run in this process for 1
+            batch_size (int): Seasons per batch
+
+        Returns:
+            dict[str, np.ndarray]: Summed output of `season.simulate`
+        """
+        sizes = [min(batch_size, simulations - start) for start in range(0, simulations, batch_size)]
+        tasks = [(*task, size, seed_sequence)
+                 for size, seed_sequence in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes)))]
+        if processes > 1 and multiprocessing.current_process().daemon:
+            # Daemonic processes (such as django-q workers) cannot start a pool
+            logger.info("Running the season simulation batches in the current daemonic process")
+            processes = 1
+        if processes > 1 and len(tasks) > 1:
+            with multiprocessing.Pool(min(processes, len(tasks))) as pool:
+                results = list(pool.imap_unordered(simulate_batch, tasks))
+        else:
+            results = [simulate_batch(task) for task in tasks]
+        return {key: sum(result[key] for result in results) for key in results[0]}
+
+    def simulate_sport(self, sport_id: str, simulations: int = None, since: datetime = None, seed: int = None,
+                       processes: int = None, batch_size: int = None, force: bool = False) -> SeasonSimulation:
+        """ Simulate the rest of a sport's season unless nothing changed since the stored simulation
+
+        Args:
+            sport_id (str): Sport key
+            simulations (int): Number of seasons, defaults to the SEASON_SIMULATIONS setting
+            since (datetime): Start of the season, defaults to every stored event
+            seed (int): Seed of the random streams, random when not given
+            processes (int): Number of worker processes, defaults to the SEASON_PROCESSES setting
+                or the number of CPUs
+            batch_size (int): Seasons per batch, defaults to the SEASON_BATCH_SIZE setting
+            force (bool): Simulate even when nothing changed
+
+        Returns:
+            SeasonSimulation: The stored simulation, None when the sport has no fitted model or
+                no events
+        """
+        simulations = simulations or settings.SEASON_SIMULATIONS
+        fit = PoissonService().fit_sport(sport_id)
+        events = self.load_season(sport_id, since)
+        if fit is None or not events:
+            return None
+        fingerprint = self.fingerprint(events, fit.fitted_at, since, simulations, settings.SEASON_FINALS_PLACES)
+        stored = SeasonSimulation.objects.filter(sport_id=sport_id).first()
+        if stored and not force and stored.fingerprint == fingerprint and (seed is None or stored.seed == seed):
+            logger.debug(f"Season of {sport_id} unchanged, keeping the stored simulation")
+            return stored
+
+        _, home_ids, away_ids, home_scores, away_scores = zip(*events)
+        team_ids, teams = np.unique(np.array(home_ids + away_ids), return_inverse=True)
+        home, away = np.split(teams, 2)
+        completed = np.array([score is not None for score in home_scores]) & np.array(
+            [score is not None for score in away_scores])
+        standings = season.table(len(team_ids), home[completed], away[completed],
+                                 np.array(home_scores, dtype=object)[completed].astype(np.int64),
+                                 np.array(away_scores, dtype=object)[completed].astype(np.int64))
+        remaining = ~completed
+        home_means, away_means = PoissonService().expected_goals(fit, team_ids[home[remaining]].tolist(),
+                                                                 team_ids[away[remaining]].tolist())
+        seed = random.getrandbits(63) if seed is None else seed
+        processes = processes or settings.SEASON_PROCESSES or os.cpu_count()
+        batch_size = batch_size or settings.SEASON_BATCH_SIZE
+        logger.debug(f"Simulating {simulations} seasons of {sport_id} with {int(remaining.sum())} fixtures left "
+                     f"in batches of {batch_size} on {processes} processes")
+        totals = self.run_batches((standings, home[remaining], away[remaining], home_means, away_means),
+                                  simulations, seed, processes, batch_size)
+        left = np.bincount(home[remaining], minlength=len(team_ids)) + np.bincount(away[remaining],
+                                                                                   minlength=len(team_ids))
+        return self.store(sport_id, team_ids, standings, left, totals, {
+            'fingerprint': fingerprint,
+            'since': since,
+            'simulations': simulations,
+            'seed': seed,
+            'completed': int(completed.sum()),
+            'remaining': int(remaining.sum()),
+            'simulated_at': timezone.now(),
+        })
+
+    @transaction.atomic
+    def store(self, sport_id: str, team_ids: np.ndarray, standings: dict, remaining: np.ndarray, totals: dict,
+              simulation: dict) -> SeasonSimulation:
+        """ Replace the stored simulation and projections of a sport
+
+        Args:
+            sport_id (str): Sport key
+            team_ids (np.ndarray): Team id per team index
+            standings (dict): Current table from `season.table`
+            remaining (np.ndarray): Fixtures left per team index
+            totals (dict): Summed output of `season.simulate`
+            simulation (dict): Fields of the SeasonSimulation
+
+        Returns:
+            SeasonSimulation: The stored simulation
+        """
+        n_teams = len(team_ids)
+        probabilities = totals['positions'] / simulation['simulations']
+        mean_positions = probabilities @ np.arange(1, n_teams + 1)
+        finals = probabilities[:, :min(settings.SEASON_FINALS_PLACES, n_teams)].sum(axis=1)
+        SeasonProjection.objects.filter(sport_id=sport_id).delete()
+        SeasonProjection.objects.bulk_create([
+            SeasonProjection(sport_id=sport_id,
+                             team_id=team_id,
+                             played=played,
+                             points=points,
+                             goal_difference=goals_for - goals_against,
+                             remaining=left,
+                             mean_points=total_points / simulation['simulations'],
+                             mean_position=mean_position,
+                             title_probability=positions[0],
+                             finals_probability=finals_probability,
+                             positions=positions)
+            for team_id, played, points, goals_for, goals_against, left, total_points, mean_position,
+            finals_probability, positions in zip(team_ids.tolist(), standings['played'].tolist(),
+                                                 standings['points'].tolist(), standings['goals_for'].tolist(),
+                                                 standings['goals_against'].tolist(), remaining.tolist(),
+                                                 totals['points'].tolist(), mean_positions.tolist(),
+                                                 finals.tolist(), probabilities.tolist())
+        ])
+        stored, _ = SeasonSimulation.objects.update_or_create(sport_id=sport_id, defaults=simulation)
+        logger.debug(f"Stored the season projection of {n_teams} teams of {sport_id}")
+        return stored
+
+    def simulate(self, force: bool = False, **kwargs) -> int:
+        """ Simulate the current seasons of the matching sports that changed, see `season_start`
+
+        Args:
+            force (bool): Simulate even when nothing changed
+            **kwargs: Arbitrary keyword arguments for filtering sports, defaults to the sports
+                whose key starts with the POISSON_SPORT_PREFIX setting
+
+        Returns:
+            int: Number of sports with a simulation
+        """
+        kwargs = kwargs or {'key__startswith': settings.POISSON_SPORT_PREFIX}
+        logger.debug(f"Simulating seasons with filters: {kwargs}")
+        return sum(self.simulate_sport(sport_id, since=self.season_start(sport_id), force=force) is not None
+                   for sport_id in Sport.objects.filter(**kwargs).values_list('key', flat=True))
+
+    def get_projections(self, **kwargs) -> list[dict]:
+        """ Get season projections from the database, best mean position first
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering, e.g. sport_id
+
+        Returns:
+            list[dict]: List of projection data
+        """
+        logger.debug(f"Getting season projections with filters: {kwargs}")
+        return list(SeasonProjection.objects.filter(**kwargs).order_by('sport_id', 'mean_position').values())
+
+    def __del__(self):
+        logger.debug("SeasonService terminated")
@@ -1,5 +1,9 @@
+from collections.abc import Iterator
+
+import pandas as pd
 from django.db import transaction
 from core.models import Sport
+from core.services import frame_loader
 from loguru import logger
 
 
@@ -101,5 +105,33 @@ class SportService:
         return list(sports)
     
     
+    def iter_sports(self, chunk_size: int = 2000, **kwargs) -> Iterator[dict]:
+        """ Stream sports data from the database one row at a time
+
+        Rows are fetched `chunk_size` at a time (through a server-side cursor on PostgreSQL) and
+        outside of a transaction, so memory stays flat however many rows match.
+
+        Args:
+            chunk_size (int): Number of rows fetched per round trip
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Yields:
+            dict: One row of sports data
+        """
+        logger.debug(f"Streaming sports with filters: {kwargs}")
+        yield from Sport.objects.filter(**kwargs).order_by('pk').values().iterator(chunk_size=chunk_size)
+
+    def get_sports_frame(self, **kwargs) -> pd.DataFrame:
+        """ Get the sports as a DataFrame, streamed without building a dict per row
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            pd.DataFrame: One row per record, foreign keys as categoricals
+        """
+        logger.debug(f"Getting sports frame with filters: {kwargs}")
+        return frame_loader.load_frame(Sport.objects.filter(**kwargs))
+
     def __del__(self):
         logger.debug("SportService terminated")
\ No newline at end of file
@@ -0,0 +1,179 @@
+import dataclasses
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+
+import numpy as np
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from loguru import logger
+
+from core.models import SweepResult
+from core.services import backtest
+from core.services.backtest_service import BacktestService
+
+# History of the current worker process, attached by `attach_history`
+_worker_history = None
+
+
+def attach_history(path: str) -> None:
+    """ Pool initializer: map the shared history read-only into the worker process
+
+    Args:
+        path (str): Directory written by `SweepService.share_history`
+    """
+    global _worker_history
+    with open(os.path.join(path, 'keys.json')) as file:
+        keys = json.load(file)
+    _worker_history = {column: np.asarray(values, dtype=object) for column, values in keys.items()}
+    for name in os.listdir(path):
+        if name.endswith('.npy'):
+            _worker_history[name[:-len('.npy')]] = np.load(os.path.join(path, name), mmap_mode='r')
+
+
+def evaluate_chunk(task: tuple[dict, list[dict]]) -> list[tuple[dict, dict]]:
+    """ Pool task: backtest a chunk of parameter combinations over the attached history
+
+    Args:
+        task (tuple[dict, list[dict]]): Strategy fields shared by every combination and the
+            parameter combinations of the chunk
+
+    Returns:
+        list[tuple[dict, dict]]: Each combination with its `backtest.summarise` summary
+    """
+    base, chunk = task
+    return [(parameters, backtest.summarise(backtest.evaluate(SweepService.strategy(base, parameters),
+                                                               _worker_history))) for parameters in chunk]
+
+
+class SweepService:
+    """ Service class to run backtest parameter sweeps on a process pool
+
+    The price history is loaded once and written as `.npy` files the workers memory-map read-only,
+    so every worker shares the same pages instead of receiving a pickled copy. Workers only run
+    NumPy, all database access stays in the parent process. The parameter grid
+    is split into chunks evaluated with `imap_unordered` and the summaries are written to
+    SweepResult as the chunks complete.
+    """
+
+    tuple_fields = ('markets', 'sides', 'bookmakers')
+
+    def __init__(self):
+        logger.debug("SweepService initialized")
+
+    @staticmethod
+    def expand_grid(grid: dict[str, list]) -> list[dict]:
+        """ Every combination of a parameter grid
+
+        Args:
+            grid (dict[str, list]): Candidate values per Strategy field
+
+        Raises:
+            ValueError: If a key is not a Strategy field or has no candidate values
+
+        Returns:
+            list[dict]: One {field: value} per combination
+        """
+        fields = {field.name for field in dataclasses.fields(backtest.Strategy)}
+        unknown = set(grid) - fields
+        if unknown:
+            raise ValueError(f"Unknown strategy parameters: {', '.join(sorted(unknown))}")
+        if not all(isinstance(values, list) and values for values in grid.values()):
+            raise ValueError("Each grid parameter must be a non-empty list of values")
+        return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+    @classmethod
+    def strategy(cls, base: dict, parameters: dict) -> backtest.Strategy:
+        """ Strategy of one combination, list values of tuple fields (as in JSON) converted """
+        fields = {**base, **parameters}
+        return backtest.Strategy(**{
+            field: tuple(value) if field in cls.tuple_fields and isinstance(value, list) else value
+            for field, value in fields.items()
+        })
+
+    @staticmethod
+    def share_history(history: dict[str, np.ndarray], path: str) -> None:
+        """ Write a history for `attach_history`: numeric columns as `.npy`, key columns as JSON
+
+        Args:
+            history (dict[str, np.ndarray]): History from `BacktestService.load_history`
+            path (str): Directory to write to
+        """
+        keys = {}
+        for column, values in history.items():
+            if values.dtype == object:
+                keys[column] = values.tolist()
+            else:
+                np.save(os.path.join(path, f"{column}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(path, 'keys.json'), 'w') as file:
+            json.dump(keys, file)
+
+    def run(self, grid: dict[str, list], base: dict = None, sweep: str = None, history: dict = None,
+            processes: int = None, chunk_size: int = None, **kwargs) -> tuple[str, int]:
+        """ Backtest every combination of a parameter grid and store the summaries
+
+        Args:
+            grid (dict[str, list]): Candidate values per Strategy field
+            base (dict): Strategy fields shared by every combination
+            sweep (str): Name the results are stored under, generated when not given
+            history (dict): Price history, loaded with `kwargs` when not given
+            processes (int): Number of worker processes, defaults to the SWEEP_PROCESSES setting or
+                the number of CPUs
+            chunk_size (int): Combinations per pool task, defaults to spreading the grid over about
+                four tasks per worker
+            **kwargs: Arbitrary keyword arguments for filtering events
+
+        Raises:
+            ValueError: If the grid or a combination is invalid
+
+        Returns:
+            tuple[str, int]: The sweep name and the number of combinations evaluated
+        """
+        base = base or {}
+        combinations = self.expand_grid(grid)
+        for parameters in combinations:
+            self.strategy(base, parameters)  # Fail before starting the pool
+        sweep = sweep or f"sweep-{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        processes = processes or settings.SWEEP_PROCESSES or os.cpu_count()
+        chunk_size = chunk_size or max(1, math.ceil(len(combinations) / (processes * 4)))
+        history = BacktestService().load_history(**kwargs) if history is None else history
+        logger.debug(f"Running sweep {sweep} of {len(combinations)} combinations on {processes} processes")
+
+        path = tempfile.mkdtemp(prefix='sweep-', dir=settings.SWEEP_TMP_DIR)
+        try:
+            self.share_history(history, path)
+            chunks = [combinations[start:start + chunk_size] for start in range(0, len(combinations), chunk_size)]
+            evaluated = 0
+            with multiprocessing.Pool(processes, initializer=attach_history, initargs=(path, )) as pool:
+                for results in pool.imap_unordered(evaluate_chunk, [(base, chunk) for chunk in chunks]):
+                    SweepResult.objects.bulk_create([
+                        SweepResult(sweep=sweep, parameters=parameters, **summary) for parameters, summary in results
+                    ])
+                    evaluated += len(results)
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+        logger.debug(f"Sweep {sweep} evaluated {evaluated} combinations")
+        return sweep, evaluated
+
+    def get_results(self, sweep: str, **kwargs) -> list[dict]:
+        """ Get the results of a sweep from the database, best ROI first
+
+        Args:
+            sweep (str): Sweep name
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of result data
+        """
+        logger.debug(f"Getting results of sweep {sweep} with filters: {kwargs}")
+        return list(SweepResult.objects.filter(sweep=sweep, **kwargs).order_by(
+            F('roi').desc(nulls_last=True), 'id').values())
+
+    def __del__(self):
+        logger.debug("SweepService terminated")
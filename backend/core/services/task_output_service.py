@@ -0,0 +1,104 @@
+import json
+import os
+import shutil
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from loguru import logger
+
+
+class TaskOutputService:
+    """ Service class to store large task outputs as chunked NDJSON files
+
+    A task streams its rows into `<TASK_OUTPUT_DIR>/<name>-<timestamp>-<id>/part-<n>.ndjson` and
+    returns the small reference dict from `write` instead of the rows, so django-q only pickles
+    the reference into Redis and its result table. Every write first deletes the outputs older
+    than TASK_OUTPUT_MAX_AGE_DAYS, so the directory does not grow forever.
+    """
+
+    def __init__(self, output_dir: str = None):
+        self.output_dir = output_dir or settings.TASK_OUTPUT_DIR
+        logger.debug("TaskOutputService initialized")
+
+    def write(self, name: str, rows: Iterable[dict], chunk_rows: int = None) -> dict:
+        """ Write rows to NDJSON files of at most `chunk_rows` rows each
+
+        Args:
+            name (str): Name of the output, e.g. the task name
+            rows (Iterable[dict]): Rows to write, consumed lazily
+            chunk_rows (int): Rows per file, defaults to the TASK_OUTPUT_CHUNK_ROWS setting
+
+        Returns:
+            dict: Reference with the output 'format', 'path', 'files' and number of 'rows'
+        """
+        chunk_rows = chunk_rows or settings.TASK_OUTPUT_CHUNK_ROWS
+        self.cleanup()
+        path = os.path.join(self.output_dir, f"{name}-{timezone.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}")
+        os.makedirs(path)
+
+        files, count, file = [], 0, None
+        try:
+            for row in rows:
+                if count % chunk_rows == 0:
+                    if file is not None:
+                        file.close()
+                    files.append(f"part-{len(files):05d}.ndjson")
+                    file = open(os.path.join(path, files[-1]), 'w')
+                file.write(json.dumps(row, cls=DjangoJSONEncoder))
+                file.write('\n')
+                count += 1
+        finally:
+            if file is not None:
+                file.close()
+
+        logger.debug(f"Wrote {count} rows of {name} to {len(files)} files in {path}")
+        return {'format': 'ndjson', 'path': path, 'files': files, 'rows': count}
+
+    def cleanup(self, max_age_days: float = None) -> int:
+        """ Delete the outputs last written more than `max_age_days` ago
+
+        Args:
+            max_age_days (float): Age in days, defaults to the TASK_OUTPUT_MAX_AGE_DAYS setting, 0 keeps every output
+
+        Returns:
+            int: Number of outputs deleted
+        """
+        max_age_days = settings.TASK_OUTPUT_MAX_AGE_DAYS if max_age_days is None else max_age_days
+        if not max_age_days or not os.path.isdir(self.output_dir):
+            return 0
+        cutoff = time.time() - max_age_days * 86400
+        removed = 0
+        for entry in os.scandir(self.output_dir):
+            if entry.is_dir(follow_symlinks=False) and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        if removed:
+            logger.debug(f"Deleted {removed} task outputs older than {max_age_days} days from {self.output_dir}")
+        return removed
+
+    @staticmethod
+    def is_reference(result) -> bool:
+        """ Whether a task result is a reference returned by `write` """
+        return isinstance(result, dict) and result.get('format') == 'ndjson' and 'files' in result
+
+    @staticmethod
+    def read(reference: dict) -> Iterator[dict]:
+        """ Stream the rows of a written output back
+
+        Args:
+            reference (dict): Reference returned by `write`
+
+        Yields:
+            dict: One row
+        """
+        for name in reference['files']:
+            with open(os.path.join(reference['path'], name)) as file:
+                for line in file:
+                    yield json.loads(line)
+
+    def __del__(self):
+        logger.debug("TaskOutputService terminated")
@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+from itertools import batched
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Max
+from loguru import logger
+
+from core.models import Outcome
+from core.services.odds_frame import TICK_DTYPE, TICK_STORE_VERSION
+
+
+class TickStoreService:
+    """ Service class to write the odds history to a memory-mapped tick store, see `OddsFrame`
+    """
+
+    def __init__(self):
+        logger.debug("TickStoreService initialized")
+
+    @staticmethod
+    def encode(keys: tuple, index: dict) -> np.ndarray:
+        """ Integer codes of keys, adding unseen keys to the dictionary in order of appearance
+
+        Args:
+            keys (tuple): Keys to encode
+            index (dict): Key to code dictionary, updated in place
+
+        Returns:
+            np.ndarray: Code of each key
+        """
+        return np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.int64, count=len(keys))
+
+    @staticmethod
+    def resize(filename: str, length: int) -> np.memmap:
+        """ Grow or shrink the ticks of a `.npy` file in place and map them again
+
+        The `.npy` header leaves room for the length to grow, so only the header is rewritten and
+        the file truncated (or zero extended), the ticks already written are never copied.
+
+        Args:
+            filename (str): Path of the `.npy` file, not mapped by anything else
+            length (int): New number of ticks
+
+        Returns:
+            np.memmap: Writable map of the resized ticks
+        """
+        with open(filename, 'r+b') as file:
+            major, _ = np.lib.format.read_magic(file)
+            file.seek(0)
+            header = {'descr': np.lib.format.dtype_to_descr(TICK_DTYPE), 'fortran_order': False, 'shape': (length, )}
+            if major == 1:
+                np.lib.format.write_array_header_1_0(file, header)
+            else:
+                np.lib.format.write_array_header_2_0(file, header)
+            file.truncate(file.tell() + length * TICK_DTYPE.itemsize)
+        return np.lib.format.open_memmap(filename, mode='r+')
+
+    def write(self, path: str = None, batch_size: int = 100000, **kwargs) -> int:
+        """ Write the outcomes of the matching events to a tick store
+
+        Ticks are streamed in (event, timestamp) order straight into a preallocated `.npy` memory
+        map, resized in place if rows were committed or deleted since the count, so memory use is
+        bounded by the batch size. The store is built next to `path` and
+        swapped in at the end, readers keep the previous version until then.
+
+        Args:
+            path (str): Directory of the tick store, defaults to the TICK_STORE_DIR setting
+            batch_size (int): Number of rows streamed per batch
+            **kwargs: Arbitrary keyword arguments for filtering events, e.g. sport_id
+
+        Returns:
+            int: Number of ticks written
+        """
+        path = path or settings.TICK_STORE_DIR
+        logger.debug(f"Writing tick store to {path} with filters: {kwargs}")
+        filters = {f"odd__event__{lookup}": value for lookup, value in kwargs.items()}
+        # Pin the rows to the current maximum id before counting, so the count and the stream
+        # leave out outcomes ingested in between
+        last_id = Outcome.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+        queryset = Outcome.objects.filter(id__lte=last_id, **filters)
+        count = queryset.count()
+
+        staging = f"{path.rstrip(os.sep)}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        filename = os.path.join(staging, 'ticks.npy')
+        ticks = np.lib.format.open_memmap(filename, mode='w+', dtype=TICK_DTYPE, shape=(count, ))
+
+        events, bookmakers, markets, names, sports = {}, {}, {}, {}, {}
+        written = 0
+        rows = queryset.order_by('odd__event_id', 'odd__timestamp', 'id').values_list(
+            'odd__event_id', 'odd__event__sport_id', 'bookmaker__key', 'market__key', 'name__name', 'odd__timestamp',
+            'price', 'point').iterator(chunk_size=batch_size)
+        for chunk in batched(rows, batch_size):
+            event_ids, sport_ids, bookmaker_keys, market_keys, team_names, timestamps, prices, points = zip(*chunk)
+            if written + len(chunk) > len(ticks):
+                # Ids are taken before commit, an ingest can commit rows below the bound after the count
+                length = max(written + len(chunk), 2 * len(ticks))
+                ticks.flush()
+                del ticks
+                ticks = self.resize(filename, length)
+            block = ticks[written:written + len(chunk)]
+            block['event'] = self.encode(event_ids, events)
+            block['bookmaker'] = self.encode(bookmaker_keys, bookmakers)
+            block['market'] = self.encode(market_keys, markets)
+            block['name'] = self.encode(team_names, names)
+            block['timestamp'] = np.array([timestamp.replace(tzinfo=None) for timestamp in timestamps],
+                                          dtype='datetime64[us]')
+            block['price'] = np.array(prices, dtype=np.float64)
+            block['point'] = np.array([np.nan if point is None else point for point in points], dtype=np.float32)
+            sports.update(zip(event_ids, sport_ids))
+            written += len(chunk)
+        offsets = np.searchsorted(ticks['event'][:written], np.arange(len(events) + 1))
+        length = len(ticks)
+        ticks.flush()
+        del ticks
+        if written < length:
+            # Rows deleted while streaming (or a grown map) leave an unused tail to drop
+            self.resize(filename, written)
+
+        np.save(os.path.join(staging, 'offsets.npy'), offsets)
+        with open(os.path.join(staging, 'keys.json'), 'w') as file:
+            json.dump({
+                'version': TICK_STORE_VERSION,
+                'events': list(events),
+                'sports': [sports[event_id] for event_id in events],
+                'bookmakers': list(bookmakers),
+                'markets': list(markets),
+                'names': list(names),
+            }, file)
+
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(staging, path)
+        logger.debug(f"Wrote {written} ticks of {len(events)} events to {path}")
+        return written
+
+    def __del__(self):
+        logger.debug("TickStoreService terminated")
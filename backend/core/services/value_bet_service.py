@@ -0,0 +1,179 @@
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from loguru import logger
+
+from core.models import ModelProbability, ValueBet
+from core.services import frame_loader, odds_math
+from core.services.latest_outcome_service import LatestOutcomeService
+
+
+class ValueBetService:
+    """ Service class to compare the latest bookmaker prices with the model probabilities
+
+    The latest prices and the ModelProbability rows of the upcoming events are loaded as aligned
+    columns and joined on event, market, outcome name and point in one vectorised pass, so a whole
+    board is scanned without an ORM round trip per outcome.
+    """
+
+    probability_fields = ['event_id', 'market_id', 'name_id', 'point', 'probability', 'push_probability']
+
+    def __init__(self):
+        self.latest_outcome_service = LatestOutcomeService()
+        logger.debug("ValueBetService initialized")
+
+    @staticmethod
+    def match_rows(prices: dict[str, np.ndarray], model: dict[str, np.ndarray]) -> np.ndarray:
+        """ Model row of each price quoting the same event, market, outcome name and point
+
+        Args:
+            prices (dict[str, np.ndarray]): Latest price columns, see `LatestOutcomeService.get_latest_columns`
+            model (dict[str, np.ndarray]): Model probability columns with 'event' encoded with the
+                event codes of `prices`
+
+        Returns:
+            np.ndarray: Model row per price, -1 where the model does not price the outcome
+        """
+        n_prices = len(prices['price'])
+        labels, n_groups = odds_math.group_labels(*[
+            np.concatenate((prices[key], model[key])) for key in ('event', 'market', 'name')
+        ], np.nan_to_num(np.concatenate((prices['point'], model['point'])).astype(float), nan=0.0))
+        rows = np.full(n_groups, -1, dtype=np.int64)
+        rows[labels[n_prices:]] = np.arange(len(labels) - n_prices)
+        return rows[labels[:n_prices]]
+
+    def load_model(self, prices: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+        """ Model probability columns of the events of a set of prices, see `match_rows`
+
+        Args:
+            prices (dict[str, np.ndarray]): Latest price columns
+
+        Returns:
+            dict[str, np.ndarray]: Columns 'event' (encoded with the event codes of `prices`),
+                'market', 'name', 'point', 'probability' and 'push_probability'
+        """
+        columns = frame_loader.load_columns(ModelProbability.objects.filter(event_id__in=prices['event_keys']),
+                                            self.probability_fields,
+                                            categorical=['event_id'])
+        # Re-encode the model's event codes with the event codes of the prices
+        event_codes = pd.Index(prices['event_keys']).get_indexer(columns['event_id_keys'].astype(str))
+        return {
+            'event': event_codes[columns['event_id']],
+            'market': columns['market_id'],
+            'name': columns['name_id'],
+            'point': columns['point'],
+            'probability': columns['probability'],
+            'push_probability': columns['push_probability'],
+        }
+
+    @staticmethod
+    def value(prices: np.ndarray, probabilities: np.ndarray, pushes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """ Expected return and Kelly stake of backing outcomes at decimal prices
+
+        A push returns the stake, so it adds neither to the return nor to the loss.
+
+        Args:
+            prices (np.ndarray): Decimal prices
+            probabilities (np.ndarray): Probability of each outcome winning
+            pushes (np.ndarray): Probability of each outcome being a push
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Expected profit per unit staked, and the Kelly fraction of
+                the bankroll to stake (0 without an edge)
+        """
+        odds = prices - 1
+        losses = 1 - probabilities - pushes
+        edge = probabilities * odds - losses
+        kelly = np.clip(edge / np.where(odds > 0, odds, np.nan), 0, 1)
+        return edge, np.nan_to_num(kelly)
+
+    def find_value(self, prices: dict[str, np.ndarray], model: dict[str, np.ndarray],
+                   min_edge: float = None) -> dict[str, np.ndarray]:
+        """ Prices whose expected return against the model reaches `min_edge`
+
+        Args:
+            prices (dict[str, np.ndarray]): Latest price columns
+            model (dict[str, np.ndarray]): Model probability columns, see `match_rows`
+            min_edge (float): Lowest expected profit per unit staked, defaults to the
+                VALUE_BET_MIN_EDGE setting
+
+        Returns:
+            dict[str, np.ndarray]: Per value bet the price 'row', 'probability', 'push_probability',
+                'edge' and 'kelly' fraction
+        """
+        min_edge = settings.VALUE_BET_MIN_EDGE if min_edge is None else min_edge
+        matched = self.match_rows(prices, model)
+        rows = np.flatnonzero(matched >= 0)
+        model_rows = matched[rows]
+        probabilities = model['probability'][model_rows].astype(float)
+        pushes = np.nan_to_num(model['push_probability'][model_rows].astype(float))
+        edge, kelly = self.value(prices['price'][rows].astype(float), probabilities, pushes)
+        selected = edge >= min_edge
+        return {
+            'row': rows[selected],
+            'probability': probabilities[selected],
+            'push_probability': pushes[selected],
+            'edge': edge[selected],
+            'kelly': kelly[selected],
+        }
+
+    @transaction.atomic
+    def scan(self, **kwargs) -> int:
+        """ Scan the latest prices of events that have not started and store the value bets found
+
+        Every value bet stored by earlier scans in the scope of the scan is marked inactive,
+        including those of events that have started or are no longer quoted.
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering the latest outcomes and the stored
+                value bets, e.g. event__sport_id
+
+        Returns:
+            int: Number of value bets found
+        """
+        logger.debug(f"Scanning for value bets with filters: {kwargs}")
+        filters = {'event__commence_time__gt': timezone.now(), **kwargs}
+        prices = self.latest_outcome_service.get_latest_columns(**filters)
+        ValueBet.objects.filter(active=True, **kwargs).update(active=False)
+        if not len(prices['id']):
+            return 0
+
+        found = self.find_value(prices, self.load_model(prices))
+        rows = found['row']
+        kelly_fractions = found['kelly'] * settings.VALUE_BET_KELLY_MULTIPLIER
+        ValueBet.objects.bulk_create([
+            ValueBet(event_id=prices['event_keys'][event],
+                     bookmaker_id=bookmaker,
+                     market_id=market,
+                     name_id=name,
+                     point=None if np.isnan(point) else point,
+                     price=price,
+                     probability=probability,
+                     push_probability=push,
+                     edge=edge,
+                     kelly_fraction=kelly)
+            for event, bookmaker, market, name, point, price, probability, push, edge, kelly in zip(
+                prices['event'][rows].tolist(), prices['bookmaker'][rows].tolist(), prices['market'][rows].tolist(),
+                prices['name'][rows].tolist(), prices['point'][rows].astype(float).tolist(),
+                prices['price'][rows].tolist(), found['probability'].tolist(), found['push_probability'].tolist(),
+                found['edge'].tolist(), kelly_fractions.tolist())
+        ])
+        logger.debug(f"Found {len(rows)} value bets")
+        return len(rows)
+
+    def get_value_bets(self, **kwargs) -> list[dict]:
+        """ Get the active value bets from the database, largest edge first
+
+        Args:
+            **kwargs: Arbitrary keyword arguments for filtering
+
+        Returns:
+            list[dict]: List of value bet data
+        """
+        logger.debug(f"Getting value bets with filters: {kwargs}")
+        return list(ValueBet.objects.filter(active=True, **kwargs).order_by('-edge').values())
+
+    def __del__(self):
+        logger.debug("ValueBetService terminated")
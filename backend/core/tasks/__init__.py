@@ -7,6 +7,15 @@ from .update_results import UpdateResultsTask
 from .update_odds import UpdateOddsTask
 from .get_sports import GetSportsTask
 from .get_events import GetEventsTask
+from .scan_arbitrage import ScanArbitrageTask
+from .scan_value_bets import ScanValueBetsTask
+from .export_parquet import ExportParquetTask
+from .refresh_rollups import RefreshRollupsTask
+from .refresh_bookmaker_stats import RefreshBookmakerStatsTask
+from .update_ratings import UpdateRatingsTask
+from .fit_poisson import FitPoissonTask
+from .simulate_seasons import SimulateSeasonsTask
+from .analyse_lead_lag import AnalyseLeadLagTask
 from loguru import logger
 
 # Register tasks
@@ -18,6 +27,15 @@ TaskRegistry.register('update_results_task', UpdateResultsTask.run)
 TaskRegistry.register('update_odds_task', UpdateOddsTask.run)
 TaskRegistry.register('get_sports_task', GetSportsTask.run)
 TaskRegistry.register('get_events_task', GetEventsTask.run)
+TaskRegistry.register('scan_arbitrage_task', ScanArbitrageTask.run)
+TaskRegistry.register('scan_value_bets_task', ScanValueBetsTask.run)
+TaskRegistry.register('export_parquet_task', ExportParquetTask.run)
+TaskRegistry.register('refresh_rollups_task', RefreshRollupsTask.run)
+TaskRegistry.register('refresh_bookmaker_stats_task', RefreshBookmakerStatsTask.run)
+TaskRegistry.register('update_ratings_task', UpdateRatingsTask.run)
+TaskRegistry.register('fit_poisson_task', FitPoissonTask.run)
+TaskRegistry.register('simulate_seasons_task', SimulateSeasonsTask.run)
+TaskRegistry.register('analyse_lead_lag_task', AnalyseLeadLagTask.run)
 
 
 # For debugging
@@ -0,0 +1,33 @@
+from core.services.lead_lag_service import LeadLagService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class AnalyseLeadLagTask(BaseTask):
+    """ A task to measure which bookmakers move their prices first, per sport and market
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key, defaults to every sport
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing AnalyseLeadLagTask...")
+        lead_lag_service = LeadLagService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            stored = lead_lag_service.analyse(**filters)
+            return f"Stored {stored} bookmaker lead-lag pairs."
+        except Exception as e:
+            logger.error(f"Error analysing bookmaker lead-lag: {str(e)}")
+            return "Error analysing bookmaker lead-lag"
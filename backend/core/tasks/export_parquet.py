@@ -0,0 +1,37 @@
+from core.services.export_service import ExportService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class ExportParquetTask(BaseTask):
+    """ A task to export the odds history and results to partitioned Parquet files
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            datasets (list[str]): Optional datasets to export, all by default
+            batch_size (int): Optional number of rows streamed per batch
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing ExportParquetTask...")
+        export_service = ExportService()
+
+        try:
+            datasets = kwargs.get('datasets')
+            if isinstance(datasets, str):
+                datasets = [datasets]
+            counts = export_service.export(datasets=datasets,
+                                           batch_size=int(kwargs.get('batch_size', 50000)))
+            return "Exported " + ", ".join(f"{rows} {dataset}" for dataset, rows in counts.items()) + " rows."
+        except Exception as e:
+            logger.error(f"Error exporting to Parquet: {str(e)}")
+            return "Error exporting to Parquet"
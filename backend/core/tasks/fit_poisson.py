@@ -0,0 +1,35 @@
+from core.services.poisson_service import PoissonService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class FitPoissonTask(BaseTask):
+    """ A task to refit the Poisson score models and price the upcoming events
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key, defaults to the sports matching POISSON_SPORT_PREFIX
+            force (str): 'true' to refit even when the results are unchanged
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing FitPoissonTask...")
+        poisson_service = PoissonService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            force = str(kwargs.get('force', '')).lower() == 'true'
+            fitted, priced = poisson_service.refresh(force=force, **filters)
+            return f"Fitted Poisson models of {fitted} sports and priced {priced} upcoming events."
+        except Exception as e:
+            logger.error(f"Error fitting Poisson models: {str(e)}")
+            return "Error fitting Poisson models"
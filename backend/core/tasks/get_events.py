@@ -1,6 +1,7 @@
 from django.conf import settings
 from core.services.oddsapi_service import OddsAPIService
 from core.services.event_service import EventService
+from core.services.task_output_service import TaskOutputService
 from core.task_registry import TaskRegistry
 from .base_task import BaseTask
 from loguru import logger
@@ -14,17 +15,24 @@ class GetEventsTask(BaseTask):
     """
     
     @classmethod
-    def execute(cls, **kwargs) -> str:
+    def execute(cls, **kwargs) -> dict | str:
         """ Execute the task
 
+        The events are streamed to NDJSON files, only the reference to the files is returned so
+        large results do not go through the django-q result store.
+
+        Keyword Args:
+            Filters for the events, e.g. sport_id=<sport_key>
+
         Returns:
-            str: A message indicating the result of the task
+            dict | str: Reference to the written events (see TaskOutputService), or a message if the
+                task failed
         """
         logger.info("Executing GetEventsTask...")
         event_service = EventService()
 
         try:
-            return event_service.get_events(**kwargs)
+            return TaskOutputService().write('get_events_task', event_service.iter_events(**kwargs))
         except Exception as e:
             logger.info(f"Error getting events: {str(e)}")
             return "Error getting events"
@@ -1,6 +1,7 @@
 from django.conf import settings
 from core.services.oddsapi_service import OddsAPIService
 from core.services.sport_service import SportService
+from core.services.task_output_service import TaskOutputService
 from core.task_registry import TaskRegistry
 from .base_task import BaseTask
 from loguru import logger
@@ -14,17 +15,24 @@ class GetSportsTask(BaseTask):
     """
     
     @classmethod
-    def execute(cls, **kwargs) -> str:
+    def execute(cls, **kwargs) -> dict | str:
         """ Execute the task
 
+        The sports are streamed to NDJSON files, only the reference to the files is returned so
+        large results do not go through the django-q result store.
+
+        Keyword Args:
+            Filters for the sports, e.g. active=True
+
         Returns:
-            str: A message indicating the result of the task
+            dict | str: Reference to the written sports (see TaskOutputService), or a message if the
+                task failed
         """
         logger.info("Executing GetSportsTask...")
         sport_service = SportService()
 
         try:
-            return sport_service.get_sports(**kwargs)
+            return TaskOutputService().write('get_sports_task', sport_service.iter_sports(**kwargs))
         except Exception as e:
             logger.info(f"Error getting sports: {str(e)}")
             return "Error getting sports"
@@ -0,0 +1,34 @@
+from core.services.bookmaker_stats_service import BookmakerStatsService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class RefreshBookmakerStatsTask(BaseTask):
+    """ A task to aggregate new snapshots and results into the bookmaker margin and efficiency stats
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key to limit the refresh to
+            batch_size (int): Optional number of snapshots or results aggregated per transaction
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing RefreshBookmakerStatsTask...")
+        bookmaker_stats_service = BookmakerStatsService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            written = bookmaker_stats_service.refresh(batch_size=int(kwargs.get('batch_size', 500)), **filters)
+            return f"Updated {written} bookmaker stat buckets."
+        except Exception as e:
+            logger.error(f"Error refreshing bookmaker stats: {str(e)}")
+            return "Error refreshing bookmaker stats"
@@ -0,0 +1,34 @@
+from core.services.rollup_service import RollupService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class RefreshRollupsTask(BaseTask):
+    """ A task to aggregate new snapshots into the OHLC odds rollups
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key to limit the refresh to
+            batch_size (int): Optional number of snapshots aggregated per transaction
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing RefreshRollupsTask...")
+        rollup_service = RollupService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            written = rollup_service.refresh(batch_size=int(kwargs.get('batch_size', 500)), **filters)
+            return f"Updated {written} odds rollup buckets."
+        except Exception as e:
+            logger.error(f"Error refreshing odds rollups: {str(e)}")
+            return "Error refreshing odds rollups"
@@ -0,0 +1,33 @@
+from core.services.arbitrage_service import ArbitrageService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class ScanArbitrageTask(BaseTask):
+    """ A task to scan the latest prices for cross-bookmaker arbitrage
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key to limit the scan to
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing ScanArbitrageTask...")
+        arbitrage_service = ArbitrageService()
+
+        try:
+            filters = {'event__sport_id': kwargs['sport']} if kwargs.get('sport') else {}
+            found_count = arbitrage_service.scan(**filters)
+            return f"Found {found_count} arbitrage opportunities."
+        except Exception as e:
+            logger.error(f"Error scanning for arbitrage: {str(e)}")
+            return "Error scanning for arbitrage"
@@ -0,0 +1,33 @@
+from core.services.value_bet_service import ValueBetService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class ScanValueBetsTask(BaseTask):
+    """ A task to compare the latest prices with the model probabilities for value bets
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key to limit the scan to
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing ScanValueBetsTask...")
+        value_bet_service = ValueBetService()
+
+        try:
+            filters = {'event__sport_id': kwargs['sport']} if kwargs.get('sport') else {}
+            found_count = value_bet_service.scan(**filters)
+            return f"Found {found_count} value bets."
+        except Exception as e:
+            logger.error(f"Error scanning for value bets: {str(e)}")
+            return "Error scanning for value bets"
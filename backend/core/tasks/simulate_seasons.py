@@ -0,0 +1,35 @@
+from core.services.season_service import SeasonService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class SimulateSeasonsTask(BaseTask):
+    """ A task to simulate the rest of the seasons whose results or fixtures changed
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key, defaults to the sports matching POISSON_SPORT_PREFIX
+            force (str): 'true' to simulate even when nothing changed
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing SimulateSeasonsTask...")
+        season_service = SeasonService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            force = str(kwargs.get('force', '')).lower() == 'true'
+            simulated = season_service.simulate(force=force, **filters)
+            return f"Season projections of {simulated} sports are up to date."
+        except Exception as e:
+            logger.error(f"Error simulating seasons: {str(e)}")
+            return "Error simulating seasons"
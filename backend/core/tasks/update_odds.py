@@ -3,6 +3,9 @@ from core.services.oddsapi_service import OddsAPIService
 from core.services.odd_service import OddService
 from core.task_registry import TaskRegistry
 from .base_task import BaseTask
+from .scan_arbitrage import ScanArbitrageTask
+from .scan_value_bets import ScanValueBetsTask
+from .refresh_bookmaker_stats import RefreshBookmakerStatsTask
 from loguru import logger
 from datetime import datetime
 
@@ -53,6 +56,10 @@ class UpdateOddsTask(BaseTask):
         try:
             
             cls.check_required_parameters(kwargs)
+            # Prices are stored as decimal odds, the read API converts them to other formats
+            if kwargs.setdefault('oddsFormat', 'decimal') != 'decimal':
+                logger.error(f"Odds are stored as decimal prices, oddsFormat '{kwargs['oddsFormat']}' is not supported")
+                raise ValueError("oddsFormat must be 'decimal'")
             
             odds_data = api_service.get_historical_odds(**kwargs) if kwargs.get("date") else api_service.get_odds(**kwargs)
             
@@ -67,7 +74,11 @@ class UpdateOddsTask(BaseTask):
             
             odds_api_len = len(odds_data['data']) if kwargs.get("date") else len(odds_data)
             
-            return f"OddsAPI returned {odds_api_len} odds, and successfully upserted {updated_count} into database."
+            arbitrage_message = ScanArbitrageTask.execute(sport=kwargs.get('sport'))
+            value_bet_message = ScanValueBetsTask.execute(sport=kwargs.get('sport'))
+            stats_message = RefreshBookmakerStatsTask.execute(sport=kwargs.get('sport'))
+            
+            return f"OddsAPI returned {odds_api_len} odds, and successfully upserted {updated_count} into database. {arbitrage_message} {value_bet_message} {stats_message}"
         except Exception as e:
             logger.error(f"Error updating odds: {str(e)}")
             return str(e)
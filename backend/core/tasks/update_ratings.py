@@ -0,0 +1,33 @@
+from core.services.rating_service import RatingService
+from .base_task import BaseTask
+from loguru import logger
+
+
+class UpdateRatingsTask(BaseTask):
+    """ A task to apply new event results to the team ratings
+
+    Args:
+        BaseTask (Class): BaseTask class that has some common methods and actions for all tasks
+
+    """
+
+    @classmethod
+    def execute(cls, **kwargs) -> str:
+        """ Execute the task
+
+        Keyword Args:
+            sport (str): Optional sport key to limit the update to
+
+        Returns:
+            str: A message indicating the result of the task
+        """
+        logger.info("Executing UpdateRatingsTask...")
+        rating_service = RatingService()
+
+        try:
+            filters = {'key': kwargs['sport']} if kwargs.get('sport') else {}
+            applied = rating_service.update(**filters)
+            return f"Applied {applied} results to the team ratings."
+        except Exception as e:
+            logger.error(f"Error updating team ratings: {str(e)}")
+            return "Error updating team ratings"
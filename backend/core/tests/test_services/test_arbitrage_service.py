@@ -0,0 +1,85 @@
+# In backend/core/tests/test_services/test_arbitrage_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import ArbitrageOpportunity, Event
+from core.services.arbitrage_service import ArbitrageService
+from core.services.odd_service import OddService
+from core.tasks.scan_arbitrage import ScanArbitrageTask
+from core.tests.utils import OddsTestCase, make_odds_payload
+
+
+def two_way(home_price, away_price):
+    return [('Sydney FC', home_price, None), ('Melbourne Victory', away_price, None)]
+
+
+class FindArbitrageTests(SimpleTestCase):
+
+    def columns(self, prices, bookmakers, names, events=None):
+        return {
+            'event': np.array(events or [0] * len(prices)),
+            'bookmaker': np.array(bookmakers),
+            'market': np.ones(len(prices), dtype=int),
+            'name': np.array(names),
+            'price': np.array(prices, dtype=float),
+            'point': np.full(len(prices), np.nan),
+        }
+
+    def test_detects_arbitrage_and_splits_stakes(self):
+        found = ArbitrageService.find_arbitrage(self.columns([2.1, 1.8, 1.8, 2.2], [1, 1, 2, 2], [10, 11, 10, 11]))
+
+        self.assertEqual(len(found['row']), 2)
+        self.assertEqual(sorted(found['row'].tolist()), [0, 3])
+        expected_sum = 1 / 2.1 + 1 / 2.2
+        self.assertAlmostEqual(found['implied_probability'][0], expected_sum)
+        self.assertAlmostEqual(found['stake'].sum(), 1.0)
+        # Equal payout on every leg
+        payouts = found['stake'] * np.array([2.1, 2.2])
+        self.assertAlmostEqual(payouts[0], payouts[1])
+
+    def test_no_arbitrage_when_margin_positive(self):
+        found = ArbitrageService.find_arbitrage(self.columns([1.9, 1.9, 1.85, 1.95], [1, 1, 2, 2], [10, 11, 10, 11]))
+        self.assertEqual(len(found['row']), 0)
+
+    def test_incomplete_market_is_not_arbitrage(self):
+        # Nobody quotes the draw of a three-way market
+        found = ArbitrageService.find_arbitrage(
+            self.columns([2.1, 2.2, 1.5, 3.0, 3.5], [1, 2, 3, 3, 3], [10, 11, 10, 11, 12]))
+        self.assertEqual(len(found['row']), 0)
+
+
+class ScanArbitrageTests(OddsTestCase):
+
+    def test_scan_stores_opportunities_and_deactivates_old_ones(self):
+        odd_service = OddService()
+        odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': two_way(2.1, 1.8)},
+            'tab': {'h2h': two_way(1.8, 2.2)},
+        })], timestamp='2029-12-31T08:00:00Z')
+
+        message = ScanArbitrageTask.execute(sport='soccer_australia_aleague')
+        self.assertEqual(message, "Found 1 arbitrage opportunities.")
+        opportunity = ArbitrageOpportunity.objects.get(active=True)
+        self.assertGreater(opportunity.profit_margin, 0)
+        self.assertEqual({leg['bookmaker'] for leg in opportunity.legs}, {'sportsbet', 'tab'})
+
+        odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': two_way(1.9, 1.9)},
+            'tab': {'h2h': two_way(1.9, 1.9)},
+        })], timestamp='2029-12-31T09:00:00Z')
+        ScanArbitrageTask.execute()
+        self.assertFalse(ArbitrageOpportunity.objects.filter(active=True).exists())
+        self.assertEqual(ArbitrageOpportunity.objects.count(), 1)
+
+    def test_scan_deactivates_opportunities_of_started_events(self):
+        OddService().upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': two_way(2.1, 1.8)},
+            'tab': {'h2h': two_way(1.8, 2.2)},
+        })], timestamp='2019-12-31T08:00:00Z')
+        ArbitrageService().scan()
+        Event.objects.filter(id='event1').update(commence_time='2020-01-01T08:00:00Z')
+
+        self.assertEqual(ArbitrageService().scan(event__sport_id='soccer_australia_aleague'), 0)
+        self.assertFalse(ArbitrageOpportunity.objects.filter(active=True).exists())
+
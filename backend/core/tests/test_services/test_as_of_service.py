@@ -0,0 +1,75 @@
+# In backend/core/tests/test_services/test_as_of_service.py
+
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.services.as_of_service import AsOfService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class MatchSnapshotsTests(SimpleTestCase):
+
+    def test_matches_latest_prior_snapshot_per_event(self):
+        odd_times = np.array(['2030-01-01T10:00', '2030-01-01T08:00', '2030-01-01T09:00', '2030-01-01T07:00'],
+                             dtype='datetime64[us]')
+        odd_events = np.array([0, 0, 1, 1])
+        lookup_events = np.array([0, 0, 0, 1, 2])
+        lookup_times = np.array(['2030-01-01T07:00', '2030-01-01T09:00', '2030-01-01T10:00', '2030-01-01T12:00',
+                                 '2030-01-01T12:00'], dtype='datetime64[us]')
+
+        matched = AsOfService.match_snapshots(odd_events, odd_times, lookup_events, lookup_times)
+
+        np.testing.assert_array_equal(matched, [-1, 1, 0, 2, -1])
+
+    def test_max_age(self):
+        matched = AsOfService.match_snapshots(np.array([0]), np.array(['2030-01-01T08:00'], dtype='datetime64[us]'),
+                                              np.array([0, 0]),
+                                              np.array(['2030-01-01T08:30', '2030-01-01T10:00'], dtype='datetime64[us]'),
+                                              max_age=np.timedelta64(3600, 's'))
+        np.testing.assert_array_equal(matched, [0, -1])
+
+    def test_validate_lookups(self):
+        with self.assertRaises(ValueError):
+            AsOfService.validate_lookups([])
+        with self.assertRaises(ValueError):
+            AsOfService.validate_lookups([{'event': 'event1', 'time': 'yesterday'}])
+
+    def test_validate_options(self):
+        AsOfService.validate_options(['h2h'], ['tab'], 0)
+        for options in ({'markets': 'h2h'}, {'bookmakers': ['tab', 1]}, {'max_age': [60]}, {'max_age': -1},
+                        {'max_age': True}, {'max_age': 1.5}):
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                AsOfService.validate_options(**options)
+
+
+class AsOfServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        odd_service = OddService()
+        for timestamp, home_price in (('2029-12-30T08:00:00Z', 2.4), ('2029-12-31T08:00:00Z', 2.0)):
+            odd_service.upsert_odds([
+                make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)},
+                                              'tab': {'h2h': h2h(home_price + 0.1, 3.3, 3.7)}}),
+            ], timestamp=timestamp)
+        self.as_of_service = AsOfService()
+
+    def test_lookup_returns_snapshot_in_force(self):
+        result = self.as_of_service.lookup([
+            {'event': 'event1', 'time': '2029-12-30T12:00:00Z'},
+            {'event': 'event1', 'time': '2029-12-31T08:00:00Z'},
+            {'event': 'event1', 'time': '2029-12-29T08:00:00Z'},
+            {'event': 'missing', 'time': '2029-12-31T08:00:00Z'},
+        ], bookmakers=['sportsbet'])
+
+        lookups = result['lookups']
+        self.assertEqual([lookup['timestamp'] for lookup in lookups],
+                         ['2029-12-30T08:00:00Z', '2029-12-31T08:00:00Z', None, None])
+        outcomes = result['outcomes']
+        self.assertEqual(set(outcomes['bookmaker']), {'sportsbet'})
+        home_prices = {odd: price for odd, name, price in zip(outcomes['odd'], outcomes['name'], outcomes['price'])
+                       if name == 'Sydney FC'}
+        self.assertEqual(home_prices, {lookups[0]['odd']: Decimal('2.4'), lookups[1]['odd']: Decimal('2.0')})
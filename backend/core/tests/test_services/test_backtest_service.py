@@ -0,0 +1,94 @@
+# In backend/core/tests/test_services/test_backtest_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import Event, EventResult
+from core.services import backtest
+from core.services.backtest_service import BacktestService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class BacktestTests(SimpleTestCase):
+
+    def test_max_drawdown(self):
+        self.assertEqual(backtest.max_drawdown(np.array([1.0, -2.0, 0.5, -1.0, 3.0])), 2.5)
+        self.assertEqual(backtest.max_drawdown(np.array([-1.0])), 1.0)
+        self.assertEqual(backtest.max_drawdown(np.zeros(0)), 0.0)
+
+    def test_invalid_strategy(self):
+        with self.assertRaises(ValueError):
+            backtest.Strategy(staking='martingale')
+        with self.assertRaises(ValueError):
+            backtest.Strategy(sides=('favourite', ))
+
+
+class BacktestServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = BacktestService()
+        # Opening, a day out and closing snapshots of a match the home side wins 2-1
+        for timestamp, tab, sportsbet in (('2029-12-30T08:00:00Z', 2.5, 2.4), ('2029-12-31T07:00:00Z', 2.2, 2.3),
+                                          ('2030-01-01T07:00:00Z', 2.0, 2.1), ('2030-01-01T09:00:00Z', 1.2, 1.2)):
+            OddService().upsert_odds([make_odds_payload(bookmakers={
+                'tab': {'h2h': h2h(tab, 3.4, 3.8)},
+                'sportsbet': {'h2h': h2h(sportsbet, 3.3, 3.9)},
+            })], timestamp=timestamp)
+        OddService().upsert_odds([make_odds_payload(event_id='event2',
+                                                    commence_time='2030-01-02T08:00:00Z',
+                                                    bookmakers={'tab': {'h2h': h2h(1.8, 3.6, 4.5)}})],
+                                 timestamp='2029-12-31T08:00:00Z')
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=2, away_score=1)
+        self.history = self.service.load_history()
+
+    def test_history_layout(self):
+        self.assertEqual(len(self.history['price']), 27)
+        self.assertEqual(self.history['is_home'].sum(), 9)
+        self.assertEqual(np.isnan(self.history['home_score']).sum(), 3)
+
+    def test_entry_time_best_price_and_clv(self):
+        bets, summary = self.service.run(
+            backtest.Strategy(sides=('home', ), best_price=True, entry_hours=24), self.history)
+
+        self.assertEqual(list(bets['event']), ['event1', 'event2'])
+        self.assertEqual(list(bets['bookmaker']), ['sportsbet', 'tab'])
+        self.assertEqual(bets['price'][0], 2.3)
+        self.assertAlmostEqual(bets['clv'][0], 2.3 / 2.1 - 1)
+        self.assertEqual(bets['result'][0], 1)
+        self.assertTrue(np.isnan(bets['result'][1]))
+        self.assertEqual((summary['bets'], summary['settled'], summary['staked']), (2, 1, 1.0))
+        self.assertAlmostEqual(summary['profit'], 1.3)
+        self.assertAlmostEqual(summary['roi'], 1.3)
+        self.assertEqual(summary['hit_rate'], 1.0)
+
+    def test_price_filters_and_to_win_staking(self):
+        bets, summary = self.service.run(
+            backtest.Strategy(min_price=3.7, bookmakers=('tab', ), staking='to_win', stake=2.0), self.history)
+
+        self.assertEqual(list(bets['name']), ['Melbourne Victory', 'Melbourne Victory'])
+        self.assertAlmostEqual(bets['stake'][0], 2.0 / 2.8)
+        self.assertAlmostEqual(summary['profit'], -2.0 / 2.8)
+        self.assertEqual(summary['max_drawdown'], 2.0 / 2.8)
+
+    def test_kelly_stakes_only_positive_edges(self):
+        bets, _ = self.service.run(backtest.Strategy(staking='kelly', stake=0.5, bankroll=100), self.history)
+
+        self.assertTrue(np.all(bets['edge'] > 0))
+        np.testing.assert_allclose(bets['stake'], 50 * bets['edge'] / (bets['price'] - 1))
+
+    def test_no_clv_when_the_point_moved(self):
+        for timestamp, point in (('2029-12-30T08:00:00Z', 3.5), ('2030-01-01T07:00:00Z', 4.5)):
+            spreads = [('Sydney FC', 1.9, -point), ('Melbourne Victory', 1.9, point)]
+            OddService().upsert_odds([make_odds_payload(bookmakers={'tab': {'spreads': spreads}})],
+                                     timestamp=timestamp)
+
+        bets, summary = self.service.run(
+            backtest.Strategy(markets=('spreads', ), sides=('home', ), entry_hours=24), self.service.load_history())
+
+        self.assertEqual((bets['point'][0], bets['closing_point'][0]), (-3.5, -4.5))
+        self.assertTrue(np.isnan(bets['clv'][0]))
+        self.assertEqual(bets['result'][0], 0)
+        self.assertIsNone(summary['clv'])
+
@@ -0,0 +1,94 @@
+# In backend/core/tests/test_services/test_bookmaker_stats_service.py
+
+from datetime import timedelta
+
+import numpy as np
+
+from core.models import BookmakerStat, BookmakerStatWatermark, ClosingLine, Event, EventResult, Odd
+from core.services.bookmaker_stats_service import BookmakerStatsService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class BookmakerStatsServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = BookmakerStatsService()
+        self.odd_service = OddService()
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+            'tab': {'h2h': h2h(1.9, 3.6, 4.0)},
+        })], timestamp='2029-12-30T08:00:00Z')
+
+    def stats(self, **kwargs):
+        return {row['bookmaker']: row for row in self.service.get_stats(sport_id='soccer_australia_aleague', **kwargs)}
+
+    def test_incremental_refresh(self):
+        self.service.refresh()
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.1, 3.3, 3.6)}})],
+                                     timestamp='2029-12-31T08:00:00Z')
+        self.service.refresh()
+
+        stats = self.stats()
+        sportsbet, tab = stats['sportsbet'], stats['tab']
+        self.assertEqual((sportsbet['books'], sportsbet['outcomes']), (2, 6))
+        self.assertAlmostEqual(sportsbet['overround'],
+                               np.mean([1 / 2.0 + 1 / 3.4 + 1 / 3.8, 1 / 2.1 + 1 / 3.3 + 1 / 3.6]))
+        self.assertAlmostEqual(sportsbet['best_price_rate'], 4 / 6)
+        self.assertAlmostEqual(tab['best_price_rate'], 2 / 3)
+        self.assertIsNone(tab['brier_score'])
+        self.assertEqual(BookmakerStat.objects.filter(bookmaker__key='sportsbet').count(), 2)
+        self.assertEqual(self.stats(start='2029-12-31')['sportsbet']['outcomes'], 3)
+
+        incremental = self.stats()
+        self.service.rebuild()
+        self.assertEqual(self.stats(), incremental)
+
+    def test_late_commits_and_reingested_snapshots_are_counted_once(self):
+        self.service.refresh()
+        watermark = BookmakerStatWatermark.objects.get(sport_id='soccer_australia_aleague').last_ingested_at
+
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.1, 3.3, 3.6)}})],
+                                     timestamp='2029-12-31T08:00:00Z')
+        # Committed by a concurrent ingest after the refresh read past it
+        Odd.objects.filter(timestamp__day=31).update(ingested_at=watermark - timedelta(minutes=1))
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+            'tab': {'h2h': h2h(1.9, 3.6, 4.0)},
+        })], timestamp='2029-12-30T08:00:00Z')
+        self.service.refresh()
+
+        stats = self.stats()
+        self.assertEqual((stats['sportsbet']['outcomes'], stats['tab']['outcomes']), (6, 3))
+
+    def test_closing_line_accuracy(self):
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=1, away_score=0)
+        self.service.refresh()
+
+        closing = dict(ClosingLine.objects.filter(bookmaker__key='tab').values_list('name__name', 'fair_probability'))
+        tab = self.stats()['tab']
+        self.assertEqual(tab['closing_outcomes'], 3)
+        self.assertAlmostEqual(tab['brier_score'], ((closing['Sydney FC'] - 1) ** 2 + closing['Draw'] ** 2 +
+                                                    closing['Melbourne Victory'] ** 2) / 3)
+        self.assertAlmostEqual(tab['log_loss'], -(np.log(closing['Sydney FC']) + np.log(1 - closing['Draw']) +
+                                                  np.log(1 - closing['Melbourne Victory'])) / 3)
+        # Results are only aggregated once
+        self.service.refresh()
+        self.assertEqual(self.stats()['tab']['closing_outcomes'], 3)
+
+    def test_corrected_score_restates_closing_line_accuracy(self):
+        result = EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=1, away_score=0)
+        self.service.refresh()
+        result.home_score, result.away_score = 0, 2
+        result.save()
+        self.service.refresh()
+
+        closing = dict(ClosingLine.objects.filter(bookmaker__key='tab').values_list('name__name', 'fair_probability'))
+        tab = self.stats()['tab']
+        self.assertEqual(tab['closing_outcomes'], 3)
+        self.assertAlmostEqual(tab['brier_score'], (closing['Sydney FC'] ** 2 + closing['Draw'] ** 2 +
+                                                    (closing['Melbourne Victory'] - 1) ** 2) / 3)
+        incremental = self.stats()
+        self.service.rebuild()
+        self.assertEqual(self.stats(), incremental)
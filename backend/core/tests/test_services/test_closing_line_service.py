@@ -0,0 +1,104 @@
+# In backend/core/tests/test_services/test_closing_line_service.py
+
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import ClosingLine, Event, EventResult, OpeningLine
+from core.services import odds_math
+from core.services.closing_line_service import ClosingLineService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class SettleOutcomesTests(SimpleTestCase):
+
+    def test_settles_h2h_spreads_and_totals(self):
+        result = odds_math.settle_outcomes(
+            market_keys=np.array(['h2h', 'h2h', 'h2h', 'spreads', 'spreads', 'totals', 'totals', 'totals']),
+            names=np.array(['Home', 'Away', 'Draw', 'Home', 'Away', 'Over', 'Under', 'Over']),
+            points=np.array([np.nan, np.nan, np.nan, -1.5, 1.5, 2.5, 2.5, 3.0]),
+            is_home=np.array([True, False, False, True, False, False, False, False]),
+            is_away=np.array([False, True, False, False, True, False, False, False]),
+            home_scores=np.full(8, 2.0),
+            away_scores=np.full(8, 1.0))
+        np.testing.assert_array_equal(result, [1, 0, 0, 0, 1, 1, 0, np.nan])
+
+    def test_missing_result_is_void(self):
+        result = odds_math.settle_outcomes(np.array(['h2h']), np.array(['Home']), np.array([np.nan]),
+                                           np.array([True]), np.array([False]), np.array([np.nan]),
+                                           np.array([np.nan]))
+        self.assertTrue(np.isnan(result[0]))
+        self.assertEqual(odds_math.settled_profit(np.array([2.0]), result)[0], 0)
+
+
+class ClosingLineServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.odd_service = OddService()
+
+    def ingest(self, timestamp, home_price):
+        self.odd_service.upsert_odds([make_odds_payload(commence_time='2030-01-01T08:00:00Z',
+                                                        bookmakers={'tab': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+
+    def ingest_history(self):
+        self.ingest('2029-12-31T08:00:00Z', 2.2)
+        self.ingest('2029-12-30T08:00:00Z', 2.4)
+        self.ingest('2030-01-01T07:00:00Z', 1.9)
+        self.ingest('2030-01-01T09:00:00Z', 1.2)  # In play, after commence time
+
+    def test_ingest_maintains_opening_and_closing_lines(self):
+        self.ingest_history()
+
+        self.assertEqual(OpeningLine.objects.get(name__name='Sydney FC').price, Decimal('2.4'))
+        self.assertEqual(ClosingLine.objects.get(name__name='Sydney FC').price, Decimal('1.9'))
+
+    def test_backfill_matches_incremental_tables(self):
+        self.ingest_history()
+        fields = ('bookmaker_id', 'market_id', 'name_id', 'price', 'timestamp')
+        opening = set(OpeningLine.objects.values_list(*fields))
+        closing = set(ClosingLine.objects.values_list(*fields))
+
+        opened, closed = ClosingLineService().backfill()
+
+        self.assertEqual((opened, closed), (3, 3))
+        self.assertEqual(opening, set(OpeningLine.objects.values_list(*fields)))
+        self.assertEqual(closing, set(ClosingLine.objects.values_list(*fields)))
+
+    def test_compute_clv_settles_against_results(self):
+        self.ingest_history()
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=2, away_score=0)
+
+        lines = ClosingLineService().compute_clv(sport_id='soccer_australia_aleague').set_index('name')
+
+        self.assertEqual(len(lines), 3)
+        self.assertAlmostEqual(lines.loc['Sydney FC', 'clv'], 2.4 / 1.9 - 1)
+        self.assertEqual(lines.loc['Sydney FC', 'result'], 1)
+        self.assertAlmostEqual(lines.loc['Sydney FC', 'profit'], 1.4)
+        self.assertEqual(lines.loc['Draw', 'result'], 0)
+
+        summary = ClosingLineService.summarise_clv(lines.reset_index())
+        self.assertEqual(summary.loc[0, 'lines'], 3)
+        self.assertAlmostEqual(summary.loc[0, 'roi'], (1.4 - 2) / 3)
+
+    def test_compute_clv_flags_moved_points_and_settles_on_the_opening_point(self):
+        for timestamp, point in (('2029-12-31T08:00:00Z', 3.5), ('2030-01-01T07:00:00Z', 4.5)):
+            spreads = [('Sydney FC', 1.9, -point), ('Melbourne Victory', 1.9, point)]
+            self.odd_service.upsert_odds([make_odds_payload(bookmakers={'tab': {'spreads': spreads}})],
+                                         timestamp=timestamp)
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=4, away_score=0)
+
+        lines = ClosingLineService().compute_clv().set_index('name')
+
+        self.assertEqual(lines.loc['Sydney FC', 'point'], -3.5)
+        self.assertEqual(lines.loc['Sydney FC', 'closing_point'], -4.5)
+        self.assertTrue(lines['point_moved'].all())
+        self.assertTrue(lines['clv'].isna().all())
+        self.assertEqual(lines.loc['Sydney FC', 'result'], 1)
+        self.assertEqual(lines.loc['Melbourne Victory', 'result'], 0)
+
+        summary = ClosingLineService.summarise_clv(lines.reset_index())
+        self.assertEqual(summary.loc[0, 'point_moved'], 2)
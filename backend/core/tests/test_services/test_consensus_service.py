@@ -0,0 +1,75 @@
+# In backend/core/tests/test_services/test_consensus_service.py
+
+from decimal import Decimal
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import MarketConsensus
+from core.services.consensus_service import ConsensusService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class ComputeConsensusTests(SimpleTestCase):
+
+    def test_best_price_median_and_fair_probability(self):
+        # Two bookmakers quoting a two-way market, the second one only quotes one side
+        columns = {
+            'event': np.array([0, 0, 0]),
+            'bookmaker': np.array([1, 1, 2]),
+            'market': np.array([1, 1, 1]),
+            'name': np.array([10, 11, 10]),
+            'price': np.array([1.9, 1.9, 2.1]),
+            'point': np.array([np.nan, np.nan, np.nan]),
+        }
+        consensus = ConsensusService.compute_consensus(columns)
+
+        home = int(np.where(columns['name'][consensus['row']] == 10)[0][0])
+        self.assertAlmostEqual(consensus['best_price'][home], 2.1)
+        self.assertEqual(consensus['best_bookmaker'][home], 2)
+        self.assertAlmostEqual(consensus['median_price'][home], 2.0)
+        self.assertEqual(consensus['bookmaker_count'][home], 2)
+        # Only the complete book contributes to the fair probability
+        self.assertAlmostEqual(consensus['fair_probability'][home], 0.5)
+
+    def test_lines_are_kept_apart(self):
+        columns = {
+            'event': np.zeros(4, dtype=int),
+            'bookmaker': np.array([1, 1, 1, 1]),
+            'market': np.array([2, 2, 2, 2]),
+            'name': np.array([20, 21, 20, 21]),
+            'price': np.array([1.9, 1.9, 1.5, 2.6]),
+            'point': np.array([44.5, 44.5, 40.5, 40.5]),
+        }
+        consensus = ConsensusService.compute_consensus(columns)
+        self.assertEqual(len(consensus['row']), 4)
+        self.assertEqual(sorted(set(consensus['line'])), [40.5, 44.5])
+
+
+class ConsensusServiceTests(OddsTestCase):
+
+    def test_ingest_refreshes_consensus(self):
+        OddService().upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+            'tab': {'h2h': h2h(2.2, 3.2, 3.5)},
+        })], timestamp='2029-12-31T08:00:00Z')
+
+        self.assertEqual(MarketConsensus.objects.count(), 3)
+        home = MarketConsensus.objects.get(name__name='Sydney FC')
+        self.assertEqual(home.best_price, Decimal('2.2'))
+        self.assertEqual(home.best_bookmaker.key, 'tab')
+        self.assertEqual(home.median_price, Decimal('2.1'))
+        self.assertEqual(home.bookmaker_count, 2)
+        total = sum(MarketConsensus.objects.values_list('fair_probability', flat=True))
+        self.assertAlmostEqual(total, 1.0)
+
+    def test_board_only_lists_upcoming_events(self):
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'tab': {'h2h': h2h(2.2, 3.2, 3.5)}}),
+            make_odds_payload(event_id='past', commence_time='2020-01-01T08:00:00Z',
+                              bookmakers={'tab': {'h2h': h2h(2.2, 3.2, 3.5)}}),
+        ], timestamp='2019-12-31T08:00:00Z')
+
+        board = ConsensusService().get_board()
+        self.assertEqual({row['event_id'] for row in board}, {'event1'})
@@ -0,0 +1,96 @@
+# In backend/core/tests/test_services/test_export_service.py
+
+import os
+import tempfile
+from datetime import timedelta
+
+import pyarrow.parquet as pq
+from django.test import override_settings
+from django.utils import timezone
+
+from core.models import Event, EventResult, ExportWatermark, Odd
+from core.services.export_service import ExportService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+@override_settings(WATERMARK_OVERLAP_MINUTES=0)
+class ExportServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.export_dir = tempfile.TemporaryDirectory()
+        self.export_service = ExportService(export_dir=self.export_dir.name)
+        self.odd_service = OddService()
+        self.ingest('2029-12-31T08:00:00Z')
+
+    def tearDown(self):
+        self.export_dir.cleanup()
+
+    def ingest(self, timestamp):
+        self.odd_service.upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='event2',
+                              sport_key='basketball_nba',
+                              home_team='Boston Celtics',
+                              away_team='Miami Heat',
+                              bookmakers={'tab': {'h2h': [('Boston Celtics', 1.5, None), ('Miami Heat', 2.6, None)]}}),
+        ], timestamp=timestamp)
+
+    def read(self, dataset):
+        return pq.read_table(os.path.join(self.export_dir.name, dataset)).to_pandas()
+
+    def test_export_partitions_by_sport_and_month(self):
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=2, away_score=1)
+
+        counts = self.export_service.export()
+
+        self.assertEqual(counts, {'events': 2, 'results': 1, 'odds': 2, 'outcomes': 5})
+        self.assertTrue(os.path.isdir(os.path.join(self.export_dir.name, 'outcomes', 'sport=basketball_nba',
+                                                   'month=2029-12')))
+        outcomes = self.read('outcomes')
+        self.assertEqual(set(outcomes['sport']), {'soccer_australia_aleague', 'basketball_nba'})
+        self.assertAlmostEqual(outcomes.loc[outcomes['name'] == 'Sydney FC', 'price'].iloc[0], 2.0)
+        self.assertEqual(self.read('results')['home_score'].tolist(), [2])
+
+    def test_export_is_incremental(self):
+        self.export_service.export(datasets=['odds', 'outcomes'])
+        self.ingest('2030-01-01T07:00:00Z')
+
+        counts = self.export_service.export(datasets=['odds', 'outcomes'])
+
+        self.assertEqual(counts, {'odds': 2, 'outcomes': 5})
+        self.assertEqual(len(self.read('outcomes')), 10)
+        self.assertEqual(ExportWatermark.objects.get(dataset='outcomes').rows, 10)
+        self.assertEqual(self.export_service.export(datasets=['outcomes']), {'outcomes': 0})
+
+    @override_settings(WATERMARK_OVERLAP_MINUTES=10)
+    def test_export_waits_for_the_overlap_window(self):
+        Odd.objects.update(ingested_at=timezone.now() - timedelta(minutes=25))
+        self.export_service.export(datasets=['odds'])
+        self.ingest('2030-01-01T07:00:00Z')
+
+        self.assertEqual(self.export_service.export(datasets=['odds']), {'odds': 0})
+        # Ten minutes later the snapshots are past the window and still after the watermark
+        watermark = ExportWatermark.objects.get(dataset='odds')
+        watermark.last_ingested_at -= timedelta(minutes=10)
+        watermark.save()
+        Odd.objects.filter(timestamp__year=2030).update(ingested_at=timezone.now() - timedelta(minutes=11))
+        self.assertEqual(self.export_service.export(datasets=['odds']), {'odds': 2})
+        self.assertEqual(len(self.read('odds').drop_duplicates('id')), 4)
+
+    def test_outcome_columns_are_dictionary_encoded(self):
+        self.export_service.export(datasets=['outcomes'])
+        path = next(os.path.join(directory, name)
+                    for directory, _, files in os.walk(os.path.join(self.export_dir.name, 'outcomes'))
+                    for name in files)
+
+        metadata = pq.ParquetFile(path).metadata
+        encodings = {metadata.schema.column(i).name: metadata.row_group(0).column(i).encodings
+                     for i in range(metadata.num_columns)}
+        self.assertIn('RLE_DICTIONARY', encodings['bookmaker'])
+        self.assertNotIn('sport', encodings)
+
+    def test_unknown_dataset(self):
+        with self.assertRaises(ValueError):
+            self.export_service.export(datasets=['bets'])
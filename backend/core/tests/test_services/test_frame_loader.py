@@ -0,0 +1,63 @@
+# In backend/core/tests/test_services/test_frame_loader.py
+
+import numpy as np
+import pandas as pd
+
+from core.models import Event, EventResult, Outcome
+from core.services import frame_loader
+from core.services.event_service import EventService
+from core.services.latest_outcome_service import LatestOutcomeService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class FrameLoaderTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+                                          'tab': {'spreads': [('Sydney FC', 1.9, -0.5), ('Melbourne Victory', 1.9, 0.5)]}}),
+        ], timestamp='2029-12-31T08:00:00Z')
+
+    def test_load_columns_types(self):
+        columns = frame_loader.load_columns(Outcome.objects.order_by('id'),
+                                            ['id', 'price', 'point', 'odd__timestamp', 'bookmaker__key'],
+                                            chunk_size=2)
+
+        self.assertEqual(columns['id'].dtype, np.int64)
+        self.assertEqual(len(columns['id']), 5)
+        self.assertEqual(columns['price'].dtype, np.float64)
+        self.assertEqual(np.isnan(columns['point']).sum(), 3)
+        self.assertEqual(columns['odd__timestamp'][0], np.datetime64('2029-12-31T08:00:00', 'us'))
+        self.assertEqual(set(columns['bookmaker__key']), {'sportsbet', 'tab'})
+
+    def test_load_columns_categorical_codes(self):
+        columns = frame_loader.load_columns(Outcome.objects.order_by('id'), ['bookmaker__key'],
+                                            categorical=['bookmaker__key'])
+
+        self.assertEqual(list(columns['bookmaker__key_keys']), ['sportsbet', 'tab'])
+        np.testing.assert_array_equal(columns['bookmaker__key'], [0, 0, 0, 1, 1])
+
+    def test_nullable_relation_is_float_or_missing(self):
+        EventResult.objects.create(event=Event.objects.get(), home_score=None, away_score=1)
+
+        columns = frame_loader.load_columns(EventResult.objects.all(), ['home_score', 'away_score', 'winner_id'])
+
+        self.assertTrue(np.isnan(columns['home_score'][0]))
+        self.assertEqual(columns['away_score'][0], 1)
+        self.assertTrue(np.isnan(columns['winner_id'][0]))
+
+    def test_load_frame_matches_values(self):
+        frame = LatestOutcomeService().get_latest_outcomes_frame()
+        values = pd.DataFrame(LatestOutcomeService().get_latest_outcomes())
+
+        self.assertEqual(list(frame.columns), list(values.columns))
+        self.assertIsInstance(frame['bookmaker_id'].dtype, pd.CategoricalDtype)
+        self.assertEqual(sorted(frame['price']), sorted(values['price'].astype(float)))
+
+    def test_service_frame_variants(self):
+        events = EventService().get_events_frame(sport_id='soccer_australia_aleague')
+
+        self.assertEqual(list(events['id']), ['event1'])
+        self.assertEqual(list(events['sport_id'].cat.categories), ['soccer_australia_aleague'])
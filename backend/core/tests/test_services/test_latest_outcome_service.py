@@ -0,0 +1,74 @@
+# In backend/core/tests/test_services/test_latest_outcome_service.py
+
+from decimal import Decimal
+
+from core.models import LatestOutcome
+from core.services.latest_outcome_service import LatestOutcomeService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class LatestOutcomeServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.odd_service = OddService()
+
+    def ingest(self, timestamp, bookmakers):
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers=bookmakers)], timestamp=timestamp)
+
+    def test_ingest_creates_latest_rows(self):
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.assertEqual(LatestOutcome.objects.count(), 3)
+        home = LatestOutcome.objects.get(name__name='Sydney FC')
+        self.assertEqual(home.price, Decimal('2.0'))
+
+    def test_newer_snapshot_replaces_prices(self):
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T09:00:00Z', {'sportsbet': {'h2h': h2h(1.9, 3.5, 4.0)}})
+        self.assertEqual(LatestOutcome.objects.count(), 3)
+        home = LatestOutcome.objects.get(name__name='Sydney FC')
+        self.assertEqual(home.price, Decimal('1.9'))
+        self.assertEqual(home.timestamp.hour, 9)
+
+    def test_older_snapshot_is_ignored(self):
+        self.ingest('2029-12-31T09:00:00Z', {'sportsbet': {'h2h': h2h(1.9, 3.5, 4.0)}})
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        home = LatestOutcome.objects.get(name__name='Sydney FC')
+        self.assertEqual(home.price, Decimal('1.9'))
+
+    def test_newer_snapshot_removes_withdrawn_prices(self):
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+                                             'tab': {'h2h': h2h(2.1, 3.3, 3.6)}})
+        self.ingest('2029-12-31T09:00:00Z', {'sportsbet': {'h2h': h2h(1.9, 3.5, 4.0)[:2]}})
+
+        # The snapshot only speaks for the bookmaker markets it quotes
+        self.assertEqual(set(LatestOutcome.objects.values_list('bookmaker__key', 'name__name')),
+                         {('sportsbet', 'Sydney FC'), ('sportsbet', 'Draw'),
+                          ('tab', 'Sydney FC'), ('tab', 'Draw'), ('tab', 'Melbourne Victory')})
+
+    def test_polls_split_by_market_keep_each_others_prices(self):
+        spreads = [('Sydney FC', 1.9, -0.5), ('Melbourne Victory', 1.9, 0.5)]
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T08:01:00Z', {'sportsbet': {'spreads': spreads}})
+        self.ingest('2029-12-31T09:00:00Z', {'sportsbet': {'h2h': h2h(1.9, 3.5, 4.0)}})
+        # A late spreads poll is older than the stored h2h prices but not than the stored spreads
+        self.ingest('2029-12-31T08:30:00Z', {'sportsbet': {'spreads': spreads[:1]}})
+
+        self.assertEqual(set(LatestOutcome.objects.values_list('market__key', 'name__name', 'timestamp__minute')),
+                         {('h2h', 'Sydney FC', 0), ('h2h', 'Draw', 0), ('h2h', 'Melbourne Victory', 0),
+                          ('spreads', 'Sydney FC', 30)})
+
+    def test_rebuild_matches_incremental_table(self):
+        self.ingest('2029-12-31T08:00:00Z', {'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+                                             'tab': {'h2h': h2h(2.1, 3.3, 3.6)}})
+        self.ingest('2029-12-31T10:00:00Z', {'sportsbet': {'h2h': h2h(1.8, 3.5, 4.2)}})
+        self.ingest('2029-12-31T09:00:00Z', {'sportsbet': {'h2h': h2h(1.9, 3.5, 4.0)},
+                                             'tab': {'h2h': h2h(2.0, 3.3, 3.6)}})
+        before = set(LatestOutcome.objects.values_list('bookmaker__key', 'name__name', 'price', 'timestamp'))
+
+        count = LatestOutcomeService().rebuild()
+
+        self.assertEqual(count, 6)
+        after = set(LatestOutcome.objects.values_list('bookmaker__key', 'name__name', 'price', 'timestamp'))
+        self.assertEqual(before, after)
@@ -0,0 +1,72 @@
+# In backend/core/tests/test_services/test_lead_lag_service.py
+
+from datetime import datetime, timedelta
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import LeadLag
+from core.services import lead_lag
+from core.services.lead_lag_service import LeadLagService
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+def random_walk(n, seed=0):
+    return np.round(2.0 * np.exp(np.cumsum(np.random.default_rng(seed).normal(0, 0.02, n))), 2)
+
+
+class LeadLagTests(SimpleTestCase):
+
+    def test_price_matrix_keeps_last_quote_and_forward_fills(self):
+        matrix = lead_lag.price_matrix(np.array([0, 0, 0, 1]), np.array([1, 1, 3, 0]), np.array([10, 20, 30, 5]),
+                                       np.array([2.0, 2.1, 2.2, 3.0]), 2, 4)
+        np.testing.assert_array_equal(matrix, [[np.nan, 2.1, 2.1, 2.2], [3.0, 3.0, 3.0, 3.0]])
+
+    def test_correlate_finds_the_lag(self):
+        leader = random_walk(200)
+        follower = np.concatenate((np.full(3, leader[0]), leader[:-3]))
+        flat = np.full(200, 1.9)
+        first, second, correlations = lead_lag.correlate(np.vstack((follower, leader, flat)), max_lag=6)
+
+        # The flat series never moves and is left out
+        np.testing.assert_array_equal(first, [0])
+        np.testing.assert_array_equal(second, [1])
+        self.assertEqual(np.argmax(correlations[0]) - 6, 3)
+        self.assertAlmostEqual(correlations[0].max(), 1.0, places=1)
+
+    def test_summarise_orders_leader_and_follower(self):
+        sums = np.zeros((2, 5))
+        sums[0, 3] = 1.6  # Bookmaker 2 leads bookmaker 1 by one bin
+        sums[1, 2] = 0.5
+        pairs = LeadLagService().summarise({'keys': np.array([[7, 1, 2], [7, 1, 3]]), 'sums': sums,
+                                            'counts': np.array([2, 1])}, resolution=300, max_lag=2)
+        self.assertEqual([(pair['leader_id'], pair['follower_id'], pair['lag_seconds']) for pair in pairs],
+                         [(2, 1, 300), (1, 3, 0)])
+        self.assertAlmostEqual(pairs[0]['correlation'], 0.8)
+        self.assertEqual(pairs[0]['series'], 2)
+
+
+class LeadLagServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        home = random_walk(60, seed=3)
+        away = random_walk(60, seed=4)
+        start = datetime(2029, 12, 1)
+        odd_service = OddService()
+        for i in range(60):
+            # sportsbet repeats tab's prices two snapshots (ten minutes) later
+            j = max(i - 2, 0)
+            odd_service.upsert_odds([make_odds_payload(bookmakers={
+                'tab': {'h2h': h2h(home[i], 3.4, away[i])},
+                'sportsbet': {'h2h': h2h(home[j], 3.4, away[j])},
+            })], timestamp=f"{start + timedelta(minutes=5 * i):%Y-%m-%dT%H:%M:%SZ}")
+
+    def test_analyse_stores_leader(self):
+        for processes in (1, 2):
+            self.assertEqual(LeadLagService().analyse(processes=processes, key='soccer_australia_aleague'), 1)
+            pair = LeadLag.objects.get()
+            self.assertEqual((pair.leader.key, pair.follower.key, pair.lag_seconds), ('tab', 'sportsbet', 600))
+            self.assertEqual(pair.series, 2)
+            self.assertGreater(pair.correlation, pair.zero_lag_correlation)
@@ -0,0 +1,91 @@
+# In backend/core/tests/test_services/test_line_movement_service.py
+
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from core.models import LineMovement
+from core.services.odd_service import OddService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+@override_settings(LINE_MOVEMENT_STREAM='', LINE_MOVEMENT_ALERT_THRESHOLD=0.1, LINE_MOVEMENT_LEAD_WINDOW=30)
+class LineMovementServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.odd_service = OddService()
+
+    def ingest(self, timestamp, bookmakers):
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers=bookmakers)], timestamp=timestamp)
+
+    def test_first_snapshot_has_no_movements(self):
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.assertFalse(LineMovement.objects.exists())
+
+    def test_records_changed_prices_only(self):
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T10:00:00Z', {'tab': {'h2h': h2h(1.5, 3.4, 3.8)}})
+
+        movement = LineMovement.objects.get()
+        self.assertEqual(movement.name.name, 'Sydney FC')
+        self.assertEqual(movement.previous_price, Decimal('2.0'))
+        self.assertEqual(movement.price, Decimal('1.5'))
+        self.assertAlmostEqual(movement.delta, -0.5)
+        self.assertAlmostEqual(movement.delta_percent, -0.25)
+        self.assertAlmostEqual(movement.velocity, -0.25)
+        self.assertTrue(movement.is_alert)
+        self.assertTrue(movement.first_mover)
+
+    def test_follower_is_linked_to_first_mover(self):
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)},
+                                             'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T08:05:00Z', {'tab': {'h2h': h2h(1.9, 3.4, 3.8)},
+                                             'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T08:10:00Z', {'tab': {'h2h': h2h(1.9, 3.4, 3.8)},
+                                             'sportsbet': {'h2h': h2h(1.95, 3.4, 3.8)}})
+
+        leader = LineMovement.objects.get(bookmaker__key='tab')
+        follower = LineMovement.objects.get(bookmaker__key='sportsbet')
+        self.assertTrue(leader.first_mover)
+        self.assertFalse(leader.is_alert)
+        self.assertFalse(follower.first_mover)
+        self.assertEqual(follower.led_by, leader.bookmaker)
+
+    def test_compares_with_the_stored_latest_prices(self):
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T09:00:00Z', {'tab': {'h2h': h2h(1.8, 3.4, 3.8)}})
+        self.ingest('2029-12-31T09:00:00Z', {'tab': {'h2h': h2h(1.8, 3.4, 3.8)}})
+        self.ingest('2029-12-31T11:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+
+        first, reversion = LineMovement.objects.order_by('timestamp')
+        self.assertEqual((first.previous_price, first.price), (Decimal('2.0'), Decimal('1.8')))
+        self.assertEqual((reversion.previous_price, reversion.price), (Decimal('1.8'), Decimal('2.0')))
+        self.assertEqual(reversion.previous_timestamp.hour, 9)
+        self.assertAlmostEqual(reversion.velocity, 0.1)
+
+    def test_older_snapshot_is_not_a_movement(self):
+        self.ingest('2029-12-31T09:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.5, 3.4, 3.8)}})
+        self.assertFalse(LineMovement.objects.exists())
+
+    @override_settings(LINE_MOVEMENT_STREAM='test:line_movements')
+    @patch('core.services.line_movement_service.redis.Redis')
+    def test_movements_are_published_to_stream_on_commit(self, mock_redis):
+        self.ingest('2029-12-31T08:00:00Z', {'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})
+        pipeline = mock_redis.return_value.pipeline.return_value
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.ingest('2029-12-31T09:00:00Z', {'tab': {'h2h': h2h(1.8, 3.4, 4.2)}})
+        pipeline.xadd.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(pipeline.xadd.call_count, 2)
+        self.assertEqual(pipeline.xadd.call_args[0][0], 'test:line_movements')
+        pipeline.execute.assert_called_once()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingest('2029-12-31T10:00:00Z', {'tab': {'h2h': h2h(1.6, 3.4, 4.2)}})
+        self.assertEqual(pipeline.execute.call_count, 2)
+        mock_redis.assert_called_once()
@@ -0,0 +1,25 @@
+# In backend/core/tests/test_services/test_odds_format.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.services import odds_format
+
+
+class OddsFormatTests(SimpleTestCase):
+
+    def test_convert(self):
+        prices = np.array([2.1, 1.5, 1.91, 3.0, 2.0, 1.0, np.nan])
+        self.assertEqual(odds_format.convert(prices, 'american').tolist(), [110, -200, -110, 200, 100, None, None])
+        self.assertEqual(odds_format.convert(prices, 'fractional').tolist(),
+                         ['11/10', '1/2', '91/100', '2/1', '1/1', None, None])
+        self.assertEqual(odds_format.convert(prices, 'decimal').tolist(), [2.1, 1.5, 1.91, 3.0, 2.0, 1.0, None])
+        with self.assertRaises(ValueError):
+            odds_format.convert(prices, 'hongkong')
+
+    def test_convert_rows(self):
+        rows = [{'id': 1, 'best_price': '2.5000', 'fair_price': None}, {'id': 2, 'best_price': '1.2000',
+                                                                        'fair_price': '1.2500'}]
+        odds_format.convert_rows(rows, ['best_price', 'fair_price'], 'fractional')
+        self.assertEqual(rows, [{'id': 1, 'best_price': '3/2', 'fair_price': None},
+                                {'id': 2, 'best_price': '1/5', 'fair_price': '1/4'}])
@@ -0,0 +1,79 @@
+# In backend/core/tests/test_services/test_odds_history_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.services.odd_service import OddService
+from core.services.odds_history_service import OddsHistoryService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class LttbTests(SimpleTestCase):
+
+    def test_keeps_ends_and_extremes(self):
+        x = np.arange(100)
+        y = np.ones(100)
+        y[37], y[71] = 5.0, -3.0
+
+        kept = OddsHistoryService.lttb(x, y, 10)
+
+        self.assertEqual(len(kept), 10)
+        self.assertEqual((kept[0], kept[-1]), (0, 99))
+        self.assertTrue(np.all(np.diff(kept) > 0))
+        self.assertIn(37, kept)
+        self.assertIn(71, kept)
+
+    def test_short_series_is_returned_whole(self):
+        np.testing.assert_array_equal(OddsHistoryService.lttb(np.arange(4), np.arange(4), 10), np.arange(4))
+
+
+class OddsHistoryServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = OddsHistoryService()
+        for hour, price in enumerate([2.0, 2.1, 2.6, 2.2, 2.3, 2.2]):
+            OddService().upsert_odds([
+                make_odds_payload(bookmakers={'tab': {'h2h': h2h(price, 3.4, 3.8)}}),
+                make_odds_payload(event_id='event2',
+                                  home_team='Melbourne Victory',
+                                  away_team='Adelaide United',
+                                  bookmakers={'tab': {'h2h': h2h(1.9, 3.5, 4.0, 'Melbourne Victory', 'Adelaide United')}}),
+            ], timestamp=f"2029-12-31T0{hour}:00:00Z")
+
+    def test_batch_history_is_downsampled_per_series(self):
+        history = self.service.history(['event2', 'event1', 'missing'], points=4)
+
+        self.assertEqual([event['event'] for event in history['events']], ['event2', 'event1', 'missing'])
+        self.assertEqual(len(history['events'][1]['series']), 3)
+        self.assertEqual(history['events'][2]['series'], [])
+        home = next(series for series in history['events'][1]['series'] if series['name'] == 'Sydney FC')
+        self.assertEqual(home['ticks'], 6)
+        self.assertEqual(len(home['timestamps']), 4)
+        self.assertEqual(home['prices'][0], 2.0)
+        self.assertIn(2.6, home['prices'])
+        self.assertEqual(home['prices'][-1], 2.2)
+        self.assertIsNone(home['points'][0])
+
+    def test_lines_are_separate_series(self):
+        for hour, point in enumerate([2.5, 2.5, 3.0]):
+            OddService().upsert_odds([
+                make_odds_payload(event_id='event3',
+                                  bookmakers={'tab': {'totals': [('Over', 1.9, point), ('Under', 1.9, point)]}}),
+            ], timestamp=f"2029-12-30T0{hour}:00:00Z")
+        history = self.service.history(['event3'], market='totals')
+
+        over = {series['point']: series for series in history['events'][0]['series'] if series['name'] == 'Over'}
+        self.assertEqual(set(over), {2.5, 3.0})
+        self.assertEqual(over[2.5]['ticks'], 2)
+        self.assertEqual(over[3.0]['points'], [3.0])
+
+    def test_time_range(self):
+        history = self.service.history(['event1'], start='2029-12-31T02:00:00Z', end='2029-12-31T04:00:00Z')
+        home = next(series for series in history['events'][0]['series'] if series['name'] == 'Sydney FC')
+        self.assertEqual(home['prices'], [2.6, 2.2])
+
+    def test_invalid_requests(self):
+        for kwargs in ({'events': []}, {'events': ['event1'], 'points': 2}, {'events': ['event1'], 'start': 'soon'}):
+            with self.assertRaises(ValueError):
+                self.service.history(**kwargs)
@@ -0,0 +1,65 @@
+# In backend/core/tests/test_services/test_outcome_metrics_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import LatestOutcome, Odd, Outcome
+from core.services.odd_service import OddService
+from core.services.outcome_metrics_service import OutcomeMetricsService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class ComputeMetricsTests(SimpleTestCase):
+
+    def test_metrics_of_a_complete_book(self):
+        metrics = OutcomeMetricsService.compute_metrics({
+            'event': np.zeros(2, dtype=int),
+            'bookmaker': np.array([1, 1]),
+            'market': np.array([1, 1]),
+            'name': np.array([10, 11]),
+            'price': np.array([1.8, 2.0]),
+            'point': np.full(2, np.nan),
+        })
+        np.testing.assert_allclose(metrics['implied_probability'], [1 / 1.8, 0.5])
+        overround = 1 / 1.8 + 0.5
+        np.testing.assert_allclose(metrics['overround'], [overround, overround])
+        np.testing.assert_allclose(metrics['fair_probability'], [(1 / 1.8) / overround, 0.5 / overround])
+
+    def test_incomplete_book_has_no_fair_probability(self):
+        metrics = OutcomeMetricsService.compute_metrics({
+            'event': np.zeros(3, dtype=int),
+            'bookmaker': np.array([1, 1, 2]),
+            'market': np.array([1, 1, 1]),
+            'name': np.array([10, 11, 10]),
+            'price': np.array([1.8, 2.0, 1.9]),
+            'point': np.full(3, np.nan),
+        })
+        self.assertTrue(np.isnan(metrics['fair_probability'][2]))
+        self.assertTrue(np.isnan(metrics['overround'][2]))
+        self.assertAlmostEqual(metrics['implied_probability'][2], 1 / 1.9)
+
+
+class OutcomeMetricsServiceTests(OddsTestCase):
+
+    def test_ingest_stores_metrics_on_outcomes_and_latest_prices(self):
+        OddService().upsert_odds([make_odds_payload(bookmakers={'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})],
+                                 timestamp='2029-12-31T08:00:00Z')
+
+        overround = 1 / 2.0 + 1 / 3.4 + 1 / 3.8
+        for model in (Outcome, LatestOutcome):
+            home = model.objects.get(name__name='Sydney FC')
+            self.assertAlmostEqual(home.implied_probability, 0.5)
+            self.assertAlmostEqual(home.overround, overround)
+            self.assertAlmostEqual(home.fair_probability, 0.5 / overround)
+
+    def test_backfill_fills_missing_metrics(self):
+        OddService().upsert_odds([make_odds_payload(bookmakers={'tab': {'h2h': h2h(2.0, 3.4, 3.8)}})],
+                                 timestamp='2029-12-31T08:00:00Z')
+        Outcome.objects.update(implied_probability=None, overround=None, fair_probability=None, timestamp=None)
+
+        count = OutcomeMetricsService().backfill()
+
+        self.assertEqual(count, 3)
+        self.assertFalse(Outcome.objects.filter(fair_probability__isnull=True).exists())
+        self.assertEqual(set(Outcome.objects.values_list('timestamp', flat=True)),
+                         set(Odd.objects.values_list('timestamp', flat=True)))
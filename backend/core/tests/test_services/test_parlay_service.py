@@ -0,0 +1,94 @@
+# In backend/core/tests/test_services/test_parlay_service.py
+
+from itertools import combinations
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import Event, Market, ModelProbability, Team
+from core.services import parlay
+from core.services.odd_service import OddService
+from core.services.parlay_service import ParlayService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class TopParlaysTests(SimpleTestCase):
+
+    def test_matches_brute_force(self):
+        rng = np.random.default_rng(7)
+        for _ in range(50):
+            n = int(rng.integers(1, 20))
+            events, scores = rng.integers(0, 6, n), rng.normal(size=n)
+            scores[rng.random(n) < 0.1] = -np.inf
+            n_legs, k = int(rng.integers(1, 4)), int(rng.integers(1, 5))
+            found, totals = parlay.top_parlays(events, scores, n_legs, k)
+            expected = sorted((scores[list(legs)].sum() for legs in combinations(range(n), n_legs)
+                               if len(set(events[list(legs)])) == n_legs and np.isfinite(scores[list(legs)]).all()),
+                              reverse=True)[:k]
+            np.testing.assert_allclose(totals, expected)
+            np.testing.assert_allclose(scores[found].sum(axis=1), totals)
+            self.assertTrue(all(len(set(events[legs])) == n_legs for legs in found))
+
+    def test_best_legs_and_combine(self):
+        legs = parlay.best_legs({
+            'event': np.array([0, 0, 0, 0, 1, 1]),
+            'bookmaker': np.array([1, 2, 1, 2, 1, 2]),
+            'market': np.ones(6, dtype=np.int64),
+            'name': np.array([10, 10, 11, 11, 12, 12]),
+            'point': np.full(6, np.nan),
+            'price': np.array([1.9, 2.1, 2.0, 1.8, 3.0, 3.2]),
+            'fair_probability': np.array([0.5, 0.46, 0.5, 0.54, np.nan, 0.3]),
+        })
+        np.testing.assert_array_equal(legs['bookmaker'], [2, 1, 2])
+        np.testing.assert_allclose(legs['price'], [2.1, 2.0, 3.2])
+        np.testing.assert_allclose(legs['probability'], [0.48, 0.52, 0.3])
+
+        combined = parlay.combine(np.array([[0, 2]]), legs['price'], legs['probability'], np.array([0.0, 0.0, 0.1]))
+        np.testing.assert_allclose(combined['price'], [2.1 * 3.2])
+        np.testing.assert_allclose(combined['probability'], [0.48 * 0.3])
+        np.testing.assert_allclose(combined['expected_value'], [2.1 * 0.48 * (3.2 * 0.3 + 0.1) - 1])
+
+
+class ParlayServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={
+                'sportsbet': {'h2h': h2h(2.1, 3.4, 3.8)},
+                'tab': {'h2h': h2h(1.8, 3.6, 4.2)},
+            }),
+            make_odds_payload(event_id='event2', home_team='Adelaide United', away_team='Perth Glory', bookmakers={
+                'sportsbet': {'h2h': h2h(2.5, 3.3, 2.9, 'Adelaide United', 'Perth Glory')},
+                'tab': {'h2h': h2h(2.4, 3.5, 3.0, 'Adelaide United', 'Perth Glory')},
+            }),
+        ], timestamp='2029-12-31T08:00:00Z')
+
+    def test_best_price_parlays(self):
+        result = ParlayService().price(legs=2, top=1, objective='price')
+        self.assertEqual(result['candidates'], 6)
+        best = result['parlays'][0]
+        self.assertAlmostEqual(best['price'], 4.2 * 3.5)
+        self.assertEqual({(leg['event'], leg['name'], leg['bookmaker']) for leg in best['legs']},
+                         {('event1', 'Melbourne Victory', 'tab'), ('event2', 'Draw', 'tab')})
+
+        result = ParlayService().price(legs=2, top=3, objective='price', bookmakers=['sportsbet'], max_price=3.5)
+        self.assertAlmostEqual(result['parlays'][0]['price'], 3.4 * 3.3)
+        self.assertEqual(len(result['parlays']), 3)
+        self.assertEqual(ParlayService().price(legs=3)['parlays'], [])
+
+    def test_model_probabilities(self):
+        market = Market.objects.get(key='h2h')
+        for name, probability in (('Sydney FC', 0.55), ('Draw', 0.25), ('Melbourne Victory', 0.2)):
+            ModelProbability.objects.create(event=Event.objects.get(id='event1'), market=market,
+                                            name=Team.objects.get(name=name), probability=probability)
+        service = ParlayService()
+        self.assertEqual(service.price(legs=2, source='model')['parlays'], [])
+        best = service.price(legs=1, top=1, source='model')['parlays'][0]
+        self.assertEqual((best['legs'][0]['name'], best['legs'][0]['bookmaker']), ('Sydney FC', 'sportsbet'))
+        self.assertAlmostEqual(best['expected_value'], 0.155)
+
+    def test_invalid_request(self):
+        for kwargs in ({'legs': 0}, {'top': 'ten'}, {'objective': 'odds'}, {'source': 'tipster'}):
+            with self.assertRaises(ValueError):
+                ParlayService().price(**kwargs)
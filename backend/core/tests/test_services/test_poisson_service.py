@@ -0,0 +1,135 @@
+# In backend/core/tests/test_services/test_poisson_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import Event, EventResult, ModelProbability, PoissonFit, ScoreMatrix, TeamStrength
+from core.services.odd_service import OddService
+from core.services.poisson_service import PoissonService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class PoissonModelTests(SimpleTestCase):
+
+    def test_fit_recovers_strengths(self):
+        rng = np.random.default_rng(7)
+        attack = np.exp(rng.normal(0, 0.3, size=8))
+        attack /= attack.mean()
+        defence = np.exp(rng.normal(0, 0.3, size=8))
+        home, away = np.array([(h, a) for h in range(8) for a in range(8) if h != a] * 60).T
+        home_goals = rng.poisson(1.3 * attack[home] * defence[away])
+        away_goals = rng.poisson(attack[away] * defence[home])
+
+        fitted = PoissonService.fit(home, away, home_goals, away_goals, 8)
+
+        self.assertAlmostEqual(fitted['attack'].mean(), 1.0)
+        np.testing.assert_allclose(fitted['attack'], attack, rtol=0.1)
+        np.testing.assert_allclose(fitted['defence'], defence, rtol=0.1)
+        self.assertAlmostEqual(fitted['home_advantage'], 1.3, delta=0.05)
+        self.assertLess(fitted['iterations'], PoissonService.max_iterations)
+
+    def test_line_probabilities(self):
+        matrices = PoissonService.score_matrices(np.array([1.5]), np.array([1.0]), max_goals=12)
+        self.assertAlmostEqual(matrices.sum(), 1.0)
+        distributions = PoissonService.value_distributions(matrices)
+        total = distributions['total'][0]
+
+        over, push = PoissonService.line_probabilities(distributions['total'], 0, np.zeros(3, dtype=np.int64),
+                                                       np.array([2.5, 2.0, 2.0]), np.array([True, True, False]))
+        self.assertAlmostEqual(over[0], total[3:].sum())
+        self.assertAlmostEqual(over[1], total[3:].sum())
+        self.assertAlmostEqual(push[1], total[2])
+        self.assertAlmostEqual(over[2], total[:2].sum())
+        self.assertEqual(push[0], 0)
+
+    def test_quarter_lines_split_into_the_adjacent_lines(self):
+        matrices = PoissonService.score_matrices(np.array([1.5]), np.array([1.0]), max_goals=12)
+        distributions = PoissonService.value_distributions(matrices)
+        total, margin = distributions['total'][0], distributions['margin'][0]
+
+        over, push = PoissonService.line_probabilities(distributions['total'], 0, np.zeros(2, dtype=np.int64),
+                                                       np.array([2.25, 2.75]), np.array([True, True]))
+        self.assertAlmostEqual(over[0], (total[3:].sum() + total[3:].sum()) / 2)
+        self.assertAlmostEqual(push[0], total[2] / 2)
+        self.assertAlmostEqual(over[1], (total[3:].sum() + total[4:].sum()) / 2)
+        self.assertAlmostEqual(push[1], total[3] / 2)
+
+        # Home -0.75 wins on a margin of 2 or more and half wins (half pushes) on a margin of 1
+        size = matrices.shape[1]
+        win, push = PoissonService.line_probabilities(distributions['margin'], 1 - size, np.zeros(1, dtype=np.int64),
+                                                      np.array([0.75]), np.array([True]))
+        self.assertAlmostEqual(win[0], margin[size + 1:].sum() + margin[size] / 2)
+        self.assertAlmostEqual(push[0], margin[size] / 2)
+
+
+class PoissonServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = PoissonService()
+        teams = ['Sydney FC', 'Melbourne Victory', 'Adelaide United']
+        fixtures = [(f"past{i}", teams[i % 3], teams[(i + 1) % 3], f"2025-0{1 + i // 3}-0{1 + i % 3}T08:00:00Z")
+                    for i in range(6)]
+        OddService().upsert_odds([
+            make_odds_payload(event_id=event_id, home_team=home_team, away_team=away_team, commence_time=commence_time,
+                              bookmakers={'tab': {'h2h': h2h(2.0, 3.4, 3.8, home_team, away_team)}})
+            for event_id, home_team, away_team, commence_time in fixtures
+        ],
+                                 timestamp='2024-12-31T08:00:00Z')
+        for (event_id, *_), (home_score, away_score) in zip(fixtures, [(3, 0), (1, 1), (0, 2), (2, 1), (0, 0), (1, 3)]):
+            EventResult.objects.create(event=Event.objects.get(id=event_id), home_score=home_score,
+                                       away_score=away_score)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={
+                'tab': {
+                    'h2h': h2h(2.0, 3.4, 3.8),
+                    'totals': [('Over', 1.9, 2.5), ('Under', 1.9, 2.5)],
+                    'spreads': [('Sydney FC', 1.9, -1.0), ('Melbourne Victory', 1.9, 1.0)],
+                },
+            })
+        ],
+                                 timestamp='2029-12-31T08:00:00Z')
+
+    def probability(self, market, name):
+        return ModelProbability.objects.get(event_id='event1', market__key=market, name__name=name)
+
+    def test_refresh_prices_quoted_lines(self):
+        self.assertEqual(self.service.refresh(), (1, 1))
+
+        self.assertEqual(TeamStrength.objects.count(), 3)
+        matrix = ScoreMatrix.objects.get(event_id='event1')
+        self.assertAlmostEqual(np.sum(matrix.matrix), 1.0, places=5)
+        h2h_total = sum(self.probability('h2h', name).probability for name in ('Sydney FC', 'Draw', 'Melbourne Victory'))
+        self.assertAlmostEqual(h2h_total, 1.0)
+        over, under = self.probability('totals', 'Over'), self.probability('totals', 'Under')
+        self.assertAlmostEqual(over.probability + under.probability, 1.0)
+        home, away = self.probability('spreads', 'Sydney FC'), self.probability('spreads', 'Melbourne Victory')
+        self.assertGreater(home.push_probability, 0)
+        self.assertAlmostEqual(home.push_probability, away.push_probability)
+        self.assertAlmostEqual(home.probability + away.probability + home.push_probability, 1.0)
+
+    def test_refits_only_when_results_change(self):
+        self.service.refresh()
+        fitted_at = PoissonFit.objects.get().fitted_at
+
+        self.service.refresh()
+        self.assertEqual(PoissonFit.objects.get().fitted_at, fitted_at)
+
+        EventResult.objects.filter(event_id='past5').delete()
+        self.service.refresh()
+        fit = PoissonFit.objects.get()
+        self.assertGreater(fit.fitted_at, fitted_at)
+        self.assertEqual(fit.results, 5)
+
+    def test_refits_when_a_score_is_corrected(self):
+        self.service.refresh()
+        fit = PoissonFit.objects.get()
+
+        result = EventResult.objects.get(event_id='past0')
+        result.home_score = 0
+        result.save()
+        self.service.refresh()
+        refit = PoissonFit.objects.get()
+        self.assertGreater(refit.fitted_at, fit.fitted_at)
+        self.assertEqual(refit.results, 6)
+        self.assertEqual(refit.last_result_updated_at, result.updated_at)
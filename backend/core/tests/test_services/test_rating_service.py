@@ -0,0 +1,131 @@
+# In backend/core/tests/test_services/test_rating_service.py
+
+from datetime import timedelta
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from core.models import Event, EventResult, RatingWatermark, TeamRating
+from core.services.odd_service import OddService
+from core.services.rating_service import RatingService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class ApplyResultsTests(SimpleTestCase):
+
+    def test_schedule_layers(self):
+        layers = RatingService.schedule_layers(np.array([0, 2, 0, 1, 3]), np.array([1, 3, 2, 3, 0]))
+        np.testing.assert_array_equal(layers, [0, 0, 1, 1, 2])
+
+    def test_matches_sequential_elo(self):
+        rng = np.random.default_rng(1)
+        home = rng.integers(0, 12, size=300)
+        away = (home + rng.integers(1, 12, size=300)) % 12
+        home_scores, away_scores = rng.poisson(1.4, size=300), rng.poisson(1.1, size=300)
+
+        ratings, games = np.full(12, 1500.0), np.zeros(12, dtype=np.int64)
+        RatingService.apply_results(ratings, games, home, away, home_scores, away_scores, k=20, home_advantage=60)
+
+        expected = np.full(12, 1500.0)
+        for h, a, hs, aws in zip(home, away, home_scores, away_scores):
+            score = 1.0 if hs > aws else 0.5 if hs == aws else 0.0
+            change = 20 * (score - 1 / (1 + 10 ** (-(expected[h] + 60 - expected[a]) / 400)))
+            expected[h] += change
+            expected[a] -= change
+        np.testing.assert_allclose(ratings, expected)
+        self.assertEqual(games.sum(), 600)
+
+
+@override_settings(RATING_INITIAL=1500, RATING_K=20, RATING_HOME_ADVANTAGE=0)
+class RatingServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = RatingService()
+        fixtures = [('event1', 'Sydney FC', 'Melbourne Victory', '2030-01-01T08:00:00Z'),
+                    ('event2', 'Adelaide United', 'Sydney FC', '2030-01-08T08:00:00Z'),
+                    ('event3', 'Melbourne Victory', 'Adelaide United', '2030-01-15T08:00:00Z')]
+        OddService().upsert_odds([
+            make_odds_payload(event_id=event_id,
+                              home_team=home_team,
+                              away_team=away_team,
+                              commence_time=commence_time,
+                              bookmakers={'tab': {'h2h': h2h(2.0, 3.4, 3.8, home_team, away_team)}})
+            for event_id, home_team, away_team, commence_time in fixtures
+        ],
+                                 timestamp='2029-12-31T08:00:00Z')
+
+    def add_result(self, event_id, home_score, away_score):
+        EventResult.objects.create(event=Event.objects.get(id=event_id), home_score=home_score, away_score=away_score)
+
+    def ratings(self):
+        return dict(TeamRating.objects.values_list('team__name', 'rating'))
+
+    def test_incremental_updates_match_rebuild(self):
+        self.add_result('event1', 2, 0)
+        self.assertEqual(self.service.update(), 1)
+        self.assertAlmostEqual(self.ratings()['Sydney FC'], 1510)
+        self.assertNotIn('Adelaide United', self.ratings())
+
+        self.add_result('event2', 1, 1)
+        self.add_result('event3', 0, 3)
+        self.assertEqual(self.service.update(), 2)
+        self.assertEqual(self.service.update(), 0)
+        incremental = self.ratings()
+        self.assertEqual(TeamRating.objects.get(team__name='Sydney FC').last_event_id, 'event2')
+
+        self.assertEqual(self.service.rebuild(), 3)
+        for team, rating in self.ratings().items():
+            self.assertAlmostEqual(incremental[team], rating)
+        self.assertAlmostEqual(sum(incremental.values()), 4500)
+
+    def test_late_result_triggers_rebuild(self):
+        self.add_result('event2', 1, 0)
+        self.service.update()
+        self.add_result('event1', 0, 2)
+        self.assertEqual(self.service.update(), 2)
+
+        watermark = RatingWatermark.objects.get(sport_id='soccer_australia_aleague')
+        self.assertEqual(watermark.last_updated_at, EventResult.objects.get(event_id='event1').updated_at)
+        self.assertEqual(TeamRating.objects.get(team__name='Sydney FC').games, 2)
+        self.assertLess(self.ratings()['Sydney FC'], 1500)
+
+    def test_corrected_score_triggers_rebuild(self):
+        self.add_result('event1', 2, 0)
+        self.add_result('event2', 1, 1)
+        self.service.update()
+        result = EventResult.objects.get(event_id='event1')
+        result.home_score, result.away_score = 0, 2
+        result.save()
+        self.assertEqual(self.service.update(), 2)
+
+        self.assertEqual(TeamRating.objects.get(team__name='Sydney FC').games, 2)
+        self.assertLess(self.ratings()['Sydney FC'], 1500)
+
+    @override_settings(WATERMARK_OVERLAP_MINUTES=0)
+    def test_corrected_score_outside_the_overlap_window_triggers_rebuild(self):
+        self.add_result('event1', 2, 0)
+        self.service.update()
+        self.add_result('event2', 1, 1)
+        self.service.update()
+        watermark = RatingWatermark.objects.get(sport_id='soccer_australia_aleague')
+        self.assertNotIn(str(EventResult.objects.get(event_id='event1').id), watermark.recent_results)
+
+        result = EventResult.objects.get(event_id='event1')
+        result.home_score, result.away_score = 0, 2
+        result.save()
+        self.assertEqual(self.service.update(), 2)
+        self.assertLess(self.ratings()['Sydney FC'], 1500)
+
+    def test_late_commit_within_the_overlap_window_is_applied_once(self):
+        self.add_result('event1', 2, 0)
+        self.add_result('event2', 1, 1)
+        self.service.update()
+        # A result committed by a concurrent ingest after the update, saved before the watermark
+        self.add_result('event3', 0, 3)
+        watermark = RatingWatermark.objects.get(sport_id='soccer_australia_aleague')
+        EventResult.objects.filter(event_id='event3').update(updated_at=watermark.last_updated_at
+                                                             - timedelta(minutes=1))
+        self.assertEqual(self.service.update(), 1)
+        self.assertEqual(self.service.update(), 0)
+        self.assertEqual(TeamRating.objects.get(team__name='Adelaide United').games, 2)
@@ -0,0 +1,134 @@
+# In backend/core/tests/test_services/test_rollup_service.py
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from core.models import Odd, OddsRollup, RollupWatermark
+from core.services.odd_service import OddService
+from core.services.rollup_service import RollupService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class ComputeRollupsTests(SimpleTestCase):
+
+    def test_ohlc_per_outcome_and_bucket(self):
+        columns = {
+            'event': np.zeros(5, dtype=np.int64),
+            'bookmaker': np.zeros(5, dtype=np.int64),
+            'market': np.zeros(5, dtype=np.int64),
+            'name': np.array([0, 0, 0, 0, 1]),
+            'price': np.array([2.2, 2.0, 2.5, 1.8, 3.0]),
+            'point': np.full(5, np.nan),
+            'timestamp': np.array(['2030-01-01T08:30', '2030-01-01T08:05', '2030-01-01T08:45', '2030-01-01T09:10',
+                                   '2030-01-01T08:30'], dtype='datetime64[us]'),
+        }
+
+        rollups = RollupService.compute_rollups(columns, 3600)
+
+        self.assertEqual(len(rollups['row']), 3)
+        first = np.flatnonzero((columns['name'][rollups['row']] == 0)
+                               & (rollups['bucket_start'] == np.datetime64('2030-01-01T08:00:00')))[0]
+        self.assertEqual((rollups['open'][first], rollups['high'][first], rollups['low'][first],
+                          rollups['close'][first], rollups['count'][first]), (2.0, 2.5, 2.0, 2.5, 3))
+
+    def test_lines_get_their_own_buckets(self):
+        columns = {
+            'event': np.zeros(4, dtype=np.int64),
+            'bookmaker': np.zeros(4, dtype=np.int64),
+            'market': np.zeros(4, dtype=np.int64),
+            'name': np.zeros(4, dtype=np.int64),
+            'price': np.array([1.9, 1.8, 2.0, 2.1]),
+            'point': np.array([2.5, 2.5, 3.0, 3.0]),
+            'timestamp': np.array(['2030-01-01T08:05', '2030-01-01T08:15', '2030-01-01T08:25', '2030-01-01T08:35'],
+                                  dtype='datetime64[us]'),
+        }
+
+        rollups = RollupService.compute_rollups(columns, 3600)
+
+        np.testing.assert_array_equal(rollups['line'], [2.5, 3.0])
+        np.testing.assert_array_equal(rollups['close'], [1.8, 2.1])
+        np.testing.assert_array_equal(rollups['count'], [2, 2])
+
+    @override_settings(ODDS_ROLLUP_BUCKETS=[3600, 86400], ODDS_ROLLUP_MAX_POINTS=48)
+    def test_choose_resolution(self):
+        start = datetime(2030, 1, 1, tzinfo=timezone.utc)
+        self.assertEqual(RollupService.choose_resolution(start, datetime(2030, 1, 2, tzinfo=timezone.utc)), 3600)
+        self.assertEqual(RollupService.choose_resolution(start, datetime(2030, 2, 1, tzinfo=timezone.utc)), 86400)
+
+
+@override_settings(ODDS_ROLLUP_BUCKETS=[3600, 86400])
+class RollupServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.odd_service = OddService()
+        self.rollup_service = RollupService()
+
+    def ingest(self, timestamp, home_price):
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={'tab': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+
+    def home_rollup(self, bucket_seconds):
+        return OddsRollup.objects.get(name__name='Sydney FC', bucket_seconds=bucket_seconds)
+
+    @override_settings(WATERMARK_OVERLAP_MINUTES=0)
+    def test_refresh_is_incremental(self):
+        self.ingest('2029-12-31T08:10:00Z', 2.2)
+        self.ingest('2029-12-31T08:40:00Z', 2.6)
+        self.rollup_service.refresh()
+        watermark = RollupWatermark.objects.get(sport_id='soccer_australia_aleague').last_ingested_at
+
+        self.ingest('2029-12-31T08:50:00Z', 2.0)
+        self.ingest('2029-12-31T08:20:00Z', 1.9)  # Arrives late, but is not the close
+        self.rollup_service.refresh(batch_size=1)
+
+        hourly = self.home_rollup(3600)
+        self.assertEqual((hourly.open, hourly.high, hourly.low, hourly.close, hourly.count), (2.2, 2.6, 1.9, 2.0, 4))
+        self.assertGreater(RollupWatermark.objects.get(sport_id='soccer_australia_aleague').last_ingested_at,
+                           watermark)
+        self.assertEqual(self.home_rollup(86400).count, 4)
+        self.assertEqual(self.rollup_service.refresh(), 0)
+
+    def test_late_commits_and_reingested_snapshots_are_counted_once(self):
+        self.ingest('2029-12-31T08:10:00Z', 2.2)
+        self.rollup_service.refresh()
+        watermark = RollupWatermark.objects.get(sport_id='soccer_australia_aleague').last_ingested_at
+
+        self.ingest('2029-12-31T08:20:00Z', 1.9)
+        # Committed by a concurrent ingest after the refresh read past it
+        Odd.objects.filter(timestamp__minute=20).update(ingested_at=watermark - timedelta(minutes=1))
+        self.ingest('2029-12-31T08:10:00Z', 2.1)  # The same snapshot ingested again with a corrected price
+        self.rollup_service.refresh()
+        self.rollup_service.refresh()
+
+        hourly = self.home_rollup(3600)
+        self.assertEqual((hourly.open, hourly.high, hourly.low, hourly.close, hourly.count), (2.1, 2.1, 1.9, 1.9, 2))
+
+    def test_get_rollups_picks_resolution(self):
+        self.ingest('2029-12-31T08:10:00Z', 2.2)
+        self.ingest('2029-12-31T10:10:00Z', 2.4)
+        self.rollup_service.refresh()
+
+        hourly = self.rollup_service.get_rollups(start=datetime(2029, 12, 31, 8, 30, tzinfo=timezone.utc),
+                                                 end=datetime(2029, 12, 31, 12, tzinfo=timezone.utc),
+                                                 event_id='event1',
+                                                 name__name='Sydney FC')
+        self.assertEqual([row['bucket_seconds'] for row in hourly], [3600, 3600])
+        self.assertEqual([row['close'] for row in hourly], [2.2, 2.4])
+
+        daily = self.rollup_service.get_rollups(bucket_seconds=86400, name__name='Sydney FC')
+        self.assertEqual([(row['open'], row['close']) for row in daily], [(2.2, 2.4)])
+
+    def test_reingested_snapshot_moving_line_drops_the_old_bucket(self):
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'tab': {'totals': [('Over', 1.9, 2.5), ('Under', 1.9, 2.5)]}})], timestamp='2029-12-31T08:10:00Z')
+        self.rollup_service.refresh()
+        self.assertEqual(set(OddsRollup.objects.values_list('line', flat=True)), {2.5})
+
+        self.odd_service.upsert_odds([make_odds_payload(bookmakers={
+            'tab': {'totals': [('Over', 1.9, 3.0), ('Under', 1.9, 3.0)]}})], timestamp='2029-12-31T08:10:00Z')
+        self.rollup_service.refresh()
+        self.assertEqual(set(OddsRollup.objects.values_list('line', 'point')), {(3.0, 3.0)})
+        self.assertEqual(OddsRollup.objects.count(), 4)
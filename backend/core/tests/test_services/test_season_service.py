@@ -0,0 +1,113 @@
+# In backend/core/tests/test_services/test_season_service.py
+
+import numpy as np
+from django.test import SimpleTestCase, override_settings
+
+from core.models import Event, EventResult, SeasonProjection, SeasonSimulation
+from core.services import season
+from core.services.odd_service import OddService
+from core.services.season_service import SeasonService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class SeasonSimulationTests(SimpleTestCase):
+
+    def setUp(self):
+        self.standings = season.table(3, np.array([0, 1]), np.array([1, 2]), np.array([2, 1]), np.array([0, 1]))
+        self.fixtures = (np.array([2, 0]), np.array([0, 1]), np.array([1.2, 1.5]), np.array([1.0, 0.9]))
+
+    def test_table(self):
+        np.testing.assert_array_equal(self.standings['played'], [1, 2, 1])
+        np.testing.assert_array_equal(self.standings['points'], [3, 1, 1])
+        np.testing.assert_array_equal(self.standings['goals_for'], [2, 1, 1])
+        np.testing.assert_array_equal(self.standings['goals_against'], [0, 3, 1])
+
+    def test_simulate_counts_every_position_once_per_season(self):
+        result = season.simulate(self.standings, *self.fixtures, 500, np.random.default_rng(1))
+        self.assertEqual(result['positions'].shape, (3, 3))
+        np.testing.assert_array_equal(result['positions'].sum(axis=0), [500, 500, 500])
+        np.testing.assert_array_equal(result['positions'].sum(axis=1), [500, 500, 500])
+        # Every fixture hands out 2 or 3 points
+        total = result['points'].sum() - 500 * self.standings['points'].sum()
+        self.assertGreaterEqual(total, 500 * 2 * 2)
+        self.assertLessEqual(total, 500 * 2 * 3)
+
+    def test_ties_broken_on_goal_difference(self):
+        standings = season.table(2, np.array([0]), np.array([1]), np.array([3]), np.array([3]))
+        standings['goals_against'][1] += 1
+        result = season.simulate(standings, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0),
+                                 np.zeros(0), 10, np.random.default_rng(0))
+        np.testing.assert_array_equal(result['positions'], [[10, 0], [0, 10]])
+
+    def test_batches_reproducible_across_processes(self):
+        task = (self.standings, *self.fixtures)
+        service = SeasonService()
+        in_process = service.run_batches(task, 1000, seed=42, processes=1, batch_size=300)
+        pooled = service.run_batches(task, 1000, seed=42, processes=2, batch_size=300)
+        np.testing.assert_array_equal(in_process['positions'], pooled['positions'])
+        np.testing.assert_array_equal(in_process['points'], pooled['points'])
+        self.assertEqual(in_process['positions'][:, 0].sum(), 1000)
+
+
+class SeasonServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.service = SeasonService()
+        fixtures = [('past1', 'Sydney FC', 'Melbourne Victory', '2025-01-01T08:00:00Z'),
+                    ('past2', 'Melbourne Victory', 'Adelaide United', '2025-01-08T08:00:00Z'),
+                    ('next1', 'Adelaide United', 'Sydney FC', '2030-01-01T08:00:00Z'),
+                    ('next2', 'Sydney FC', 'Melbourne Victory', '2030-01-08T08:00:00Z')]
+        OddService().upsert_odds([
+            make_odds_payload(event_id=event_id, home_team=home_team, away_team=away_team, commence_time=commence_time,
+                              bookmakers={'tab': {'h2h': h2h(2.0, 3.4, 3.8, home_team, away_team)}})
+            for event_id, home_team, away_team, commence_time in fixtures
+        ],
+                                 timestamp='2024-12-31T08:00:00Z')
+        EventResult.objects.create(event=Event.objects.get(id='past1'), home_score=2, away_score=0)
+        EventResult.objects.create(event=Event.objects.get(id='past2'), home_score=1, away_score=1)
+
+    def projection(self, team):
+        return SeasonProjection.objects.get(team__name=team)
+
+    def test_simulate_sport(self):
+        simulation = self.service.simulate_sport('soccer_australia_aleague', simulations=2000, seed=7, processes=1,
+                                                 batch_size=500)
+
+        self.assertEqual((simulation.completed, simulation.remaining), (2, 2))
+        self.assertEqual(SeasonProjection.objects.count(), 3)
+        sydney = self.projection('Sydney FC')
+        self.assertEqual((sydney.played, sydney.points, sydney.goal_difference, sydney.remaining), (1, 3, 2, 2))
+        self.assertGreaterEqual(sydney.mean_points, 3)
+        self.assertAlmostEqual(sum(sydney.positions), 1.0)
+        self.assertAlmostEqual(sum(projection.title_probability for projection in SeasonProjection.objects.all()), 1.0)
+        self.assertGreater(sydney.title_probability, self.projection('Adelaide United').title_probability)
+        self.assertAlmostEqual(sydney.finals_probability, 1.0)
+
+    def test_cached_until_results_change(self):
+        first = self.service.simulate_sport('soccer_australia_aleague', simulations=200, processes=1)
+        self.assertEqual(self.service.simulate_sport('soccer_australia_aleague', simulations=200,
+                                                     processes=1).simulated_at, first.simulated_at)
+
+        EventResult.objects.create(event=Event.objects.get(id='next1'), home_score=0, away_score=1)
+        second = self.service.simulate_sport('soccer_australia_aleague', simulations=200, processes=1)
+        self.assertGreater(second.simulated_at, first.simulated_at)
+        self.assertEqual((second.completed, second.remaining), (3, 1))
+        self.assertEqual(SeasonSimulation.objects.count(), 1)
+
+    def test_season_starts_after_the_last_break(self):
+        start = self.service.season_start('soccer_australia_aleague')
+        self.assertEqual(start, Event.objects.get(id='next1').commence_time)
+        with override_settings(SEASON_START='2024-07-01'):
+            self.assertEqual(self.service.season_start('soccer_australia_aleague').year, 2024)
+
+    def test_started_events_without_a_result_are_left_out(self):
+        OddService().upsert_odds([make_odds_payload(event_id='past3', home_team='Adelaide United',
+                                                    away_team='Sydney FC', commence_time='2025-01-15T08:00:00Z')],
+                                 timestamp='2024-12-31T08:00:00Z')
+
+        simulation = self.service.simulate_sport('soccer_australia_aleague', simulations=200, processes=1)
+
+        self.assertEqual((simulation.completed, simulation.remaining), (2, 2))
+        self.assertEqual(self.projection('Adelaide United').remaining, 1)
+
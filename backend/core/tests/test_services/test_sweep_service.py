@@ -0,0 +1,45 @@
+# In backend/core/tests/test_services/test_sweep_service.py
+
+from django.test import TestCase
+
+from core.benchmarks.backtest import synthetic_history
+from core.models import SweepResult
+from core.services import backtest
+from core.services.sweep_service import SweepService
+
+
+class SweepServiceTests(TestCase):
+
+    def setUp(self):
+        self.service = SweepService()
+        self.history = synthetic_history(40, n_bookmakers=3, n_snapshots=6)
+
+    def test_expand_grid(self):
+        combinations = self.service.expand_grid({'entry_hours': [0, 2], 'sides': [['home'], ['home', 'away']]})
+        self.assertEqual(len(combinations), 4)
+        self.assertEqual(self.service.strategy({'best_price': True}, combinations[1]),
+                         backtest.Strategy(best_price=True, entry_hours=0, sides=('home', 'away')))
+        with self.assertRaises(ValueError):
+            self.service.expand_grid({'leverage': [1, 2]})
+        with self.assertRaises(ValueError):
+            self.service.expand_grid({'entry_hours': []})
+
+    def test_pool_results_match_single_process(self):
+        grid = {'entry_hours': [0, 3], 'min_edge': [None, 0.0, 0.02], 'staking': ['flat', 'kelly']}
+
+        sweep, evaluated = self.service.run(grid, base={'best_price': True}, sweep='test', history=self.history,
+                                            processes=2, chunk_size=5)
+
+        self.assertEqual((sweep, evaluated), ('test', 12))
+        self.assertEqual(SweepResult.objects.filter(sweep='test').count(), 12)
+        for result in self.service.get_results('test'):
+            strategy = self.service.strategy({'best_price': True}, result['parameters'])
+            expected = backtest.summarise(backtest.evaluate(strategy, self.history))
+            self.assertEqual(result['bets'], expected['bets'])
+            self.assertAlmostEqual(result['profit'], expected['profit'])
+            self.assertAlmostEqual(result['max_drawdown'], expected['max_drawdown'])
+
+    def test_invalid_combination_fails_before_running(self):
+        with self.assertRaises(ValueError):
+            self.service.run({'staking': ['flat', 'martingale']}, history=self.history, processes=2)
+        self.assertFalse(SweepResult.objects.exists())
@@ -0,0 +1,83 @@
+# In backend/core/tests/test_services/test_task_output_service.py
+
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from django.test import SimpleTestCase, override_settings
+
+from core.models import Event
+from core.services.event_service import EventService
+from core.services.odd_service import OddService
+from core.services.task_output_service import TaskOutputService
+from core.tasks.get_events import GetEventsTask
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class TaskOutputServiceTests(SimpleTestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.task_output_service = TaskOutputService(output_dir=self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_write_chunks_and_read_back(self):
+        rows = ({'id': i, 'at': datetime(2030, 1, 1, tzinfo=timezone.utc)} for i in range(5))
+
+        reference = self.task_output_service.write('test', rows, chunk_rows=2)
+
+        self.assertTrue(TaskOutputService.is_reference(reference))
+        self.assertEqual(reference['rows'], 5)
+        self.assertEqual(reference['files'], ['part-00000.ndjson', 'part-00001.ndjson', 'part-00002.ndjson'])
+        read = list(TaskOutputService.read(reference))
+        self.assertEqual([row['id'] for row in read], list(range(5)))
+        self.assertEqual(read[0]['at'], '2030-01-01T00:00:00Z')
+
+    def test_write_without_rows(self):
+        reference = self.task_output_service.write('test', iter([]))
+
+        self.assertEqual((reference['rows'], reference['files']), (0, []))
+        self.assertTrue(os.path.isdir(reference['path']))
+
+    @override_settings(TASK_OUTPUT_MAX_AGE_DAYS=7)
+    def test_write_deletes_outputs_older_than_the_max_age(self):
+        old = self.task_output_service.write('test', iter([{'id': 1}]))
+        recent = self.task_output_service.write('test', iter([{'id': 2}]))
+        eight_days_ago = time.time() - 8 * 86400
+        os.utime(old['path'], (eight_days_ago, eight_days_ago))
+
+        self.task_output_service.write('test', iter([]))
+
+        self.assertFalse(os.path.exists(old['path']))
+        self.assertTrue(os.path.isdir(recent['path']))
+
+
+class StreamingGetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='event2', bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ], timestamp='2029-12-31T08:00:00Z')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_iter_events_streams_rows(self):
+        rows = EventService().iter_events(chunk_size=1, sport_id='soccer_australia_aleague')
+
+        self.assertEqual([row['id'] for row in rows], ['event1', 'event2'])
+
+    def test_get_events_task_returns_reference(self):
+        with override_settings(TASK_OUTPUT_DIR=self.directory.name):
+            result = GetEventsTask.execute(id='event2')
+
+        self.assertTrue(TaskOutputService.is_reference(result))
+        self.assertEqual(result['rows'], 1)
+        self.assertEqual([row['id'] for row in TaskOutputService.read(result)], ['event2'])
+        self.assertEqual(Event.objects.count(), 2)
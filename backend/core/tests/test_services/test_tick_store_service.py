@@ -0,0 +1,85 @@
+# In backend/core/tests/test_services/test_tick_store_service.py
+
+import os
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.db.models import QuerySet
+
+from core.services.odd_service import OddService
+from core.services.odds_frame import OddsFrame
+from core.services.tick_store_service import TickStoreService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class TickStoreServiceTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'ticks')
+        odd_service = OddService()
+        for timestamp, home_price in (('2029-12-31T08:00:00Z', 2.0), ('2029-12-30T08:00:00Z', 2.4)):
+            odd_service.upsert_odds([
+                make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)}}),
+                make_odds_payload(event_id='event2',
+                                  sport_key='basketball_nba',
+                                  home_team='Boston Celtics',
+                                  away_team='Miami Heat',
+                                  bookmakers={'tab': {'spreads': [('Boston Celtics', 1.9, -4.5),
+                                                                  ('Miami Heat', 1.9, 4.5)]}}),
+            ], timestamp=timestamp)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_write_and_read_round_trip(self):
+        written = TickStoreService().write(path=self.path, batch_size=4)
+        frame = OddsFrame(self.path)
+
+        self.assertEqual(written, 10)
+        self.assertEqual(len(frame), 10)
+        self.assertIsInstance(frame.ticks, np.memmap)
+        self.assertTrue(np.shares_memory(frame['price'], frame.ticks))
+
+        ticks = frame.event('event1')
+        self.assertEqual(len(ticks), 6)
+        self.assertTrue(np.all(np.diff(ticks['timestamp']) >= np.timedelta64(0)))
+        home = ticks[frame.decode('names', ticks['name']) == 'Sydney FC']
+        np.testing.assert_allclose(home['price'], [2.4, 2.0])
+        self.assertEqual(ticks['timestamp'][0], np.datetime64('2029-12-30T08:00:00', 'us'))
+
+    def test_select_and_to_pandas(self):
+        TickStoreService().write(path=self.path)
+        frame = OddsFrame(self.path)
+
+        spreads = frame.select(sports=['basketball_nba'], markets=['spreads'], start='2029-12-31')
+        self.assertEqual(len(spreads), 2)
+        np.testing.assert_allclose(np.sort(spreads['point']), [-4.5, 4.5])
+
+        data = frame.to_pandas(spreads)
+        self.assertEqual(set(data['bookmaker']), {'tab'})
+        self.assertEqual(set(data['event']), {'event2'})
+
+    def test_rewrite_replaces_store(self):
+        TickStoreService().write(path=self.path)
+        written = TickStoreService().write(path=self.path, sport_id='basketball_nba')
+
+        self.assertEqual(written, 4)
+        self.assertEqual(OddsFrame(self.path).keys['events'], ['event2'])
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_rows_committed_or_deleted_after_the_count_are_resized_in_place(self):
+        expected = TickStoreService().write(path=self.path)
+        prices = OddsFrame(self.path).ticks['price'].copy()
+        for count in (3, 25):
+            with mock.patch.object(QuerySet, 'count', return_value=count):
+                written = TickStoreService().write(path=self.path, batch_size=4)
+            frame = OddsFrame(self.path)
+
+            self.assertEqual(written, expected)
+            self.assertEqual(len(frame), expected)
+            np.testing.assert_allclose(frame.ticks['price'], prices)
+            self.assertEqual(os.path.getsize(os.path.join(self.path, 'ticks.npy')),
+                             frame.ticks.offset + expected * frame.ticks.itemsize)
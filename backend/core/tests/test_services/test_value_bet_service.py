@@ -0,0 +1,75 @@
+# In backend/core/tests/test_services/test_value_bet_service.py
+
+import numpy as np
+from django.test import SimpleTestCase
+
+from core.models import Event, Market, ModelProbability, Team, ValueBet
+from core.services.odd_service import OddService
+from core.services.value_bet_service import ValueBetService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
+
+
+class FindValueTests(SimpleTestCase):
+
+    def test_value_with_push(self):
+        edge, kelly = ValueBetService.value(np.array([2.1, 1.8, 2.0]), np.array([0.55, 0.55, 0.45]),
+                                            np.array([0.0, 0.0, 0.1]))
+        np.testing.assert_allclose(edge, [0.55 * 1.1 - 0.45, 0.55 * 0.8 - 0.45, 0.0], atol=1e-12)
+        np.testing.assert_allclose(kelly, [(0.55 * 1.1 - 0.45) / 1.1, 0.0, 0.0])
+
+    def test_matches_on_event_market_name_and_point(self):
+        prices = {
+            'event': np.array([0, 0, 1, 0]),
+            'market': np.array([1, 1, 1, 2]),
+            'name': np.array([10, 11, 10, 10]),
+            'point': np.array([np.nan, np.nan, np.nan, -1.5]),
+            'price': np.array([2.5, 1.5, 2.5, 2.5]),
+        }
+        model = {
+            'event': np.array([0, 0]),
+            'market': np.array([2, 1]),
+            'name': np.array([10, 10]),
+            'point': np.array([-0.5, np.nan]),
+            'probability': np.array([0.6, 0.5]),
+            'push_probability': np.array([0.0, 0.0]),
+        }
+        np.testing.assert_array_equal(ValueBetService.match_rows(prices, model), [1, -1, -1, -1])
+
+        found = ValueBetService().find_value(prices, model, min_edge=0.1)
+        np.testing.assert_array_equal(found['row'], [0])
+        self.assertAlmostEqual(found['edge'][0], 0.25)
+
+
+class ScanValueBetsTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        OddService().upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': h2h(2.1, 3.4, 3.8)},
+            'tab': {'h2h': h2h(1.8, 3.6, 4.2)},
+        })], timestamp='2029-12-31T08:00:00Z')
+        market = Market.objects.get(key='h2h')
+        for name, probability in (('Sydney FC', 0.55), ('Draw', 0.25), ('Melbourne Victory', 0.2)):
+            ModelProbability.objects.create(event=Event.objects.get(id='event1'), market=market,
+                                            name=Team.objects.get(name=name), probability=probability)
+
+    def test_scan_stores_value_bets_and_deactivates_old_ones(self):
+        service = ValueBetService()
+        self.assertEqual(service.scan(), 1)
+        value_bet = ValueBet.objects.get(active=True)
+        self.assertEqual((value_bet.bookmaker.key, value_bet.name.name), ('sportsbet', 'Sydney FC'))
+        self.assertAlmostEqual(value_bet.edge, 0.155)
+        self.assertAlmostEqual(value_bet.kelly_fraction, 0.155 / 1.1 * 0.25)
+
+        self.assertEqual(service.scan(event__sport_id='soccer_australia_aleague'), 1)
+        self.assertEqual(ValueBet.objects.filter(active=True).count(), 1)
+        self.assertEqual(ValueBet.objects.count(), 2)
+
+    def test_scan_deactivates_value_bets_of_started_events(self):
+        service = ValueBetService()
+        service.scan()
+        Event.objects.filter(id='event1').update(commence_time='2020-01-01T08:00:00Z')
+
+        self.assertEqual(service.scan(event__sport_id='soccer_australia_aleague'), 0)
+        self.assertFalse(ValueBet.objects.filter(active=True).exists())
+
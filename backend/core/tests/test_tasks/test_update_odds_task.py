@@ -0,0 +1,13 @@
+# In backend/core/tests/test_tasks/test_update_odds_task.py
+
+from django.test import TestCase
+
+from core.tasks.update_odds import UpdateOddsTask
+
+
+class UpdateOddsTaskTests(TestCase):
+
+    def test_rejects_non_decimal_odds_format(self):
+        message = UpdateOddsTask.execute(sport='soccer_australia_aleague', regions=['au'], markets=['h2h'],
+                                         date='2024-01-01/00:00:00', oddsFormat='american')
+        self.assertEqual(message, "oddsFormat must be 'decimal'")
@@ -6,7 +6,15 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import Sport, Team
+from core.models import (ArbitrageOpportunity, Event, EventResult, LatestOutcome, Market, Outcome, Sport, Team,
+                         ValueBet)
+from core.services.bookmaker_stats_service import BookmakerStatsService
+from core.services.odd_service import OddService
+from core.services.poisson_service import PoissonService
+from core.services.rating_service import RatingService
+from core.services.rollup_service import RollupService
+from core.services.season_service import SeasonService
+from core.tests.utils import OddsTestCase, h2h, make_odds_payload
 
 
 class HomeViewTests(TestCase):
@@ -85,3 +93,489 @@ class TeamViewSetTests(TestCase):
                          msg=f"Response data: {response.data}")
         self.assertEqual(Team.objects.count(), 1)
         self.assertEqual(Team.objects.get().name, 'Team A')
+
+
+class LatestOutcomeViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='event2',
+                              home_team='Perth Glory',
+                              away_team='Adelaide United',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.5, 3.2, 2.7, 'Perth Glory', 'Adelaide United')}}),
+        ], timestamp='2029-12-31T08:00:00Z')
+
+    def test_latest_outcome_list(self):
+        response = self.client.get(reverse('latestoutcome-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_latest_outcome_filter_by_event(self):
+        response = self.client.get(reverse('latestoutcome-list'), {'event': 'event2', 'market': 'h2h'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertTrue(all(row['event'] == 'event2' for row in response.data['results']))
+
+    def test_latest_outcome_odds_format(self):
+        response = self.client.get(reverse('latestoutcome-list'), {'event': 'event1', 'odds_format': 'fractional'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(row['price'] for row in response.data['results']), ['1/1', '12/5', '14/5'])
+
+        outcome = LatestOutcome.objects.get(event_id='event1', name__name='Sydney FC')
+        response = self.client.get(reverse('latestoutcome-detail', args=[outcome.id]), {'odds_format': 'american'})
+        self.assertEqual(response.data['price'], 100)
+
+        response = self.client.get(reverse('latestoutcome-list'), {'odds_format': 'hongkong'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OutcomeViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for home_price, timestamp in ((2.0, '2029-12-29T08:00:00Z'), (2.2, '2029-12-30T08:00:00Z'),
+                                      (2.4, '2029-12-31T08:00:00Z')):
+            OddService().upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+
+    def test_keyset_pages(self):
+        expected = list(Outcome.objects.order_by('timestamp', 'id').values_list('id', flat=True))
+        self.assertEqual(len(expected), 9)
+        seen, pages = [], []
+        response = self.client.get(reverse('outcome-list'), {'page_size': 4})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            seen += [row['id'] for row in response.data['results']]
+            if not response.data['next']:
+                break
+            response = self.client.get(response.data['next'])
+        self.assertEqual(seen, expected)
+        self.assertEqual([len(page['results']) for page in pages], [4, 4, 1])
+        self.assertIsNone(pages[0]['previous'])
+
+        response = self.client.get(pages[2]['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], expected[4:8])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual([row['id'] for row in response.data['results']], expected[:4])
+        self.assertIsNone(response.data['previous'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('outcome-list'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_line_movements_newest_first(self):
+        response = self.client.get(reverse('linemovement-list'), {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['timestamp'], '2029-12-31T08:00:00Z')
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'][0]['timestamp'], '2029-12-30T08:00:00Z')
+        self.assertIsNone(response.data['next'])
+
+
+class MarketConsensusViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='past',
+                              commence_time='2020-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ], timestamp='2019-12-31T08:00:00Z')
+
+    def test_consensus_list(self):
+        response = self.client.get(reverse('consensus-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_consensus_board(self):
+        response = self.client.get(reverse('consensus-board'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({row['event'] for row in response.data['results']}, {'event1'})
+
+    def test_consensus_board_odds_format(self):
+        response = self.client.get(reverse('consensus-board'), {'odds_format': 'american'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(sorted(row['best_price'] for row in response.data['results']), [100, 240, 280])
+
+
+class ArbitrageOpportunityViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='past',
+                              commence_time='2020-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ], timestamp='2019-12-31T08:00:00Z')
+        market = Market.objects.get(key='h2h')
+        legs = [{'bookmaker': 'sportsbet', 'name': 'Sydney FC', 'price': 2.1, 'point': None, 'stake': 0.5},
+                {'bookmaker': 'tab', 'name': 'Melbourne Victory', 'price': 2.2, 'point': None, 'stake': 0.5}]
+        for event_id in ('event1', 'past'):
+            ArbitrageOpportunity.objects.create(event_id=event_id, market=market, implied_probability=0.93,
+                                                profit_margin=0.07, legs=legs)
+
+    def test_only_events_that_have_not_started(self):
+        response = self.client.get(reverse('arbitrage-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([opportunity['event'] for opportunity in response.data], ['event1'])
+
+    def test_leg_prices_odds_format(self):
+        response = self.client.get(reverse('arbitrage-list'), {'odds_format': 'fractional'})
+        self.assertEqual([leg['price'] for leg in response.data[0]['legs']], ['11/10', '6/5'])
+        opportunity = ArbitrageOpportunity.objects.get(event_id='event1')
+        response = self.client.get(reverse('arbitrage-detail', args=[opportunity.id]), {'odds_format': 'american'})
+        self.assertEqual([leg['price'] for leg in response.data['legs']], [110, 120])
+
+
+class ValueBetViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(event_id='past',
+                              commence_time='2020-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ], timestamp='2019-12-31T08:00:00Z')
+        for outcome in LatestOutcome.objects.filter(name__name='Sydney FC'):
+            ValueBet.objects.create(event=outcome.event, bookmaker=outcome.bookmaker, market=outcome.market,
+                                    name=outcome.name, price=outcome.price, probability=0.55, edge=0.1,
+                                    kelly_fraction=0.1)
+
+    def test_only_events_that_have_not_started(self):
+        response = self.client.get(reverse('valuebet-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([value_bet['event'] for value_bet in response.data['results']], ['event1'])
+
+    def test_pages_largest_edge_first(self):
+        outcome = LatestOutcome.objects.get(event_id='event1', name__name='Draw')
+        ValueBet.objects.create(event=outcome.event, bookmaker=outcome.bookmaker, market=outcome.market,
+                                name=outcome.name, price=outcome.price, probability=0.35, edge=0.19,
+                                kelly_fraction=0.08)
+
+        response = self.client.get(reverse('valuebet-list'), {'page_size': 1})
+        self.assertEqual([value_bet['edge'] for value_bet in response.data['results']], [0.19])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([value_bet['edge'] for value_bet in response.data['results']], [0.1])
+        self.assertIsNone(response.data['next'])
+
+
+class AsOfOddsViewTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for timestamp, home_price in (('2029-12-30T08:00:00Z', 2.4), ('2029-12-31T08:00:00Z', 2.0)):
+            OddService().upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+
+    def test_as_of_lookup(self):
+        response = self.client.post(reverse('odds_as_of'), {
+            'lookups': [{'event': 'event1', 'time': '2029-12-30T12:00:00Z'}],
+            'markets': ['h2h'],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['lookups'][0]['timestamp'], '2029-12-30T08:00:00Z')
+        self.assertEqual(len(response.data['outcomes']['price']), 3)
+
+    def test_as_of_odds_format(self):
+        response = self.client.post(f"{reverse('odds_as_of')}?odds_format=american", {
+            'lookups': [{'event': 'event1', 'time': '2029-12-30T12:00:00Z'}],
+            'markets': ['h2h'],
+        }, format='json')
+        self.assertEqual(sorted(response.data['outcomes']['price']), [140, 240, 280])
+        response = self.client.post(f"{reverse('odds_as_of')}?odds_format=hongkong", {
+            'lookups': [{'event': 'event1', 'time': '2029-12-30T12:00:00Z'}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_as_of_invalid_lookup(self):
+        response = self.client.post(reverse('odds_as_of'), {'lookups': [{'event': 'event1'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_as_of_invalid_options(self):
+        lookups = [{'event': 'event1', 'time': '2029-12-30T12:00:00Z'}]
+        for options in ({'markets': 'h2h'}, {'max_age': {'seconds': 60}}):
+            response = self.client.post(reverse('odds_as_of'), {'lookups': lookups, **options}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OddsHistoryViewTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for timestamp, home_price in (('2029-12-30T08:00:00Z', 2.4), ('2029-12-31T08:00:00Z', 2.0)):
+            OddService().upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+
+    def test_history(self):
+        response = self.client.post(reverse('odds_history'), {'events': ['event1'], 'points': 50}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        series = response.data['events'][0]['series']
+        self.assertEqual(len(series), 3)
+        self.assertEqual(len(series[0]['timestamps']), 2)
+
+    def test_history_odds_format(self):
+        response = self.client.post(f"{reverse('odds_history')}?odds_format=fractional", {'events': ['event1']},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        prices = {line['name']: line['prices'] for line in response.data['events'][0]['series']}
+        self.assertEqual(prices['Sydney FC'], ['7/5', '1/1'])
+
+    def test_history_invalid_request(self):
+        response = self.client.post(reverse('odds_history'), {'events': 'event1'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OddsRollupViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        for timestamp, home_price in (('2029-12-31T08:10:00Z', 2.2), ('2029-12-31T09:10:00Z', 2.4)):
+            OddService().upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(home_price, 3.4, 3.8)}})],
+                                     timestamp=timestamp)
+        RollupService().refresh()
+
+    def test_rollup_list_with_automatic_resolution(self):
+        response = self.client.get(reverse('rollup-list'), {'event': 'event1', 'start': '2029-12-31T00:00:00Z',
+                                                            'end': '2030-01-01T00:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 6)
+        self.assertEqual({row['bucket_seconds'] for row in response.data['results']}, {3600})
+
+    def test_rollup_invalid_range(self):
+        response = self.client.get(reverse('rollup-list'), {'start': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TeamRatingViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}})],
+                                 timestamp='2029-12-31T08:00:00Z')
+        EventResult.objects.create(event=Event.objects.get(id='event1'), home_score=1, away_score=0)
+        RatingService().rebuild()
+
+    def test_ratings_ordered_by_rating(self):
+        response = self.client.get(reverse('rating-list'), {'sport': 'soccer_australia_aleague'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertGreater(response.data[0]['rating'], response.data[1]['rating'])
+
+
+class ModelProbabilityViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(event_id='past', commence_time='2025-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ],
+                                 timestamp='2024-12-31T08:00:00Z')
+        EventResult.objects.create(event=Event.objects.get(id='past'), home_score=2, away_score=1)
+        PoissonService().refresh()
+
+    def test_filter_by_market(self):
+        response = self.client.get(reverse('modelprobability-list'), {'event': 'event1', 'market': 'h2h'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 3)
+        self.assertAlmostEqual(sum(row['probability'] for row in response.data), 1.0)
+
+
+class SeasonProjectionViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(event_id='past', commence_time='2025-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+            make_odds_payload(bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ],
+                                 timestamp='2024-12-31T08:00:00Z')
+        EventResult.objects.create(event=Event.objects.get(id='past'), home_score=2, away_score=1)
+        SeasonService().simulate_sport('soccer_australia_aleague', simulations=100, processes=1)
+
+    def test_ordered_by_mean_position(self):
+        response = self.client.get(reverse('seasonprojection-list'), {'sport': 'soccer_australia_aleague'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertLessEqual(response.data[0]['mean_position'], response.data[1]['mean_position'])
+        self.assertEqual(len(response.data[0]['positions']), 2)
+
+
+class BookmakerStatsViewTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([make_odds_payload(bookmakers={
+            'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)},
+            'tab': {'h2h': h2h(1.9, 3.6, 4.0)},
+        })], timestamp='2029-12-30T08:00:00Z')
+        BookmakerStatsService().refresh()
+
+    def test_stats(self):
+        response = self.client.get(reverse('bookmaker_stats'), {'sport': 'soccer_australia_aleague',
+                                                                'bookmaker': 'tab', 'start': '2029-12-30'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        self.assertAlmostEqual(response.data[0]['best_price_rate'], 2 / 3)
+
+    def test_invalid_date(self):
+        response = self.client.get(reverse('bookmaker_stats'), {'start': '30/12/2029'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ParlayViewTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={'tab': {'h2h': h2h(1.8, 3.6, 4.2)}}),
+            make_odds_payload(event_id='event2', home_team='Adelaide United', away_team='Perth Glory', bookmakers={
+                'tab': {'h2h': h2h(2.4, 3.5, 3.0, 'Adelaide United', 'Perth Glory')},
+            }),
+        ], timestamp='2029-12-31T08:00:00Z')
+
+    def test_parlays(self):
+        response = self.client.post(reverse('parlays'), {'legs': 2, 'top': 2, 'sport': 'soccer_australia_aleague'},
+                                    format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['parlays']), 2)
+        self.assertEqual(len(response.data['parlays'][0]['legs']), 2)
+        self.assertGreaterEqual(response.data['parlays'][0]['expected_value'],
+                                response.data['parlays'][1]['expected_value'])
+
+    def test_parlay_odds_format(self):
+        response = self.client.post(f"{reverse('parlays')}?odds_format=american",
+                                    {'legs': 2, 'top': 1, 'objective': 'price'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        parlay = response.data['parlays'][0]
+        # 4.2 x 3.5 = 14.7
+        self.assertEqual(parlay['price'], 1370)
+        self.assertEqual(sorted(leg['price'] for leg in parlay['legs']), [250, 320])
+
+    def test_invalid_legs(self):
+        response = self.client.post(reverse('parlays'), {'legs': 50}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventOddsViewSetTests(OddsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='testuser',
+                                             password='testpass')
+        self.client.force_authenticate(user=self.user)
+        OddService().upsert_odds([
+            make_odds_payload(bookmakers={
+                'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8), 'totals': [('Over', 1.9, 2.5), ('Under', 1.9, 2.5)]},
+                'tab': {'h2h': h2h(2.1, 3.3, 3.6)},
+            }),
+            make_odds_payload(event_id='past',
+                              commence_time='2020-01-01T08:00:00Z',
+                              bookmakers={'sportsbet': {'h2h': h2h(2.0, 3.4, 3.8)}}),
+        ], timestamp='2019-12-31T08:00:00Z')
+
+    def add_events(self, count):
+        OddService().upsert_odds([
+            make_odds_payload(event_id=f"extra{i}", home_team=f"Home {i}", away_team=f"Away {i}", bookmakers={
+                'tab': {'h2h': h2h(2.5, 3.2, 2.7, f"Home {i}", f"Away {i}")},
+            }) for i in range(count)
+        ], timestamp='2019-12-31T09:00:00Z')
+
+    def test_nested_odds(self):
+        response = self.client.get(reverse('eventodds-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([event['id'] for event in response.data['results']], ['event1'])
+        event = response.data['results'][0]
+        self.assertEqual(event['home_team']['name'], 'Sydney FC')
+        self.assertEqual([bookmaker['key'] for bookmaker in event['bookmakers']], ['sportsbet', 'tab'])
+        markets = {market['key']: market['outcomes'] for market in event['bookmakers'][0]['markets']}
+        self.assertEqual(set(markets), {'h2h', 'totals'})
+        self.assertIn({'name': 'Over', 'price': 1.9, 'point': 2.5}, markets['totals'])
+
+        response = self.client.get(reverse('eventodds-detail', args=['past']), {'odds_format': 'american'})
+        outcomes = response.data['bookmakers'][0]['markets'][0]['outcomes']
+        self.assertEqual(sorted(outcome['price'] for outcome in outcomes), [100, 240, 280])
+
+    def test_bookmaker_and_market_filters(self):
+        response = self.client.get(reverse('eventodds-list'), {'bookmaker': 'sportsbet', 'market': 'totals'})
+        bookmakers = response.data['results'][0]['bookmakers']
+        self.assertEqual(len(bookmakers), 1)
+        self.assertEqual([market['key'] for market in bookmakers[0]['markets']], ['totals'])
+
+    def test_query_count_does_not_grow_with_events(self):
+        with self.assertNumQueries(2):
+            self.client.get(reverse('eventodds-list'))
+        self.add_events(5)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('eventodds-list'), {'odds_format': 'fractional'})
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_pages_by_commence_time_and_id(self):
+        self.add_events(4)
+        ids, url = [], reverse('eventodds-list') + '?page_size=2'
+        while url:
+            response = self.client.get(url)
+            ids += [event['id'] for event in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, ['event1', 'extra0', 'extra1', 'extra2', 'extra3'])
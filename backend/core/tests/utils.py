@@ -0,0 +1,45 @@
+# In backend/core/tests/utils.py
+
+from django.test import TestCase
+
+
+class OddsTestCase(TestCase):
+    """ TestCase for tests that ingest odds """
+
+
+def make_odds_payload(event_id='event1',
+                      sport_key='soccer_australia_aleague',
+                      home_team='Sydney FC',
+                      away_team='Melbourne Victory',
+                      commence_time='2030-01-01T08:00:00Z',
+                      bookmakers=None):
+    """ Build one event of an Odds API odds response
+
+    `bookmakers` maps a bookmaker key to {market key: [(outcome name, price, point), ...]}.
+    """
+    bookmakers = bookmakers or {}
+    return {
+        'id': event_id,
+        'sport_key': sport_key,
+        'sport_title': sport_key,
+        'commence_time': commence_time,
+        'home_team': home_team,
+        'away_team': away_team,
+        'bookmakers': [{
+            'key': bookmaker_key,
+            'title': bookmaker_key,
+            'markets': [{
+                'key': market_key,
+                'outcomes': [{
+                    'name': name,
+                    'price': price,
+                    'point': point
+                } for name, price, point in outcomes]
+            } for market_key, outcomes in markets.items()]
+        } for bookmaker_key, markets in bookmakers.items()]
+    }
+
+
+def h2h(home_price, draw_price, away_price, home_team='Sydney FC', away_team='Melbourne Victory'):
+    """ Build the outcomes of a three-way h2h market """
+    return [(home_team, home_price, None), ('Draw', draw_price, None), (away_team, away_price, None)]
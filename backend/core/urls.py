@@ -1,21 +1,46 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
-from .views import RegisterView
+from .views import (AsOfOddsView, BookmakerStatsView, OddsHistoryView,
+                    ParlayView, RegisterView)
 
 from . import views
-from .views import (EventViewSet, OddViewSet,
-                    OutcomeViewSet, SportViewSet, TeamViewSet, UserViewSet)
+from .views import (ArbitrageOpportunityViewSet, EventOddsViewSet,
+                    EventViewSet,
+                    LatestOutcomeViewSet, LeadLagViewSet,
+                    LineMovementViewSet,
+                    MarketConsensusViewSet, ModelProbabilityViewSet,
+                    OddsRollupViewSet, OddViewSet,
+                    OutcomeViewSet, SeasonProjectionViewSet,
+                    SportViewSet, SweepResultViewSet,
+                    TeamRatingViewSet, TeamViewSet, UserViewSet,
+                    ValueBetViewSet)
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet)
 router.register(r'sports', SportViewSet)
 router.register(r'teams', TeamViewSet)
 router.register(r'events', EventViewSet)
+router.register(r'event-odds', EventOddsViewSet, basename='eventodds')
 router.register(r'odd', OddViewSet)
 router.register(r'outcomes', OutcomeViewSet)
+router.register(r'latest-outcomes', LatestOutcomeViewSet, basename='latestoutcome')
+router.register(r'consensus', MarketConsensusViewSet, basename='consensus')
+router.register(r'arbitrage', ArbitrageOpportunityViewSet, basename='arbitrage')
+router.register(r'value-bets', ValueBetViewSet, basename='valuebet')
+router.register(r'line-movements', LineMovementViewSet, basename='linemovement')
+router.register(r'lead-lags', LeadLagViewSet, basename='leadlag')
+router.register(r'rollups', OddsRollupViewSet, basename='rollup')
+router.register(r'sweep-results', SweepResultViewSet, basename='sweepresult')
+router.register(r'ratings', TeamRatingViewSet, basename='rating')
+router.register(r'model-probabilities', ModelProbabilityViewSet, basename='modelprobability')
+router.register(r'season-projections', SeasonProjectionViewSet, basename='seasonprojection')
 
 urlpatterns = [
     path('', views.home, name='home'),
     path('', include(router.urls)),
+    path('odds/as-of/', AsOfOddsView.as_view(), name='odds_as_of'),
+    path('odds/history/', OddsHistoryView.as_view(), name='odds_history'),
+    path('bookmaker-stats/', BookmakerStatsView.as_view(), name='bookmaker_stats'),
+    path('parlays/', ParlayView.as_view(), name='parlays'),
     path('auth/register/', RegisterView.as_view(), name='auth_regiser')
 ]
\ No newline at end of file
@@ -1,15 +1,44 @@
+from datetime import timezone as dt_timezone
+
 from django.contrib.auth.models import User
+from django.db.models import F, Prefetch
 from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from rest_framework import generics
+from rest_framework import generics, status
+from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny
-from .serializers import RegisterSerializer
+from .filters import QueryParamFilterMixin
+from .pagination import (BucketKeysetPagination, CommenceTimeKeysetPagination, KeysetPagination,
+                         LargestEdgeFirstKeysetPagination, NewestFirstKeysetPagination)
+from .serializers import RegisterSerializer, request_odds_format
+from .services import odds_format
+from .services.as_of_service import AsOfService
+from .services.bookmaker_stats_service import BookmakerStatsService
+from .services.odds_history_service import OddsHistoryService
+from .services.parlay_service import ParlayService
+from .services.rollup_service import RollupService
 
-from .models import Event, Odd, Outcome, Sport, Team
-from .serializers import (EventSerializer,
-                          OddSerializer, OutcomeSerializer,
-                          SportSerializer, TeamSerializer, UserSerializer)
+from .models import (ArbitrageOpportunity, Event, LatestOutcome, LeadLag,
+                     LineMovement, MarketConsensus, ModelProbability, Odd,
+                     Outcome, SeasonProjection, Sport, SweepResult, Team,
+                     TeamRating, ValueBet)
+from .serializers import (ArbitrageOpportunitySerializer,
+                          EventOddsSerializer, EventSerializer,
+                          LatestOutcomeSerializer, LeadLagSerializer,
+                          LineMovementSerializer,
+                          MarketConsensusSerializer,
+                          ModelProbabilitySerializer, OddsRollupSerializer,
+                          OddSerializer,
+                          OutcomeSerializer, SeasonProjectionSerializer,
+                          SportSerializer,
+                          SweepResultSerializer, TeamRatingSerializer,
+                          TeamSerializer, UserSerializer, ValueBetSerializer)
 
 
 def home(request):
@@ -82,13 +111,370 @@ class EventViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
+class EventOddsViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Events with their teams and current prices per bookmaker and market in one response
+
+    The list holds the events that have not started, optionally filtered by `sport` and `event`
+    query parameters, and the prices can be limited to `bookmaker` and `market` keys. A page is
+    read with two queries however many events it holds: the events joined with their teams, and
+    the current prices of all of them joined with their bookmaker, market and outcome name. Pages
+    are keyset paginated on (commence_time, id).
+    """
+    serializer_class = EventOddsSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = CommenceTimeKeysetPagination
+    filter_params = {
+        'event': 'id',
+        'sport': 'sport_id',
+    }
+    outcome_filter_params = {
+        'bookmaker': 'bookmaker__key',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        outcomes = LatestOutcome.objects.select_related('bookmaker', 'market', 'name').order_by(
+            'bookmaker__key', 'market__key', 'id')
+        outcomes = outcomes.filter(**self.query_filters(self.outcome_filter_params))
+        queryset = Event.objects.select_related('home_team', 'away_team').prefetch_related(
+            Prefetch('latest_outcomes', queryset=outcomes)).order_by('commence_time', 'id')
+        if self.action == 'list':
+            queryset = queryset.filter(commence_time__gte=timezone.now())
+        return queryset
+
+
 class OddViewSet(viewsets.ModelViewSet):
     queryset = Odd.objects.all()
     serializer_class = OddSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
 
 class OutcomeViewSet(viewsets.ModelViewSet):
     queryset = Outcome.objects.all()
     serializer_class = OutcomeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+
+class LatestOutcomeViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Current prices per event/bookmaker/market/outcome, optionally filtered by
+    `event`, `sport`, `bookmaker` and `market` query parameters, keyset paginated on (timestamp, id)
+    """
+    serializer_class = LatestOutcomeSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'bookmaker': 'bookmaker__key',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        return LatestOutcome.objects.all()
+
+
+class MarketConsensusViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Best price and consensus per event/market/line/outcome, optionally filtered by
+    `event`, `sport` and `market` query parameters, keyset paginated on (timestamp, id)
+    """
+    serializer_class = MarketConsensusSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        return MarketConsensus.objects.all()
+
+    @action(detail=False)
+    def board(self, request):
+        """ Consensus rows of the events that have not started yet, keyset paginated on the commence
+        time of their event and id
+        """
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            event__commence_time__gte=timezone.now()).annotate(commence_time=F('event__commence_time'))
+        paginator = CommenceTimeKeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        return paginator.get_paginated_response(self.get_serializer(page, many=True).data)
+
+
+class ArbitrageOpportunityViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Active arbitrage opportunities of events that have not started, optionally filtered by
+    `event`, `sport` and `market` query parameters. Leg prices follow the `odds_format` query parameter.
+    """
+    serializer_class = ArbitrageOpportunitySerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        return ArbitrageOpportunity.objects.filter(active=True, event__commence_time__gt=timezone.now()).order_by(
+            '-profit_margin')
+
+
+class ValueBetViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Active value bets of events that have not started against the model probabilities, largest
+    edge first, optionally filtered by `event`, `sport`, `bookmaker` and `market` query parameters and
+    keyset paginated on (edge, id)
+    """
+    serializer_class = ValueBetSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = LargestEdgeFirstKeysetPagination
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'bookmaker': 'bookmaker__key',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        return ValueBet.objects.filter(active=True, event__commence_time__gt=timezone.now())
+
+
+class LineMovementViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Price movements between snapshots, newest first, optionally filtered by `event`, `sport`,
+    `bookmaker` and `market` query parameters, and to threshold alerts with `alerts=true`
+    """
+    serializer_class = LineMovementSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = NewestFirstKeysetPagination
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'bookmaker': 'bookmaker__key',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        queryset = LineMovement.objects.order_by('-timestamp', '-id')
+        if self.request.query_params.get('alerts') == 'true':
+            queryset = queryset.filter(is_alert=True)
+        return queryset
+
+
+class OddsRollupViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Open/high/low/close prices per outcome and time bucket, optionally filtered by `event`,
+    `sport`, `bookmaker` and `market`, limited to a `start`/`end` range (ISO 8601). The bucket size
+    is `resolution` seconds when given, otherwise the finest one that fits the range in
+    ODDS_ROLLUP_MAX_POINTS buckets. Pages are keyset paginated on (bucket_start, id).
+    """
+    serializer_class = OddsRollupSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = BucketKeysetPagination
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'bookmaker': 'bookmaker__key',
+        'market': 'market__key',
+    }
+
+    def parse_time(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValidationError({param: 'Expected an ISO 8601 datetime'})
+        return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed, dt_timezone.utc)
+
+    def get_queryset(self):
+        resolution = self.request.query_params.get('resolution')
+        if resolution and not resolution.isdigit():
+            raise ValidationError({'resolution': 'Expected a bucket size in seconds'})
+        return RollupService().rollup_queryset(start=self.parse_time('start'),
+                                               end=self.parse_time('end'),
+                                               bucket_seconds=int(resolution) if resolution else None,
+                                               **self.query_filters())
+
+
+class SweepResultViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Backtest summaries of strategy sweeps, best ROI first, optionally filtered by `sweep` """
+    serializer_class = SweepResultSerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'sweep': 'sweep',
+    }
+
+    def get_queryset(self):
+        return SweepResult.objects.order_by(F('roi').desc(nulls_last=True), 'id')
+
+
+class TeamRatingViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Current team ratings, highest first, optionally filtered by `sport` and `team` (name). The
+    primary key is the team id, the `name` of outcomes and latest outcomes
+    """
+    serializer_class = TeamRatingSerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'sport': 'team__sport_id',
+        'team': 'team__name',
+    }
+
+    def get_queryset(self):
+        return TeamRating.objects.order_by('-rating')
+
+
+class ModelProbabilityViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Poisson model probabilities of the quoted outcomes of upcoming events, optionally filtered
+    by `event`, `sport` and `market` query parameters
+    """
+    serializer_class = ModelProbabilitySerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'event': 'event_id',
+        'sport': 'event__sport_id',
+        'market': 'market__key',
+    }
+
+    def get_queryset(self):
+        return ModelProbability.objects.order_by('event_id', 'market_id', 'point', 'name_id')
+
+
+class LeadLagViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Bookmaker lead-lag pairs, strongest correlation first, optionally filtered by `sport`,
+    `market`, `leader` and `follower` (bookmaker keys) query parameters
+    """
+    serializer_class = LeadLagSerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'sport': 'sport_id',
+        'market': 'market__key',
+        'leader': 'leader__key',
+        'follower': 'follower__key',
+    }
+
+    def get_queryset(self):
+        return LeadLag.objects.order_by('-correlation')
+
+
+class SeasonProjectionViewSet(QueryParamFilterMixin, viewsets.ReadOnlyModelViewSet):
+    """ Current and simulated final standings, best mean position first, optionally filtered by
+    `sport` and `team` (name)
+    """
+    serializer_class = SeasonProjectionSerializer
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'sport': 'sport_id',
+        'team': 'team__name',
+    }
+
+    def get_queryset(self):
+        return SeasonProjection.objects.order_by('sport_id', 'mean_position')
+
+
+class AsOfOddsView(APIView):
+    """ Point-in-time prices for a batch of events
+
+    POST {"lookups": [{"event": <id>, "time": <ISO 8601>}, ...], "markets": [...], "bookmakers": [...],
+    "max_age": <seconds>} returns the snapshot in force at each time and its outcomes as columns. Prices
+    follow the `odds_format` query parameter.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        price_format = request_odds_format({'request': request})
+        try:
+            result = AsOfService().lookup(request.data.get('lookups'),
+                                          markets=request.data.get('markets'),
+                                          bookmakers=request.data.get('bookmakers'),
+                                          max_age=request.data.get('max_age'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        result['outcomes']['price'] = odds_format.convert_values(result['outcomes']['price'], price_format)
+        return Response(result)
+
+
+class BookmakerStatsView(QueryParamFilterMixin, APIView):
+    """ Margin and efficiency of each bookmaker and market, from the precomputed day buckets
+
+    GET with optional `sport`, `market`, `bookmaker` (keys) and `start`/`end` (YYYY-MM-DD, inclusive)
+    returns per bookmaker and market the mean overround, best price rate and closing line Brier
+    score and log loss.
+    """
+    permission_classes = [IsAuthenticated]
+    filter_params = {
+        'sport': 'sport_id',
+        'market': 'market__key',
+        'bookmaker': 'bookmaker__key',
+    }
+
+    def parse_day(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise ValidationError({param: 'Expected a date (YYYY-MM-DD)'})
+        return parsed
+
+    def get(self, request):
+        return Response(BookmakerStatsService().get_stats(start=self.parse_day('start'),
+                                                          end=self.parse_day('end'),
+                                                          **self.query_filters()))
+
+
+class OddsHistoryView(APIView):
+    """ Downsampled price history of a batch of events for charts
+
+    POST {"events": [<id>, ...], "market": "h2h", "bookmakers": [...], "points": <budget>, "start": <ISO 8601>,
+    "end": <ISO 8601>} returns per event one series of timestamps, prices and points per bookmaker, outcome and point.
+    Prices follow the `odds_format` query parameter.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        price_format = request_odds_format({'request': request})
+        try:
+            result = OddsHistoryService().history(request.data.get('events'),
+                                                  market=request.data.get('market') or 'h2h',
+                                                  bookmakers=request.data.get('bookmakers'),
+                                                  points=request.data.get('points'),
+                                                  start=request.data.get('start'),
+                                                  end=request.data.get('end'))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        # Convert the prices of all series in one pass
+        series = [line for event in result['events'] for line in event['series']]
+        prices = iter(odds_format.convert_values([price for line in series for price in line['prices']], price_format))
+        for line in series:
+            line['prices'] = [next(prices) for _ in line['prices']]
+        return Response(result)
+
+
+class ParlayView(APIView):
+    """ Best priced parlays of N legs from distinct upcoming events
+
+    POST {"legs": <n>, "top": <k>, "objective": "ev"|"price", "source": "consensus"|"model", "sport": <key>,
+    "markets": [...], "bookmakers": [...], "min_price": <price>, "max_price": <price>} returns the top K
+    combinations of the best price per outcome across bookmakers. The parlay and leg prices follow the
+    `odds_format` query parameter, min_price and max_price are decimal.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        price_format = request_odds_format({'request': request})
+        filters = {'event__sport_id': request.data['sport']} if request.data.get('sport') else {}
+        try:
+            result = ParlayService().price(legs=request.data.get('legs', 2),
+                                           top=request.data.get('top', 10),
+                                           objective=request.data.get('objective') or 'ev',
+                                           source=request.data.get('source') or 'consensus',
+                                           markets=request.data.get('markets'),
+                                           bookmakers=request.data.get('bookmakers'),
+                                           min_price=request.data.get('min_price'),
+                                           max_price=request.data.get('max_price'),
+                                           **filters)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        odds_format.convert_rows(result['parlays'], ['price'], price_format)
+        odds_format.convert_rows([leg for parlay in result['parlays'] for leg in parlay['legs']], ['price'],
+                                 price_format)
+        return Response(result)
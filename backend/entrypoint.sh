@@ -5,6 +5,9 @@ set -e
 python manage.py makemigrations
 python manage.py migrate
 
+# Copy the snapshot timestamp onto outcomes stored before it existed, /outcomes/ is paged by it
+python manage.py backfill_outcome_metrics --missing
+
 # Check if a command was passed
 if [ "$1" ]; then
     # If a command was passed, execute it